@@ -26,6 +26,7 @@ Benefits of this architecture:
 """
 
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 
 from flask import Flask
@@ -73,6 +74,25 @@ def create_app():
 
     container = RepositoryContainer()
 
+    # MongoDB lookups and upserts would be collection scans without their indexes: create any that are missing, and
+    # optionally refuse to start if a repository query is still planned as a collection scan
+    mongo_index_manager = container.mongo_index_manager()
+    if mongo_index_manager:
+        mongo_index_manager.ensure_indexes()
+        if os.getenv("MONGO_CHECK_QUERY_PLANS", "false").lower() == "true":
+            mongo_index_manager.check_query_plans()
+
+    # Materialized analytics live in memory: catch up with whatever the repositories already hold
+    materialized_analytics = container.materialized_analytics()
+    if materialized_analytics:
+        materialized_analytics.rebuild()
+
+    # Durable in-memory and SQLite repositories come back with their data, but the rollups next to them live in
+    # memory only
+    activity_rollups = container.activity_rollups()
+    if activity_rollups and RepositoryContainer.repo_type in ("durable_memory", "sqlite"):
+        activity_rollups.backfill(container.habit_event_repo())
+
     person_controller = container.person_controller()
     habit_controller = container.habit_controller()
     habit_event_controller = container.habit_event_controller()
@@ -0,0 +1,215 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.habit import Habit
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, batches
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+HOUR_US = 60 * 60 * 1_000_000
+DAY_US = 24 * HOUR_US
+
+STATUS_CODES = {"pending": 0, "completed": 1, "missed": 2}
+# Deleted rows are compacted away once they are this share of the rows, and at least COMPACT_MIN_ROWS
+COMPACT_DEAD_FRACTION = 0.25
+COMPACT_MIN_ROWS = 256
+# Fields of the events held by the store
+EVENT_FIELDS = ("event_id", "person_id", "habit_id", "status", "timestamp")
+
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """Naive timestamps are encoded as microseconds since 1970-01-01 on the same naive clock."""
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+class IdCodes:
+    """Maps UUIDs to dense integer codes so they can be stored in numpy arrays."""
+
+    def __init__(self):
+        self.codes: Dict[UUID, int] = {}
+        self.ids: List[UUID] = []
+
+    def encode(self, value: UUID) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.ids)
+            self.ids.append(value)
+        return code
+
+    def get(self, value: UUID) -> Optional[int]:
+        return self.codes.get(value)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ColumnarEventStore(HabitActivityListener):
+    """Columnar snapshot of habit events for vectorized analytics.
+
+    Timestamps are int64 epoch microseconds, person and habit ids are int32 codes and the status is a uint8 code,
+    so analytics become `bincount`/`unique` calls instead of loops over `HabitEvent` objects. The store is
+    refreshed incrementally: new events are appended, updated events are rewritten in place and deleted events
+    are masked out, then compacted away once they are COMPACT_DEAD_FRACTION of the rows. Reads copy the rows they
+    use under the lock, so a concurrent write never shows them half rewritten.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self.person_codes = IdCodes()
+        self.habit_codes = IdCodes()
+        self.status_codes = dict(STATUS_CODES)
+        self.rows: Dict[UUID, int] = {}
+        self.size = 0
+        self.dead = 0
+        self._allocate(max(capacity, 1))
+
+    @classmethod
+    def from_repository(cls, habit_event_repo: HabitEventRepository, batch_size: int = DEFAULT_BATCH_SIZE) -> "ColumnarEventStore":
+        """Build the store from any habit event repository backend, streaming the event rows `batch_size` at a time."""
+        store = cls()
+        for rows in batches(habit_event_repo.project(EVENT_FIELDS, batch_size), batch_size):
+            store.append(rows)
+        return store
+
+    def _allocate(self, capacity: int):
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.persons = np.zeros(capacity, dtype=np.int32)
+        self.habits = np.zeros(capacity, dtype=np.int32)
+        self.statuses = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed: int):
+        capacity = len(self.timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = (self.timestamps, self.persons, self.habits, self.statuses, self.alive)
+        self._allocate(capacity)
+        for new_column, old_column in zip((self.timestamps, self.persons, self.habits, self.statuses, self.alive), old):
+            new_column[:self.size] = old_column[:self.size]
+
+    def _status_code(self, status: str) -> int:
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.status_codes)
+        return code
+
+    # Write path
+
+    def append(self, events: Iterable[HabitEvent]):
+        """Append new events, or rewrite the row of events the store already holds."""
+        with self._lock:
+            rows, timestamps, persons, habits, statuses = [], [], [], [], []
+            size = self.size
+            for event in events:
+                row = self.rows.get(event.event_id)
+                if row is None:
+                    row = self.rows[event.event_id] = size
+                    size += 1
+                rows.append(row)
+                timestamps.append(to_epoch_us(event.timestamp))
+                persons.append(self.person_codes.encode(event.person_id))
+                habits.append(self.habit_codes.encode(event.habit_id))
+                statuses.append(self._status_code(event.status))
+            if not rows:
+                return
+
+            # Column writes are done once per batch rather than once per event
+            self._grow(size)
+            self.timestamps[rows] = timestamps
+            self.persons[rows] = persons
+            self.habits[rows] = habits
+            self.statuses[rows] = statuses
+            self.alive[rows] = True
+            self.size = size
+
+    def remove(self, event_id: UUID):
+        with self._lock:
+            row = self.rows.pop(event_id, None)
+            if row is None:
+                return
+            self.alive[row] = False
+            self.dead += 1
+            # Each compaction follows a quarter of the rows being deleted: its cost is constant per delete
+            if self.dead >= max(COMPACT_MIN_ROWS, self.size * COMPACT_DEAD_FRACTION):
+                self._compact()
+
+    def compact(self):
+        """Drop the rows of deleted events."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self.alive[:self.size])
+        row_of = {row: event_id for event_id, row in self.rows.items()}
+        for column in (self.timestamps, self.persons, self.habits, self.statuses, self.alive):
+            column[:len(keep)] = column[keep]
+        self.alive[len(keep):self.size] = False
+        self.rows = {row_of[old_row]: new_row for new_row, old_row in enumerate(keep.tolist())}
+        self.size = len(keep)
+        self.dead = 0
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        self.append([event])
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        self.remove(event.event_id)
+
+    # Read path
+
+    def _columns(self, person_id: UUID = None):
+        """Copies of the live rows, optionally of one person, taken under the lock: updates rewrite rows in place."""
+        with self._lock:
+            size = self.size
+            alive = self.alive[:size].copy()
+            if person_id:
+                code = self.person_codes.get(person_id)
+                alive &= (self.persons[:size] == code) if code is not None else False
+            # Boolean indexing copies
+            return {
+                "timestamps": self.timestamps[:size][alive],
+                "persons": self.persons[:size][alive],
+                "habits": self.habits[:size][alive],
+                "statuses": self.statuses[:size][alive],
+            }
+
+    def completion_rates(self, habits: Iterable[Habit]) -> Dict[str, dict]:
+        columns = self._columns()
+        habit_count = len(self.habit_codes)
+        totals = np.bincount(columns["habits"], minlength=habit_count)
+        completed = np.bincount(
+            columns["habits"], weights=columns["statuses"] == STATUS_CODES["completed"], minlength=habit_count
+        )
+
+        completion_rates = {}
+        for habit in habits:
+            code = self.habit_codes.get(habit.habit_id)
+            total = int(totals[code]) if code is not None and code < len(totals) else 0
+            completion_rates[str(habit.habit_id)] = {
+                "completion_rate": (int(completed[code]) / total * 100) if total > 0 else 0,
+                "habit_name": habit.name
+            }
+        return completion_rates
+
+    def time_of_day_heatmap(self, person_id: UUID = None) -> Dict[str, int]:
+        hours = (self._columns(person_id)["timestamps"] // HOUR_US) % 24
+        counts = np.bincount(hours, minlength=24)
+        return {f"{hour:02d}:00": int(count) for hour, count in enumerate(counts)}
+
+    def active_users(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        columns = self._columns()
+        days = (to_epoch_us(now or datetime.now()) - columns["timestamps"]) // DAY_US
+        persons = columns["persons"]
+        return {
+            "daily": len(np.unique(persons[days == 0])),
+            "weekly": len(np.unique(persons[days <= 7])),
+            "monthly": len(np.unique(persons[days <= 30]))
+        }
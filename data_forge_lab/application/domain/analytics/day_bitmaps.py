@@ -0,0 +1,264 @@
+import threading
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.habit import Habit
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+
+# Days held by one container of a DayBitmap (about 2.8 years)
+CONTAINER_DAYS = 1024
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def longest_run(bits: int) -> int:
+    """Length of the longest run of set bits: every `bits & (bits >> 1)` shortens all the runs by one."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+class DayBitmap:
+    """Set of days (day ordinals) as a roaring-style bitmap: the days are split into containers of CONTAINER_DAYS
+    consecutive days, each one an int whose bits are its days, and only the containers holding days are kept.
+
+    A habit logged daily for years takes a few hundred bytes, and counting, intersecting or measuring the runs of
+    the days are int operations on whole containers instead of loops over days.
+    """
+    __slots__ = ("containers",)
+
+    def __init__(self, days: Iterable[int] = ()):
+        self.containers: Dict[int, int] = {}
+        for day in days:
+            self.add(day)
+
+    def add(self, day: int):
+        key, bit = divmod(day, CONTAINER_DAYS)
+        self.containers[key] = self.containers.get(key, 0) | (1 << bit)
+
+    def discard(self, day: int):
+        key, bit = divmod(day, CONTAINER_DAYS)
+        bits = self.containers.get(key, 0) & ~(1 << bit)
+        if bits:
+            self.containers[key] = bits
+        else:
+            self.containers.pop(key, None)
+
+    def __contains__(self, day: int) -> bool:
+        key, bit = divmod(day, CONTAINER_DAYS)
+        return bool(self.containers.get(key, 0) >> bit & 1)
+
+    def __len__(self) -> int:
+        return sum(popcount(bits) for bits in self.containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.containers)
+
+    def __and__(self, other: "DayBitmap") -> "DayBitmap":
+        result = DayBitmap()
+        for key in self.containers.keys() & other.containers.keys():
+            bits = self.containers[key] & other.containers[key]
+            if bits:
+                result.containers[key] = bits
+        return result
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self.containers):
+            bits = self.containers[key]
+            while bits:
+                low = bits & -bits
+                yield key * CONTAINER_DAYS + low.bit_length() - 1
+                bits ^= low
+
+    def first(self) -> Optional[int]:
+        if not self.containers:
+            return None
+        key = min(self.containers)
+        bits = self.containers[key]
+        return key * CONTAINER_DAYS + (bits & -bits).bit_length() - 1
+
+    def last(self) -> Optional[int]:
+        if not self.containers:
+            return None
+        key = max(self.containers)
+        return key * CONTAINER_DAYS + self.containers[key].bit_length() - 1
+
+    def count(self, start: int, stop: int) -> int:
+        """Number of days in [start, stop)."""
+        total = 0
+        for key in range(start // CONTAINER_DAYS, (stop - 1) // CONTAINER_DAYS + 1):
+            bits = self.containers.get(key)
+            if bits:
+                offset = key * CONTAINER_DAYS
+                low, high = max(start - offset, 0), min(stop - offset, CONTAINER_DAYS)
+                total += popcount(bits >> low & ((1 << (high - low)) - 1))
+        return total
+
+    def span(self) -> int:
+        """The days from the first one on as a single int (bit 0: the first day), for run measurements."""
+        first = self.first()
+        if first is None:
+            return 0
+        base = first // CONTAINER_DAYS
+        bits = 0
+        for key, container in self.containers.items():
+            bits |= container << ((key - base) * CONTAINER_DAYS)
+        return bits >> first % CONTAINER_DAYS
+
+    def streaks(self) -> Tuple[int, int]:
+        """Current streak (the run of the last day) and longest streak."""
+        bits = self.span()
+        if not bits:
+            return 0, 0
+        length = bits.bit_length()
+        # The highest unset bit below the last day ends the current run
+        gaps = ~bits & ((1 << length) - 1)
+        return length - gaps.bit_length(), longest_run(bits)
+
+
+class HabitDays:
+    """Days of a habit with at least one event, and with at least one completed event.
+
+    The bitmaps hold a day once: the events beyond the first of their day are counted aside, so that removing an
+    event only clears its day with the day's last event.
+    """
+    __slots__ = ("active", "completed", "_more_active", "_more_completed")
+
+    def __init__(self):
+        self.active = DayBitmap()
+        self.completed = DayBitmap()
+        self._more_active: Dict[int, int] = {}
+        self._more_completed: Dict[int, int] = {}
+
+    def add(self, day: int, is_completed: bool):
+        self._count(self.active, self._more_active, day)
+        if is_completed:
+            self._count(self.completed, self._more_completed, day)
+
+    def remove(self, day: int, is_completed: bool):
+        self._uncount(self.active, self._more_active, day)
+        if is_completed:
+            self._uncount(self.completed, self._more_completed, day)
+
+    @staticmethod
+    def _count(bitmap: DayBitmap, more: Dict[int, int], day: int):
+        if day in bitmap:
+            more[day] = more.get(day, 0) + 1
+        else:
+            bitmap.add(day)
+
+    @staticmethod
+    def _uncount(bitmap: DayBitmap, more: Dict[int, int], day: int):
+        extra = more.get(day)
+        if extra is None:
+            bitmap.discard(day)
+        elif extra == 1:
+            del more[day]
+        else:
+            more[day] = extra - 1
+
+    def days_active(self) -> int:
+        """Days from the first active day to the last one."""
+        return self.active.last() - self.active.first() if self.active else 0
+
+    def consistency(self) -> float:
+        """Percentage of the days from the first active day to the last one with a completion."""
+        return len(self.completed) / (self.days_active() + 1) * 100 if self.active else 0
+
+
+class HabitDayBitmaps(HabitActivityListener):
+    """Per-habit bitmaps of the days with events and with completed events, kept current on event writes.
+
+    Streaks and consistency are then read with popcounts and shifts on a few ints per habit instead of grouping and
+    sorting the events, and questions across habits, such as the days on which a person completed every habit, are
+    ANDs of their bitmaps. The bitmaps count calendar days, not events: drop-off and first-week success, defined
+    over event times, stay with `AnalyticsEngine`.
+    """
+
+    def __init__(self):
+        self.habits: Dict[UUID, HabitDays] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_events(cls, events: Iterable[HabitEvent]) -> "HabitDayBitmaps":
+        """Bitmaps of events or projection rows holding their habit_id, status and timestamp, in one pass."""
+        bitmaps = cls()
+        for event in events:
+            bitmaps._days(event.habit_id).add(event.timestamp.toordinal(), event.status == "completed")
+        return bitmaps
+
+    @classmethod
+    def from_repository(cls, habit_event_repo: HabitEventRepository) -> "HabitDayBitmaps":
+        bitmaps = cls()
+        bitmaps.rebuild(habit_event_repo)
+        return bitmaps
+
+    def rebuild(self, habit_event_repo: HabitEventRepository, batch_size: int = DEFAULT_BATCH_SIZE):
+        habits = self.from_events(habit_event_repo.project(("habit_id", "status", "timestamp"), batch_size)).habits
+        with self._lock:
+            self.habits = habits
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        with self._lock:
+            if previous is not None:
+                self._remove(previous)
+            self._days(event.habit_id).add(event.timestamp.toordinal(), event.status == "completed")
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        with self._lock:
+            self._remove(event)
+
+    def on_habit_deleted(self, habit: Habit) -> None:
+        with self._lock:
+            self.habits.pop(habit.habit_id, None)
+
+    def _days(self, habit_id: UUID) -> HabitDays:
+        days = self.habits.get(habit_id)
+        if days is None:
+            days = self.habits[habit_id] = HabitDays()
+        return days
+
+    def _remove(self, event: HabitEvent):
+        days = self.habits.get(event.habit_id)
+        if days is not None:
+            days.remove(event.timestamp.toordinal(), event.status == "completed")
+
+    def activity_days(self, habits: Iterable[Habit]) -> Dict[str, dict]:
+        """Active and completed days, streaks and consistency of the habits with events."""
+        activity = {}
+        with self._lock:
+            for habit in habits:
+                days = self.habits.get(habit.habit_id)
+                if not days or not days.active:
+                    continue
+                current, longest = days.completed.streaks()
+                activity[str(habit.habit_id)] = {
+                    "habit_name": habit.name,
+                    "active_days": len(days.active),
+                    "completed_days": len(days.completed),
+                    "current_streak": current,
+                    "longest_streak": longest,
+                    "consistency": days.consistency()
+                }
+        return activity
+
+    def days_all_completed(self, habit_ids: Iterable[UUID]) -> List[date]:
+        """Days on which every one of the habits was completed (none for no habits)."""
+        with self._lock:
+            common: Optional[DayBitmap] = None
+            for habit_id in habit_ids:
+                days = self.habits.get(habit_id)
+                if days is None:
+                    return []
+                common = days.completed if common is None else common & days.completed
+                if not common:
+                    return []
+            return [date.fromordinal(day) for day in common] if common else []
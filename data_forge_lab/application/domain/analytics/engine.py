@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.habit import Habit
+
+
+# "(timestamp - first).days <= 7" is equivalent to being strictly less than 8 days after the first event
+FIRST_WEEK = timedelta(days=8)
+
+# Active user windows: persons with an event whose age in days, `(now - timestamp).days`, passes the test
+ACTIVE_WINDOWS = {
+    "daily": lambda days: days == 0,
+    "weekly": lambda days: days <= 7,
+    "monthly": lambda days: days <= 30,
+}
+
+
+@dataclass
+class HabitEventStats:
+    """Aggregated view of all events logged for a single habit.
+
+    Only the events of the first week are kept, so that the stats of a habit stay small however many events it has.
+    Events may come in any order: the ones after the first week of the first event seen so far are dropped, and the
+    kept ones are pruned again when the first week moves back.
+    """
+    person_id: UUID
+    total: int = 0
+    completed: int = 0
+    first_timestamp: Optional[datetime] = None
+    last_timestamp: Optional[datetime] = None
+    first_week: List[Tuple[datetime, bool]] = field(default_factory=list)
+    _prune_at: int = field(default=64, repr=False)
+
+    def add(self, event: HabitEvent):
+        is_completed = event.status == "completed"
+        self.total += 1
+        if is_completed:
+            self.completed += 1
+        if self.first_timestamp is None or event.timestamp < self.first_timestamp:
+            self.first_timestamp = event.timestamp
+        if self.last_timestamp is None or event.timestamp > self.last_timestamp:
+            self.last_timestamp = event.timestamp
+        if event.timestamp < self.first_timestamp + FIRST_WEEK:
+            self.first_week.append((event.timestamp, is_completed))
+            if len(self.first_week) >= self._prune_at:
+                self.first_week = self.first_week_events()
+                self._prune_at = max(64, 2 * len(self.first_week))
+
+    def first_week_events(self) -> List[Tuple[datetime, bool]]:
+        cutoff = self.first_timestamp + FIRST_WEEK
+        return [entry for entry in self.first_week if entry[0] < cutoff]
+
+
+class AnalyticsEngine:
+    """Reads habit events once, groups them by habit/person/status/hour and answers analytics queries
+    from the grouped result instead of querying the event repository once per habit.
+
+    Events are only read, never kept: the grouped result grows with the number of habits and persons, not events,
+    so the events (or rows with the same fields, see `HabitEventRepository.project`) can be streamed. Active users
+    are counted as of `now`, the time the engine is built at by default.
+    """
+
+    def __init__(self, events: Iterable[HabitEvent], now: Optional[datetime] = None):
+        self.now = now or datetime.now()
+        self.habit_stats: Dict[UUID, HabitEventStats] = {}
+        self.person_event_counts: Dict[UUID, int] = {}
+        self.active_persons: Dict[str, Set[UUID]] = {window: set() for window in ACTIVE_WINDOWS}
+        self.person_hours: Dict[UUID, List[int]] = {}
+        self.status_counts: Dict[str, int] = {}
+        self.hours = [0] * 24
+
+        for event in events:
+            self.add(event)
+
+    def add(self, event: HabitEvent):
+        stats = self.habit_stats.get(event.habit_id)
+        if stats is None:
+            stats = self.habit_stats[event.habit_id] = HabitEventStats(person_id=event.person_id)
+        stats.add(event)
+
+        self.person_event_counts[event.person_id] = self.person_event_counts.get(event.person_id, 0) + 1
+        # Every event counts, not only the latest of each person: events may be logged ahead of `now`
+        days = (self.now - event.timestamp).days
+        for window, is_within in ACTIVE_WINDOWS.items():
+            if is_within(days):
+                self.active_persons[window].add(event.person_id)
+        self.status_counts[event.status] = self.status_counts.get(event.status, 0) + 1
+
+        hour = event.timestamp.hour
+        self.hours[hour] += 1
+        person_hours = self.person_hours.get(event.person_id)
+        if person_hours is None:
+            person_hours = self.person_hours[event.person_id] = [0] * 24
+        person_hours[hour] += 1
+
+    def completion_rates(self, habits: Iterable[Habit]) -> Dict[str, dict]:
+        completion_rates = {}
+        for habit in habits:
+            stats = self.habit_stats.get(habit.habit_id)
+            completion_rates[str(habit.habit_id)] = {
+                "completion_rate": (stats.completed / stats.total * 100) if stats else 0,
+                "habit_name": habit.name
+            }
+        return completion_rates
+
+    def time_of_day_heatmap(self, person_id: UUID = None) -> Dict[str, int]:
+        hours = self.person_hours.get(person_id, [0] * 24) if person_id else self.hours
+        return {f"{hour:02d}:00": count for hour, count in enumerate(hours)}
+
+    def drop_off_rates(self, habits: Iterable[Habit], days_threshold: int = 7) -> Dict[str, dict]:
+        drop_off_data = {}
+        for habit in habits:
+            stats = self.habit_stats.get(habit.habit_id)
+            if not stats:
+                continue
+
+            days_active = (stats.last_timestamp - stats.first_timestamp).days
+            drop_off_data[str(habit.habit_id)] = {
+                "drop_off_rate": 1 if days_active < days_threshold else 0,
+                "habit_name": habit.name,
+                "days_active": days_active
+            }
+        return drop_off_data
+
+    def first_week_success(self, habits: Iterable[Habit]) -> Dict[str, dict]:
+        first_week_data = {}
+        for habit in habits:
+            stats = self.habit_stats.get(habit.habit_id)
+            if not stats:
+                continue
+
+            first_week = [is_completed for _, is_completed in stats.first_week_events()]
+            first_week_data[str(habit.habit_id)] = {
+                "success_rate": (sum(first_week) / len(first_week) * 100) if first_week else 0,
+                "habit_name": habit.name
+            }
+        return first_week_data
+
+    def active_users(self) -> Dict[str, int]:
+        """Persons with an event in the last day, week and month before `now`."""
+        return {window: len(persons) for window, persons in self.active_persons.items()}
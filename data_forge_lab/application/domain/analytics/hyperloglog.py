@@ -0,0 +1,112 @@
+import math
+import threading
+from datetime import date, datetime, timedelta
+from hashlib import blake2b
+from typing import Dict, Iterable, Optional
+
+from application.domain.models.event import HabitEvent
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+
+# 2 ** -rank for every rank a 64 bit hash can produce
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(66)]
+
+
+class HyperLogLog:
+    """Fixed-size sketch estimating the number of distinct values added to it.
+
+    With `m = 2 ** precision` registers the relative standard error is about `1.04 / sqrt(m)`: 1.6% for the
+    default precision of 12, which takes 4 KiB. Sketches are mergeable, the union of two sketches being the
+    register-wise maximum, but values cannot be removed from them.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: bytes):
+        hashed = int.from_bytes(blake2b(value, digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Return the sketch of the union of both sketches."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        return HyperLogLog(self.precision, bytearray(map(max, self.registers, other.registers)))
+
+    def count(self) -> int:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(_INVERSE_POWERS[rank] for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"], precision: int = 12) -> "HyperLogLog":
+        merged = cls(precision)
+        for sketch in sketches:
+            merged = merged.merge(sketch)
+        return merged
+
+
+class DailyActiveUserSketches(HabitActivityListener):
+    """One HyperLogLog sketch of the active persons per day.
+
+    Active users over any window come from merging one fixed-size sketch per day, so memory no longer grows with
+    the number of users. Like the rollups, windows are aligned on calendar days. Sketches only grow: deleting or
+    moving an event does not remove its person from a day until the sketches are rebuilt.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.sketches: Dict[date, HyperLogLog] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_repository(cls, habit_event_repo: HabitEventRepository, precision: int = 12) -> "DailyActiveUserSketches":
+        sketches = cls(precision)
+        sketches.add(habit_event_repo.project(("person_id", "timestamp")))
+        return sketches
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def add(self, events: Iterable[HabitEvent]):
+        with self._lock:
+            for event in events:
+                day = event.timestamp.date()
+                sketch = self.sketches.get(day)
+                if sketch is None:
+                    sketch = self.sketches[day] = HyperLogLog(self.precision)
+                sketch.add(event.person_id.bytes)
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        self.add([event])
+
+    def count_between(self, start: date, end: date) -> int:
+        with self._lock:
+            sketches = [sketch for day, sketch in self.sketches.items() if start <= day <= end]
+        return HyperLogLog.union(sketches, self.precision).count()
+
+    def active_users(self, today: Optional[date] = None, days: Optional[int] = None) -> Dict[str, int]:
+        """Approximate distinct active persons today, over the last 7 and 30 days and, optionally, the last `days` days."""
+        today = today or datetime.now().date()
+        since = {"daily": today, "weekly": today - timedelta(days=7), "monthly": today - timedelta(days=30)}
+        if days:
+            since[f"last_{days}_days"] = today - timedelta(days=days - 1)
+        return {window: self.count_between(start, today) for window, start in since.items()}
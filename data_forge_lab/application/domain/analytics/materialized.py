@@ -0,0 +1,217 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+
+from application.domain.models.person import Country, Person
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.analytics.person_countries import PersonCountries, country_of
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+
+
+@dataclass
+class MaterializedHabit:
+    person_id: UUID
+    name: str
+    category: str
+
+
+class MaterializedAnalytics(HabitActivityListener):
+    """Analytics counters kept up to date by the services on every habit and habit event write.
+
+    Reads are O(1) or O(result size). The counters live in process memory, so they have to be rebuilt from the
+    repositories on startup when the storage outlives the process (e.g. MongoDB), and `check_consistency` can be
+    used to compare them against a full recompute.
+    """
+
+    def __init__(self, person_repo: PersonRepository, habit_repo: HabitRepository, habit_event_repo: HabitEventRepository):
+        self.person_repo = person_repo
+        self.habit_repo = habit_repo
+        self.habit_event_repo = habit_event_repo
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.habits: Dict[UUID, MaterializedHabit] = {}
+        self.person_habits: Dict[UUID, Set[UUID]] = {}
+        # Events may reference habits that are not (or no longer) stored, so their counts are kept separately
+        self.event_counts: Dict[UUID, List[int]] = {}
+        self.hours = [0] * 24
+        self.person_hours: Dict[UUID, List[int]] = {}
+        self.category_counts: Dict[str, int] = {}
+        self.person_category_counts: Dict[UUID, Dict[str, int]] = {}
+        self.person_event_counts: Dict[UUID, int] = {}
+        self.country_totals = {
+            country.value: {"total_habits": 0, "total_events": 0, "active_users": 0} for country in Country
+        }
+        self.person_countries = PersonCountries(self.person_repo)
+
+    # Write path
+
+    def on_person_saved(self, previous: Optional[Person], person: Person) -> None:
+        with self._lock:
+            self._move_person(person.person_id, self.person_countries.update(person), country_of(person))
+
+    def on_person_deleted(self, person: Person) -> None:
+        with self._lock:
+            self._move_person(person.person_id, self.person_countries.forget(person.person_id), None)
+
+    def _move_person(self, person_id: UUID, old: Optional[str], new: Optional[str]):
+        """Move the habits, events and activity of a person from the country they were counted under to `new`."""
+        if old == new:
+            return
+        events = self.person_event_counts.get(person_id, 0)
+        totals = {
+            "total_habits": len(self.person_habits.get(person_id, ())),
+            "total_events": events,
+            "active_users": 1 if events else 0
+        }
+        for country, sign in ((old, -1), (new, 1)):
+            if country:
+                for key, value in totals.items():
+                    self.country_totals[country][key] += sign * value
+
+    def on_habit_saved(self, previous: Optional[Habit], habit: Habit) -> None:
+        with self._lock:
+            if previous is not None or habit.habit_id in self.habits:
+                self._remove_habit(habit.habit_id)
+            self._add_habit(habit)
+
+    def on_habit_deleted(self, habit: Habit) -> None:
+        with self._lock:
+            self._remove_habit(habit.habit_id)
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        with self._lock:
+            if previous is not None:
+                self._apply_event(previous, -1)
+            self._apply_event(event, 1)
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        with self._lock:
+            self._apply_event(event, -1)
+
+    def _add_habit(self, habit: Habit):
+        self.habits[habit.habit_id] = MaterializedHabit(person_id=habit.person_id, name=habit.name, category=habit.category)
+        self.person_habits.setdefault(habit.person_id, set()).add(habit.habit_id)
+        self._count_category(habit.person_id, habit.category, 1)
+
+        country = self._country_of(habit.person_id)
+        if country:
+            self.country_totals[country]["total_habits"] += 1
+
+    def _remove_habit(self, habit_id: UUID):
+        habit = self.habits.pop(habit_id, None)
+        if habit is None:
+            return
+        self.person_habits.get(habit.person_id, set()).discard(habit_id)
+        self._count_category(habit.person_id, habit.category, -1)
+
+        country = self._country_of(habit.person_id)
+        if country:
+            self.country_totals[country]["total_habits"] -= 1
+
+    def _count_category(self, person_id: UUID, category: str, delta: int):
+        self.category_counts[category] = self.category_counts.get(category, 0) + delta
+        if not self.category_counts[category]:
+            del self.category_counts[category]
+
+        person_counts = self.person_category_counts.setdefault(person_id, {})
+        person_counts[category] = person_counts.get(category, 0) + delta
+        if not person_counts[category]:
+            del person_counts[category]
+
+    def _apply_event(self, event: HabitEvent, delta: int):
+        completed = delta if event.status == "completed" else 0
+        counts = self.event_counts.setdefault(event.habit_id, [0, 0])
+        counts[0] += delta
+        counts[1] += completed
+        if not counts[0]:
+            del self.event_counts[event.habit_id]
+
+        hour = event.timestamp.hour
+        self.hours[hour] += delta
+        self.person_hours.setdefault(event.person_id, [0] * 24)[hour] += delta
+
+        previous_count = self.person_event_counts.get(event.person_id, 0)
+        if previous_count + delta:
+            self.person_event_counts[event.person_id] = previous_count + delta
+        else:
+            self.person_event_counts.pop(event.person_id, None)
+
+        country = self._country_of(event.person_id)
+        if country:
+            self.country_totals[country]["total_events"] += delta
+            if previous_count == 0 and delta > 0:
+                self.country_totals[country]["active_users"] += 1
+            elif previous_count + delta == 0:
+                self.country_totals[country]["active_users"] -= 1
+
+    def _country_of(self, person_id: UUID) -> Optional[str]:
+        return self.person_countries.get(person_id)
+
+    # Read path
+
+    def completion_rates(self, person_id: UUID = None) -> Dict[str, dict]:
+        habit_ids = self.person_habits.get(person_id, ()) if person_id else self.habits.keys()
+        completion_rates = {}
+        for habit_id in list(habit_ids):
+            habit = self.habits[habit_id]
+            total, completed = self.event_counts.get(habit_id, (0, 0))
+            completion_rates[str(habit_id)] = {
+                "completion_rate": (completed / total * 100) if total > 0 else 0,
+                "habit_name": habit.name
+            }
+        return completion_rates
+
+    def time_of_day_heatmap(self, person_id: UUID = None) -> Dict[str, int]:
+        hours = self.person_hours.get(person_id, [0] * 24) if person_id else self.hours
+        return {f"{hour:02d}:00": count for hour, count in enumerate(hours)}
+
+    def category_distribution(self, person_id: UUID = None) -> Dict[str, int]:
+        return dict(self.person_category_counts.get(person_id, {}) if person_id else self.category_counts)
+
+    def geographic_trends(self) -> Dict[str, Dict[str, int]]:
+        return {country: dict(totals) for country, totals in self.country_totals.items()}
+
+    # Maintenance
+
+    def rebuild(self):
+        """Recompute every counter from scratch out of the repositories."""
+        with self._lock:
+            self._reset()
+            self.person_countries.load(self.person_repo.project(("person_id", "country")))
+            for habit in self.habit_repo.project(("habit_id", "person_id", "name", "category")):
+                self._add_habit(habit)
+            for event in self.habit_event_repo.project(("habit_id", "person_id", "status", "timestamp")):
+                self._apply_event(event, 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "completion_rates": self.completion_rates(),
+                "time_of_day_heatmap": self.time_of_day_heatmap(),
+                "category_distribution": self.category_distribution(),
+                "geographic_trends": self.geographic_trends(),
+            }
+
+    def check_consistency(self) -> dict:
+        """Compare the incrementally maintained counters against a full recompute.
+
+        Returns the name of every section that differs, along with both versions.
+        """
+        recomputed = MaterializedAnalytics(self.person_repo, self.habit_repo, self.habit_event_repo)
+        recomputed.rebuild()
+
+        current = self.snapshot()
+        expected = recomputed.snapshot()
+        mismatches = {
+            section: {"materialized": current[section], "recomputed": expected[section]}
+            for section in current
+            if current[section] != expected[section]
+        }
+        return {"consistent": not mismatches, "mismatches": mismatches}
@@ -0,0 +1,56 @@
+import threading
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from application.domain.models.person import Person
+from interfaces.repositories.person_repository import PersonRepository
+
+
+def country_of(person: Person) -> Optional[str]:
+    return person.country.value if person.country else None
+
+
+class PersonCountries:
+    """Country of every person, for the analytics that attribute habits and events to a country.
+
+    A person is read from the repository the first time it is asked for, then only changes through `update` and
+    `forget`, which the person hooks of the listeners call. The country returned by `get` is therefore the one the
+    person's counts were attributed to: `update` and `forget` return it so that the counts can be moved. Persons that
+    are not stored (yet) are not cached, and count under no country.
+    """
+
+    def __init__(self, person_repo: PersonRepository):
+        self.person_repo = person_repo
+        self._countries: Dict[UUID, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, person_id: UUID) -> Optional[str]:
+        with self._lock:
+            if person_id in self._countries:
+                return self._countries[person_id]
+        try:
+            person = self.person_repo.get_by_id(person_id)
+        except ValueError:
+            person = None
+        if person is None:
+            return None
+        with self._lock:
+            return self._countries.setdefault(person_id, country_of(person))
+
+    def load(self, persons: Iterable):
+        """Replace the cache by the countries of persons or projection rows holding their person_id and country."""
+        countries = {person.person_id: country_of(person) for person in persons}
+        with self._lock:
+            self._countries = countries
+
+    def update(self, person: Person) -> Optional[str]:
+        """Record the person's current country. Returns the country it was attributed to until now."""
+        with self._lock:
+            previous = self._countries.get(person.person_id)
+            self._countries[person.person_id] = country_of(person)
+            return previous
+
+    def forget(self, person_id: UUID) -> Optional[str]:
+        """Drop a deleted person. Returns the country it was attributed to."""
+        with self._lock:
+            return self._countries.pop(person_id, None)
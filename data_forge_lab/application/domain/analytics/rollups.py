@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.rollup import ActivityRollup
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.activity_rollup_repository import ActivityRollupRepository
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+
+
+class ActivityRollups(HabitActivityListener):
+    """Keeps daily rollups of habit events, with hourly buckets, for every person and globally.
+
+    Event writes bump the counters of the rollups they fall into, so the time-of-day heatmap and the active user
+    counts read one rollup per day of the requested range instead of scanning the raw events. Active user windows
+    are aligned on calendar days.
+    """
+
+    def __init__(self, rollup_repo: ActivityRollupRepository):
+        self.rollup_repo = rollup_repo
+
+    def _increment(self, event: HabitEvent, sign: int):
+        day, hour = event.timestamp.date(), event.timestamp.hour
+        completed = sign if event.status == "completed" else 0
+        self.rollup_repo.increment(day, None, hour, sign, completed)
+        self.rollup_repo.increment(day, event.person_id, hour, sign, completed)
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        if previous:
+            self._increment(previous, -1)
+        self._increment(event, 1)
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        self._increment(event, -1)
+
+    def backfill(self, habit_event_repo: HabitEventRepository) -> int:
+        """Rebuild every rollup from the raw events. Returns the number of rollups written."""
+        rollups: Dict[Tuple[date, Optional[UUID]], ActivityRollup] = {}
+        for event in habit_event_repo.project(("person_id", "status", "timestamp")):
+            day, hour = event.timestamp.date(), event.timestamp.hour
+            completed = 1 if event.status == "completed" else 0
+            for person_id in (None, event.person_id):
+                rollup = rollups.get((day, person_id))
+                if rollup is None:
+                    rollup = rollups[(day, person_id)] = ActivityRollup(day=day, person_id=person_id)
+                rollup.add(hour, 1, completed)
+        self.rollup_repo.replace_all(rollups.values())
+        return len(rollups)
+
+    def time_of_day_heatmap(self, person_id: UUID = None, start: date = None, end: date = None) -> Dict[str, int]:
+        hours = [0] * 24
+        for rollup in self.rollup_repo.find_range(start, end, person_id):
+            for hour, count in enumerate(rollup.hourly_counts):
+                hours[hour] += count
+        return {f"{hour:02d}:00": count for hour, count in enumerate(hours)}
+
+    def active_users(self, today: Optional[date] = None, days: Optional[int] = None) -> Dict[str, int]:
+        """Distinct active persons today, over the last 7 and 30 days and, optionally, over the last `days` days."""
+        today = today or datetime.now().date()
+        since = {"daily": today, "weekly": today - timedelta(days=7), "monthly": today - timedelta(days=30)}
+        if days:
+            since[f"last_{days}_days"] = today - timedelta(days=days - 1)
+
+        active: Dict[str, Set[UUID]] = {window: set() for window in since}
+        for rollup in self.rollup_repo.find_person_rollups(min(since.values()), today):
+            if rollup.event_count <= 0:
+                continue
+            for window, start in since.items():
+                if rollup.day >= start:
+                    active[window].add(rollup.person_id)
+        return {window: len(persons) for window, persons in active.items()}
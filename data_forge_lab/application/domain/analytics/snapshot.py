@@ -0,0 +1,96 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, project_entities
+
+
+def _group(items, key) -> Dict:
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
+
+
+class _PersonSnapshot:
+    def __init__(self, persons: List[Person]):
+        self.persons = persons
+        self.by_id = {person.person_id: person for person in persons}
+        self.by_country = _group(persons, lambda person: person.country)
+
+    def get_by_id(self, person_id: UUID) -> Optional[Person]:
+        return self.by_id.get(person_id)
+
+    def find_all(self) -> List[Person]:
+        return self.persons
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Person]:
+        return iter(self.persons)
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return project_entities(self.persons, Person, fields)
+
+    def find_by_country(self, country: Country) -> List[Person]:
+        return self.by_country.get(country, [])
+
+
+class _HabitSnapshot:
+    def __init__(self, habits: List[Habit]):
+        self.habits = habits
+        self.by_id = {habit.habit_id: habit for habit in habits}
+        self.by_person = _group(habits, lambda habit: habit.person_id)
+
+    def get_by_id(self, habit_id: UUID) -> Optional[Habit]:
+        return self.by_id.get(habit_id)
+
+    def find_all(self) -> List[Habit]:
+        return self.habits
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Habit]:
+        return iter(self.habits)
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return project_entities(self.habits, Habit, fields)
+
+    def find_by_person_id(self, person_id: UUID) -> List[Habit]:
+        return self.by_person.get(person_id, [])
+
+
+class _HabitEventSnapshot:
+    def __init__(self, events: List[HabitEvent]):
+        self.events = events
+        self.by_person = _group(events, lambda event: event.person_id)
+        self.by_habit = _group(events, lambda event: event.habit_id)
+
+    def find_all(self) -> List[HabitEvent]:
+        return self.events
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[HabitEvent]:
+        return iter(self.events)
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return project_entities(self.events, HabitEvent, fields)
+
+    def find_by_person_id(self, person_id: UUID) -> List[HabitEvent]:
+        return self.by_person.get(person_id, [])
+
+    def find_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        return self.by_habit.get(habit_id, [])
+
+
+class RepositorySnapshot:
+    """Read-only copy of the persons, habits and habit events, loaded with one `find_all` per repository.
+
+    It exposes the finders the analytics use, so several analytics can be computed from the same data without
+    going back to the repositories. The returned lists are shared and must not be mutated.
+    """
+
+    def __init__(self, person_repo: PersonRepository, habit_repo: HabitRepository, habit_event_repo: HabitEventRepository):
+        self.persons = _PersonSnapshot(person_repo.find_all())
+        self.habits = _HabitSnapshot(habit_repo.find_all())
+        self.habit_events = _HabitEventSnapshot(habit_event_repo.find_all())
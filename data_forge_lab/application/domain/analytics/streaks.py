@@ -0,0 +1,249 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.habit import Habit
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, batches
+
+
+class CompletionDays:
+    """The days on which a habit was completed, as sorted runs of consecutive days, with their streaks.
+
+    Days are day ordinals, counted once however many completions they hold. The runs are kept as sorted lists of
+    first and last days, and their lengths as a sorted list: adding or removing a day anywhere finds the runs it
+    touches by bisection and merges, shortens or splits them, then reads the current streak (the run of the last
+    completed day) and the longest one at the ends of the lists.
+
+    Only the latest completion time of each day is kept: removing it from a day with other completions leaves it
+    as the day's latest, which is off by at most the rest of that day.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.latest: Dict[int, datetime] = {}
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.lengths: List[int] = []
+
+    @classmethod
+    def from_days(cls, counts: Dict[int, int], latest: Dict[int, datetime]) -> "CompletionDays":
+        """Runs of the days with completions (day ordinal -> completions, and latest completion time), in one
+        sorted pass."""
+        days = cls()
+        days.counts, days.latest = dict(counts), dict(latest)
+        for day in sorted(days.counts):
+            if days.ends and days.ends[-1] == day - 1:
+                days.ends[-1] = day
+            else:
+                days.starts.append(day)
+                days.ends.append(day)
+        days.lengths = sorted(end - start + 1 for start, end in zip(days.starts, days.ends))
+        return days
+
+    @property
+    def current(self) -> int:
+        return self.ends[-1] - self.starts[-1] + 1 if self.starts else 0
+
+    @property
+    def longest(self) -> int:
+        return self.lengths[-1] if self.lengths else 0
+
+    @property
+    def last_completed(self) -> Optional[datetime]:
+        return self.latest[self.ends[-1]] if self.ends else None
+
+    def add(self, completed_at: datetime) -> bool:
+        """Count a completion. Returns whether its day had none before, and so changed the runs."""
+        day = completed_at.toordinal()
+        count = self.counts.get(day, 0)
+        self.counts[day] = count + 1
+        if count:
+            self.latest[day] = max(self.latest[day], completed_at)
+            return False
+        self.latest[day] = completed_at
+        index = bisect_right(self.starts, day)
+        extends_previous = index > 0 and self.ends[index - 1] == day - 1
+        extends_next = index < len(self.starts) and self.starts[index] == day + 1
+        if extends_previous and extends_next:
+            self._drop_length(index - 1)
+            self._drop_length(index)
+            self.ends[index - 1] = self.ends[index]
+            del self.starts[index], self.ends[index]
+            self._add_length(index - 1)
+        elif extends_previous:
+            self._drop_length(index - 1)
+            self.ends[index - 1] = day
+            self._add_length(index - 1)
+        elif extends_next:
+            self._drop_length(index)
+            self.starts[index] = day
+            self._add_length(index)
+        else:
+            self.starts.insert(index, day)
+            self.ends.insert(index, day)
+            self._add_length(index)
+        return True
+
+    def remove(self, completed_at: datetime) -> bool:
+        """Uncount a completion. Returns whether it was its day's last one, and so changed the runs."""
+        day = completed_at.toordinal()
+        count = self.counts.get(day, 0)
+        if count > 1:
+            self.counts[day] = count - 1
+        if count != 1:
+            return False
+        del self.counts[day], self.latest[day]
+        index = bisect_right(self.starts, day) - 1
+        start, end = self.starts[index], self.ends[index]
+        self._drop_length(index)
+        if start == end:
+            del self.starts[index], self.ends[index]
+            return True
+        if day == start:
+            self.starts[index] = day + 1
+        elif day == end:
+            self.ends[index] = day - 1
+        else:
+            self.ends[index] = day - 1
+            self.starts.insert(index + 1, day + 1)
+            self.ends.insert(index + 1, end)
+            self._add_length(index + 1)
+        self._add_length(index)
+        return True
+
+    def _add_length(self, index: int):
+        insort(self.lengths, self.ends[index] - self.starts[index] + 1)
+
+    def _drop_length(self, index: int):
+        del self.lengths[bisect_left(self.lengths, self.ends[index] - self.starts[index] + 1)]
+
+
+def completion_history(habit_event_repo: HabitEventRepository,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[UUID, CompletionDays]:
+    """Completed days of every habit with completed events, from one streamed scan of the events in any order."""
+    counts: Dict[UUID, Counter] = defaultdict(Counter)
+    latest: Dict[UUID, Dict[int, datetime]] = defaultdict(dict)
+    for event in habit_event_repo.project(("habit_id", "status", "timestamp"), batch_size):
+        if event.status != "completed":
+            continue
+        day = event.timestamp.toordinal()
+        counts[event.habit_id][day] += 1
+        days = latest[event.habit_id]
+        if day not in days or event.timestamp > days[day]:
+            days[day] = event.timestamp
+    return {habit_id: CompletionDays.from_days(counts[habit_id], latest[habit_id]) for habit_id in counts}
+
+
+def recompute_streaks(habit_event_repo: HabitEventRepository, habit_repo: HabitRepository,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Rebuild the streaks and last completion of every habit from its completed events, in one sorted pass per
+    habit, and save the habits whose stored values were wrong, `batch_size` at a time. Returns their number.
+
+    Habits are saved whole: run it while habits are not being edited, edits made during the run may be lost.
+    """
+    history = completion_history(habit_event_repo, batch_size)
+
+    def corrected() -> Iterable[Habit]:
+        for habit in habit_repo.iter_all(batch_size):
+            days = history.get(habit.habit_id) or CompletionDays()
+            values = (days.current, days.longest, days.last_completed)
+            if (habit.streak, habit.longest_streak, habit.last_completed) != values:
+                habit.streak, habit.longest_streak, habit.last_completed = values
+                yield habit
+
+    return sum(len(habit_repo.save_many(batch).written) for batch in batches(corrected(), batch_size))
+
+
+class StreakTracker(HabitActivityListener):
+    """Keeps the streaks of every habit exact whatever the order in which completions are logged or deleted.
+
+    The completed days of each habit are held as runs (see CompletionDays). An event write or delete updates the
+    runs with O(log n) searches, then writes the habit's current and longest streak and last completion, computed
+    from every completed day rather than from the previous completion only. Writes happen outside of the tracker's
+    lock, one habit at a time: other habits are tracked while a habit's streaks are written.
+    """
+    # The tracker writes the streaks: the services leave them alone
+    updates_streaks = True
+
+    def __init__(self, habit_repo: HabitRepository):
+        self.habit_repo = habit_repo
+        self.habits: Dict[UUID, CompletionDays] = {}
+        self._write_locks: Dict[UUID, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_repositories(cls, habit_event_repo: HabitEventRepository, habit_repo: HabitRepository) -> "StreakTracker":
+        tracker = cls(habit_repo)
+        tracker.rebuild(habit_event_repo)
+        return tracker
+
+    def rebuild(self, habit_event_repo: HabitEventRepository):
+        """Load the completed days of every habit from the events. Stored streaks are left as they are, see
+        `recompute_streaks` to fix them."""
+        habits = completion_history(habit_event_repo)
+        with self._lock:
+            self.habits = habits
+
+    def streaks(self, habit_id: UUID) -> Tuple[int, int]:
+        """Current and longest streak of a habit."""
+        with self._lock:
+            days = self.habits.get(habit_id)
+            return (days.current, days.longest) if days else (0, 0)
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        changed = set()
+        with self._lock:
+            if previous is not None and previous.status == "completed":
+                if self._days(previous.habit_id).remove(previous.timestamp):
+                    changed.add(previous.habit_id)
+            if event.status == "completed":
+                self._days(event.habit_id).add(event.timestamp)
+                changed.add(event.habit_id)
+        for habit_id in changed:
+            self._write(habit_id)
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        with self._lock:
+            changed = event.status == "completed" and self._days(event.habit_id).remove(event.timestamp)
+        if changed:
+            self._write(event.habit_id)
+
+    def on_habit_events_deleted(self, habit_id: UUID, events: List[HabitEvent]) -> None:
+        # The habit goes with its events: its days are dropped and its streaks not written
+        self._forget(habit_id)
+
+    def on_habit_deleted(self, habit: Habit) -> None:
+        self._forget(habit.habit_id)
+
+    def _forget(self, habit_id: UUID):
+        with self._lock:
+            self.habits.pop(habit_id, None)
+            self._write_locks.pop(habit_id, None)
+
+    def _days(self, habit_id: UUID) -> CompletionDays:
+        days = self.habits.get(habit_id)
+        if days is None:
+            days = self.habits[habit_id] = CompletionDays()
+        return days
+
+    def _write(self, habit_id: UUID):
+        # Writes of a habit are serialized and each one reads the latest days right before writing, so that the last
+        # write holds them. The tracker's lock is only held for the read
+        with self._lock:
+            write_lock = self._write_locks.setdefault(habit_id, threading.Lock())
+        with write_lock:
+            with self._lock:
+                days = self.habits.get(habit_id)
+                if days is None:
+                    return
+                changes = {
+                    "streak": days.current, "longest_streak": days.longest, "last_completed": days.last_completed
+                }
+            self.habit_repo.update_fields(habit_id, changes)
@@ -0,0 +1,166 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from application.domain.models.person import Person
+from application.domain.models.habit import Habit
+from application.domain.analytics.person_countries import PersonCountries, country_of
+from interfaces.habit_activity_listener import HabitActivityListener
+from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.habit_repository import HabitRepository
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary holding at most `capacity` counters.
+
+    When a new item arrives and the summary is full, it takes over the smallest counter, whose count becomes the
+    item's `error`: any item with a true count above `total / capacity` is guaranteed to be tracked, and a tracked
+    count overestimates the true count by at most its error.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+
+    def increment(self, item: str):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += 1
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [1, 0]
+        else:
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            count = self.counters.pop(victim)[0]
+            self.counters[item] = [count + 1, count]
+
+    def decrement(self, item: str):
+        counter = self.counters.get(item)
+        if counter is None:
+            return
+        counter[0] -= 1
+        if counter[0] <= 0:
+            del self.counters[item]
+
+    def load(self, counts: Dict[str, int]):
+        """Replace the counters by the `capacity` largest exact counts."""
+        largest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+        self.counters = {item: [count, 0] for item, count in largest if count > 0}
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+
+class HabitPopularityTracker(HabitActivityListener):
+    """Streaming top-K of habit names by number of distinct users, overall, per category and per country.
+
+    Habit writes adjust one Space-Saving summary per scope, so popularity is answered from at most `capacity`
+    counters regardless of the number of habits. A person only counts once per habit name: the tracker looks at
+    the person's other habits before counting a habit in or out.
+    """
+
+    def __init__(self, person_repo: PersonRepository, habit_repo: HabitRepository, capacity: int = 100):
+        self.person_repo = person_repo
+        self.habit_repo = habit_repo
+        self.capacity = capacity
+        self._lock = threading.RLock()
+        self._reset()
+
+    @classmethod
+    def from_repositories(cls, person_repo: PersonRepository, habit_repo: HabitRepository, capacity: int = 100) -> "HabitPopularityTracker":
+        tracker = cls(person_repo, habit_repo, capacity)
+        tracker.rebuild()
+        return tracker
+
+    def _reset(self):
+        self.overall = SpaceSaving(self.capacity)
+        self.by_category: Dict[str, SpaceSaving] = {}
+        self.by_country: Dict[str, SpaceSaving] = {}
+        self.person_countries = PersonCountries(self.person_repo)
+
+    def _summary(self, summaries: Dict[str, SpaceSaving], key: str) -> SpaceSaving:
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = SpaceSaving(self.capacity)
+        return summary
+
+    # Write path
+
+    def on_person_saved(self, previous: Optional[Person], person: Person) -> None:
+        with self._lock:
+            self._move_person(person.person_id, self.person_countries.update(person), country_of(person))
+
+    def on_person_deleted(self, person: Person) -> None:
+        with self._lock:
+            self._move_person(person.person_id, self.person_countries.forget(person.person_id), None)
+
+    def _move_person(self, person_id: UUID, old: Optional[str], new: Optional[str]):
+        """Count the habit names of a person under `new` instead of the country they were counted under."""
+        if old == new:
+            return
+        names = {habit.name for habit in self.habit_repo.find_by_person_id(person_id)}
+        for name in names:
+            if old:
+                self._summary(self.by_country, old).decrement(name)
+            if new:
+                self._summary(self.by_country, new).increment(name)
+
+    def _apply(self, habit: Habit, delta: int):
+        others = [other for other in self.habit_repo.find_by_person_id(habit.person_id) if other.habit_id != habit.habit_id]
+        summaries = []
+        if not any(other.name == habit.name for other in others):
+            summaries.append(self.overall)
+            country = self.person_countries.get(habit.person_id)
+            if country:
+                summaries.append(self._summary(self.by_country, country))
+        if not any(other.name == habit.name and other.category == habit.category for other in others):
+            summaries.append(self._summary(self.by_category, habit.category))
+
+        for summary in summaries:
+            if delta > 0:
+                summary.increment(habit.name)
+            else:
+                summary.decrement(habit.name)
+
+    def on_habit_saved(self, previous: Optional[Habit], habit: Habit) -> None:
+        with self._lock:
+            if previous is not None:
+                self._apply(previous, -1)
+            self._apply(habit, 1)
+
+    def on_habit_deleted(self, habit: Habit) -> None:
+        with self._lock:
+            self._apply(habit, -1)
+
+    def rebuild(self):
+        """Load every summary with the exact counts computed from the repositories."""
+        overall: Dict[str, set] = {}
+        by_category: Dict[str, Dict[str, set]] = {}
+        by_country: Dict[str, Dict[str, set]] = {}
+        with self._lock:
+            self._reset()
+            self.person_countries.load(self.person_repo.project(("person_id", "country")))
+            for habit in self.habit_repo.project(("person_id", "name", "category")):
+                overall.setdefault(habit.name, set()).add(habit.person_id)
+                by_category.setdefault(habit.category, {}).setdefault(habit.name, set()).add(habit.person_id)
+                country = self.person_countries.get(habit.person_id)
+                if country:
+                    by_country.setdefault(country, {}).setdefault(habit.name, set()).add(habit.person_id)
+
+            self.overall.load({name: len(persons) for name, persons in overall.items()})
+            for summaries, scoped in ((self.by_category, by_category), (self.by_country, by_country)):
+                for key, names in scoped.items():
+                    self._summary(summaries, key).load({name: len(persons) for name, persons in names.items()})
+
+    # Read path
+
+    def top(self, k: int = 5, category: Optional[str] = None, country: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            if category:
+                summary = self.by_category.get(category)
+            elif country:
+                summary = self.by_country.get(country)
+            else:
+                summary = self.overall
+            ranked = summary.top(k) if summary else []
+        return [{"habit_name": name, "user_count": count} for name, count, _ in ranked]
@@ -24,11 +24,28 @@ class Habit:
     updated_at: Optional[datetime] = None
     streak: int = 0
     last_completed: Optional[datetime] = None
+    longest_streak: int = 0
 
     def update_goal(self, new_goal: str):
         self.goal = new_goal
         self.updated_at = datetime.now()
 
+    def record_completion(self, completed_at: datetime):
+        """Count a completion in the streak. A completion on the day after the last one extends the streak, one on
+        the same day keeps it and one after a missed day starts a new streak. A completion on a day before the last
+        completed one leaves the streak as it is."""
+        last_day = self.last_completed.date() if self.last_completed else None
+        days = (completed_at.date() - last_day).days if last_day else None
+        if days is None or days > 1:
+            self.streak = 1
+        elif days == 1:
+            self.streak += 1
+        elif days == 0:
+            self.streak = max(self.streak, 1)
+        self.longest_streak = max(self.longest_streak, self.streak)
+        if self.last_completed is None or completed_at > self.last_completed:
+            self.last_completed = completed_at
+
     def to_dict(self):
         return {
             "habit_id": str(self.habit_id),
@@ -39,5 +56,6 @@ class Habit:
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "streak": self.streak,
-            "last_completed": self.last_completed.isoformat() if self.last_completed else None
+            "last_completed": self.last_completed.isoformat() if self.last_completed else None,
+            "longest_streak": self.longest_streak
         }
@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from datetime import date
+from uuid import UUID
+from typing import List, Optional
+
+
+@dataclass
+class ActivityRollup:
+    """Habit event counts pre-aggregated over one day, for one person or globally (person_id is None).
+
+    `hourly_counts` holds the day's 24 hourly buckets.
+    """
+    day: date
+    person_id: Optional[UUID] = None
+    event_count: int = 0
+    completed_count: int = 0
+    hourly_counts: List[int] = field(default_factory=lambda: [0] * 24)
+
+    def add(self, hour: int, events: int = 1, completed: int = 0):
+        self.event_count += events
+        self.completed_count += completed
+        self.hourly_counts[hour] += events
+
+    def to_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "person_id": str(self.person_id) if self.person_id else None,
+            "event_count": self.event_count,
+            "completed_count": self.completed_count,
+            "hours": {f"{hour:02d}": count for hour, count in enumerate(self.hourly_counts) if count}
+        }
@@ -1,5 +1,8 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Dict, Any, Optional
 from uuid import UUID
 from application.domain.models.person import Person, Country
 from application.domain.models.habit import Habit
@@ -7,6 +10,31 @@ from application.domain.models.event import HabitEvent
 from interfaces.repositories.person_repository import PersonRepository
 from interfaces.repositories.habit_repository import HabitRepository
 from interfaces.repositories.habit_event_repository import HabitEventRepository
+from application.domain.analytics.engine import AnalyticsEngine
+from application.domain.analytics.materialized import MaterializedAnalytics
+from application.domain.analytics.columnar_store import ColumnarEventStore
+from application.domain.analytics.rollups import ActivityRollups
+from application.domain.analytics.hyperloglog import DailyActiveUserSketches
+from application.domain.analytics.top_k import HabitPopularityTracker
+from application.domain.analytics.day_bitmaps import HabitDayBitmaps
+from application.domain.analytics.snapshot import RepositorySnapshot
+
+# Fields of the events read by the analytics scans, which stream them as rows instead of loading every event
+EVENT_FIELDS = ("habit_id", "person_id", "status", "timestamp")
+
+# Dashboard sections, named after their `/api/analytics/*` routes
+DASHBOARD_SECTIONS = {
+    "completion-rates": lambda analytics: analytics.get_completion_rates(),
+    "consistency": lambda analytics: analytics.get_consistency(),
+    "distribution": lambda analytics: analytics.get_distribution(),
+    "category-distribution": lambda analytics: analytics.get_category_distribution(),
+    "habit-popularity": lambda analytics: analytics.get_habit_popularity(),
+    "time-heatmap": lambda analytics: analytics.get_time_of_day_heatmap(),
+    "drop-off-rates": lambda analytics: analytics.get_drop_off_rates(),
+    "first-week-success": lambda analytics: analytics.get_first_week_success(),
+    "engagement": lambda analytics: analytics.get_engagement_metrics(),
+    "geographic-trends": lambda analytics: analytics.get_geographic_trends(),
+}
 
 
 class AnalyticsService:
@@ -14,28 +42,58 @@ class AnalyticsService:
         self,
         person_repo: PersonRepository,
         habit_repo: HabitRepository,
-        habit_event_repo: HabitEventRepository
+        habit_event_repo: HabitEventRepository,
+        materialized: Optional[MaterializedAnalytics] = None,
+        event_store: Optional[ColumnarEventStore] = None,
+        rollups: Optional[ActivityRollups] = None,
+        active_user_sketches: Optional[DailyActiveUserSketches] = None,
+        popularity: Optional[HabitPopularityTracker] = None,
+        day_bitmaps: Optional[HabitDayBitmaps] = None
     ):
         self.person_repo = person_repo
         self.habit_repo = habit_repo
         self.habit_event_repo = habit_event_repo
+        self.materialized = materialized
+        self.event_store = event_store
+        self.rollups = rollups
+        self.active_user_sketches = active_user_sketches
+        self.popularity = popularity
+        self.day_bitmaps = day_bitmaps
+        # Set on the dashboard's snapshot service, so that its sections share grouped events
+        self._engines: Optional[Dict[tuple, AnalyticsEngine]] = None
+        self._engines_lock = threading.Lock()
+
+    def _events(self, person_id: UUID = None, start: date = None, end: date = None) -> Iterable[HabitEvent]:
+        """The relevant events, read with a single repository call, optionally between start and end (inclusive).
+
+        Scans of every event stream projected rows: they are consumed once, in bounded memory.
+        """
+        events = self.habit_event_repo.find_by_person_id(person_id) if person_id else self.habit_event_repo.project(EVENT_FIELDS)
+        if start or end:
+            events = (
+                event for event in events
+                if (start is None or event.timestamp.date() >= start) and (end is None or event.timestamp.date() <= end)
+            )
+        return events
+
+    def _engine(self, person_id: UUID = None, start: date = None, end: date = None) -> AnalyticsEngine:
+        """Group the relevant events in one pass."""
+        if self._engines is None:
+            return AnalyticsEngine(self._events(person_id, start, end))
+        with self._engines_lock:
+            key = (person_id, start, end)
+            if key not in self._engines:
+                self._engines[key] = AnalyticsEngine(self._events(person_id, start, end))
+            return self._engines[key]
 
     def get_completion_rates(self, person_id: UUID = None) -> Dict[str, float]:
         """Calculate completion rates for habits."""
+        if self.materialized:
+            return self.materialized.completion_rates(person_id)
         habits = self.habit_repo.find_by_person_id(person_id) if person_id else self.habit_repo.find_all()
-        completion_rates = {}
-        
-        for habit in habits:
-            events = self.habit_event_repo.find_by_habit_id(habit.habit_id)
-            total_events = len(events)
-            completed_events = sum(1 for e in events if e.status == "completed")
-            
-            completion_rates[str(habit.habit_id)] = {
-                "completion_rate": (completed_events / total_events * 100) if total_events > 0 else 0,
-                "habit_name": habit.name
-            }
-        
-        return completion_rates
+        if self.event_store:
+            return self.event_store.completion_rates(habits)
+        return self._engine(person_id).completion_rates(habits)
 
     def get_consistency(self, person_id: UUID = None):
         # Example: average completion rate across all habits or for a person
@@ -56,6 +114,8 @@ class AnalyticsService:
     
     def get_distribution(self, person_id: UUID = None):
         # Example: count of habits per category
+        if self.materialized:
+            return self.materialized.category_distribution(person_id)
         habits = self.habit_repo.find_by_person_id(person_id) if person_id else self.habit_repo.find_all()
         dist = {}
         for habit in habits:
@@ -66,9 +126,20 @@ class AnalyticsService:
         # Alias for get_distribution (for now)
         return self.get_distribution(person_id)
 
-    def get_habit_popularity(self):
-        # Count number of unique persons that have each habit name
+    def get_habit_popularity(self, k: int = 5, category: str = None, country: str = None, exact: bool = False):
+        """Top `k` habit names by number of distinct users, optionally within one category or one country.
+
+        Served by the streaming top-K tracker when it is enabled and can answer the request, unless `exact` is set.
+        """
+        if self.popularity and not exact and k <= self.popularity.capacity and not (category and country):
+            return self.popularity.top(k, category, country)
         habits = self.habit_repo.find_all()
+        if category:
+            habits = [habit for habit in habits if habit.category == category]
+        if country:
+            persons = {person.person_id for person in self.person_repo.find_all() if person.country and person.country.value == country}
+            habits = [habit for habit in habits if habit.person_id in persons]
+        # Count number of unique persons that have each habit name
         habit_persons = {}
         for habit in habits:
             if habit.name not in habit_persons:
@@ -80,117 +151,207 @@ class AnalyticsService:
             for name, persons in habit_persons.items()
         ]
         sorted_habits = sorted(habit_counts, key=lambda x: x["user_count"], reverse=True)
-        return sorted_habits[:5]
-
-    def get_time_of_day_heatmap(self, person_id: UUID = None) -> Dict[str, int]:
-        """Generate time-of-day heatmap data."""
-        events = self.habit_event_repo.find_by_person_id(person_id) if person_id else self.habit_event_repo.find_all()
-        heatmap = {f"{hour:02d}:00": 0 for hour in range(24)}
-        
-        for event in events:
-            hour = event.timestamp.hour
-            heatmap[f"{hour:02d}:00"] += 1
-        
-        return heatmap
+        return sorted_habits[:k]
+
+    def get_time_of_day_heatmap(self, person_id: UUID = None, start: date = None, end: date = None) -> Dict[str, int]:
+        """Generate time-of-day heatmap data, optionally restricted to events between start and end (inclusive)."""
+        if self.rollups:
+            return self.rollups.time_of_day_heatmap(person_id, start, end)
+        if start or end:
+            return self._engine(person_id, start, end).time_of_day_heatmap()
+        if self.materialized:
+            return self.materialized.time_of_day_heatmap(person_id)
+        if self.event_store:
+            return self.event_store.time_of_day_heatmap(person_id)
+        return self._engine(person_id).time_of_day_heatmap()
 
     def get_drop_off_rates(self, days_threshold: int = 7) -> Dict[str, float]:
         """Calculate how often users abandon habits after X days."""
-        habits = self.habit_repo.find_all()
-        drop_off_data = {}
-        
-        for habit in habits:
-            events = sorted(self.habit_event_repo.find_by_habit_id(habit.habit_id), key=lambda x: x.timestamp)
-            if not events:
-                continue
-                
-            first_event = events[0]
-            last_event = events[-1]
-            days_active = (last_event.timestamp - first_event.timestamp).days
-            
-            drop_off_data[str(habit.habit_id)] = {
-                "drop_off_rate": 1 if days_active < days_threshold else 0,
-                "habit_name": habit.name,
-                "days_active": days_active
-            }
-        
-        return drop_off_data
+        return self._engine().drop_off_rates(self.habit_repo.iter_all(), days_threshold)
 
     def get_first_week_success(self) -> Dict[str, float]:
         """Calculate success rates in the first week of habit creation."""
-        habits = self.habit_repo.find_all()
-        first_week_data = {}
-        
-        for habit in habits:
-            events = sorted(self.habit_event_repo.find_by_habit_id(habit.habit_id), key=lambda x: x.timestamp)
-            if not events:
-                continue
-                
-            first_event = events[0]
-            first_week_events = [e for e in events if (e.timestamp - first_event.timestamp).days <= 7]
-            completed_in_first_week = sum(1 for e in first_week_events if e.status == "completed")
-            
-            first_week_data[str(habit.habit_id)] = {
-                "success_rate": (completed_in_first_week / len(first_week_events) * 100) if first_week_events else 0,
-                "habit_name": habit.name
-            }
-        
-        return first_week_data
-
-    def get_engagement_metrics(self) -> Dict[str, Any]:
-        """Calculate engagement metrics."""
-        users = self.person_repo.find_all()
-        habits = self.habit_repo.find_all()
-        events = self.habit_event_repo.find_all()
-        
-        # Active users per time period
-        now = datetime.now()
-        active_users = {
-            "day": set(),
-            "week": set(),
-            "month": set()
-        }
-        
-        for event in events:
-            event_time = event.timestamp
-            if (now - event_time).days == 0:
-                active_users["day"].add(str(event.person_id))
-            if (now - event_time).days <= 7:
-                active_users["week"].add(str(event.person_id))
-            if (now - event_time).days <= 30:
-                active_users["month"].add(str(event.person_id))
-        
+        return self._engine().first_week_success(self.habit_repo.iter_all())
+
+    def get_activity_days(self, person_id: UUID = None) -> Dict[str, Any]:
+        """Active and completed days, current and longest streak and consistency of every habit (or a person's), and
+        for a person the days on which all of their habits were completed.
+
+        Read from the day bitmaps when they are enabled, otherwise from bitmaps built by one scan of the events.
+        """
+        habits = self.habit_repo.find_by_person_id(person_id) if person_id else self.habit_repo.iter_all()
+        bitmaps = self.day_bitmaps or HabitDayBitmaps.from_events(self._events(person_id))
+        if not person_id:
+            return {"habits": bitmaps.activity_days(habits)}
+        days = bitmaps.days_all_completed(habit.habit_id for habit in habits)
         return {
-            "active_users": {
-                "daily": len(active_users["day"]),
-                "weekly": len(active_users["week"]),
-                "monthly": len(active_users["month"])
-            },
-            "avg_habits_per_user": len(habits) / len(users) if users else 0
+            "habits": bitmaps.activity_days(habits),
+            "all_habits_completed_days": [day.isoformat() for day in days]
         }
 
-    def get_geographic_trends(self) -> Dict[str, Dict[str, int]]:
-        """Analyze habit popularity by country."""
+    def get_engagement_metrics(self, days: Optional[int] = None, approx: bool = False) -> Dict[str, Any]:
+        """Calculate engagement metrics, with the active users of the last `days` days when given.
+
+        With `approx`, active users are estimated from the HyperLogLog sketches when they are enabled.
+        """
         users = self.person_repo.find_all()
         habits = self.habit_repo.find_all()
+        return self._engagement(self._active_users(days, approx), len(users), len(habits), approx)
+
+    def _engagement(self, active_users: Dict[str, int], user_count: int, habit_count: int, approx: bool) -> Dict[str, Any]:
+        metrics = {
+            "active_users": active_users,
+            "avg_habits_per_user": habit_count / user_count if user_count else 0
+        }
+        if approx and self.active_user_sketches:
+            metrics["approximate"] = {"standard_error": self.active_user_sketches.standard_error}
+        return metrics
+
+    def _active_users(self, days: Optional[int] = None, approx: bool = False) -> Dict[str, int]:
+        if approx and self.active_user_sketches:
+            return self.active_user_sketches.active_users(days=days)
+        if self.rollups:
+            return self.rollups.active_users(days=days)
+        return self._scan_active_users(days)
+
+    def _scan_active_users(self, days: Optional[int] = None) -> Dict[str, int]:
+        active_users = self.event_store.active_users() if self.event_store else self._engine().active_users()
+        if days:
+            today = datetime.now().date()
+            active_users[f"last_{days}_days"] = len(self._engine(start=today - timedelta(days=days - 1), end=today).person_event_counts)
+        return active_users
+
+    def get_geographic_trends(self, category: str = None, start: date = None, end: date = None, by_category: bool = False) -> Dict[str, Dict[str, int]]:
+        """Analyze habit popularity by country.
+
+        `category` restricts the habits and their events to one category, `start`/`end` restrict the events counted
+        and `by_category` adds a per-category breakdown to every country.
+        """
+        if self.materialized and not (category or start or end or by_category):
+            return self.materialized.geographic_trends()
+
+        # Habits and events are grouped by person once, then joined to the persons of each country
+        habit_categories = {}
+        person_habits = {}
+        for habit in self.habit_repo.iter_all():
+            if category and habit.category != category:
+                continue
+            habit_categories[habit.habit_id] = habit.category
+            counts = person_habits.setdefault(habit.person_id, {})
+            counts[habit.category] = counts.get(habit.category, 0) + 1
+
+        person_events = {}
+        for event in self._events(start=start, end=end):
+            event_category = habit_categories.get(event.habit_id)
+            if category and event_category is None:
+                continue
+            counts = person_events.setdefault(event.person_id, {})
+            counts[event_category] = counts.get(event_category, 0) + 1
+
         country_data = {}
-        
-        # Initialize country data
         for country in Country:
-            country_data[country.value] = {
-                "total_habits": 0,
-                "total_events": 0,
-                "active_users": 0
-            }
-        
-        # Count habits and events by country
-        for user in users:
-            country = user.country.value if user.country else None
-            if country and country in country_data:
-                user_habits = [h for h in habits if h.person_id == user.person_id]
-                user_events = [e for e in self.habit_event_repo.find_by_person_id(user.person_id)]
-                country_data[country]["total_habits"] += len(user_habits)
-                country_data[country]["total_events"] += len(user_events)
-                if user_events:
-                    country_data[country]["active_users"] += 1
-        
+            totals = {"total_habits": 0, "total_events": 0, "active_users": 0}
+            categories = {}
+            for person in self.person_repo.find_by_country(country):
+                habit_counts = person_habits.get(person.person_id, {})
+                event_counts = person_events.get(person.person_id, {})
+                totals["total_habits"] += sum(habit_counts.values())
+                totals["total_events"] += sum(event_counts.values())
+                if event_counts:
+                    totals["active_users"] += 1
+                if by_category:
+                    for name in set(habit_counts) | set(event_counts):
+                        if name is None:
+                            continue  # events of habits that no longer exist
+                        breakdown = categories.setdefault(name, {"total_habits": 0, "total_events": 0, "active_users": 0})
+                        breakdown["total_habits"] += habit_counts.get(name, 0)
+                        breakdown["total_events"] += event_counts.get(name, 0)
+                        if event_counts.get(name):
+                            breakdown["active_users"] += 1
+            if by_category:
+                totals["categories"] = categories
+            country_data[country.value] = totals
         return country_data
+
+    def _with_repositories(self, person_repo, habit_repo, habit_event_repo) -> "AnalyticsService":
+        return AnalyticsService(
+            person_repo, habit_repo, habit_event_repo,
+            materialized=self.materialized,
+            event_store=self.event_store,
+            rollups=self.rollups,
+            active_user_sketches=self.active_user_sketches,
+            popularity=self.popularity,
+            day_bitmaps=self.day_bitmaps
+        )
+
+    @property
+    def snapshot_version(self) -> tuple:
+        """Write versions of the repositories read by the service, fixed for a point-in-time service."""
+        return tuple(repo.write_version for repo in (self.person_repo, self.habit_repo, self.habit_event_repo))
+
+    def point_in_time(self) -> "AnalyticsService":
+        """Service reading snapshots of the repositories, so that a long computation sees one consistent state
+        while writers go on. The incrementally maintained accelerators (materialized counters, rollups, ...) are
+        shared and keep following the live state. Returns self when the repositories cannot take snapshots."""
+        repos = (self.person_repo, self.habit_repo, self.habit_event_repo)
+        snapshots = tuple(repo.snapshot() for repo in repos)
+        if all(snapshot is repo for snapshot, repo in zip(snapshots, repos)):
+            return self
+        return self._with_repositories(*snapshots)
+
+    def _dashboard_source(self) -> "AnalyticsService":
+        """Service computing the dashboard sections from one consistent state of the repositories: their snapshots
+        when they support them, otherwise a copy loaded once."""
+        source = self.point_in_time()
+        if source is self:
+            snapshot = RepositorySnapshot(self.person_repo, self.habit_repo, self.habit_event_repo)
+            source = self._with_repositories(snapshot.persons, snapshot.habits, snapshot.habit_events)
+        source._engines = {}
+        return source
+
+    def get_dashboard(self, sections: Optional[List[str]] = None, max_workers: int = 4) -> Dict[str, Any]:
+        """Compute several analytics sections at once, concurrently, from one consistent state of the repositories.
+
+        Returns the result of every section, or its error, along with per-section timings in milliseconds.
+        """
+        sections = sections or list(DASHBOARD_SECTIONS)
+        unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown dashboard sections: {', '.join(unknown)}")
+
+        started = time.perf_counter()
+        source = self._dashboard_source()
+        timings = {"load": (time.perf_counter() - started) * 1000}
+
+        def compute(name):
+            section_started = time.perf_counter()
+            try:
+                result = DASHBOARD_SECTIONS[name](source)
+            except Exception as e:
+                result = {"error": str(e)}
+            return result, (time.perf_counter() - section_started) * 1000
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as pool:
+            futures = {name: pool.submit(compute, name) for name in sections}
+            results = {}
+            for name, future in futures.items():
+                results[name], timings[name] = future.result()
+
+        return {
+            "sections": results,
+            "timings_ms": {name: round(elapsed, 3) for name, elapsed in timings.items()},
+            "total_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def rebuild_materialized(self) -> bool:
+        """Recompute the materialized counters from scratch. Returns False when they are not enabled."""
+        if not self.materialized:
+            return False
+        self.materialized.rebuild()
+        return True
+
+    def check_materialized(self) -> Optional[dict]:
+        """Compare the materialized counters against a full recompute, if they are enabled."""
+        if not self.materialized:
+            return None
+        return self.materialized.check_consistency()
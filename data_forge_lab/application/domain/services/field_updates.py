@@ -0,0 +1,74 @@
+from dataclasses import fields
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple, Union, get_args, get_origin, get_type_hints
+from uuid import UUID
+
+
+def _to_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        raise ValueError("a date is expected, not a date and time")
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _to_uuid(value: Any) -> UUID:
+    return value if isinstance(value, UUID) else UUID(value)
+
+
+def _exactly(field_type: type) -> Callable[[Any], Any]:
+    def check(value: Any) -> Any:
+        # bool is an int, but not a count
+        if type(value) is not field_type:
+            raise ValueError(f"a {field_type.__name__} is expected")
+        return value
+    return check
+
+
+CONVERTERS: Dict[type, Callable[[Any], Any]] = {datetime: _to_datetime, date: _to_date, UUID: _to_uuid}
+
+
+@lru_cache(maxsize=None)
+def _field_converters(entity_type: type) -> Dict[str, Tuple[Callable[[Any], Any], bool]]:
+    """Converter of every field of a dataclass entity, and whether the field may be None."""
+    hints = get_type_hints(entity_type)
+    converters = {}
+    for field in fields(entity_type):
+        field_type, nullable = hints[field.name], field.default is None
+        if get_origin(field_type) is Union:
+            types = [arg for arg in get_args(field_type) if arg is not type(None)]
+            field_type, nullable = types[0], nullable or len(types) < len(get_args(field_type))
+        if field_type in CONVERTERS:
+            convert = CONVERTERS[field_type]
+        elif isinstance(field_type, type) and issubclass(field_type, Enum):
+            convert = field_type
+        else:
+            convert = _exactly(field_type)
+        converters[field.name] = (convert, nullable)
+    return converters
+
+
+def typed_changes(entity_type: type, changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Field changes of an entity, as decoded from JSON, converted to the types of its fields: ISO 8601 strings to
+    datetimes and dates, strings to UUIDs, values to enum members. Values already of the field's type are kept.
+
+    Raises ValueError naming the field when a value cannot be converted, or is None for a field that cannot be.
+    """
+    converters = _field_converters(entity_type)
+    typed = {}
+    for name, value in changes.items():
+        convert, nullable = converters[name]
+        if value is None:
+            if not nullable:
+                raise ValueError(f"Invalid {name}: a value is required")
+            typed[name] = None
+            continue
+        try:
+            typed[name] = convert(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {name} {value!r}: {e}") from None
+    return typed
@@ -1,16 +1,24 @@
+from dataclasses import fields, replace
 from uuid import UUID
 from typing import List, Optional
 from application.domain.models.event import HabitEvent, HabitEventCreatedMessage
+from application.domain.services.field_updates import typed_changes
 from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.pagination import Page
 from interfaces.event_publisher import EventPublisher
+from interfaces.habit_activity_listener import HabitActivityListener
 from datetime import datetime, timedelta
 
+# Fields that updates may change: every field but the id
+UPDATABLE_FIELDS = frozenset(field.name for field in fields(HabitEvent)) - {"event_id"}
+
 
 class HabitEventService:
-    def __init__(self, habit_event_repo: HabitEventRepository, event_publisher: EventPublisher, habit_repo=None):
+    def __init__(self, habit_event_repo: HabitEventRepository, event_publisher: EventPublisher, habit_repo=None, listeners: Optional[List[HabitActivityListener]] = None):
         self.habit_event_repo = habit_event_repo
         self.event_publisher = event_publisher
         self.habit_repo = habit_repo
+        self.listeners = listeners or []
 
     def create_habit_event(self, person_id: UUID, habit_id: UUID, notes: Optional[str] = None, timestamp: Optional[datetime] = None) -> HabitEvent:
         if timestamp is None:
@@ -18,35 +26,30 @@ class HabitEventService:
         event = HabitEvent(person_id=person_id, habit_id=habit_id, notes=notes, status="completed", timestamp=timestamp)
         saved = self.habit_event_repo.save(event)
 
-        # Streak logic
-        if self.habit_repo:
-            habit = self.habit_repo.get_by_id(habit_id)
-            if habit:
-                # Only update streak if event is completed
-                if getattr(event, 'status', None) == 'completed':
-                    today = event.timestamp.date()
-                    last_completed = habit.last_completed.date() if habit.last_completed else None
-                    if last_completed and (today - last_completed).days == 1:
-                        habit.streak += 1
-                    else:
-                        habit.streak = 1
-                    habit.last_completed = event.timestamp
-                    habit.updated_at = datetime.now()
-                    self.habit_repo.save(habit)
+        # The streak is updated in a single atomic update of the habit, concurrent completions all count. A listener
+        # tracking the streaks from every completion (see StreakTracker) updates them instead
+        updates_streaks = any(listener.updates_streaks for listener in self.listeners)
+        if self.habit_repo and saved.status == "completed" and not updates_streaks:
+            self.habit_repo.record_completion(habit_id, saved.timestamp, datetime.now())
+
+        for listener in self.listeners:
+            listener.on_event_saved(None, saved)
 
         self.event_publisher.publish(saved.to_event_created())  # Emit event
 
         return saved
 
     def update_habit_event(self, event_id: UUID, **kwargs) -> Optional[HabitEvent]:
-        event = self.habit_event_repo.get_by_id(event_id)
-        if not event:
+        # Only the changed fields are written, and the event as it was before comes back from the same call
+        changes = typed_changes(HabitEvent, {key: value for key, value in kwargs.items() if key in UPDATABLE_FIELDS})
+        previous = self.habit_event_repo.update_fields(event_id, changes)
+        if not previous:
             return None
+        saved = replace(previous, **changes)
 
-        for key, value in kwargs.items():
-            if hasattr(event, key):
-                setattr(event, key, value)
-        return self.habit_event_repo.save(event)
+        for listener in self.listeners:
+            listener.on_event_saved(previous, saved)
+        return saved
 
     def get_habit_event(self, event_id: UUID) -> Optional[HabitEvent]:
         return self.habit_event_repo.get_by_id(event_id)
@@ -54,5 +57,16 @@ class HabitEventService:
     def list_habit_events(self, habit_id: UUID) -> List[HabitEvent]:
         return self.habit_event_repo.find_by_habit_id(habit_id)
 
+    def list_habit_events_page(self, habit_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[HabitEvent]:
+        return self.habit_event_repo.find_page_by_habit_id(habit_id, limit, cursor)
+
     def delete_habit_event(self, event_id: UUID) -> bool:
-        return self.habit_event_repo.delete(event_id)
+        if not self.listeners:
+            return self.habit_event_repo.delete(event_id)
+
+        event = self.habit_event_repo.get_by_id(event_id)
+        deleted = self.habit_event_repo.delete(event_id)
+        if deleted and event:
+            for listener in self.listeners:
+                listener.on_event_deleted(event)
+        return deleted
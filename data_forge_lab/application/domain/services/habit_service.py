@@ -1,14 +1,22 @@
+from dataclasses import fields, replace
 from uuid import UUID, uuid4
 from datetime import datetime
 from typing import List, Optional
 from application.domain.models.habit import Habit
+from application.domain.services.field_updates import typed_changes
 from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.pagination import Page
+from interfaces.habit_activity_listener import HabitActivityListener
+
+# Fields that updates may change: every field but the id
+UPDATABLE_FIELDS = frozenset(field.name for field in fields(Habit)) - {"habit_id"}
 
 
 class HabitService:
-    def __init__(self, habit_repo: HabitRepository, habit_event_repo=None):
+    def __init__(self, habit_repo: HabitRepository, habit_event_repo=None, listeners: Optional[List[HabitActivityListener]] = None):
         self.habit_repo = habit_repo
         self.habit_event_repo = habit_event_repo
+        self.listeners = listeners or []
 
     def create_habit(self, person_id: UUID, name: str, goal: str, category: str, habit_id: Optional[UUID] = None) -> Habit:
         # Check for duplicate habit name for this person (case-insensitive)
@@ -21,17 +29,24 @@ class HabitService:
             habit_id = uuid4()
             
         habit = Habit(person_id=person_id, name=name, goal=goal, category=category, habit_id=habit_id)
-        return self.habit_repo.save(habit)
+        saved = self.habit_repo.save(habit)
+
+        for listener in self.listeners:
+            listener.on_habit_saved(None, saved)
+        return saved
 
     def update_habit(self, habit_id: UUID, **kwargs) -> Optional[Habit]:
-        habit = self.habit_repo.get_by_id(habit_id)
-        if not habit:
+        # Only the changed fields are written, and the habit as it was before comes back from the same call
+        changes = typed_changes(Habit, {key: value for key, value in kwargs.items() if key in UPDATABLE_FIELDS})
+        changes["updated_at"] = datetime.now()
+        previous = self.habit_repo.update_fields(habit_id, changes)
+        if not previous:
             return None
-        for key, value in kwargs.items():
-            if hasattr(habit, key):
-                setattr(habit, key, value)
-        habit.updated_at = datetime.now()
-        return self.habit_repo.save(habit)
+        saved = replace(previous, **changes)
+
+        for listener in self.listeners:
+            listener.on_habit_saved(previous, saved)
+        return saved
 
     def get_habit(self, habit_id: UUID) -> Optional[Habit]:
         return self.habit_repo.get_by_id(habit_id)
@@ -39,10 +54,20 @@ class HabitService:
     def list_habits(self, person_id: UUID) -> List[Habit]:
         return self.habit_repo.find_by_person_id(person_id)
 
+    def list_habits_page(self, person_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[Habit]:
+        return self.habit_repo.find_page_by_person_id(person_id, limit, cursor)
+
     def delete_habit(self, habit_id: UUID) -> bool:
-        # Delete all events for this habit if event repo is available
+        habit = self.habit_repo.get_by_id(habit_id) if self.listeners else None
+
+        # Delete all events for this habit, in one batch, if event repo is available
         if self.habit_event_repo:
-            events = self.habit_event_repo.find_by_habit_id(habit_id)
-            for event in events:
-                self.habit_event_repo.delete(event.event_id)
-        return self.habit_repo.delete(habit_id)
+            events = self.habit_event_repo.delete_by_habit_id(habit_id)
+            for listener in self.listeners:
+                listener.on_habit_events_deleted(habit_id, events)
+
+        deleted = self.habit_repo.delete(habit_id)
+        if deleted and habit:
+            for listener in self.listeners:
+                listener.on_habit_deleted(habit)
+        return deleted
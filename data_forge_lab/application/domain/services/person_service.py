@@ -1,20 +1,57 @@
+from dataclasses import fields, replace
 from datetime import date
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from application.domain.models.person import Person, Country
+from application.domain.services.field_updates import typed_changes
 from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.batch import BatchWriteResult, write_batch
+from interfaces.repositories.pagination import Page
+from interfaces.habit_activity_listener import HabitActivityListener
 from uuid import UUID, uuid4
 
+# Fields that updates may change: every field but the id
+UPDATABLE_FIELDS = frozenset(field.name for field in fields(Person)) - {"person_id"}
+
 
 class PersonService:
-    def __init__(self, person_repo: PersonRepository):
+    def __init__(self, person_repo: PersonRepository, listeners: Optional[List[HabitActivityListener]] = None):
         self.person_repo = person_repo
+        self.listeners = listeners or []
 
     def create_person(self, first_name: str, last_name: str, date_of_birth: date, email: str, phone_number: str, address: str, country: Country, person_id: Optional[UUID] = None, gender: Optional[str] = None, notification_preferences: Optional[dict] = None, language_preference: str = "English") -> Person:
+        print(f"date_of_birth: {date_of_birth} - {type(date_of_birth)}")
+        saved = self.person_repo.save(self._new_person(
+            first_name, last_name, date_of_birth, email, phone_number, address, country, person_id, gender,
+            notification_preferences, language_preference
+        ))
+
+        for listener in self.listeners:
+            listener.on_person_saved(None, saved)
+        return saved
+
+    def create_persons(self, persons: Iterable[dict], ordered: bool = True) -> BatchWriteResult:
+        """Create one person per dict of `create_person` arguments, saved in a single batch.
+
+        Items that do not make a valid person are reported at their position, with the ones the repository rejects.
+        """
+        result = write_batch(
+            persons,
+            lambda fields: self._new_person(**fields),
+            lambda new_persons: self.person_repo.save_many(new_persons, ordered),
+            ordered
+        )
+
+        for saved in result.written:
+            for listener in self.listeners:
+                listener.on_person_saved(None, saved)
+        return result
+
+    @staticmethod
+    def _new_person(first_name: str, last_name: str, date_of_birth: date, email: str, phone_number: str, address: str, country: Country, person_id: Optional[UUID] = None, gender: Optional[str] = None, notification_preferences: Optional[dict] = None, language_preference: str = "English") -> Person:
         if not person_id:
             person_id = uuid4()
 
-        print(f"date_of_birth: {date_of_birth} - {type(date_of_birth)}")
-        person = Person(
+        return Person(
             first_name=first_name,
             last_name=last_name,
             date_of_birth=date_of_birth,
@@ -27,15 +64,19 @@ class PersonService:
             language_preference=language_preference,
             country=country
         )
-        return self.person_repo.save(person)
 
     def update_person(self, person_id: UUID, **kwargs) -> Optional[Person]:
-        person = self.person_repo.get_by_id(person_id)
-        if not person:
+        # Only the changed fields are written, the person is not read first
+        changes = typed_changes(Person, {key: value for key, value in kwargs.items() if key in UPDATABLE_FIELDS})
+        changes["last_updated"] = date.today()
+        previous = self.person_repo.update_fields(person_id, changes)
+        if not previous:
             return None
+        saved = replace(previous, **changes)
 
-        person.update_details(**kwargs)
-        return self.person_repo.save(person)
+        for listener in self.listeners:
+            listener.on_person_saved(previous, saved)
+        return saved
 
     def get_person(self, person_id: UUID) -> Optional[Person]:
         return self.person_repo.get_by_id(person_id)
@@ -43,5 +84,13 @@ class PersonService:
     def list_persons(self) -> List[Person]:
         return self.person_repo.find_all()
 
+    def list_persons_page(self, limit: int, cursor: Optional[str] = None) -> Page[Person]:
+        return self.person_repo.find_page(limit, cursor)
+
     def delete_person(self, person_id: UUID) -> bool:
-        return self.person_repo.delete(person_id)
+        person = self.person_repo.get_by_id(person_id) if self.listeners else None
+        deleted = self.person_repo.delete(person_id)
+        if deleted and person:
+            for listener in self.listeners:
+                listener.on_person_deleted(person)
+        return deleted
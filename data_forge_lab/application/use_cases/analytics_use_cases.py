@@ -1,44 +1,84 @@
+from datetime import date
 from uuid import UUID
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
 from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.cache.analytics_cache import AnalyticsCache
 
 
 class AnalyticsUseCases:
-    def __init__(self, analytics_service: AnalyticsService):
+    def __init__(self, analytics_service: AnalyticsService, cache: Optional[AnalyticsCache] = None):
         self.analytics_service = analytics_service
+        self.cache = cache
 
-    def get_completion_rates(self, person_id: Optional[UUID] = None) -> Dict[str, float]:
+    def _cached(self, method: str, compute: Callable[[AnalyticsService], Any], *args, use_cache: bool = True):
+        """Compute on a point-in-time view of the repositories, and serve the result from the cache, keyed by method
+        name and arguments and tagged with the view's snapshot version, unless bypassed."""
+        analytics = self.analytics_service.point_in_time()
+        if not self.cache or not use_cache:
+            return compute(analytics)
+        return self.cache.get_or_compute((method, *args), lambda: compute(analytics), version=analytics.snapshot_version)
+
+    def get_completion_rates(self, person_id: Optional[UUID] = None, use_cache: bool = True) -> Dict[str, float]:
         """Get completion rates for a specific person or all users."""
-        return self.analytics_service.get_completion_rates(person_id)
-
-    def get_consistency(self, person_id: Optional[UUID] = None):
-        return self.analytics_service.get_consistency(person_id)
-    
-    def get_distribution(self, person_id: Optional[UUID] = None):
-        return self.analytics_service.get_distribution(person_id)
-    
-    def get_habit_popularity(self):
-        return self.analytics_service.get_habit_popularity()
-    
-    def get_time_of_day_heatmap(self, person_id: Optional[UUID] = None) -> Dict[str, int]:
-        """Get time-of-day heatmap data for a specific person or all users."""
-        return self.analytics_service.get_time_of_day_heatmap(person_id)
-
-    def get_drop_off_rates(self, days_threshold: int = 7) -> Dict[str, float]:
+        return self._cached("completion_rates", lambda analytics: analytics.get_completion_rates(person_id), person_id, use_cache=use_cache)
+
+    def get_consistency(self, person_id: Optional[UUID] = None, use_cache: bool = True):
+        return self._cached("consistency", lambda analytics: analytics.get_consistency(person_id), person_id, use_cache=use_cache)
+
+    def get_distribution(self, person_id: Optional[UUID] = None, use_cache: bool = True):
+        return self._cached("distribution", lambda analytics: analytics.get_distribution(person_id), person_id, use_cache=use_cache)
+
+    def get_habit_popularity(self, k: int = 5, category: Optional[str] = None, country: Optional[str] = None, exact: bool = False, use_cache: bool = True):
+        """Get the top `k` habit names by number of distinct users. Raises ValueError when `k` is below 1."""
+        if k < 1:
+            raise ValueError(f"Invalid k {k}: must be at least 1")
+        return self._cached(
+            "habit_popularity",
+            lambda analytics: analytics.get_habit_popularity(k, category, country, exact),
+            k, category, country, exact,
+            use_cache=use_cache
+        )
+
+    def get_time_of_day_heatmap(self, person_id: Optional[UUID] = None, start: Optional[date] = None, end: Optional[date] = None, use_cache: bool = True) -> Dict[str, int]:
+        """Get time-of-day heatmap data for a specific person or all users, optionally within a date range."""
+        return self._cached("time_of_day_heatmap", lambda analytics: analytics.get_time_of_day_heatmap(person_id, start, end), person_id, start, end, use_cache=use_cache)
+
+    def get_drop_off_rates(self, days_threshold: int = 7, use_cache: bool = True) -> Dict[str, float]:
         """Get drop-off rates for habits after a specified number of days."""
-        return self.analytics_service.get_drop_off_rates(days_threshold)
+        return self._cached("drop_off_rates", lambda analytics: analytics.get_drop_off_rates(days_threshold), days_threshold, use_cache=use_cache)
 
-    def get_first_week_success(self) -> Dict[str, float]:
+    def get_first_week_success(self, use_cache: bool = True) -> Dict[str, float]:
         """Get success rates in the first week of habit creation."""
-        return self.analytics_service.get_first_week_success()
+        return self._cached("first_week_success", lambda analytics: analytics.get_first_week_success(), use_cache=use_cache)
+
+    def get_activity_days(self, person_id: Optional[UUID] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Get the active and completed days, streaks and consistency of the habits, and a person's all-habit days."""
+        return self._cached("activity_days", lambda analytics: analytics.get_activity_days(person_id), person_id, use_cache=use_cache)
+
+    def get_engagement_metrics(self, days: Optional[int] = None, approx: bool = False, use_cache: bool = True) -> Dict[str, Any]:
+        """Get engagement metrics for the application, optionally with approximate active user counts."""
+        return self._cached("engagement_metrics", lambda analytics: analytics.get_engagement_metrics(days, approx), days, approx, use_cache=use_cache)
+
+    def get_geographic_trends(self, category: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None, by_category: bool = False, use_cache: bool = True) -> Dict[str, Dict[str, int]]:
+        """Get geographic trends for habits and users, optionally for one category, a date range or per category."""
+        return self._cached(
+            "geographic_trends",
+            lambda analytics: analytics.get_geographic_trends(category, start, end, by_category),
+            category, start, end, by_category,
+            use_cache=use_cache
+        )
+
+    def get_category_distribution(self, person_id: Optional[UUID] = None, use_cache: bool = True):
+        return self._cached("category_distribution", lambda analytics: analytics.get_category_distribution(person_id), person_id, use_cache=use_cache)
 
-    def get_engagement_metrics(self) -> Dict[str, Any]:
-        """Get engagement metrics for the application."""
-        return self.analytics_service.get_engagement_metrics()
+    def get_dashboard(self, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get several analytics sections in one call. Not cached, so that the reported timings are real."""
+        return self.analytics_service.get_dashboard(sections)
 
-    def get_geographic_trends(self) -> Dict[str, Dict[str, int]]:
-        """Get geographic trends for habits and users."""
-        return self.analytics_service.get_geographic_trends() 
+    def rebuild_materialized(self) -> bool:
+        """Rebuild the materialized analytics counters from the repositories."""
+        return self.analytics_service.rebuild_materialized()
 
-    def get_category_distribution(self, person_id: Optional[UUID] = None):
-        return self.analytics_service.get_category_distribution(person_id)
+    def check_materialized(self) -> Optional[dict]:
+        """Check the materialized analytics counters against a full recompute."""
+        return self.analytics_service.check_materialized()
@@ -1,4 +1,5 @@
 from uuid import UUID
+from typing import Optional
 from application.domain.services.habit_event_service import HabitEventService
 
 
@@ -18,5 +19,8 @@ class HabitEventUseCases:
     def list_habit_events(self, habit_id: UUID):
         return self.habit_event_service.list_habit_events(habit_id)
 
+    def list_habit_events_page(self, habit_id: UUID, limit: int, cursor: Optional[str] = None):
+        return self.habit_event_service.list_habit_events_page(habit_id, limit, cursor)
+
     def delete_habit_event(self, event_id: UUID):
         return self.habit_event_service.delete_habit_event(event_id)
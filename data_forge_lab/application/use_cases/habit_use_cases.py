@@ -1,4 +1,5 @@
 from uuid import UUID
+from typing import Optional
 from application.domain.services.habit_service import HabitService
 from interfaces.repositories.habit_repository import HabitRepository
 from interfaces.repositories.habit_event_repository import HabitEventRepository
@@ -20,5 +21,8 @@ class HabitUseCases:
     def list_habits(self, person_id: UUID):
         return self.habit_service.list_habits(person_id)
 
+    def list_habits_page(self, person_id: UUID, limit: int, cursor: Optional[str] = None):
+        return self.habit_service.list_habits_page(person_id, limit, cursor)
+
     def delete_habit(self, habit_id: UUID):
         return self.habit_service.delete_habit(habit_id)
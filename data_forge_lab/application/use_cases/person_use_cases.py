@@ -1,6 +1,6 @@
 from uuid import UUID
 from datetime import date
-from typing import Optional
+from typing import Iterable, Optional
 from application.domain.models.person import Country
 
 from application.domain.services.person_service import PersonService
@@ -13,6 +13,9 @@ class PersonUseCases:
     def create_person(self, first_name: str, last_name: str, date_of_birth: date, email: str, phone_number: str, address: str, country: Country, gender: Optional[str] = None, notification_preferences: Optional[dict] = None, language_preference: str = "English"):
         return self.person_service.create_person(first_name, last_name, date_of_birth, email, phone_number, address, country, gender, notification_preferences, language_preference)
 
+    def create_persons(self, persons: Iterable[dict], ordered: bool = True):
+        return self.person_service.create_persons(persons, ordered)
+
     def update_person(self, person_id: UUID, **kwargs):
         return self.person_service.update_person(person_id, **kwargs)
 
@@ -22,5 +25,8 @@ class PersonUseCases:
     def list_persons(self):
         return self.person_service.list_persons()
 
+    def list_persons_page(self, limit: int, cursor: Optional[str] = None):
+        return self.person_service.list_persons_page(limit, cursor)
+
     def delete_person(self, person_id: UUID):
         return self.person_service.delete_person(person_id)
@@ -9,7 +9,26 @@ are explicitly controlled.
 
 This container:
 - Switches automatically between MongoDB repositories and in-memory repositories based on an environment variable.
+  The indexes declared by the MongoDB repositories are managed by a `MongoIndexManager`.
+  `REPO_TYPE=durable_memory` selects in-memory repositories backed by a write-ahead log and periodic snapshots in
+  `DURABLE_DATA_DIR`, fsynced unless `DURABLE_FSYNC=false` and snapshotted every `DURABLE_SNAPSHOT_EVERY` writes.
+  `REPO_TYPE=sqlite` selects repositories backed by the SQLite database file `SQLITE_PATH`, in WAL mode.
 - Initializes an `EventPublisher` as either a real Kafka publisher or a no-op publisher depending on the environment.
+- Selects the analytics implementation with `ANALYTICS_BACKEND`: plain Python (`python`, default), materialized
+  counters updated by the services through `HabitActivityListener` hooks (`materialized`), a columnar numpy
+  snapshot of the events kept current the same way (`columnar`), MongoDB aggregation pipelines (`mongo`,
+  requires `REPO_TYPE=mongo`) or SQL GROUP BY queries (`sqlite`, requires `REPO_TYPE=sqlite`).
+- Maintains daily rollups with hourly buckets when `ANALYTICS_ROLLUPS=true`, so the time-of-day heatmap and the
+  active user counts, including date-range queries, read pre-aggregated rows instead of raw events.
+- Keeps per-day HyperLogLog sketches of the active users when `ANALYTICS_APPROX_USERS=true`, used by engagement
+  requests made with `?approx=true`.
+- Tracks habit popularity with streaming top-K summaries of `ANALYTICS_TOP_K_CAPACITY` counters (0 disables it).
+- Keeps the habits' current and longest streaks exact from every completed day when `STREAK_TRACKING=true`, so that
+  backfilled, edited and deleted events update them too.
+- Keeps per-habit bitmaps of the days with events and with completions when `ANALYTICS_DAY_BITMAPS=true`, answering
+  `/analytics/activity-days` with bit operations.
+- Caches analytics results in front of the use cases, invalidated by the repositories' write versions and bounded
+  by `ANALYTICS_CACHE_SIZE` entries (0 disables it) and `ANALYTICS_CACHE_TTL` seconds.
 - Uses `Singleton` providers to ensure one instance per application lifecycle (e.g., repositories, publishers).
 - Uses `Factory` providers when multiple independent instances are needed (e.g., services or controllers).
 
@@ -30,11 +49,30 @@ from infrastructure.config.mongo_config import get_mongo_collections
 from infrastructure.persistence.mongodb.person import MongoPersonRepository
 from infrastructure.persistence.mongodb.habit import MongoHabitRepository
 from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.analytics import MongoAnalyticsService
+from infrastructure.persistence.mongodb.activity_rollup import MongoActivityRollupRepository
+from infrastructure.persistence.mongodb.indexes import MongoIndexManager
 
 # In-memory repositories
 from infrastructure.persistence.in_memory import InMemoryPersonRepository
 from infrastructure.persistence.in_memory import InMemoryHabitRepository
 from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+from infrastructure.persistence.in_memory import InMemoryActivityRollupRepository
+
+# Durable in-memory repositories
+from infrastructure.persistence.durable.repositories import DurablePersonRepository
+from infrastructure.persistence.durable.repositories import DurableHabitRepository
+from infrastructure.persistence.durable.repositories import DurableHabitEventRepository
+
+# SQLite repositories
+from infrastructure.persistence.sqlite.database import SqliteDatabase
+from infrastructure.persistence.sqlite.person import SqlitePersonRepository
+from infrastructure.persistence.sqlite.habit import SqliteHabitRepository
+from infrastructure.persistence.sqlite.habit_event import SqliteHabitEventRepository
+from infrastructure.persistence.sqlite.analytics import SqliteAnalyticsService
+
+# Analytics cache
+from infrastructure.cache.analytics_cache import AnalyticsCache
 
 # Kafka publisher
 from infrastructure.messaging.kafka_event_publisher import KafkaEventPublisher
@@ -44,6 +82,13 @@ from application.domain.services.habit_service import HabitService
 from application.domain.services.habit_event_service import HabitEventService
 from application.domain.services.person_service import PersonService
 from application.domain.services.analytics_service import AnalyticsService
+from application.domain.analytics.materialized import MaterializedAnalytics
+from application.domain.analytics.columnar_store import ColumnarEventStore
+from application.domain.analytics.rollups import ActivityRollups
+from application.domain.analytics.hyperloglog import DailyActiveUserSketches
+from application.domain.analytics.top_k import HabitPopularityTracker
+from application.domain.analytics.streaks import StreakTracker
+from application.domain.analytics.day_bitmaps import HabitDayBitmaps
 
 from application.use_cases.habit_use_cases import HabitUseCases
 from application.use_cases.habit_event_use_cases import HabitEventUseCases
@@ -80,6 +125,14 @@ class RepositoryContainer(containers.DeclarativeContainer):
             MongoHabitEventRepository,
             collection=mongo_collections.provided["habit_event"]
         )
+        activity_rollup_repo = providers.Singleton(
+            MongoActivityRollupRepository,
+            collection=mongo_collections.provided["activity_rollup"]
+        )
+        mongo_index_manager = providers.Singleton(
+            MongoIndexManager,
+            repositories=providers.List(person_repo, habit_repo, habit_event_repo, activity_rollup_repo)
+        )
 
         event_publisher = providers.Singleton(
             KafkaEventPublisher,
@@ -87,30 +140,129 @@ class RepositoryContainer(containers.DeclarativeContainer):
             bootstrap_servers=os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
         )
     else:
-        person_repo = providers.Singleton(InMemoryPersonRepository)
-        habit_repo = providers.Singleton(InMemoryHabitRepository)
-        habit_event_repo = providers.Singleton(InMemoryHabitEventRepository)
+        mongo_index_manager = providers.Object(None)
+        if repo_type == "durable_memory":
+            durable_options = dict(
+                directory=os.getenv("DURABLE_DATA_DIR", "data"),
+                fsync=os.getenv("DURABLE_FSYNC", "true").lower() == "true",
+                snapshot_every=int(os.getenv("DURABLE_SNAPSHOT_EVERY", "100000"))
+            )
+            person_repo = providers.Singleton(DurablePersonRepository, **durable_options)
+            habit_repo = providers.Singleton(DurableHabitRepository, **durable_options)
+            habit_event_repo = providers.Singleton(DurableHabitEventRepository, **durable_options)
+        elif repo_type == "sqlite":
+            sqlite_database = providers.Singleton(
+                SqliteDatabase,
+                path=os.getenv("SQLITE_PATH", "data/data_forge_lab.db"),
+                synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+            )
+            person_repo = providers.Singleton(SqlitePersonRepository, database=sqlite_database)
+            habit_repo = providers.Singleton(SqliteHabitRepository, database=sqlite_database)
+            habit_event_repo = providers.Singleton(SqliteHabitEventRepository, database=sqlite_database)
+        else:
+            person_repo = providers.Singleton(InMemoryPersonRepository)
+            habit_repo = providers.Singleton(InMemoryHabitRepository)
+            habit_event_repo = providers.Singleton(InMemoryHabitEventRepository)
+        activity_rollup_repo = providers.Singleton(InMemoryActivityRollupRepository)
 
         class NoOpEventPublisher(EventPublisher):
             def publish(self, event): pass
 
         event_publisher = providers.Singleton(NoOpEventPublisher)
 
+    # Analytics
+    analytics_backend = os.getenv("ANALYTICS_BACKEND", "python")
+    if analytics_backend == "mongo" and repo_type == "mongo":
+        analytics_service_class = MongoAnalyticsService
+    elif analytics_backend == "sqlite" and repo_type == "sqlite":
+        analytics_service_class = SqliteAnalyticsService
+    else:
+        analytics_service_class = AnalyticsService
+    if analytics_backend == "materialized":
+        materialized_analytics = providers.Singleton(
+            MaterializedAnalytics,
+            person_repo=person_repo,
+            habit_repo=habit_repo,
+            habit_event_repo=habit_event_repo
+        )
+        event_store = providers.Object(None)
+        analytics_listeners = [materialized_analytics]
+    elif analytics_backend == "columnar":
+        materialized_analytics = providers.Object(None)
+        event_store = providers.Singleton(ColumnarEventStore.from_repository, habit_event_repo=habit_event_repo)
+        analytics_listeners = [event_store]
+    else:
+        materialized_analytics = providers.Object(None)
+        event_store = providers.Object(None)
+        analytics_listeners = []
+
+    if os.getenv("ANALYTICS_ROLLUPS", "false").lower() == "true":
+        activity_rollups = providers.Singleton(ActivityRollups, rollup_repo=activity_rollup_repo)
+        analytics_listeners.append(activity_rollups)
+    else:
+        activity_rollups = providers.Object(None)
+
+    if os.getenv("ANALYTICS_APPROX_USERS", "false").lower() == "true":
+        active_user_sketches = providers.Singleton(DailyActiveUserSketches.from_repository, habit_event_repo=habit_event_repo)
+        analytics_listeners.append(active_user_sketches)
+    else:
+        active_user_sketches = providers.Object(None)
+
+    top_k_capacity = int(os.getenv("ANALYTICS_TOP_K_CAPACITY", "0"))
+    if top_k_capacity > 0:
+        habit_popularity = providers.Singleton(
+            HabitPopularityTracker.from_repositories,
+            person_repo=person_repo,
+            habit_repo=habit_repo,
+            capacity=top_k_capacity
+        )
+        analytics_listeners.append(habit_popularity)
+    else:
+        habit_popularity = providers.Object(None)
+
+    if os.getenv("STREAK_TRACKING", "false").lower() == "true":
+        streak_tracker = providers.Singleton(
+            StreakTracker.from_repositories,
+            habit_event_repo=habit_event_repo,
+            habit_repo=habit_repo
+        )
+        analytics_listeners.append(streak_tracker)
+    else:
+        streak_tracker = providers.Object(None)
+
+    if os.getenv("ANALYTICS_DAY_BITMAPS", "false").lower() == "true":
+        day_bitmaps = providers.Singleton(HabitDayBitmaps.from_repository, habit_event_repo=habit_event_repo)
+        analytics_listeners.append(day_bitmaps)
+    else:
+        day_bitmaps = providers.Object(None)
+    activity_listeners = providers.List(*analytics_listeners)
+
+    analytics_cache_size = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+    if analytics_cache_size > 0:
+        analytics_cache = providers.Singleton(
+            AnalyticsCache,
+            repositories=providers.List(person_repo, habit_repo, habit_event_repo),
+            max_entries=analytics_cache_size,
+            ttl_seconds=float(os.getenv("ANALYTICS_CACHE_TTL", "30"))
+        )
+    else:
+        analytics_cache = providers.Object(None)
+
     # Services
-    person_service = providers.Factory(PersonService, person_repo=person_repo)
-    habit_service = providers.Factory(HabitService, habit_repo=habit_repo, habit_event_repo=habit_event_repo)
-    habit_event_service = providers.Factory(HabitEventService, habit_event_repo=habit_event_repo, event_publisher=event_publisher, habit_repo=habit_repo)
-    analytics_service = providers.Factory(AnalyticsService, person_repo=person_repo, habit_repo=habit_repo, habit_event_repo=habit_event_repo)
+    person_service = providers.Factory(PersonService, person_repo=person_repo, listeners=activity_listeners)
+    habit_service = providers.Factory(HabitService, habit_repo=habit_repo, habit_event_repo=habit_event_repo, listeners=activity_listeners)
+    habit_event_service = providers.Factory(HabitEventService, habit_event_repo=habit_event_repo, event_publisher=event_publisher, habit_repo=habit_repo, listeners=activity_listeners)
+    analytics_service = providers.Factory(analytics_service_class, person_repo=person_repo, habit_repo=habit_repo, habit_event_repo=habit_event_repo, materialized=materialized_analytics, event_store=event_store, rollups=activity_rollups, active_user_sketches=active_user_sketches, popularity=habit_popularity, day_bitmaps=day_bitmaps)
 
     # Use Cases
     person_use_cases = providers.Factory(PersonUseCases, person_service=person_service)
     habit_use_cases = providers.Factory(HabitUseCases, habit_service=habit_service)
     habit_event_use_cases = providers.Factory(HabitEventUseCases, habit_event_service=habit_event_service)
-    analytics_use_cases = providers.Factory(AnalyticsUseCases, analytics_service=analytics_service)
+    analytics_use_cases = providers.Factory(AnalyticsUseCases, analytics_service=analytics_service, cache=analytics_cache)
 
     # Controllers
     person_controller = providers.Factory(PersonController, person_use_cases=person_use_cases)
     habit_controller = providers.Factory(HabitController, habit_use_cases=habit_use_cases)
     habit_event_controller = providers.Factory(HabitEventController, habit_event_use_cases=habit_event_use_cases)
     analytics_controller = providers.Factory(AnalyticsController, analytics_use_cases=analytics_use_cases)
-    system_controller = providers.Singleton(SystemController, person_repo=person_repo, event_publisher=event_publisher)
\ No newline at end of file
+    system_controller = providers.Singleton(SystemController, person_repo=person_repo, event_publisher=event_publisher, analytics_cache=analytics_cache)
\ No newline at end of file
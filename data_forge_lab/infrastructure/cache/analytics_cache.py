@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+from interfaces.repositories.versioned_repository import VersionedRepository
+
+
+class AnalyticsCache:
+    """LRU + TTL cache for analytics results, invalidated by the repositories' write versions.
+
+    Each entry is tagged with the write versions of the repositories at the time it was computed. Any save or
+    delete moves a version, which turns every older entry into a miss. The TTL bounds staleness for writes the
+    versions cannot see (e.g. another process writing to the same MongoDB).
+    """
+
+    def __init__(self, repositories: Iterable[VersionedRepository], max_entries: int = 256, ttl_seconds: float = 30.0):
+        self.repositories = list(repositories)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def version(self) -> Tuple[int, ...]:
+        return tuple(repo.write_version for repo in self.repositories)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], version: Optional[Tuple[int, ...]] = None) -> Any:
+        """`version` is the snapshot version the computation reads, when it reads a point-in-time view. Otherwise
+        the current version is read before computing: a write landing mid-computation then leaves a stale-tagged
+        entry rather than a wrongly fresh one."""
+        version = self.version() if version is None else version
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (version, now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "version": list(self.version()),
+            }
@@ -4,13 +4,17 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Ids are stored as binary UUIDs (subtype 4): the client encodes and decodes `uuid.UUID` values natively
+CLIENT_OPTIONS = {"uuidRepresentation": "standard"}
+
 
 def get_mongo_collections():
-    client = MongoClient(os.getenv("MONGO_URI"))
+    client = MongoClient(os.getenv("MONGO_URI"), **CLIENT_OPTIONS)
     db = client[os.getenv("MONGO_DB")]
 
     return {
         "person": db[os.getenv("MONGO_PERSON_COLLECTION")],
         "habit": db[os.getenv("MONGO_HABIT_COLLECTION")],
-        "habit_event": db[os.getenv("MONGO_HABIT_EVENT_COLLECTION")]
+        "habit_event": db[os.getenv("MONGO_HABIT_EVENT_COLLECTION")],
+        "activity_rollup": db[os.getenv("MONGO_ACTIVITY_ROLLUP_COLLECTION", "activity_rollups")]
     }
@@ -0,0 +1,190 @@
+import gc
+import io
+import logging
+import os
+import pickle
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from application.domain.models.person import Country
+from infrastructure.persistence.durable.wal import WriteAheadLog, fsync_directory
+from infrastructure.persistence.in_memory import (
+    InMemoryRepository, InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository, _State
+)
+from infrastructure.persistence.records import HabitEventRecord, HabitRecord, PersonRecord
+
+logger = logging.getLogger("data_forge_lab")
+
+# Version 2: entities are stored as compact records keyed by the int of their id
+SNAPSHOT_MAGIC = b"DFLSNAP2"
+
+# The only classes log records and snapshots may reference: records and the values they hold besides builtins
+_STORED_CLASSES = {
+    (cls.__module__, cls.__qualname__): cls
+    for cls in (PersonRecord, HabitRecord, HabitEventRecord, Country, date, datetime, timedelta, timezone)
+}
+
+
+class RecordUnpickler(pickle.Unpickler):
+    """Unpickler of log records and snapshots that refuses any global outside of `_STORED_CLASSES`, so that a
+    tampered data directory cannot make loading call arbitrary functions."""
+
+    def find_class(self, module: str, name: str) -> type:
+        try:
+            return _STORED_CLASSES[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed in repository data") from None
+
+
+def load_records(payload: bytes) -> Any:
+    return RecordUnpickler(io.BytesIO(payload)).load()
+
+
+class DurableRepository(InMemoryRepository):
+    """In-memory repository that survives restarts.
+
+    Every save and delete is appended to a write-ahead log and fsynced (with group commit) before it returns, and
+    batches are synced once, after their last record. Every `snapshot_every` writes, the current version is pinned
+    and written to a binary snapshot in the background, after which the log segments it covers are deleted. On startup
+    the snapshot is loaded and the log written since is replayed, both in bulk. When the log cannot be written, the
+    write is taken back and the repository refuses any other write until it is reopened.
+
+    Log records are pickled `(id, record)` pairs and snapshots pickled lists of them, read back by `RecordUnpickler`,
+    which only builds records and their values.
+    """
+
+    def __init__(self, directory: str, name: str, fsync: bool = True, snapshot_every: int = 100_000):
+        # Sets up the indexes of the concrete in-memory repository, which follows in the MRO
+        super().__init__()
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, f"{name}.snapshot")
+        self.snapshot_every = snapshot_every
+        self.log = WriteAheadLog(directory, name, fsync)
+        self._checkpoint_lock = threading.Lock()
+        self._log_error: Optional[Exception] = None
+        self._snapshot_segment = 0
+        self._since_snapshot = 0
+        self._recover()
+
+    def _recover(self):
+        """Load the snapshot and replay the log tail, in bulk."""
+        # Loading creates millions of objects and no garbage: cyclic collections would only rescan them, over and over
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            self._snapshot_segment, entities = self._read_snapshot()
+            for payload in self.log.read(after=self._snapshot_segment):
+                entity_id, entity = load_records(payload)
+                if entity is None:
+                    entities.pop(entity_id, None)
+                else:
+                    entities[entity_id] = entity
+                self._since_snapshot += 1
+            self._load(entities.items())
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _read_snapshot(self) -> Tuple[int, Dict[int, Any]]:
+        if not os.path.exists(self.snapshot_path):
+            return 0, {}
+        with open(self.snapshot_path, "rb") as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.snapshot_path} is not a repository snapshot")
+            segment, items = RecordUnpickler(file).load()
+        return segment, dict(items)
+
+    def _commit_many(self, changes: List[Tuple[int, Any]], expected: Optional[List[Any]] = None) -> List[bool]:
+        if self._pinned is not None:
+            raise RuntimeError("Repository snapshots are read-only")
+        payloads = [pickle.dumps(change, protocol=pickle.HIGHEST_PROTOCOL) for change in changes]
+        position = checkpoint = None
+        with self._commit_lock:
+            if self._log_error is not None:
+                raise RuntimeError("The write-ahead log failed, reopen the repository") from self._log_error
+            before = self._state
+            applied = self._apply_many(changes, expected)
+            committed = self._state
+            try:
+                # Appended under the commit lock, so that the log order is the version order
+                for payload, logged in zip(payloads, applied):
+                    if logged:
+                        position = self.log.append(payload)
+                        self._since_snapshot += 1
+            except Exception as e:
+                self._fail(e, before, committed)
+                raise
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                checkpoint = self._begin_checkpoint()
+        # A batch is synced once, after its last record
+        if position is not None:
+            try:
+                self.log.sync(position)
+            except Exception as e:
+                with self._commit_lock:
+                    self._fail(e, before, committed)
+                raise
+        if checkpoint:
+            threading.Thread(target=self._write_snapshot, args=checkpoint, daemon=True).start()
+        return applied
+
+    def _fail(self, error: Exception, before: _State, committed: _State):
+        """Take back a version whose log records could not be written, and refuse any later write. Callers hold the
+        commit lock.
+
+        The version is only taken back while no later one builds on it. A failed append can leave a torn record in
+        the log, which would end the replay of the segment there on restart, and a failed fsync leaves the records
+        appended in an unknown state (a restart replays the ones that reached the disk): the log cannot take more
+        records either way.
+        """
+        logger.error(f"Write-ahead log of {self.snapshot_path} failed, no more writes are accepted: {error}")
+        self._log_error = error
+        if self._state is committed:
+            self._state = _State(self.bump_write_version(), before.storage, before.indexes)
+
+    def _begin_checkpoint(self) -> Tuple[int, _State]:
+        # Callers hold the commit lock: the pinned version holds exactly the writes of the segments up to the closed one
+        self._since_snapshot = 0
+        return self.log.rotate(), self._state
+
+    def checkpoint(self) -> int:
+        """Write a snapshot now and drop the log it covers. Returns the number of entities written."""
+        with self._commit_lock:
+            segment, state = self._begin_checkpoint()
+        return self._write_snapshot(segment, state)
+
+    def _write_snapshot(self, segment: int, state: _State) -> int:
+        with self._checkpoint_lock:
+            if segment <= self._snapshot_segment:
+                return 0
+            items = state.storage.items()
+            temporary = self.snapshot_path + ".tmp"
+            with open(temporary, "wb") as file:
+                file.write(SNAPSHOT_MAGIC)
+                pickle.dump((segment, items), file, protocol=pickle.HIGHEST_PROTOCOL)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.snapshot_path)
+            fsync_directory(self.directory)
+            self._snapshot_segment = segment
+            self.log.remove_through(segment)
+            return len(items)
+
+    def close(self):
+        self.log.close()
+
+
+class DurablePersonRepository(DurableRepository, InMemoryPersonRepository):
+    def __init__(self, directory: str, fsync: bool = True, snapshot_every: int = 100_000):
+        super().__init__(directory, "persons", fsync, snapshot_every)
+
+
+class DurableHabitRepository(DurableRepository, InMemoryHabitRepository):
+    def __init__(self, directory: str, fsync: bool = True, snapshot_every: int = 100_000):
+        super().__init__(directory, "habits", fsync, snapshot_every)
+
+
+class DurableHabitEventRepository(DurableRepository, InMemoryHabitEventRepository):
+    def __init__(self, directory: str, fsync: bool = True, snapshot_every: int = 100_000):
+        super().__init__(directory, "habit_events", fsync, snapshot_every)
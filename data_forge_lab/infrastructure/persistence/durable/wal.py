@@ -0,0 +1,129 @@
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from typing import Iterator, List
+
+logger = logging.getLogger("data_forge_lab")
+
+# Payload length and CRC32 of the payload
+FRAME = struct.Struct("<II")
+
+
+def fsync_directory(directory: str):
+    """Make file creations, renames and deletions in `directory` durable (a no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only log of binary records, split in numbered segment files, with group commit.
+
+    `append` buffers a framed record and returns its position, `sync(position)` returns once the record is on disk.
+    Writers waiting in `sync` at the same time share one fsync: the first one flushes and fsyncs everything appended
+    so far, the others find their record already durable. With `fsync=False` records are only handed to the OS,
+    which survives a process crash but not a power loss.
+    """
+
+    def __init__(self, directory: str, name: str, fsync: bool = True):
+        self.directory = directory
+        self.name = name
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._pattern = re.compile(rf"^{re.escape(name)}\.(\d+)\.wal$")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._appended = 0
+        self._synced = 0
+        self.segment = max(self.segments(), default=0) + 1
+        self._file = open(self._path(self.segment), "ab")
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{self.name}.{segment:08d}.wal")
+
+    def segments(self) -> List[int]:
+        return sorted(
+            int(match.group(1))
+            for match in map(self._pattern.match, os.listdir(self.directory)) if match
+        )
+
+    def append(self, payload: bytes) -> int:
+        with self._lock:
+            self._file.write(FRAME.pack(len(payload), zlib.crc32(payload)))
+            self._file.write(payload)
+            self._appended += 1
+            return self._appended
+
+    def sync(self, position: int):
+        if self._synced >= position:
+            return
+        with self._sync_lock:
+            if self._synced >= position:
+                return
+            with self._lock:
+                self._file.flush()
+                appended, fd = self._appended, self._file.fileno()
+            # Records appended while fsync runs wait for the next one
+            if self.fsync:
+                os.fsync(fd)
+            self._synced = appended
+
+    def rotate(self) -> int:
+        """Close the current segment and start a new one. Returns the number of the closed segment."""
+        with self._sync_lock, self._lock:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._synced = self._appended
+            closed, self.segment = self.segment, self.segment + 1
+            self._file = open(self._path(self.segment), "ab")
+            return closed
+
+    def remove_through(self, segment: int):
+        """Delete the segments up to `segment`, once a snapshot covers them."""
+        for number in self.segments():
+            if number <= segment:
+                os.remove(self._path(number))
+        fsync_directory(self.directory)
+
+    def read(self, after: int = 0) -> Iterator[bytes]:
+        """Payloads of the segments numbered above `after`, in order.
+
+        A record cut short by a crash, or failing its checksum, ends its segment: the segment is truncated there, so
+        that new records are never appended after garbage.
+        """
+        for segment in self.segments():
+            if segment <= after:
+                continue
+            path = self._path(segment)
+            with open(path, "rb") as file:
+                data = file.read()
+            offset = 0
+            while offset + FRAME.size <= len(data):
+                length, checksum = FRAME.unpack_from(data, offset)
+                start = offset + FRAME.size
+                payload = data[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                yield payload
+                offset = start + length
+            if offset < len(data):
+                logger.warning(f"Truncating {len(data) - offset} bytes of incomplete records from {path}")
+                with open(path, "r+b") as file:
+                    file.truncate(offset)
+
+    def close(self):
+        self.sync(self._appended)
+        with self._lock:
+            self._file.close()
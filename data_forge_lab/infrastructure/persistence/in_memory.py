@@ -1,89 +1,502 @@
+import copy
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import replace
+from datetime import date, datetime, timezone
+from operator import attrgetter
 from uuid import UUID
-from typing import List, Optional
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from application.domain.models.person import Person
+from application.domain.models.person import Person, Country
 from application.domain.models.habit import Habit
 from application.domain.models.event import HabitEvent
+from application.domain.models.rollup import ActivityRollup
 
 from interfaces.repositories.person_repository import PersonRepository
 from interfaces.repositories.habit_event_repository import HabitEventRepository
 from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.activity_rollup_repository import ActivityRollupRepository
+from interfaces.repositories.versioned_repository import VersionedRepository
+from interfaces.repositories.batch import BatchWriteResult, write_batch
+from interfaces.repositories.pagination import Page, Position, check_page_size, decode_cursor, page_of
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, row_type
+from infrastructure.persistence.persistent_map import EMPTY, PersistentMap
+from infrastructure.persistence.records import Interner, PersonRecord, HabitRecord, HabitEventRecord, to_epoch
 
 
 Database = None
 
+_UNINDEXED = object()
+# Added to the sort values of SortKey hashes, which must be non-negative: epoch microseconds and day ordinals are
+# far smaller in magnitude
+_SORT_OFFSET = 1 << 62
+
+
+class SecondaryIndex:
+    """Hash index from the value of a key field to the entities holding it.
+
+    The index holds no state of its own: its buckets live in the repository's versioned state, as a persistent
+    map from value to a persistent map of entities by id, so that every snapshot carries the index matching its
+    storage and lookups never go back to the storage.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable]):
+        self.key = key
+
+    def update(self, buckets: PersistentMap, storage: PersistentMap, entity_id: int, previous, entity) -> PersistentMap:
+        """Buckets with `entity_id` moved from the bucket of `previous` to the bucket of `entity` (either may be
+        None, for inserts and deletes). `storage` already holds `entity`, and the bucket shares its entry."""
+        old = self.key(previous) if previous is not None else _UNINDEXED
+        new = self.key(entity) if entity is not None else _UNINDEXED
+        if old is not _UNINDEXED and old != new:
+            bucket = buckets[old].delete(entity_id)
+            buckets = buckets.set(old, bucket) if bucket else buckets.delete(old)
+        if new is not _UNINDEXED:
+            buckets = buckets.set(new, buckets.get(new, EMPTY).adopt(storage, entity_id))
+        return buckets
+
+    def build(self, storage: PersistentMap) -> PersistentMap:
+        """Buckets of every record of `storage`, built in bulk."""
+        return PersistentMap.from_items(storage.partition(self.key).items())
+
+
+def epoch_order(value) -> int:
+    """Sort value of a timestamp, stored (epoch microseconds) or not: naive ones on their wall clock, aware ones in
+    UTC, like SQLite stores them."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return to_epoch(value)
+    return value
+
+
+class SortKey:
+    """Position of a record in a SortedIndex bucket: an int sort value, then the record's id.
+
+    Keys hash to their sort value, so the buckets iterate in sort order (see `PersistentMap.iter_items_from`), and
+    keys sharing a sort value are ordered by id.
+    """
+    __slots__ = ("value", "entity_id")
+
+    def __init__(self, value: int, entity_id: int):
+        self.value = value
+        self.entity_id = entity_id
+
+    def __hash__(self):
+        return self.value + _SORT_OFFSET
+
+    def __eq__(self, other):
+        return self.value == other.value and self.entity_id == other.entity_id
+
+    def __lt__(self, other):
+        return (self.value, self.entity_id) < (other.value, other.entity_id)
+
+
+class SortedIndex(SecondaryIndex):
+    """Index from the value of a key field to the entities holding it, sorted by a sort field then by id.
+
+    Buckets are persistent maps from SortKey to record: a page of a bucket is a seek to the cursor's position then a
+    walk of the next entries, whatever the depth of the page. Unlike plain buckets they cannot share the storage's
+    entries, each record costs an entry and a key more.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable], sort_field: str, order: Callable[[Any], int]):
+        super().__init__(key)
+        self.sort_field = sort_field
+        self.order = order
+
+    def position(self, record) -> SortKey:
+        return SortKey(self.order(getattr(record, self.sort_field)), record.key)
+
+    def seek(self, position: Position) -> SortKey:
+        value, entity_id = position
+        return SortKey(self.order(value), entity_id.int)
+
+    def update(self, buckets: PersistentMap, storage: PersistentMap, entity_id: int, previous, entity) -> PersistentMap:
+        if previous is not None:
+            old, old_position = self.key(previous), self.position(previous)
+            if entity is None or old != self.key(entity) or old_position != self.position(entity):
+                bucket = buckets[old].delete(old_position)
+                buckets = buckets.set(old, bucket) if bucket else buckets.delete(old)
+        if entity is not None:
+            new = self.key(entity)
+            buckets = buckets.set(new, buckets.get(new, EMPTY).set(self.position(entity), entity))
+        return buckets
+
+    def build(self, storage: PersistentMap) -> PersistentMap:
+        groups = {}
+        for record in storage.values():
+            groups.setdefault(self.key(record), []).append((self.position(record), record))
+        return PersistentMap.from_items((group, PersistentMap.from_items(items)) for group, items in groups.items())
+
+
+class _State:
+    """One immutable version of a repository: its write version, entities by id and index buckets."""
+    __slots__ = ("version", "storage", "indexes")
+
+    def __init__(self, version: int, storage: PersistentMap, indexes: Tuple[PersistentMap, ...]):
+        self.version = version
+        self.storage = storage
+        self.indexes = indexes
+
+
+class InMemoryRepository(VersionedRepository):
+    """Storage shared by the in-memory repositories, safe to use from Flask's threaded server.
+
+    The repository is a sequence of immutable versions (MVCC). Records and index buckets are held in persistent
+    maps, so a write copies only the few trie nodes on its path and publishes the new version with a single
+    reference swap under a short commit lock. Readers never lock: they read whichever version is current, and
+    `snapshot()` pins one in O(1) for long scans that must neither block writers nor see half-applied updates.
+
+    Entities are stored as compact records (see `records`), keyed by the 128 bit int of their id, with repeated ids
+    and strings interned. Domain objects are only materialized by the reads that return them, each read getting
+    fresh objects that the services are free to update in place.
+    """
+    record_type: type
 
-class InMemoryPersonRepository(PersonRepository):
     def __init__(self):
-        self.storage = {}
+        self.indexes: List[SecondaryIndex] = []
+        self._intern = Interner()
+        self._state = _State(0, EMPTY, ())
+        self._pinned: Optional[_State] = None
+        self._commit_lock = threading.Lock()
+
+    def _set_indexes(self, *indexes: SecondaryIndex):
+        self.indexes = list(indexes)
+        self._state = _State(self._state.version, self._state.storage, tuple(EMPTY for _ in indexes))
+
+    def _current(self) -> _State:
+        return self._pinned or self._state
+
+    @property
+    def storage(self) -> PersistentMap:
+        """Records by id, as of the current version (or the pinned one, for snapshots)."""
+        return self._current().storage
+
+    @property
+    def write_version(self) -> int:
+        return self._current().version
+
+    def buckets(self, index: SecondaryIndex) -> PersistentMap:
+        return self._current().indexes[self.indexes.index(index)]
+
+    def snapshot(self) -> "InMemoryRepository":
+        snapshot = copy.copy(self)
+        snapshot._pinned = self._current()
+        return snapshot
+
+    def _commit(self, entity_id: int, entity) -> bool:
+        """Publish a version with the record `entity` stored under `entity_id`, or removed when `entity` is None."""
+        return self._commit_many([(entity_id, entity)])[0]
+
+    def _commit_many(self, changes: List[Tuple[int, Any]], expected: Optional[List[Any]] = None) -> List[bool]:
+        """Publish a single version with all the `(id, record)` changes applied in order (see `_commit`). Returns
+        whether each change applied: deleting a missing record does not.
+
+        With `expected`, the records that each change's id must still hold, none of the changes apply when one of
+        them was replaced in between (compare-and-set).
+        """
+        if self._pinned is not None:
+            raise RuntimeError("Repository snapshots are read-only")
+        with self._commit_lock:
+            return self._apply_many(changes, expected)
+
+    def _apply_many(self, changes: List[Tuple[int, Any]], expected: Optional[List[Any]] = None) -> List[bool]:
+        # Callers hold the commit lock. Intermediate states are never published: readers see the whole batch or none
+        storage, indexes, applied = self._state.storage, self._state.indexes, []
+        if expected is not None and any(
+            storage.get(entity_id) is not record for (entity_id, _), record in zip(changes, expected)
+        ):
+            return [False] * len(changes)
+        for entity_id, entity in changes:
+            previous = storage.get(entity_id)
+            if previous is None and entity is None:
+                applied.append(False)
+                continue
+            storage = storage.set(entity_id, entity) if entity is not None else storage.delete(entity_id)
+            indexes = tuple(
+                index.update(buckets, storage, entity_id, previous, entity)
+                for index, buckets in zip(self.indexes, indexes)
+            )
+            applied.append(True)
+        if storage is not self._state.storage:
+            self._state = _State(self.bump_write_version(), storage, indexes)
+        return applied
+
+    def _load(self, entities: Iterable[Tuple[int, Any]]):
+        """Replace the whole content with `(id, record)` pairs (see `_encode`), building the maps in bulk."""
+        storage = PersistentMap.from_items(entities)
+        indexes = tuple(index.build(storage) for index in self.indexes)
+        with self._commit_lock:
+            self._state = _State(self.bump_write_version(), storage, indexes)
+
+    def _encode(self, entity) -> Tuple[int, Any]:
+        """The storage key and record of a domain object."""
+        record = self.record_type.from_entity(entity, self._intern)
+        return record.key, record
+
+    def _put(self, entity):
+        self._commit(*self._encode(entity))
+
+    def _put_many(self, entities: Iterable, ordered: bool) -> BatchWriteResult:
+        def commit(encoded: list) -> BatchWriteResult:
+            self._commit_many([change for _, change in encoded])
+            return BatchWriteResult([entity for entity, _ in encoded])
+
+        return write_batch(entities, lambda entity: (entity, self._encode(entity)), commit, ordered)
+
+    def _compare_and_set(self, entity_id: UUID, expected: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        """Apply `changes` to the fields of an entity if its `expected` fields hold the expected values. The commit
+        only applies if the record compared is still the stored one, and compares again against the new one if not."""
+        while True:
+            record = self._state.storage.get(entity_id.int)
+            if record is None:
+                return False
+            entity = record.materialize()
+            if any(getattr(entity, name) != value for name, value in expected.items()):
+                return False
+            key, updated = self._encode(replace(entity, **changes))
+            if self._commit_many([(key, updated)], [record])[0]:
+                return True
+
+    def _update_fields(self, entity_id: UUID, changes: Dict[str, Any]):
+        """Apply `changes` to the fields of an entity and return it as it was before, None when there is none. Like
+        `_compare_and_set`, the commit only applies over the record the changes were made to, and the changes are made
+        again to the new one if another write replaced it in between, so that concurrent updates of other fields are
+        kept."""
+        while True:
+            record = self._state.storage.get(entity_id.int)
+            if record is None:
+                return None
+            entity = record.materialize()
+            if not changes:
+                return entity
+            key, updated = self._encode(replace(entity, **changes))
+            if self._commit_many([(key, updated)], [record])[0]:
+                return entity
+
+    def _remove(self, entity_id: UUID) -> bool:
+        return self._commit(entity_id.int, None)
+
+    def _remove_many(self, entity_ids: Iterable[UUID]) -> int:
+        return sum(self._commit_many([(entity_id.int, None) for entity_id in entity_ids]))
+
+    def _get(self, entity_id: UUID):
+        record = self._current().storage.get(entity_id.int)
+        return record.materialize() if record is not None else None
+
+    def _all(self) -> list:
+        return [record.materialize() for record in self._current().storage.values()]
+
+    def _lookup(self, index: SecondaryIndex, value: Hashable) -> list:
+        """Entities of an index bucket: in the order of its pages for sorted indexes, in hash order otherwise."""
+        bucket = self.buckets(index).get(value, EMPTY)
+        if isinstance(index, SortedIndex):
+            return [record.materialize() for _, record in bucket.iter_items_from()]
+        return [record.materialize() for record in bucket.values()]
+
+    def _page(self, index: SortedIndex, value: Hashable, limit: int, cursor: Optional[str], sort_type: type,
+              position: Callable[[Any], Position]) -> Page:
+        check_page_size(limit)
+        after = decode_cursor(cursor, sort_type)
+        start = index.seek(after) if after else None
+        records = []
+        for key, record in self.buckets(index).get(value, EMPTY).iter_items_from(start):
+            # The seek lands on the first key sharing the cursor's sort value, the ones up to the cursor are skipped
+            if start is not None and not start < key:
+                continue
+            records.append(record)
+            if len(records) > limit:
+                break
+        entities = [record.materialize() for record in records]
+        return page_of(entities, limit, position)
+
+    # Records are already in memory: scans build one entity or row at a time, and `batch_size` does not apply. The
+    # version scanned is the one current when the scan starts, later writes neither wait for it nor show up in it
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator:
+        return (record.materialize() for record in self._current().storage.iter_values())
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        make = row_type(self.record_type.entity_type, tuple(fields))._make
+        readers = [
+            (lambda record, name=name, decode=decode: decode(getattr(record, name))) if decode else attrgetter(name)
+            for name, decode in ((name, self.record_type.decoders.get(name)) for name in fields)
+        ]
+        return (make([read(record) for read in readers]) for record in self._current().storage.iter_values())
+
+
+class InMemoryPersonRepository(InMemoryRepository, PersonRepository):
+    record_type = PersonRecord
+
+    def __init__(self):
+        super().__init__()
+        self.by_country = SecondaryIndex(lambda person: person.country)
+        # A single bucket holding every person, in creation order
+        self.by_creation = SortedIndex(lambda person: None, "creation_date", date.toordinal)
+        self._set_indexes(self.by_country, self.by_creation)
 
     def save(self, person: Person) -> Person:
-        self.storage[person.person_id] = person
-        print(f"self.storage: {self.storage}")
+        self._put(person)
         return person
 
+    def save_many(self, persons: Iterable[Person], ordered: bool = True) -> BatchWriteResult:
+        return self._put_many(persons, ordered)
+
     def get_by_id(self, person_id: UUID) -> Optional[Person]:
-        return self.storage.get(person_id)
+        return self._get(person_id)
+
+    def update_fields(self, person_id: UUID, changes: Dict[str, Any]) -> Optional[Person]:
+        return self._update_fields(person_id, changes)
 
     def find_all(self) -> List[Person]:
-        return list(self.storage.values())
+        # In creation order, like the pages
+        return self._lookup(self.by_creation, None)
+
+    def find_page(self, limit: int, cursor: Optional[str] = None) -> Page[Person]:
+        return self._page(self.by_creation, None, limit, cursor, date, attrgetter("creation_date", "person_id"))
+
+    def find_by_country(self, country: Country) -> List[Person]:
+        return self._lookup(self.by_country, country)
 
     def delete(self, person_id: UUID) -> bool:
         # Delete the person by ID and return True if successful, False otherwise
-        if person_id in self.storage:
-            del self.storage[person_id]
-            return True
-        return False
+        return self._remove(person_id)
+
+    def delete_many(self, person_ids: Iterable[UUID]) -> int:
+        return self._remove_many(person_ids)
+
 
+class InMemoryHabitEventRepository(InMemoryRepository, HabitEventRepository):
+    record_type = HabitEventRecord
 
-class InMemoryHabitEventRepository(HabitEventRepository):
     def __init__(self):
-        self.storage = {}
+        super().__init__()
+        self.by_habit = SortedIndex(lambda event: event.habit_id, "timestamp", epoch_order)
+        self.by_person = SecondaryIndex(lambda event: event.person_id)
+        self.by_status = SecondaryIndex(lambda event: event.status)
+        self._set_indexes(self.by_habit, self.by_person, self.by_status)
 
     def save(self, habit_event: HabitEvent) -> HabitEvent:
-        self.storage[habit_event.event_id] = habit_event
-        print(f"self.storage: {self.storage}")
+        self._put(habit_event)
         return habit_event
 
+    def save_many(self, habit_events: Iterable[HabitEvent], ordered: bool = True) -> BatchWriteResult:
+        return self._put_many(habit_events, ordered)
+
     def get_by_id(self, event_id: UUID) -> Optional[HabitEvent]:
-        return self.storage.get(event_id)
+        return self._get(event_id)
+
+    def update_fields(self, event_id: UUID, changes: Dict[str, Any]) -> Optional[HabitEvent]:
+        return self._update_fields(event_id, changes)
 
     def find_all(self) -> List[HabitEvent]:
-        return list(self.storage.values())
+        return self._all()
 
     def find_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
-        return [event for event in self.storage.values() if event.habit_id == habit_id]
+        return self._lookup(self.by_habit, habit_id.int)
+
+    def find_page_by_habit_id(self, habit_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[HabitEvent]:
+        return self._page(self.by_habit, habit_id.int, limit, cursor, datetime, attrgetter("timestamp", "event_id"))
 
     def find_by_person_id(self, person_id: UUID) -> List[HabitEvent]:
-        return [event for event in self.storage.values() if event.person_id == person_id]
+        return self._lookup(self.by_person, person_id.int)
+
+    def find_by_status(self, status: str) -> List[HabitEvent]:
+        return self._lookup(self.by_status, status)
 
     def delete(self, event_id: UUID) -> bool:
-        if event_id in self.storage:
-            del self.storage[event_id]
-            return True
-        return False
+        return self._remove(event_id)
+
+    def delete_many(self, event_ids: Iterable[UUID]) -> int:
+        return self._remove_many(event_ids)
+
+    def delete_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        records = list(self.buckets(self.by_habit).get(habit_id.int, EMPTY).values())
+        applied = self._commit_many([(record.key, None) for record in records])
+        # Events deleted concurrently in the meantime were not deleted by this batch
+        return [record.materialize() for record, deleted in zip(records, applied) if deleted]
 
 
-class InMemoryHabitRepository(HabitRepository):
+class InMemoryHabitRepository(InMemoryRepository, HabitRepository):
+    record_type = HabitRecord
+
     def __init__(self):
-        self.storage = {}
+        super().__init__()
+        self.by_person = SortedIndex(lambda habit: habit.person_id, "created_at", epoch_order)
+        self._set_indexes(self.by_person)
 
     def save(self, habit: Habit) -> Habit:
-        self.storage[habit.habit_id] = habit
-        print(f"self.storage: {self.storage}")
+        self._put(habit)
         return habit
 
+    def save_many(self, habits: Iterable[Habit], ordered: bool = True) -> BatchWriteResult:
+        return self._put_many(habits, ordered)
+
     def get_by_id(self, habit_id: UUID) -> Optional[Habit]:
-        return self.storage.get(habit_id)
+        return self._get(habit_id)
+
+    def update_fields(self, habit_id: UUID, changes: Dict[str, Any]) -> Optional[Habit]:
+        return self._update_fields(habit_id, changes)
+
+    def compare_and_set(self, habit_id: UUID, expected: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        return self._compare_and_set(habit_id, expected, changes)
 
     def find_all(self) -> List[Habit]:
-        return list(self.storage.values())
+        return self._all()
 
     def find_by_person_id(self, person_id: UUID) -> List[Habit]:
-        return [habit for habit in self.storage.values() if habit.person_id == person_id]
+        return self._lookup(self.by_person, person_id.int)
+
+    def find_page_by_person_id(self, person_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[Habit]:
+        return self._page(self.by_person, person_id.int, limit, cursor, datetime, attrgetter("created_at", "habit_id"))
 
     def delete(self, habit_id: UUID) -> bool:
-        if habit_id in self.storage:
-            del self.storage[habit_id]
-            return True
-        return False
+        return self._remove(habit_id)
+
+    def delete_many(self, habit_ids: Iterable[UUID]) -> int:
+        return self._remove_many(habit_ids)
+
+
+class InMemoryActivityRollupRepository(ActivityRollupRepository):
+    """Rollups grouped by day, the days kept sorted: a date range is found by bisection and only its days are read,
+    so a query costs the rollups it returns rather than every stored rollup."""
+
+    def __init__(self):
+        self.days: List[date] = []
+        self.by_day: Dict[date, Dict[Optional[UUID], ActivityRollup]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, day: date, person_id: Optional[UUID], hour: int, events: int = 1, completed: int = 0) -> None:
+        with self._lock:
+            rollups = self.by_day.get(day)
+            if rollups is None:
+                rollups = self.by_day[day] = {}
+                insort(self.days, day)
+            rollup = rollups.get(person_id)
+            if rollup is None:
+                rollup = rollups[person_id] = ActivityRollup(day=day, person_id=person_id)
+            rollup.add(hour, events, completed)
+
+    def _days_between(self, start: Optional[date], end: Optional[date]) -> List[Dict[Optional[UUID], ActivityRollup]]:
+        with self._lock:
+            low = bisect_left(self.days, start) if start else 0
+            high = bisect_right(self.days, end) if end else len(self.days)
+            return [self.by_day[day] for day in self.days[low:high]]
+
+    def find_range(self, start: Optional[date] = None, end: Optional[date] = None, person_id: Optional[UUID] = None) -> List[ActivityRollup]:
+        return [rollups[person_id] for rollups in self._days_between(start, end) if person_id in rollups]
+
+    def find_person_rollups(self, start: Optional[date] = None, end: Optional[date] = None) -> List[ActivityRollup]:
+        return [
+            rollup for rollups in self._days_between(start, end)
+            for person_id, rollup in list(rollups.items()) if person_id is not None
+        ]
+
+    def replace_all(self, rollups: Iterable[ActivityRollup]) -> None:
+        by_day: Dict[date, Dict[Optional[UUID], ActivityRollup]] = {}
+        for rollup in rollups:
+            by_day.setdefault(rollup.day, {})[rollup.person_id] = rollup
+        with self._lock:
+            self.by_day = by_day
+            self.days = sorted(by_day)
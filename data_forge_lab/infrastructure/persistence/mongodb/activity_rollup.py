@@ -0,0 +1,71 @@
+from datetime import date
+from typing import Iterable, List, Optional
+from uuid import UUID
+from pymongo import ASCENDING, IndexModel, InsertOne
+from pymongo.collection import Collection
+
+from application.domain.models.rollup import ActivityRollup
+from interfaces.repositories.activity_rollup_repository import ActivityRollupRepository
+
+
+class MongoActivityRollupRepository(ActivityRollupRepository):
+    """One document per (day, person_id), with `person_id: null` for the global rollups.
+
+    Days are calendar days, not instants: they are stored as ISO strings, so that range filters compare
+    lexicographically. Person ids are binary UUIDs, and the hourly buckets an `hours` sub-document keyed by
+    two-digit hour so that `$inc` can create them on upsert.
+    """
+
+    indexes = [IndexModel([("person_id", ASCENDING), ("day", ASCENDING)], unique=True)]
+    index_queries = [
+        {"person_id": None, "day": {"$gte": "2024-01-01"}},
+        {"person_id": {"$type": "binData"}, "day": {"$gte": "2024-01-01"}},
+    ]
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def increment(self, day: date, person_id: Optional[UUID], hour: int, events: int = 1, completed: int = 0) -> None:
+        self.collection.update_one(
+            {"day": day.isoformat(), "person_id": person_id},
+            {"$inc": {"event_count": events, "completed_count": completed, f"hours.{hour:02d}": events}},
+            upsert=True
+        )
+
+    def find_range(self, start: Optional[date] = None, end: Optional[date] = None, person_id: Optional[UUID] = None) -> List[ActivityRollup]:
+        query = self._day_filter(start, end)
+        query["person_id"] = person_id
+        return [self._from_dict(doc) for doc in self.collection.find(query)]
+
+    def find_person_rollups(self, start: Optional[date] = None, end: Optional[date] = None) -> List[ActivityRollup]:
+        query = self._day_filter(start, end)
+        query["person_id"] = {"$type": "binData"}
+        return [self._from_dict(doc) for doc in self.collection.find(query, {"hours": 0})]
+
+    def replace_all(self, rollups: Iterable[ActivityRollup]) -> None:
+        self.collection.delete_many({})
+        requests = [InsertOne({**rollup.to_dict(), "person_id": rollup.person_id}) for rollup in rollups]
+        if requests:
+            self.collection.bulk_write(requests, ordered=False)
+        self.collection.create_indexes(self.indexes)
+
+    @staticmethod
+    def _day_filter(start: Optional[date], end: Optional[date]) -> dict:
+        day = {}
+        if start:
+            day["$gte"] = start.isoformat()
+        if end:
+            day["$lte"] = end.isoformat()
+        return {"day": day} if day else {}
+
+    def _from_dict(self, data: dict) -> ActivityRollup:
+        hourly_counts = [0] * 24
+        for hour, count in data.get("hours", {}).items():
+            hourly_counts[int(hour)] = count
+        return ActivityRollup(
+            day=date.fromisoformat(data["day"]),
+            person_id=data.get("person_id"),
+            event_count=data.get("event_count", 0),
+            completed_count=data.get("completed_count", 0),
+            hourly_counts=hourly_counts
+        )
@@ -0,0 +1,264 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from application.domain.models.person import Country
+from application.domain.services.analytics_service import AnalyticsService
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+# Timestamps are BSON datetimes holding the wall-clock time: `$hour` is the local hour, and subtracting two of them
+# gives milliseconds
+HOUR = {"$hour": "$timestamp"}
+COMPLETED = {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+
+
+def day_range(start: Optional[date], end: Optional[date]) -> dict:
+    """Timestamp filter for the days between start and end (inclusive)."""
+    timestamp = {}
+    if start:
+        timestamp["$gte"] = datetime.combine(start, time())
+    if end:
+        timestamp["$lt"] = datetime.combine(end + timedelta(days=1), time())
+    return timestamp
+
+
+class MongoAnalyticsService(AnalyticsService):
+    """AnalyticsService backed by MongoDB aggregation pipelines.
+
+    Every computation runs server-side as `$group`/`$lookup`/`$facet` stages, so only aggregated rows cross the
+    wire instead of whole collections. Results are identical to the Python implementation.
+    """
+
+    def _dashboard_source(self) -> AnalyticsService:
+        # Sections are aggregation pipelines: they run concurrently on the server instead of sharing loaded data
+        return self
+
+    @property
+    def persons(self):
+        return self.person_repo.collection
+
+    @property
+    def habits(self):
+        return self.habit_repo.collection
+
+    @property
+    def habit_events(self):
+        return self.habit_event_repo.collection
+
+    def get_completion_rates(self, person_id: UUID = None) -> Dict[str, float]:
+        """Calculate completion rates for habits."""
+        pipeline = [
+            {"$lookup": {
+                "from": self.habit_events.name,
+                "let": {"habit_id": "$habit_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$habit_id", "$$habit_id"]}}},
+                    {"$group": {"_id": None, "total": {"$sum": 1}, "completed": {"$sum": COMPLETED}}},
+                ],
+                "as": "stats"
+            }},
+            {"$project": {"_id": 0, "habit_id": 1, "name": 1, "stats": 1}},
+        ]
+        if person_id:
+            pipeline.insert(0, {"$match": {"person_id": person_id}})
+
+        completion_rates = {}
+        for row in self.habits.aggregate(pipeline):
+            stats = row["stats"][0] if row["stats"] else None
+            completion_rates[str(row["habit_id"])] = {
+                "completion_rate": (stats["completed"] / stats["total"] * 100) if stats else 0,
+                "habit_name": row["name"]
+            }
+        return completion_rates
+
+    def get_distribution(self, person_id: UUID = None):
+        pipeline = [{"$group": {"_id": "$category", "count": {"$sum": 1}}}]
+        if person_id:
+            pipeline.insert(0, {"$match": {"person_id": person_id}})
+        return {row["_id"]: row["count"] for row in self.habits.aggregate(pipeline)}
+
+    def get_habit_popularity(self, k: int = 5, category: str = None, country: str = None, exact: bool = False):
+        if self.popularity and not exact and k <= self.popularity.capacity and not (category and country):
+            return self.popularity.top(k, category, country)
+        match = {}
+        if category:
+            match["category"] = category
+        if country:
+            match["person_id"] = {"$in": self.persons.distinct("person_id", {"country": country})}
+        pipeline = [
+            {"$group": {"_id": "$name", "persons": {"$addToSet": "$person_id"}, "first_seen": {"$min": "$_id"}}},
+            {"$project": {"_id": 0, "habit_name": "$_id", "user_count": {"$size": "$persons"}, "first_seen": 1}},
+            # Ties keep the order in which names first appeared, like Python's stable sort
+            {"$sort": {"user_count": -1, "first_seen": 1}},
+            {"$limit": k},
+        ]
+        if match:
+            pipeline.insert(0, {"$match": match})
+        return [
+            {"habit_name": row["habit_name"], "user_count": row["user_count"]}
+            for row in self.habits.aggregate(pipeline)
+        ]
+
+    def get_time_of_day_heatmap(self, person_id: UUID = None, start: date = None, end: date = None) -> Dict[str, int]:
+        """Generate time-of-day heatmap data, optionally restricted to events between start and end (inclusive)."""
+        if self.rollups:
+            return self.rollups.time_of_day_heatmap(person_id, start, end)
+        match = {}
+        if person_id:
+            match["person_id"] = person_id
+        if start or end:
+            match["timestamp"] = day_range(start, end)
+        pipeline = [{"$group": {"_id": HOUR, "count": {"$sum": 1}}}]
+        if match:
+            pipeline.insert(0, {"$match": match})
+
+        heatmap = {f"{hour:02d}:00": 0 for hour in range(24)}
+        for row in self.habit_events.aggregate(pipeline):
+            heatmap[f"{row['_id']:02d}:00"] = row["count"]
+        return heatmap
+
+    def get_drop_off_rates(self, days_threshold: int = 7) -> Dict[str, float]:
+        """Calculate how often users abandon habits after X days."""
+        pipeline = [
+            {"$group": {"_id": "$habit_id", "first": {"$min": "$timestamp"}, "last": {"$max": "$timestamp"}}},
+            {"$lookup": {"from": self.habits.name, "localField": "_id", "foreignField": "habit_id", "as": "habit"}},
+            {"$unwind": "$habit"},
+            {"$project": {
+                "_id": 0,
+                "habit_id": "$_id",
+                "habit_name": "$habit.name",
+                "days_active": {"$floor": {"$divide": [
+                    {"$subtract": ["$last", "$first"]}, DAY_MS
+                ]}},
+            }},
+        ]
+
+        drop_off_data = {}
+        for row in self.habit_events.aggregate(pipeline):
+            days_active = int(row["days_active"])
+            drop_off_data[str(row["habit_id"])] = {
+                "drop_off_rate": 1 if days_active < days_threshold else 0,
+                "habit_name": row["habit_name"],
+                "days_active": days_active
+            }
+        return drop_off_data
+
+    def get_first_week_success(self) -> Dict[str, float]:
+        """Calculate success rates in the first week of habit creation."""
+        pipeline = [
+            {"$group": {"_id": "$habit_id", "first": {"$min": "$timestamp"}}},
+            {"$lookup": {"from": self.habits.name, "localField": "_id", "foreignField": "habit_id", "as": "habit"}},
+            {"$unwind": "$habit"},
+            {"$lookup": {
+                "from": self.habit_events.name,
+                # "(timestamp - first).days <= 7" means strictly less than 8 days after the first event
+                "let": {"habit_id": "$_id", "cutoff": {"$add": ["$first", 8 * DAY_MS]}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$habit_id", "$$habit_id"]}}},
+                    {"$match": {"$expr": {"$lt": ["$timestamp", "$$cutoff"]}}},
+                    {"$group": {"_id": None, "total": {"$sum": 1}, "completed": {"$sum": COMPLETED}}},
+                ],
+                "as": "first_week"
+            }},
+            {"$unwind": "$first_week"},
+            {"$project": {
+                "_id": 0,
+                "habit_id": "$_id",
+                "habit_name": "$habit.name",
+                "total": "$first_week.total",
+                "completed": "$first_week.completed",
+            }},
+        ]
+
+        first_week_data = {}
+        for row in self.habit_events.aggregate(pipeline):
+            first_week_data[str(row["habit_id"])] = {
+                "success_rate": row["completed"] / row["total"] * 100,
+                "habit_name": row["habit_name"]
+            }
+        return first_week_data
+
+    def get_engagement_metrics(self, days: Optional[int] = None, approx: bool = False) -> Dict[str, Any]:
+        """Calculate engagement metrics, with the active users of the last `days` days when given."""
+        users = self.persons.count_documents({})
+        habits = self.habits.count_documents({})
+        return self._engagement(self._active_users(days, approx), users, habits, approx)
+
+    def _scan_active_users(self, days: Optional[int] = None) -> Dict[str, int]:
+        now = datetime.now()
+        # "(now - timestamp).days" is 0 for the last 24 hours, <= 7 for the last 8 days and <= 30 for the last 31
+        windows = {
+            "daily": {"$gt": now - timedelta(days=1), "$lte": now},
+            "weekly": {"$gt": now - timedelta(days=8)},
+            "monthly": {"$gt": now - timedelta(days=31)},
+        }
+        earliest = windows["monthly"]
+        if days:
+            # Custom windows are aligned on calendar days, like the rollups
+            today = now.date()
+            windows[f"last_{days}_days"] = day_range(today - timedelta(days=days - 1), today)
+            earliest = {"$gte": min(windows["monthly"]["$gt"], windows[f"last_{days}_days"]["$gte"])}
+        pipeline = [
+            {"$match": {"timestamp": earliest}},
+            {"$facet": {
+                period: [
+                    {"$match": {"timestamp": window}},
+                    {"$group": {"_id": "$person_id"}},
+                    {"$count": "users"},
+                ]
+                for period, window in windows.items()
+            }},
+        ]
+        facets = next(self.habit_events.aggregate(pipeline), {})
+        return {period: facets[period][0]["users"] if facets.get(period) else 0 for period in windows}
+
+    def get_geographic_trends(self, category: str = None, start: date = None, end: date = None, by_category: bool = False) -> Dict[str, Dict[str, int]]:
+        """Analyze habit popularity by country."""
+        if by_category:
+            return super().get_geographic_trends(category, start, end, by_category)
+        countries = [country.value for country in Country]
+        habit_match = [{"$match": {"$expr": {"$eq": ["$person_id", "$$person_id"]}}}]
+        event_match = [{"$match": {"$expr": {"$eq": ["$person_id", "$$person_id"]}}}]
+        if category:
+            habit_match.append({"$match": {"category": category}})
+            event_match.append({"$match": {"habit_id": {"$in": self.habits.distinct("habit_id", {"category": category})}}})
+        if start or end:
+            event_match.append({"$match": {"timestamp": day_range(start, end)}})
+        pipeline = [
+            {"$match": {"country": {"$in": countries}}},
+            {"$lookup": {
+                "from": self.habits.name,
+                "let": {"person_id": "$person_id"},
+                "pipeline": habit_match + [{"$count": "count"}],
+                "as": "habits"
+            }},
+            {"$lookup": {
+                "from": self.habit_events.name,
+                "let": {"person_id": "$person_id"},
+                "pipeline": event_match + [{"$count": "count"}],
+                "as": "events"
+            }},
+            {"$project": {
+                "country": 1,
+                "habits": {"$ifNull": [{"$first": "$habits.count"}, 0]},
+                "events": {"$ifNull": [{"$first": "$events.count"}, 0]},
+            }},
+            {"$group": {
+                "_id": "$country",
+                "total_habits": {"$sum": "$habits"},
+                "total_events": {"$sum": "$events"},
+                "active_users": {"$sum": {"$cond": [{"$gt": ["$events", 0]}, 1, 0]}},
+            }},
+        ]
+
+        country_data = {country: {"total_habits": 0, "total_events": 0, "active_users": 0} for country in countries}
+        for row in self.persons.aggregate(pipeline):
+            country_data[row["_id"]] = {
+                "total_habits": row["total_habits"],
+                "total_events": row["total_events"],
+                "active_users": row["active_users"]
+            }
+        return country_data
+
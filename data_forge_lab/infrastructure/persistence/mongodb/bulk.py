@@ -0,0 +1,24 @@
+from typing import Any, Callable, Iterable
+
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from interfaces.repositories.batch import BatchWriteResult, write_batch
+
+
+def bulk_write(collection: Collection, entities: Iterable, to_request: Callable[[Any], Any], ordered: bool = True) -> BatchWriteResult:
+    """Write the entities with a single `bulk_write` of their requests.
+
+    The driver splits the requests into as few commands as the server's size limits allow. Ordered bulk writes stop
+    at the first failing request, unordered ones let the server apply the others: the failures of either are reported
+    at the position of their entity in the batch (see BatchWriteResult).
+    """
+    def write(prepared: list) -> BatchWriteResult:
+        failures = {}
+        try:
+            collection.bulk_write([request for _, request in prepared], ordered=ordered)
+        except BulkWriteError as e:
+            failures = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        return BatchWriteResult.partial([entity for entity, _ in prepared], failures, ordered)
+
+    return write_batch(entities, lambda entity: (entity, to_request(entity)), write, ordered)
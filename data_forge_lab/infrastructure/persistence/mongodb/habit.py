@@ -1,53 +1,153 @@
 # data_forge_lab/infrastructure/persistence/mongodb/habit.py
 
-from typing import List, Optional
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from uuid import UUID
-from datetime import datetime
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
 from pymongo.collection import Collection
 
 from application.domain.models.habit import Habit
 from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.mongodb.bulk import bulk_write
+from infrastructure.persistence.mongodb.pagination import find_page
+from infrastructure.persistence.mongodb.streaming import project_documents
+from infrastructure.persistence.mongodb.updates import update_fields
 
 
 class MongoHabitRepository(HabitRepository):
+    """Ids are stored as binary UUIDs and times as BSON datetimes, which have millisecond precision."""
+
+    # Created at boot by MongoIndexManager, which also checks that the lookups below are planned on them
+    indexes = [
+        IndexModel([("habit_id", ASCENDING)], unique=True),
+        IndexModel([("person_id", ASCENDING), ("name", ASCENDING)]),
+        IndexModel([("person_id", ASCENDING), ("created_at", ASCENDING), ("habit_id", ASCENDING)]),
+    ]
+    index_queries = [
+        {"habit_id": UUID(int=0)},
+        {"person_id": UUID(int=0)},
+    ]
+
     def __init__(self, collection: Collection):
         self.collection = collection
 
     def save(self, habit: Habit) -> Habit:
-        habit_dict = habit.to_dict()
-
         self.collection.update_one(
-            {"habit_id": str(habit.habit_id)},
-            {"$set": habit_dict},
+            {"habit_id": habit.habit_id},
+            {"$set": self._to_dict(habit)},
             upsert=True
         )
+        self.bump_write_version()
         return habit
 
+    def save_many(self, habits: Iterable[Habit], ordered: bool = True) -> BatchWriteResult:
+        result = bulk_write(self.collection, habits, lambda habit: UpdateOne(
+            {"habit_id": habit.habit_id}, {"$set": self._to_dict(habit)}, upsert=True
+        ), ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
     def get_by_id(self, habit_id: UUID) -> Optional[Habit]:
-        doc = self.collection.find_one({"habit_id": str(habit_id)})
+        doc = self.collection.find_one({"habit_id": habit_id})
         return self._from_dict(doc) if doc else None
 
+    def update_fields(self, habit_id: UUID, changes: Dict[str, Any]) -> Optional[Habit]:
+        # Ids and times are stored as native BSON values: the changes are sent as they are
+        previous = update_fields(self.collection, "habit_id", habit_id, changes, self._from_dict)
+        if previous and changes:
+            self.bump_write_version()
+        return previous
+
+    def compare_and_set(self, habit_id: UUID, expected: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        result = self.collection.update_one({**expected, "habit_id": habit_id}, {"$set": changes})
+        if result.modified_count:
+            self.bump_write_version()
+        return result.matched_count > 0
+
+    def record_completion(self, habit_id: UUID, completed_at: datetime, updated_at: datetime) -> Optional[Habit]:
+        # The streak transition of Habit.record_completion as an update pipeline: the server computes it from the
+        # stored habit and writes it in the same atomic update, concurrent completions cannot overwrite each other
+        day = datetime.combine(completed_at.date(), time())
+        last = "$last_completed"
+        transition = {"$set": {
+            "streak": {"$switch": {"branches": [
+                {"case": {"$gte": [last, day + timedelta(days=1)]}, "then": "$streak"},
+                {"case": {"$gte": [last, day]}, "then": {"$max": ["$streak", 1]}},
+                {"case": {"$gte": [last, day - timedelta(days=1)]}, "then": {"$add": ["$streak", 1]}},
+            ], "default": 1}},
+            # $max ignores a missing or null last completion
+            "last_completed": {"$max": [last, completed_at]},
+            "updated_at": updated_at,
+        }}
+        # A second stage reads the new streak
+        longest = {"$set": {"longest_streak": {"$max": ["$longest_streak", "$streak"]}}}
+        document = self.collection.find_one_and_update(
+            {"habit_id": habit_id}, [transition, longest], return_document=ReturnDocument.AFTER
+        )
+        if not document:
+            return None
+        self.bump_write_version()
+        return self._from_dict(document)
+
     def find_all(self) -> List[Habit]:
         docs = self.collection.find()
         return [self._from_dict(doc) for doc in docs]
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Habit]:
+        return map(self._from_dict, self.collection.find().batch_size(batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        # Ids and times are stored as native BSON values, which are already the domain types
+        return project_documents(self.collection, Habit, fields, {}, batch_size)
+
     def find_by_person_id(self, person_id: UUID) -> List[Habit]:
-        docs = self.collection.find({"person_id": str(person_id)})
+        docs = self.collection.find({"person_id": person_id})
         return [self._from_dict(doc) for doc in docs]
 
+    def find_page_by_person_id(self, person_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[Habit]:
+        return find_page(self.collection, {"person_id": person_id}, "created_at", "habit_id", limit, cursor, self._from_dict)
+
     def delete(self, habit_id: UUID) -> bool:
-        result = self.collection.delete_one({"habit_id": str(habit_id)})
+        result = self.collection.delete_one({"habit_id": habit_id})
+        if result.deleted_count:
+            self.bump_write_version()
         return result.deleted_count > 0
 
+    def delete_many(self, habit_ids: Iterable[UUID]) -> int:
+        result = self.collection.delete_many({"habit_id": {"$in": list(habit_ids)}})
+        if result.deleted_count:
+            self.bump_write_version()
+        return result.deleted_count
+
+    @staticmethod
+    def _to_dict(habit: Habit) -> dict:
+        return {
+            "habit_id": habit.habit_id,
+            "person_id": habit.person_id,
+            "name": habit.name,
+            "goal": habit.goal,
+            "category": habit.category,
+            "created_at": habit.created_at,
+            "updated_at": habit.updated_at,
+            "streak": habit.streak,
+            "last_completed": habit.last_completed,
+            "longest_streak": habit.longest_streak
+        }
+
     def _from_dict(self, data: dict) -> Habit:
         return Habit(
-            habit_id=UUID(data["habit_id"]),
-            person_id=UUID(data["person_id"]),
+            habit_id=data["habit_id"],
+            person_id=data["person_id"],
             name=data["name"],
             goal=data["goal"],
             category=data["category"],
-            created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None,
+            created_at=data["created_at"],
+            updated_at=data.get("updated_at"),
             streak=data.get("streak", 0),
-            last_completed=datetime.fromisoformat(data["last_completed"]) if data.get("last_completed") else None
+            last_completed=data.get("last_completed"),
+            longest_streak=data.get("longest_streak", 0)
         )
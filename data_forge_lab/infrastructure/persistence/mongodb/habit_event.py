@@ -1,51 +1,130 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from uuid import UUID
-from datetime import datetime
+from pymongo import ASCENDING, IndexModel, UpdateOne
 from pymongo.collection import Collection
 
 from application.domain.models.event import HabitEvent
 from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.mongodb.bulk import bulk_write
+from infrastructure.persistence.mongodb.pagination import find_page
+from infrastructure.persistence.mongodb.streaming import project_documents
+from infrastructure.persistence.mongodb.updates import update_fields
 
 
 class MongoHabitEventRepository(HabitEventRepository):
+    """Ids are stored as binary UUIDs and timestamps as BSON datetimes, which have millisecond precision."""
+
+    # Created at boot by MongoIndexManager, which also checks that the lookups below are planned on them
+    indexes = [
+        IndexModel([("event_id", ASCENDING)], unique=True),
+        # Also orders and seeks the pages of a habit's events
+        IndexModel([("habit_id", ASCENDING), ("timestamp", ASCENDING), ("event_id", ASCENDING)]),
+        IndexModel([("person_id", ASCENDING), ("timestamp", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+    ]
+    index_queries = [
+        {"event_id": UUID(int=0)},
+        {"habit_id": UUID(int=0)},
+        {"person_id": UUID(int=0)},
+        {"status": "completed"},
+    ]
+
     def __init__(self, collection: Collection):
         self.collection = collection
 
     def save(self, event: HabitEvent) -> HabitEvent:
-        event_dict = event.to_dict()
         self.collection.update_one(
-            {"event_id": str(event.event_id)},
-            {"$set": event_dict},
+            {"event_id": event.event_id},
+            {"$set": self._to_dict(event)},
             upsert=True
         )
+        self.bump_write_version()
         return event
 
+    def save_many(self, events: Iterable[HabitEvent], ordered: bool = True) -> BatchWriteResult:
+        result = bulk_write(self.collection, events, lambda event: UpdateOne(
+            {"event_id": event.event_id}, {"$set": self._to_dict(event)}, upsert=True
+        ), ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
     def get_by_id(self, event_id: UUID) -> Optional[HabitEvent]:
-        doc = self.collection.find_one({"event_id": str(event_id)})
+        doc = self.collection.find_one({"event_id": event_id})
         return self._from_dict(doc) if doc else None
 
+    def update_fields(self, event_id: UUID, changes: Dict[str, Any]) -> Optional[HabitEvent]:
+        # Ids and times are stored as native BSON values: the changes are sent as they are
+        previous = update_fields(self.collection, "event_id", event_id, changes, self._from_dict)
+        if previous and changes:
+            self.bump_write_version()
+        return previous
+
     def find_all(self) -> List[HabitEvent]:
         docs = self.collection.find()
         return [self._from_dict(doc) for doc in docs]
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[HabitEvent]:
+        return map(self._from_dict, self.collection.find().batch_size(batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        # Ids and times are stored as native BSON values, which are already the domain types
+        return project_documents(self.collection, HabitEvent, fields, {}, batch_size)
+
     def find_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
-        docs = self.collection.find({"habit_id": str(habit_id)})
+        docs = self.collection.find({"habit_id": habit_id})
         return [self._from_dict(doc) for doc in docs]
 
+    def find_page_by_habit_id(self, habit_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[HabitEvent]:
+        return find_page(self.collection, {"habit_id": habit_id}, "timestamp", "event_id", limit, cursor, self._from_dict)
+
     def find_by_person_id(self, person_id: UUID) -> List[HabitEvent]:
-        docs = self.collection.find({"person_id": str(person_id)})
+        docs = self.collection.find({"person_id": person_id})
+        return [self._from_dict(doc) for doc in docs]
+
+    def find_by_status(self, status: str) -> List[HabitEvent]:
+        docs = self.collection.find({"status": status})
         return [self._from_dict(doc) for doc in docs]
 
     def delete(self, event_id: UUID) -> bool:
-        result = self.collection.delete_one({"event_id": str(event_id)})
+        result = self.collection.delete_one({"event_id": event_id})
+        if result.deleted_count:
+            self.bump_write_version()
         return result.deleted_count > 0
 
+    def delete_many(self, event_ids: Iterable[UUID]) -> int:
+        result = self.collection.delete_many({"event_id": {"$in": list(event_ids)}})
+        if result.deleted_count:
+            self.bump_write_version()
+        return result.deleted_count
+
+    def delete_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        # Deletes the events found rather than all the habit's events, which could include some inserted in between
+        events = self.find_by_habit_id(habit_id)
+        if events:
+            self.delete_many([event.event_id for event in events])
+        return events
+
+    @staticmethod
+    def _to_dict(event: HabitEvent) -> dict:
+        return {
+            "event_id": event.event_id,
+            "person_id": event.person_id,
+            "habit_id": event.habit_id,
+            "timestamp": event.timestamp,
+            "notes": event.notes,
+            "status": event.status
+        }
+
     def _from_dict(self, data: dict) -> HabitEvent:
         return HabitEvent(
-            event_id=UUID(data["event_id"]),
-            person_id=UUID(data["person_id"]),
-            habit_id=UUID(data["habit_id"]),
-            timestamp=datetime.fromisoformat(data["timestamp"]),
+            event_id=data["event_id"],
+            person_id=data["person_id"],
+            habit_id=data["habit_id"],
+            timestamp=data["timestamp"],
             notes=data.get("notes"),
             status=data["status"]
         )
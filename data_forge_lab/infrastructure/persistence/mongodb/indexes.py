@@ -0,0 +1,67 @@
+import logging
+from typing import Any, Dict, Iterable, Iterator, List
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger("data_forge_lab")
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when repository queries are planned as collection scans."""
+
+
+def plan_stages(plan: Any) -> Iterator[str]:
+    """Every stage of an explain() plan, whatever its shape (classic `inputStage(s)` trees or SBE `queryPlan`)."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+class MongoIndexManager:
+    """Creates the indexes declared by the Mongo repositories, and checks that their lookups use them.
+
+    Every repository declares `indexes`, a list of `IndexModel`, and `index_queries`, the filters of its lookups
+    and upserts. `ensure_indexes` is idempotent: creating an index that already exists with the same keys and options
+    is a no-op on the server, so it runs at every boot. An index that conflicts with an existing one (same keys,
+    other options, e.g. not unique) is logged and skipped, the query plan check then tells whether it matters.
+    """
+
+    def __init__(self, repositories: Iterable[Any]):
+        self.repositories = [repo for repo in repositories if getattr(repo, "indexes", None)]
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create the missing indexes. Returns the names of the declared indexes in place, by collection."""
+        ensured = {}
+        for repo in self.repositories:
+            names = ensured.setdefault(repo.collection.name, [])
+            # One index per command, so that a conflicting index does not prevent the others from being created
+            for index in repo.indexes:
+                try:
+                    names.extend(repo.collection.create_indexes([index]))
+                except OperationFailure as e:
+                    logger.error(f"Index {index.document['name']} of {repo.collection.name} not created: {e}")
+            logger.info(f"Indexes of {repo.collection.name}: {', '.join(names)}")
+        return ensured
+
+    def collection_scans(self) -> List[dict]:
+        """The repository queries whose winning plan contains a COLLSCAN stage."""
+        scans = []
+        for repo in self.repositories:
+            for query in getattr(repo, "index_queries", []):
+                plan = repo.collection.find(query).explain()["queryPlanner"]["winningPlan"]
+                if "COLLSCAN" in plan_stages(plan):
+                    scans.append({"collection": repo.collection.name, "filter": query})
+        return scans
+
+    def check_query_plans(self):
+        """Raise a QueryPlanError if any repository query is planned as a collection scan."""
+        scans = self.collection_scans()
+        if scans:
+            raise QueryPlanError("Collection scans planned for: " + "; ".join(
+                f"{scan['collection']} {sorted(scan['filter'])}" for scan in scans
+            ))
@@ -0,0 +1,27 @@
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Optional
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from interfaces.repositories.pagination import Page, check_page_size, decode_cursor, page_of
+
+
+def find_page(collection: Collection, query: dict, sort_field: str, id_field: str, limit: int, cursor: Optional[str],
+              from_dict: Callable[[dict], Any], sort_type: type = datetime,
+              to_bson: Callable[[Any], Any] = lambda value: value) -> Page:
+    """Page of the documents matching `query`, sorted by `sort_field` then `id_field` (see Page).
+
+    The collection must have a compound index on the equality fields of `query`, then `sort_field` and `id_field`:
+    the page is then one index range starting at the cursor, read in index order, and `limit + 1` documents are
+    fetched. `to_bson` converts sort values of the cursor to their stored form.
+    """
+    check_page_size(limit)
+    after = decode_cursor(cursor, sort_type)
+    if after:
+        value, item_id = to_bson(after[0]), after[1]
+        # The range on the sort field bounds the index scan, the $or only skips the documents sharing the cursor's value
+        query = {**query, sort_field: {"$gte": value}, "$or": [{sort_field: {"$gt": value}}, {id_field: {"$gt": item_id}}]}
+    documents = collection.find(query).sort([(sort_field, ASCENDING), (id_field, ASCENDING)]).limit(limit + 1)
+    return page_of([from_dict(document) for document in documents], limit, attrgetter(sort_field, id_field))
@@ -2,58 +2,133 @@ import uuid
 from uuid import UUID
 from bson import ObjectId
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
+from pymongo import ASCENDING, IndexModel, ReplaceOne
 from pymongo.collection import Collection
 
 from application.domain.models.person import Person, Country
 from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.mongodb.bulk import bulk_write
+from infrastructure.persistence.mongodb.pagination import find_page
+from infrastructure.persistence.mongodb.streaming import project_documents
+from infrastructure.persistence.mongodb.updates import update_fields
 
 
 class MongoPersonRepository(PersonRepository):
+    """Ids are stored as binary UUIDs. Dates have no BSON type of their own and are stored as ISO strings."""
+
+    # Created at boot by MongoIndexManager, which also checks that the lookups below are planned on them
+    indexes = [
+        IndexModel([("person_id", ASCENDING)], unique=True),
+        IndexModel([("country", ASCENDING)]),
+        IndexModel([("creation_date", ASCENDING), ("person_id", ASCENDING)]),
+    ]
+    index_queries = [
+        {"person_id": UUID(int=0)},
+        {"country": "France"},
+        {"creation_date": {"$gte": ""}},
+    ]
+
+    # Converters of the projected fields that are not stored as they are
+    decoders = {
+        "date_of_birth": lambda value: date.fromisoformat(value) if value else None,
+        "creation_date": lambda value: date.fromisoformat(value) if value else None,
+        "last_updated": lambda value: date.fromisoformat(value) if value else None,
+        "country": lambda value: Country(value) if value else None,
+        "notification_preferences": lambda value: value or {},
+    }
+
+    # Converters of the updated fields that are not stored as they are, the inverses of `decoders`
+    encoders = {
+        "date_of_birth": lambda value: value.isoformat() if value else None,
+        "creation_date": lambda value: value.isoformat() if value else None,
+        "last_updated": lambda value: value.isoformat() if value else None,
+        "country": lambda value: value.value if value else None,
+    }
+
     def __init__(self, collection: Collection):
         self.collection = collection
 
     def save(self, person: Person) -> Person:
-        print(f"Person: {person} - {type(person)}")
-        person_dict = person.to_dict()
-        person_dict["person_id"] = str(person.person_id)
-        print(f"person_dict: {person_dict}")
-        person_dict["creation_date"] = person.creation_date.isoformat()
-        person_dict["last_updated"] = person.last_updated.isoformat()
-
-        existing = self.collection.find_one({"person_id": str(person.person_id)})
-        if existing:
-            self.collection.replace_one({"person_id": str(person.person_id)}, person_dict)
-        else:
-            self.collection.insert_one(person_dict)
-
+        # A single upserting replace: inserts new persons and overwrites existing ones in one round trip
+        self.collection.replace_one({"person_id": person.person_id}, self._to_dict(person), upsert=True)
+        self.bump_write_version()
         return person
 
+    def save_many(self, persons: Iterable[Person], ordered: bool = True) -> BatchWriteResult:
+        result = bulk_write(self.collection, persons, lambda person: ReplaceOne(
+            {"person_id": person.person_id}, self._to_dict(person), upsert=True
+        ), ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
     def get_by_id(self, person_id: UUID) -> Optional[Person]:
-        doc = self.collection.find_one({"person_id": str(person_id)})
+        doc = self.collection.find_one({"person_id": person_id})
 
         if doc:
             return self._from_dict(doc)
 
         raise ValueError(f"Person with ID {person_id} not found.")
 
+    def update_fields(self, person_id: UUID, changes: Dict[str, Any]) -> Optional[Person]:
+        encoded = {
+            name: self.encoders[name](value) if name in self.encoders else value for name, value in changes.items()
+        }
+        previous = update_fields(self.collection, "person_id", person_id, encoded, self._from_dict)
+        if previous and changes:
+            self.bump_write_version()
+        return previous
+
     def find_all(self) -> List[Person]:
         persons = []
         for doc in self.collection.find():
             persons.append(self._from_dict(doc))
         return persons
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Person]:
+        return map(self._from_dict, self.collection.find().batch_size(batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return project_documents(self.collection, Person, fields, self.decoders, batch_size)
+
+    def find_page(self, limit: int, cursor: Optional[str] = None) -> Page[Person]:
+        return find_page(self.collection, {}, "creation_date", "person_id", limit, cursor, self._from_dict,
+                         sort_type=date, to_bson=date.isoformat)
+
+    def find_by_country(self, country: Country) -> List[Person]:
+        return [self._from_dict(doc) for doc in self.collection.find({"country": country.value})]
+
     def delete(self, person_id: UUID) -> bool:
-        result = self.collection.delete_one({"person_id": str(person_id)})
+        result = self.collection.delete_one({"person_id": person_id})
+        if result.deleted_count:
+            self.bump_write_version()
         return result.deleted_count > 0
 
+    def delete_many(self, person_ids: Iterable[UUID]) -> int:
+        result = self.collection.delete_many({"person_id": {"$in": list(person_ids)}})
+        if result.deleted_count:
+            self.bump_write_version()
+        return result.deleted_count
+
+    @staticmethod
+    def _to_dict(person: Person) -> dict:
+        person_dict = person.to_dict()
+        person_dict["person_id"] = person.person_id
+        person_dict["creation_date"] = person.creation_date.isoformat()
+        person_dict["last_updated"] = person.last_updated.isoformat()
+        return person_dict
+
     def _from_dict(self, data: dict) -> Person:
         country_value = data.get("country")
         country = Country(country_value) if country_value else None
         
         return Person(
-            person_id=UUID(data["person_id"]),
+            person_id=data["person_id"],
             first_name=data["first_name"],
             last_name=data["last_name"],
             date_of_birth=date.fromisoformat(data["date_of_birth"]),
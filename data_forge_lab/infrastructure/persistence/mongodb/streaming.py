@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Iterator, Sequence
+
+from pymongo.collection import Collection
+
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, row_type
+
+
+def project_documents(collection: Collection, entity_type: type, fields: Sequence[str], decoders: Dict[str, Callable],
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+    """Stream the given fields of every document as rows of `entity_type` (see `row_type`), converted by `decoders`.
+
+    Only the projected fields leave the server, `batch_size` documents per round trip.
+    """
+    make = row_type(entity_type, tuple(fields))._make
+    readers = [(name, decoders.get(name)) for name in fields]
+    cursor = collection.find({}, {"_id": 0, **dict.fromkeys(fields, 1)}).batch_size(batch_size)
+    return (
+        make([decode(document.get(name)) if decode else document.get(name) for name, decode in readers])
+        for document in cursor
+    )
@@ -0,0 +1,21 @@
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+def update_fields(collection: Collection, id_field: str, entity_id: Any, changes: Dict[str, Any],
+                  from_dict: Callable[[dict], Any]) -> Optional[Any]:
+    """Set the already encoded `changes` on the document of an entity with a single `find_one_and_update`.
+
+    Only the changed fields travel to the server and are rewritten, and the update is atomic: concurrent updates of
+    other fields are kept. Returns the entity as it was before the update, None when there is no such document. The
+    document after the update is the one returned with `changes` applied, so it is not read back.
+    """
+    if not changes:
+        document = collection.find_one({id_field: entity_id})
+    else:
+        document = collection.find_one_and_update(
+            {id_field: entity_id}, {"$set": changes}, return_document=ReturnDocument.BEFORE
+        )
+    return from_dict(document) if document else None
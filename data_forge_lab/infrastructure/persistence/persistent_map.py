@@ -0,0 +1,333 @@
+from bisect import bisect_left
+from operator import attrgetter
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+# Hashes are widened to 65 bits, 13 chunks of 5 bits consumed from the most significant one: the trie order is then
+# the numeric order of the hashes, which lets `from_items` build a trie from sorted entries
+_TOP = 60
+_MISSING = object()
+# Number of set bits, the index of a child in its node
+_popcount = int.bit_count
+
+
+def _hash(key) -> int:
+    return (hash(key) & _HASH_MASK) << 1
+
+
+class _Entry:
+    __slots__ = ("hash", "key", "value")
+
+    def __init__(self, hash_: int, key, value):
+        self.hash = hash_
+        self.key = key
+        self.value = value
+
+
+class _Collision:
+    """Entries whose keys share the same hash."""
+    __slots__ = ("hash", "entries")
+
+    def __init__(self, hash_: int, entries: Tuple[_Entry, ...]):
+        self.hash = hash_
+        self.entries = entries
+
+
+class _Node:
+    """Bitmap-indexed node: bit `i` of the bitmap is set when the 5 bit hash chunk `i` has a child, and children
+    are stored densely in chunk order. The children list is never mutated once the node is built."""
+    __slots__ = ("bitmap", "children")
+
+    def __init__(self, bitmap: int, children: list):
+        self.bitmap = bitmap
+        self.children = children
+
+
+def _merge(first, second, shift: int):
+    """Node holding two entries (or collisions) with different hashes."""
+    if first.hash == second.hash:
+        return _Collision(first.hash, _entries_of(first) + _entries_of(second))
+    first_chunk = (first.hash >> shift) & _MASK
+    second_chunk = (second.hash >> shift) & _MASK
+    if first_chunk == second_chunk:
+        return _Node(1 << first_chunk, [_merge(first, second, shift - _BITS)])
+    children = [first, second] if first_chunk < second_chunk else [second, first]
+    return _Node((1 << first_chunk) | (1 << second_chunk), children)
+
+
+def _entries_of(child) -> Tuple[_Entry, ...]:
+    return child.entries if isinstance(child, _Collision) else (child,)
+
+
+def _replaced(children: list, index: int, child) -> list:
+    children = children.copy()
+    children[index] = child
+    return children
+
+
+def _dissoc(node: _Node, shift: int, hash_: int, key) -> Tuple[Optional[Any], bool]:
+    """Returns the node without `key` (None once empty) and whether the key was found."""
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node, False
+    index = _popcount(node.bitmap & (bit - 1))
+    children = node.children
+    child = children[index]
+    kind = type(child)
+
+    if kind is _Node:
+        new_child, removed = _dissoc(child, shift - _BITS, hash_, key)
+    elif kind is _Entry:
+        if child.hash != hash_ or child.key != key:
+            return node, False
+        new_child, removed = None, True
+    else:
+        if child.hash != hash_:
+            return node, False
+        others = tuple(existing for existing in child.entries if existing.key != key)
+        if len(others) == len(child.entries):
+            return node, False
+        new_child, removed = (others[0] if len(others) == 1 else _Collision(hash_, others)), True
+
+    if not removed:
+        return node, False
+    if new_child is None:
+        if node.bitmap == bit:
+            return None, True
+        children = children.copy()
+        del children[index]
+        return _Node(node.bitmap & ~bit, children), True
+    return _Node(node.bitmap, _replaced(children, index, new_child)), True
+
+
+def _build(entries: List[_Entry], hashes: List[int], start: int, end: int, shift: int) -> _Node:
+    """Node holding `entries[start:end]`, sorted by hash and sharing the hash chunks above `shift`. Every child is a
+    run of entries found by bisection, so the work is proportional to the number of nodes, not entries x depth."""
+    bitmap, children = 0, []
+    while start < end:
+        prefix = hashes[start] >> shift
+        stop = bisect_left(hashes, (prefix + 1) << shift, start, end)
+        bitmap |= 1 << (prefix & _MASK)
+        if stop - start == 1:
+            children.append(entries[start])
+        elif hashes[start] == hashes[stop - 1]:
+            children.append(_Collision(hashes[start], tuple(entries[start:stop])))
+        else:
+            children.append(_build(entries, hashes, start, stop, shift - _BITS))
+        start = stop
+    return _Node(bitmap, children)
+
+
+def _built(entries: List[_Entry]) -> "PersistentMap":
+    hashes = [entry.hash for entry in entries]
+    return PersistentMap(_build(entries, hashes, 0, len(entries), _TOP), len(entries)) if entries else EMPTY
+
+
+def _collect(node: _Node, entries: list) -> list:
+    for child in node.children:
+        kind = type(child)
+        if kind is _Entry:
+            entries.append(child)
+        elif kind is _Node:
+            _collect(child, entries)
+        else:
+            entries.extend(child.entries)
+    return entries
+
+
+def _walk(node: _Node) -> Iterator[_Entry]:
+    for child in node.children:
+        kind = type(child)
+        if kind is _Entry:
+            yield child
+        elif kind is _Node:
+            yield from _walk(child)
+        else:
+            yield from child.entries
+
+
+def _walk_sorted(child) -> Iterator[_Entry]:
+    kind = type(child)
+    if kind is _Entry:
+        yield child
+    elif kind is _Node:
+        for grandchild in child.children:
+            yield from _walk_sorted(grandchild)
+    else:
+        yield from sorted(child.entries, key=attrgetter("key"))
+
+
+def _walk_from(node: _Node, shift: int, hash_: int) -> Iterator[_Entry]:
+    """Entries of `node` whose hash is at least `hash_`, in hash order. Only the path to `hash_` is searched, the
+    children after it are walked whole."""
+    bit = 1 << ((hash_ >> shift) & _MASK)
+    index = _popcount(node.bitmap & (bit - 1))
+    if node.bitmap & bit:
+        child = node.children[index]
+        if type(child) is _Node:
+            yield from _walk_from(child, shift - _BITS, hash_)
+        elif child.hash >= hash_:
+            yield from _walk_sorted(child)
+        index += 1
+    for child in node.children[index:]:
+        yield from _walk_sorted(child)
+
+
+_EMPTY_NODE = _Node(0, [])
+
+
+class PersistentMap:
+    """Immutable hash array mapped trie.
+
+    `set` and `delete` return a new map and leave the original untouched. Only the O(log32 n) nodes on the path
+    to the changed key are copied, every other node is shared, so keeping any number of past versions around is
+    cheap and handing out a version is O(1). Iteration follows hash order, not insertion order.
+    """
+    __slots__ = ("_root", "_size", "_entries")
+
+    def __init__(self, root: _Node = _EMPTY_NODE, size: int = 0):
+        self._root = root
+        self._size = size
+        self._entries: Optional[list] = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[Any, Any]]) -> "PersistentMap":
+        """Map built in bulk, much faster than one `set` per item. Later items win over earlier ones."""
+        entries = [_Entry(_hash(key), key, value) for key, value in dict(items).items()]
+        entries.sort(key=attrgetter("hash"))
+        return _built(entries)
+
+    def partition(self, key: Callable[[Any], Hashable]) -> Dict[Hashable, "PersistentMap"]:
+        """Maps of the entries grouped by `key(value)`, built in bulk and sharing this map's entries."""
+        groups: Dict[Hashable, List[_Entry]] = {}
+        for entry in self._all_entries():
+            groups.setdefault(key(entry.value), []).append(entry)
+        # Entries come out of the trie in hash order, and each group keeps that order
+        return {group: _built(entries) for group, entries in groups.items()}
+
+    def _all_entries(self) -> list:
+        # Collected once per map: full scans of the same version (e.g. a snapshot) skip the trie walk
+        if self._entries is None:
+            self._entries = _collect(self._root, [])
+        return self._entries
+
+    def _find(self, key) -> Optional[_Entry]:
+        hash_ = _hash(key)
+        node, shift = self._root, _TOP
+        while True:
+            bit = 1 << ((hash_ >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return None
+            child = node.children[_popcount(node.bitmap & (bit - 1))]
+            kind = type(child)
+            if kind is _Node:
+                node, shift = child, shift - _BITS
+            elif kind is _Entry:
+                return child if child.hash == hash_ and child.key == key else None
+            else:
+                for entry in child.entries:
+                    if entry.key == key:
+                        return entry
+                return None
+
+    def get(self, key, default=None):
+        entry = self._find(key)
+        return entry.value if entry is not None else default
+
+    def set(self, key, value) -> "PersistentMap":
+        return self._with(_Entry(_hash(key), key, value))
+
+    def adopt(self, source: "PersistentMap", key) -> "PersistentMap":
+        """This map with `key` bound to its value in `source`, sharing the entry rather than allocating one: maps
+        holding the same items under different groupings (e.g. secondary indexes) then cost a slot each, not an
+        entry each."""
+        entry = source._find(key)
+        if entry is None:
+            raise KeyError(key)
+        return self._with(entry)
+
+    def _with(self, entry: _Entry) -> "PersistentMap":
+        hash_, key = entry.hash, entry.key
+        # Walk down iteratively, then copy the path bottom-up
+        path = []
+        node, shift = self._root, _TOP
+        while True:
+            bit = 1 << ((hash_ >> shift) & _MASK)
+            index = _popcount(node.bitmap & (bit - 1))
+            if not node.bitmap & bit:
+                children = node.children.copy()
+                children.insert(index, entry)
+                new_node, added = _Node(node.bitmap | bit, children), True
+                break
+            child = node.children[index]
+            kind = type(child)
+            if kind is _Node:
+                path.append((node, index))
+                node, shift = child, shift - _BITS
+                continue
+            if kind is _Entry and child.hash == hash_ and child.key == key:
+                new_child, added = entry, False
+            elif kind is _Collision and child.hash == hash_:
+                others = tuple(existing for existing in child.entries if existing.key != key)
+                new_child, added = _Collision(hash_, others + (entry,)), len(others) == len(child.entries)
+            else:
+                new_child, added = _merge(child, entry, shift - _BITS), True
+            new_node = _Node(node.bitmap, _replaced(node.children, index, new_child))
+            break
+        for parent, index in reversed(path):
+            new_node = _Node(parent.bitmap, _replaced(parent.children, index, new_node))
+        return PersistentMap(new_node, self._size + 1 if added else self._size)
+
+    def delete(self, key) -> "PersistentMap":
+        root, removed = _dissoc(self._root, _TOP, _hash(key), key)
+        if not removed:
+            return self
+        return PersistentMap(root or _EMPTY_NODE, self._size - 1)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator:
+        return iter(self.keys())
+
+    def keys(self) -> list:
+        return [entry.key for entry in self._all_entries()]
+
+    def values(self) -> list:
+        return [entry.value for entry in self._all_entries()]
+
+    def iter_values(self) -> Iterator:
+        """Values in hash order, walking the trie lazily rather than collecting every entry like `values`."""
+        entries = self._entries if self._entries is not None else _walk(self._root)
+        return (entry.value for entry in entries)
+
+    def items(self) -> list:
+        return [(entry.key, entry.value) for entry in self._all_entries()]
+
+    def iter_items_from(self, key=None) -> Iterator[Tuple[Any, Any]]:
+        """Items in hash order from the hash of `key` on (every item without), walking the trie lazily.
+
+        Keys hashing to their own order, non-negative ints below 2**61 - 1 or objects whose `__hash__` returns a
+        non-negative int below 2**63, come out in key order: the map is then a sorted map, and this is a seek in O(log32 n). Keys sharing a hash
+        come out sorted, so they must be orderable.
+        """
+        if key is None:
+            return ((entry.key, entry.value) for entry in _walk_sorted(self._root))
+        return ((entry.key, entry.value) for entry in _walk_from(self._root, _TOP, _hash(key)))
+
+
+EMPTY = PersistentMap()
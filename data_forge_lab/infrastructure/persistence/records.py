@@ -0,0 +1,218 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, ClassVar, Dict, Hashable, Optional, Union
+from uuid import UUID
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class Interner:
+    """Hands out one canonical instance per distinct value, so that the ids and strings repeated across millions of
+    records are stored once."""
+
+    def __init__(self):
+        self._values: Dict[Hashable, Hashable] = {}
+
+    def __call__(self, value):
+        if value is None:
+            return None
+        # dict.setdefault is atomic, concurrent writers agree on the canonical instance
+        return self._values.setdefault(value, value)
+
+
+def to_epoch(value: Optional[datetime]) -> Union[int, datetime, None]:
+    """Microseconds since 1970-01-01 for naive datetimes. Aware datetimes are kept as they are."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_epoch(value: Union[int, datetime, None]) -> Optional[datetime]:
+    if type(value) is not int:
+        return value
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def uuid_from_int(value: int) -> UUID:
+    return UUID(int=value)
+
+
+@dataclass(slots=True)
+class HabitEventRecord:
+    """Storage form of a HabitEvent: ids as 128 bit ints, the timestamp as epoch microseconds, the status
+    interned."""
+    event_id: int
+    person_id: int
+    habit_id: int
+    timestamp: Union[int, datetime]
+    notes: Optional[str]
+    status: str
+
+    entity_type: ClassVar[type] = HabitEvent
+    # Converters from stored to domain values, by field, for projections; other fields are stored as they are
+    decoders: ClassVar[Dict[str, Callable]] = {
+        "event_id": uuid_from_int, "person_id": uuid_from_int, "habit_id": uuid_from_int, "timestamp": from_epoch
+    }
+
+    @property
+    def key(self) -> int:
+        return self.event_id
+
+    @classmethod
+    def from_entity(cls, event: HabitEvent, intern: Interner) -> "HabitEventRecord":
+        return cls(
+            event.event_id.int,
+            intern(event.person_id.int),
+            intern(event.habit_id.int),
+            to_epoch(event.timestamp),
+            event.notes,
+            intern(event.status)
+        )
+
+    def materialize(self) -> HabitEvent:
+        return HabitEvent(
+            person_id=UUID(int=self.person_id),
+            habit_id=UUID(int=self.habit_id),
+            event_id=UUID(int=self.event_id),
+            timestamp=from_epoch(self.timestamp),
+            notes=self.notes,
+            status=self.status
+        )
+
+    def __reduce__(self):
+        # Pickled as a plain tuple of fields: smaller and faster to load than the slots state
+        return HabitEventRecord, (self.event_id, self.person_id, self.habit_id, self.timestamp, self.notes, self.status)
+
+
+@dataclass(slots=True)
+class HabitRecord:
+    habit_id: int
+    person_id: int
+    name: str
+    goal: str
+    category: str
+    created_at: Union[int, datetime]
+    updated_at: Union[int, datetime, None]
+    streak: int
+    last_completed: Union[int, datetime, None]
+    # Defaults to 0 for the records pickled before habits had a longest streak
+    longest_streak: int = 0
+
+    entity_type: ClassVar[type] = Habit
+    decoders: ClassVar[Dict[str, Callable]] = {
+        "habit_id": uuid_from_int, "person_id": uuid_from_int,
+        "created_at": from_epoch, "updated_at": from_epoch, "last_completed": from_epoch
+    }
+
+    @property
+    def key(self) -> int:
+        return self.habit_id
+
+    @classmethod
+    def from_entity(cls, habit: Habit, intern: Interner) -> "HabitRecord":
+        return cls(
+            habit.habit_id.int,
+            intern(habit.person_id.int),
+            intern(habit.name),
+            intern(habit.goal),
+            intern(habit.category),
+            to_epoch(habit.created_at),
+            to_epoch(habit.updated_at),
+            habit.streak,
+            to_epoch(habit.last_completed),
+            habit.longest_streak
+        )
+
+    def materialize(self) -> Habit:
+        return Habit(
+            person_id=UUID(int=self.person_id),
+            name=self.name,
+            goal=self.goal,
+            category=self.category,
+            habit_id=UUID(int=self.habit_id),
+            created_at=from_epoch(self.created_at),
+            updated_at=from_epoch(self.updated_at),
+            streak=self.streak,
+            last_completed=from_epoch(self.last_completed),
+            longest_streak=self.longest_streak
+        )
+
+    def __reduce__(self):
+        return HabitRecord, (
+            self.habit_id, self.person_id, self.name, self.goal, self.category, self.created_at, self.updated_at,
+            self.streak, self.last_completed, self.longest_streak
+        )
+
+
+@dataclass(slots=True)
+class PersonRecord:
+    """Storage form of a Person. Dates are kept as `date` objects, which are already compact."""
+    person_id: int
+    first_name: str
+    last_name: str
+    date_of_birth: date
+    email: str
+    phone_number: str
+    address: str
+    country: Optional[Country]
+    gender: Optional[str]
+    notification_preferences: Optional[Dict[str, Any]]
+    language_preference: str
+    creation_date: date
+    last_updated: date
+
+    entity_type: ClassVar[type] = Person
+    decoders: ClassVar[Dict[str, Callable]] = {
+        "person_id": uuid_from_int, "notification_preferences": lambda preferences: dict(preferences or {})
+    }
+
+    @property
+    def key(self) -> int:
+        return self.person_id
+
+    @classmethod
+    def from_entity(cls, person: Person, intern: Interner) -> "PersonRecord":
+        return cls(
+            person.person_id.int,
+            intern(person.first_name),
+            intern(person.last_name),
+            person.date_of_birth,
+            person.email,
+            person.phone_number,
+            person.address,
+            person.country,
+            intern(person.gender),
+            dict(person.notification_preferences) if person.notification_preferences else None,
+            intern(person.language_preference),
+            intern(person.creation_date),
+            intern(person.last_updated)
+        )
+
+    def materialize(self) -> Person:
+        return Person(
+            first_name=self.first_name,
+            last_name=self.last_name,
+            date_of_birth=self.date_of_birth,
+            email=self.email,
+            phone_number=self.phone_number,
+            address=self.address,
+            country=self.country,
+            gender=self.gender,
+            person_id=UUID(int=self.person_id),
+            notification_preferences=dict(self.notification_preferences or {}),
+            language_preference=self.language_preference,
+            creation_date=self.creation_date,
+            last_updated=self.last_updated
+        )
+
+    def __reduce__(self):
+        return PersonRecord, (
+            self.person_id, self.first_name, self.last_name, self.date_of_birth, self.email, self.phone_number,
+            self.address, self.country, self.gender, self.notification_preferences, self.language_preference,
+            self.creation_date, self.last_updated
+        )
@@ -0,0 +1,194 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from application.domain.models.person import Country
+from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.persistence.sqlite.database import uuid_to_sql, uuid_from_sql, datetime_to_sql
+
+HOUR_US = 60 * 60 * 1_000_000
+DAY_US = 24 * HOUR_US
+
+
+def day_start(day: date) -> int:
+    return datetime_to_sql(datetime.combine(day, datetime.min.time()))
+
+
+def day_range(column: str, start: Optional[date], end: Optional[date]) -> tuple:
+    """SQL condition and parameters keeping the rows whose timestamp falls between start and end (inclusive)."""
+    conditions, parameters = [], []
+    if start:
+        conditions.append(f"{column} >= ?")
+        parameters.append(day_start(start))
+    if end:
+        conditions.append(f"{column} < ?")
+        parameters.append(day_start(end + timedelta(days=1)))
+    return " AND ".join(conditions) or "1", parameters
+
+
+class SqliteAnalyticsService(AnalyticsService):
+    """AnalyticsService pushing its aggregations down to SQLite as GROUP BY queries.
+
+    Only aggregated rows leave the database, and the queries run on the habit_id/person_id/timestamp indexes.
+    Timestamps are stored as epoch microseconds, so hours and day differences are integer arithmetic. Results are
+    identical to the Python implementation.
+    """
+
+    def _dashboard_source(self) -> AnalyticsService:
+        # Sections are queries on a WAL database: they run concurrently on their own connections
+        return self
+
+    @property
+    def database(self):
+        return self.habit_event_repo.database
+
+    def get_completion_rates(self, person_id: UUID = None) -> Dict[str, float]:
+        """Calculate completion rates for habits."""
+        rows = self.database.query(
+            """
+            SELECT h.habit_id, h.name, COUNT(e.event_id), SUM(e.status = 'completed')
+            FROM habits h LEFT JOIN habit_events e ON e.habit_id = h.habit_id
+            WHERE ? IS NULL OR h.person_id = ?
+            GROUP BY h.habit_id
+            """,
+            (uuid_to_sql(person_id), uuid_to_sql(person_id))
+        )
+        return {
+            str(uuid_from_sql(habit_id)): {
+                "completion_rate": (completed / total * 100) if total else 0,
+                "habit_name": name
+            }
+            for habit_id, name, total, completed in rows
+        }
+
+    def get_distribution(self, person_id: UUID = None):
+        rows = self.database.query(
+            "SELECT category, COUNT(*) FROM habits WHERE ? IS NULL OR person_id = ? GROUP BY category",
+            (uuid_to_sql(person_id), uuid_to_sql(person_id))
+        )
+        return dict(rows)
+
+    def get_habit_popularity(self, k: int = 5, category: str = None, country: str = None, exact: bool = False):
+        if self.popularity and not exact and k <= self.popularity.capacity and not (category and country):
+            return self.popularity.top(k, category, country)
+        rows = self.database.query(
+            """
+            SELECT name, COUNT(DISTINCT person_id) AS user_count
+            FROM habits
+            WHERE (?1 IS NULL OR category = ?1)
+              AND (?2 IS NULL OR person_id IN (SELECT person_id FROM persons WHERE country = ?2))
+            GROUP BY name
+            -- Ties keep the order in which names first appeared, like Python's stable sort
+            ORDER BY user_count DESC, MIN(rowid)
+            LIMIT ?3
+            """,
+            (category, country, k)
+        )
+        return [{"habit_name": name, "user_count": user_count} for name, user_count in rows]
+
+    def get_time_of_day_heatmap(self, person_id: UUID = None, start: date = None, end: date = None) -> Dict[str, int]:
+        """Generate time-of-day heatmap data, optionally restricted to events between start and end (inclusive)."""
+        if self.rollups:
+            return self.rollups.time_of_day_heatmap(person_id, start, end)
+        condition, parameters = day_range("timestamp", start, end)
+        rows = self.database.query(
+            f"""
+            SELECT timestamp / {HOUR_US} % 24 AS hour, COUNT(*)
+            FROM habit_events
+            WHERE (? IS NULL OR person_id = ?) AND {condition}
+            GROUP BY hour
+            """,
+            (uuid_to_sql(person_id), uuid_to_sql(person_id), *parameters)
+        )
+        heatmap = {f"{hour:02d}:00": 0 for hour in range(24)}
+        for hour, count in rows:
+            heatmap[f"{hour:02d}:00"] = count
+        return heatmap
+
+    def get_drop_off_rates(self, days_threshold: int = 7) -> Dict[str, float]:
+        """Calculate how often users abandon habits after X days."""
+        rows = self.database.query(
+            f"""
+            SELECT h.habit_id, h.name, (e.last - e.first) / {DAY_US}
+            FROM (SELECT habit_id, MIN(timestamp) AS first, MAX(timestamp) AS last FROM habit_events GROUP BY habit_id) e
+            JOIN habits h ON h.habit_id = e.habit_id
+            """
+        )
+        return {
+            str(uuid_from_sql(habit_id)): {
+                "drop_off_rate": 1 if days_active < days_threshold else 0,
+                "habit_name": name,
+                "days_active": days_active
+            }
+            for habit_id, name, days_active in rows
+        }
+
+    def get_first_week_success(self) -> Dict[str, float]:
+        """Calculate success rates in the first week of habit creation."""
+        rows = self.database.query(
+            f"""
+            SELECT h.habit_id, h.name, COUNT(*), SUM(e.status = 'completed')
+            FROM (SELECT habit_id, MIN(timestamp) AS first FROM habit_events GROUP BY habit_id) f
+            JOIN habits h ON h.habit_id = f.habit_id
+            -- "(timestamp - first).days <= 7" means strictly less than 8 days after the first event
+            JOIN habit_events e ON e.habit_id = f.habit_id AND e.timestamp < f.first + {8 * DAY_US}
+            GROUP BY f.habit_id
+            """
+        )
+        return {
+            str(uuid_from_sql(habit_id)): {"success_rate": completed / total * 100, "habit_name": name}
+            for habit_id, name, total, completed in rows
+        }
+
+    def get_engagement_metrics(self, days: Optional[int] = None, approx: bool = False) -> Dict[str, Any]:
+        """Calculate engagement metrics, with the active users of the last `days` days when given."""
+        users, habits = self.database.query_one("SELECT (SELECT COUNT(*) FROM persons), (SELECT COUNT(*) FROM habits)")
+        return self._engagement(self._active_users(days, approx), users, habits, approx)
+
+    def _scan_active_users(self, days: Optional[int] = None) -> Dict[str, int]:
+        now = datetime_to_sql(datetime.now())
+        # "(now - timestamp).days" is 0 for the last 24 hours, <= 7 for the last 8 days and <= 30 for the last 31
+        windows = {
+            "daily": ("timestamp > ? AND timestamp <= ?", [now - DAY_US, now]),
+            "weekly": ("timestamp > ?", [now - 8 * DAY_US]),
+            "monthly": ("timestamp > ?", [now - 31 * DAY_US]),
+        }
+        earliest = now - 31 * DAY_US
+        if days:
+            # Custom windows are aligned on calendar days, like the rollups
+            today = date.today()
+            windows[f"last_{days}_days"] = day_range("timestamp", today - timedelta(days=days - 1), today)
+            earliest = min(earliest, day_start(today - timedelta(days=days - 1)))
+        columns = ", ".join(f"COUNT(DISTINCT CASE WHEN {condition} THEN person_id END)" for condition, _ in windows.values())
+        parameters = [parameter for _, window_parameters in windows.values() for parameter in window_parameters]
+        counts = self.database.query_one(
+            f"SELECT {columns} FROM habit_events WHERE timestamp >= ?", (*parameters, earliest)
+        )
+        return dict(zip(windows, counts))
+
+    def get_geographic_trends(self, category: str = None, start: date = None, end: date = None, by_category: bool = False) -> Dict[str, Dict[str, int]]:
+        """Analyze habit popularity by country."""
+        if by_category:
+            return super().get_geographic_trends(category, start, end, by_category)
+        condition, parameters = day_range("timestamp", start, end)
+        rows = self.database.query(
+            f"""
+            SELECT p.country, COALESCE(SUM(h.count), 0), COALESCE(SUM(e.count), 0), COUNT(e.count)
+            FROM persons p
+            LEFT JOIN (
+                SELECT person_id, COUNT(*) AS count FROM habits WHERE ?1 IS NULL OR category = ?1 GROUP BY person_id
+            ) h ON h.person_id = p.person_id
+            LEFT JOIN (
+                SELECT person_id, COUNT(*) AS count FROM habit_events
+                WHERE (?1 IS NULL OR habit_id IN (SELECT habit_id FROM habits WHERE category = ?1)) AND {condition}
+                GROUP BY person_id
+            ) e ON e.person_id = p.person_id
+            WHERE p.country IS NOT NULL
+            GROUP BY p.country
+            """,
+            (category, *parameters)
+        )
+        country_data = {country.value: {"total_habits": 0, "total_events": 0, "active_users": 0} for country in Country}
+        for country, total_habits, total_events, active_users in rows:
+            country_data[country] = {"total_habits": total_habits, "total_events": total_events, "active_users": active_users}
+        return country_data
@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from interfaces.repositories.batch import BatchWriteResult, write_batch
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, row_type
+from infrastructure.persistence.records import to_epoch, from_epoch
+
+# Errors of one row (constraint violations, unsupported values) that leave the rest of its batch valid
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    person_id BLOB PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    date_of_birth TEXT NOT NULL,
+    email TEXT,
+    phone_number TEXT,
+    address TEXT,
+    country TEXT,
+    gender TEXT,
+    notification_preferences TEXT,
+    language_preference TEXT,
+    creation_date TEXT,
+    last_updated TEXT
+);
+CREATE INDEX IF NOT EXISTS persons_country ON persons (country);
+-- Pages of persons, habits and events are ranges of these indexes: ordered by time then id, seeked with row values
+CREATE INDEX IF NOT EXISTS persons_creation ON persons (creation_date, person_id);
+
+CREATE TABLE IF NOT EXISTS habits (
+    habit_id BLOB PRIMARY KEY,
+    person_id BLOB NOT NULL,
+    name TEXT NOT NULL,
+    goal TEXT,
+    category TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER,
+    streak INTEGER NOT NULL DEFAULT 0,
+    last_completed INTEGER,
+    longest_streak INTEGER NOT NULL DEFAULT 0
+);
+DROP INDEX IF EXISTS habits_person;
+CREATE INDEX IF NOT EXISTS habits_person_created ON habits (person_id, created_at, habit_id);
+CREATE INDEX IF NOT EXISTS habits_category ON habits (category);
+
+CREATE TABLE IF NOT EXISTS habit_events (
+    event_id BLOB PRIMARY KEY,
+    person_id BLOB NOT NULL,
+    habit_id BLOB NOT NULL,
+    timestamp INTEGER NOT NULL,
+    notes TEXT,
+    status TEXT NOT NULL
+);
+-- Lookups by habit or person also serve their time ranges and MIN/MAX(timestamp) from the index
+DROP INDEX IF EXISTS habit_events_habit;
+CREATE INDEX IF NOT EXISTS habit_events_habit_timestamp ON habit_events (habit_id, timestamp, event_id);
+CREATE INDEX IF NOT EXISTS habit_events_person ON habit_events (person_id, timestamp);
+CREATE INDEX IF NOT EXISTS habit_events_timestamp ON habit_events (timestamp);
+CREATE INDEX IF NOT EXISTS habit_events_status ON habit_events (status);
+"""
+
+# Columns added to existing tables since their creation, by table: databases created before get them on open
+ADDED_COLUMNS = {
+    "habits": {"longest_streak": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
+def uuid_to_sql(value: Optional[UUID]) -> Optional[bytes]:
+    return value.bytes if value is not None else None
+
+
+def uuid_from_sql(value: Optional[bytes]) -> Optional[UUID]:
+    return UUID(bytes=value) if value is not None else None
+
+
+def datetime_to_sql(value: Optional[datetime]) -> Optional[int]:
+    """Epoch microseconds of the wall-clock time. Aware datetimes are converted to UTC first."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return to_epoch(value)
+
+
+def datetime_from_sql(value: Optional[int]) -> Optional[datetime]:
+    return from_epoch(value)
+
+
+class SqliteDatabase:
+    """A SQLite database file shared by the SQLite repositories.
+
+    The database runs in WAL mode, so readers never block the writer nor each other, with `synchronous=NORMAL`
+    unless told otherwise: commits are durable across application crashes, and only the last ones can be lost on
+    power loss. Connections are pooled, one per concurrent request, and every statement is a constant string so
+    that each connection's statement cache hands it back already prepared.
+    """
+
+    def __init__(self, path: str, synchronous: str = "NORMAL", busy_timeout_ms: int = 5000):
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+                for column, definition in columns.items():
+                    if column not in existing:
+                        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: single statements commit on their own, batches open explicit transactions
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                self._idle.append(connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Connection inside a write transaction, committed on exit or rolled back on error."""
+        with self.connection() as connection:
+            # IMMEDIATE takes the write lock upfront, instead of failing on the first write when another writer won
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def query(self, sql: str, parameters=()) -> list:
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def query_one(self, sql: str, parameters=()) -> Optional[tuple]:
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).fetchone()
+
+    def stream(self, sql: str, parameters=(), batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """Rows of a query, fetched `batch_size` at a time. The connection stays checked out, and its read snapshot
+        open, until the rows are exhausted or the iterator is closed."""
+        with self.connection() as connection:
+            cursor = connection.execute(sql, parameters)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def project(self, table: str, entity_type: type, fields: Sequence[str], decoders: Dict[str, Callable],
+                batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """Stream the columns named after `fields` as rows of `entity_type` (see `row_type`), converted by `decoders`."""
+        # row_type only accepts fields of the entity, which are also the column names
+        make = row_type(entity_type, tuple(fields))._make
+        converters = [decoders.get(name) for name in fields]
+        rows = self.stream(f"SELECT {', '.join(fields)} FROM {table}", (), batch_size)
+        return (make([convert(value) if convert else value for convert, value in zip(converters, row)]) for row in rows)
+
+    def execute(self, sql: str, parameters=()) -> int:
+        """Run one write statement in its own transaction. Returns the number of rows changed."""
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).rowcount
+
+    def execute_many(self, sql: str, rows: Iterable[tuple]) -> int:
+        """Run one write statement per row, in a single transaction. Returns the number of rows changed."""
+        with self.transaction() as connection:
+            return connection.executemany(sql, rows).rowcount
+
+    def write_many(self, sql: str, entities: Iterable, to_row: Callable[[object], tuple], ordered: bool = True) -> BatchWriteResult:
+        """Run a write statement on the row of every entity, in a single transaction.
+
+        A failing row only rolls back its own statement: it is reported at its position in the batch, with the rows
+        that cannot be built, and the transaction commits the others (see BatchWriteResult for ordered batches).
+        """
+        def write(prepared: list) -> BatchWriteResult:
+            failures = {}
+            with self.transaction() as connection:
+                for index, (_, row) in enumerate(prepared):
+                    try:
+                        connection.execute(sql, row)
+                    except ROW_ERRORS as e:
+                        failures[index] = str(e)
+                        if ordered:
+                            break
+            return BatchWriteResult.partial([entity for entity, _ in prepared], failures, ordered)
+
+        return write_batch(entities, lambda entity: (entity, to_row(entity)), write, ordered)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,174 @@
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from application.domain.models.habit import Habit
+from interfaces.repositories.habit_repository import HabitRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page, check_page_size, decode_cursor, page_of
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.sqlite.database import (
+    SqliteDatabase, uuid_to_sql, uuid_from_sql, datetime_to_sql, datetime_from_sql
+)
+
+COLUMNS = "habit_id, person_id, name, goal, category, created_at, updated_at, streak, last_completed, longest_streak"
+UPSERT = f"""
+    INSERT INTO habits ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (habit_id) DO UPDATE SET
+        person_id = excluded.person_id, name = excluded.name, goal = excluded.goal, category = excluded.category,
+        created_at = excluded.created_at, updated_at = excluded.updated_at, streak = excluded.streak,
+        last_completed = excluded.last_completed, longest_streak = excluded.longest_streak
+"""
+SELECT = f"SELECT {COLUMNS} FROM habits"
+# Unpaginated lists follow the order of the pages
+ALL = f"{SELECT} ORDER BY created_at, habit_id"
+BY_PERSON = f"{SELECT} WHERE person_id = ? ORDER BY created_at, habit_id"
+FIRST_PAGE_BY_PERSON = f"{SELECT} WHERE person_id = ? ORDER BY created_at, habit_id LIMIT ?"
+PAGE_BY_PERSON = f"{SELECT} WHERE person_id = ? AND (created_at, habit_id) > (?, ?) ORDER BY created_at, habit_id LIMIT ?"
+
+# Converters of the projected columns that are not stored as they are
+DECODERS = {
+    "habit_id": uuid_from_sql,
+    "person_id": uuid_from_sql,
+    "created_at": datetime_from_sql,
+    "updated_at": datetime_from_sql,
+    "last_completed": datetime_from_sql,
+}
+
+# Converters of the compared and set columns that are not stored as they are, the inverses of DECODERS
+ENCODERS = {
+    "habit_id": uuid_to_sql,
+    "person_id": uuid_to_sql,
+    "created_at": datetime_to_sql,
+    "updated_at": datetime_to_sql,
+    "last_completed": datetime_to_sql,
+}
+
+
+class SqliteHabitRepository(HabitRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    def save(self, habit: Habit) -> Habit:
+        self.database.execute(UPSERT, self._to_row(habit))
+        self.bump_write_version()
+        return habit
+
+    def save_many(self, habits: Iterable[Habit], ordered: bool = True) -> BatchWriteResult:
+        """Save the habits in one transaction."""
+        result = self.database.write_many(UPSERT, habits, self._to_row, ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
+    def get_by_id(self, habit_id: UUID) -> Optional[Habit]:
+        row = self.database.query_one(f"{SELECT} WHERE habit_id = ?", (uuid_to_sql(habit_id),))
+        return self._from_row(row) if row else None
+
+    def update_fields(self, habit_id: UUID, changes: Dict[str, Any]) -> Optional[Habit]:
+        """A single UPDATE of the changed columns, in the write transaction that reads the habit as it was before:
+        no other write lands in between."""
+        unknown = [name for name in changes if name not in COLUMNS.split(", ")]
+        if unknown:
+            raise ValueError(f"Invalid update of habit: {', '.join(unknown)}")
+        with self.database.transaction() as connection:
+            row = connection.execute(f"{SELECT} WHERE habit_id = ?", (uuid_to_sql(habit_id),)).fetchone()
+            if row and changes:
+                assignments = ", ".join(f"{name} = ?" for name in changes)
+                connection.execute(f"UPDATE habits SET {assignments} WHERE habit_id = ?", (
+                    *(self._to_column(name, value) for name, value in changes.items()), uuid_to_sql(habit_id)
+                ))
+        if row and changes:
+            self.bump_write_version()
+        return self._from_row(row) if row else None
+
+    def compare_and_set(self, habit_id: UUID, expected: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        """A single conditional UPDATE, which SQLite runs atomically."""
+        unknown = [name for name in (*expected, *changes) if name not in COLUMNS.split(", ")]
+        if unknown or not changes:
+            raise ValueError(f"Invalid update of habit: {', '.join(unknown) or 'no field'}")
+        # The statement only varies with the names of the fields, which are columns: each variant is prepared once
+        assignments = ", ".join(f"{name} = ?" for name in changes)
+        conditions = "".join(f" AND {name} IS ?" for name in expected)
+        updated = self.database.execute(f"UPDATE habits SET {assignments} WHERE habit_id = ?{conditions}", (
+            *(self._to_column(name, value) for name, value in changes.items()),
+            uuid_to_sql(habit_id),
+            *(self._to_column(name, value) for name, value in expected.items()),
+        ))
+        if updated:
+            self.bump_write_version()
+        return updated > 0
+
+    def find_all(self) -> List[Habit]:
+        return [self._from_row(row) for row in self.database.query(ALL)]
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Habit]:
+        return map(self._from_row, self.database.stream(SELECT, (), batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return self.database.project("habits", Habit, fields, DECODERS, batch_size)
+
+    def find_by_person_id(self, person_id: UUID) -> List[Habit]:
+        rows = self.database.query(BY_PERSON, (uuid_to_sql(person_id),))
+        return [self._from_row(row) for row in rows]
+
+    def find_page_by_person_id(self, person_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[Habit]:
+        check_page_size(limit)
+        after = decode_cursor(cursor)
+        if after:
+            created_at, habit_id = after
+            rows = self.database.query(PAGE_BY_PERSON, (
+                uuid_to_sql(person_id), datetime_to_sql(created_at), uuid_to_sql(habit_id), limit + 1
+            ))
+        else:
+            rows = self.database.query(FIRST_PAGE_BY_PERSON, (uuid_to_sql(person_id), limit + 1))
+        return page_of([self._from_row(row) for row in rows], limit, attrgetter("created_at", "habit_id"))
+
+    def delete(self, habit_id: UUID) -> bool:
+        deleted = self.database.execute("DELETE FROM habits WHERE habit_id = ?", (uuid_to_sql(habit_id),))
+        if deleted:
+            self.bump_write_version()
+        return deleted > 0
+
+    def delete_many(self, habit_ids: Iterable[UUID]) -> int:
+        deleted = self.database.execute_many(
+            "DELETE FROM habits WHERE habit_id = ?", [(uuid_to_sql(habit_id),) for habit_id in habit_ids]
+        )
+        if deleted:
+            self.bump_write_version()
+        return deleted
+
+    @staticmethod
+    def _to_column(name: str, value: Any) -> Any:
+        return ENCODERS[name](value) if name in ENCODERS else value
+
+    @staticmethod
+    def _to_row(habit: Habit) -> tuple:
+        return (
+            uuid_to_sql(habit.habit_id),
+            uuid_to_sql(habit.person_id),
+            habit.name,
+            habit.goal,
+            habit.category,
+            datetime_to_sql(habit.created_at),
+            datetime_to_sql(habit.updated_at),
+            habit.streak,
+            datetime_to_sql(habit.last_completed),
+            habit.longest_streak
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Habit:
+        habit_id, person_id, name, goal, category, created_at, updated_at, streak, last_completed, longest_streak = row
+        return Habit(
+            habit_id=uuid_from_sql(habit_id),
+            person_id=uuid_from_sql(person_id),
+            name=name,
+            goal=goal,
+            category=category,
+            created_at=datetime_from_sql(created_at),
+            updated_at=datetime_from_sql(updated_at),
+            streak=streak,
+            last_completed=datetime_from_sql(last_completed),
+            longest_streak=longest_streak
+        )
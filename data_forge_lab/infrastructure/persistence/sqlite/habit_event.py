@@ -0,0 +1,145 @@
+from dataclasses import replace
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from application.domain.models.event import HabitEvent
+from interfaces.repositories.habit_event_repository import HabitEventRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page, check_page_size, decode_cursor, page_of
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.sqlite.database import (
+    SqliteDatabase, uuid_to_sql, uuid_from_sql, datetime_to_sql, datetime_from_sql
+)
+
+COLUMNS = "event_id, person_id, habit_id, timestamp, notes, status"
+UPSERT = f"""
+    INSERT INTO habit_events ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (event_id) DO UPDATE SET
+        person_id = excluded.person_id, habit_id = excluded.habit_id, timestamp = excluded.timestamp,
+        notes = excluded.notes, status = excluded.status
+"""
+SELECT = f"SELECT {COLUMNS} FROM habit_events"
+# Unpaginated lists follow the order of the pages
+ALL = f"{SELECT} ORDER BY timestamp, event_id"
+BY_HABIT = f"{SELECT} WHERE habit_id = ? ORDER BY timestamp, event_id"
+BY_PERSON = f"{SELECT} WHERE person_id = ? ORDER BY timestamp, event_id"
+FIRST_PAGE_BY_HABIT = f"{SELECT} WHERE habit_id = ? ORDER BY timestamp, event_id LIMIT ?"
+PAGE_BY_HABIT = f"{SELECT} WHERE habit_id = ? AND (timestamp, event_id) > (?, ?) ORDER BY timestamp, event_id LIMIT ?"
+
+# Converters of the projected columns that are not stored as they are
+DECODERS = {
+    "event_id": uuid_from_sql,
+    "person_id": uuid_from_sql,
+    "habit_id": uuid_from_sql,
+    "timestamp": datetime_from_sql,
+}
+
+
+class SqliteHabitEventRepository(HabitEventRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    def save(self, event: HabitEvent) -> HabitEvent:
+        self.database.execute(UPSERT, self._to_row(event))
+        self.bump_write_version()
+        return event
+
+    def save_many(self, events: Iterable[HabitEvent], ordered: bool = True) -> BatchWriteResult:
+        """Save the events in one transaction."""
+        result = self.database.write_many(UPSERT, events, self._to_row, ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
+    def get_by_id(self, event_id: UUID) -> Optional[HabitEvent]:
+        row = self.database.query_one(f"{SELECT} WHERE event_id = ?", (uuid_to_sql(event_id),))
+        return self._from_row(row) if row else None
+
+    def update_fields(self, event_id: UUID, changes: Dict[str, Any]) -> Optional[HabitEvent]:
+        """Read the event and write it back with the changes in one write transaction: no other write lands in
+        between."""
+        with self.database.transaction() as connection:
+            row = connection.execute(f"{SELECT} WHERE event_id = ?", (uuid_to_sql(event_id),)).fetchone()
+            previous = self._from_row(row) if row else None
+            if previous and changes:
+                connection.execute(UPSERT, self._to_row(replace(previous, **changes)))
+        if previous and changes:
+            self.bump_write_version()
+        return previous
+
+    def find_all(self) -> List[HabitEvent]:
+        return [self._from_row(row) for row in self.database.query(ALL)]
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[HabitEvent]:
+        return map(self._from_row, self.database.stream(SELECT, (), batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return self.database.project("habit_events", HabitEvent, fields, DECODERS, batch_size)
+
+    def find_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        rows = self.database.query(BY_HABIT, (uuid_to_sql(habit_id),))
+        return [self._from_row(row) for row in rows]
+
+    def find_page_by_habit_id(self, habit_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[HabitEvent]:
+        check_page_size(limit)
+        after = decode_cursor(cursor)
+        if after:
+            timestamp, event_id = after
+            rows = self.database.query(PAGE_BY_HABIT, (
+                uuid_to_sql(habit_id), datetime_to_sql(timestamp), uuid_to_sql(event_id), limit + 1
+            ))
+        else:
+            rows = self.database.query(FIRST_PAGE_BY_HABIT, (uuid_to_sql(habit_id), limit + 1))
+        return page_of([self._from_row(row) for row in rows], limit, attrgetter("timestamp", "event_id"))
+
+    def find_by_person_id(self, person_id: UUID) -> List[HabitEvent]:
+        rows = self.database.query(BY_PERSON, (uuid_to_sql(person_id),))
+        return [self._from_row(row) for row in rows]
+
+    def find_by_status(self, status: str) -> List[HabitEvent]:
+        return [self._from_row(row) for row in self.database.query(f"{SELECT} WHERE status = ?", (status,))]
+
+    def delete(self, event_id: UUID) -> bool:
+        deleted = self.database.execute("DELETE FROM habit_events WHERE event_id = ?", (uuid_to_sql(event_id),))
+        if deleted:
+            self.bump_write_version()
+        return deleted > 0
+
+    def delete_many(self, event_ids: Iterable[UUID]) -> int:
+        deleted = self.database.execute_many(
+            "DELETE FROM habit_events WHERE event_id = ?", [(uuid_to_sql(event_id),) for event_id in event_ids]
+        )
+        if deleted:
+            self.bump_write_version()
+        return deleted
+
+    def delete_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        # One statement deletes the events and hands them back
+        rows = self.database.query(f"DELETE FROM habit_events WHERE habit_id = ? RETURNING {COLUMNS}", (uuid_to_sql(habit_id),))
+        if rows:
+            self.bump_write_version()
+        return [self._from_row(row) for row in rows]
+
+    @staticmethod
+    def _to_row(event: HabitEvent) -> tuple:
+        return (
+            uuid_to_sql(event.event_id),
+            uuid_to_sql(event.person_id),
+            uuid_to_sql(event.habit_id),
+            datetime_to_sql(event.timestamp),
+            event.notes,
+            event.status
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> HabitEvent:
+        event_id, person_id, habit_id, timestamp, notes, status = row
+        return HabitEvent(
+            event_id=uuid_from_sql(event_id),
+            person_id=uuid_from_sql(person_id),
+            habit_id=uuid_from_sql(habit_id),
+            timestamp=datetime_from_sql(timestamp),
+            notes=notes,
+            status=status
+        )
@@ -0,0 +1,150 @@
+import json
+from dataclasses import replace
+from datetime import date
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from application.domain.models.person import Person, Country
+from interfaces.repositories.person_repository import PersonRepository
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page, check_page_size, decode_cursor, page_of
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE
+from infrastructure.persistence.sqlite.database import SqliteDatabase, uuid_to_sql, uuid_from_sql
+
+COLUMNS = (
+    "person_id, first_name, last_name, date_of_birth, email, phone_number, address, country, gender, "
+    "notification_preferences, language_preference, creation_date, last_updated"
+)
+UPSERT = f"""
+    INSERT INTO persons ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (person_id) DO UPDATE SET
+        first_name = excluded.first_name, last_name = excluded.last_name, date_of_birth = excluded.date_of_birth,
+        email = excluded.email, phone_number = excluded.phone_number, address = excluded.address,
+        country = excluded.country, gender = excluded.gender,
+        notification_preferences = excluded.notification_preferences,
+        language_preference = excluded.language_preference, creation_date = excluded.creation_date,
+        last_updated = excluded.last_updated
+"""
+SELECT = f"SELECT {COLUMNS} FROM persons"
+# The unpaginated list follows the order of the pages
+ALL = f"{SELECT} ORDER BY creation_date, person_id"
+FIRST_PAGE = f"{SELECT} ORDER BY creation_date, person_id LIMIT ?"
+PAGE = f"{SELECT} WHERE (creation_date, person_id) > (?, ?) ORDER BY creation_date, person_id LIMIT ?"
+
+# Converters of the projected columns that are not stored as they are
+DECODERS = {
+    "person_id": uuid_from_sql,
+    "date_of_birth": date.fromisoformat,
+    "country": lambda country: Country(country) if country else None,
+    "notification_preferences": lambda preferences: json.loads(preferences) if preferences else {},
+    "creation_date": date.fromisoformat,
+    "last_updated": date.fromisoformat,
+}
+
+
+class SqlitePersonRepository(PersonRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    def save(self, person: Person) -> Person:
+        self.database.execute(UPSERT, self._to_row(person))
+        self.bump_write_version()
+        return person
+
+    def save_many(self, persons: Iterable[Person], ordered: bool = True) -> BatchWriteResult:
+        """Save the persons in one transaction."""
+        result = self.database.write_many(UPSERT, persons, self._to_row, ordered)
+        if result.written:
+            self.bump_write_version()
+        return result
+
+    def get_by_id(self, person_id: UUID) -> Optional[Person]:
+        row = self.database.query_one(f"{SELECT} WHERE person_id = ?", (uuid_to_sql(person_id),))
+        return self._from_row(row) if row else None
+
+    def update_fields(self, person_id: UUID, changes: Dict[str, Any]) -> Optional[Person]:
+        """Read the person and write it back with the changes in one write transaction: no other write lands in
+        between."""
+        with self.database.transaction() as connection:
+            row = connection.execute(f"{SELECT} WHERE person_id = ?", (uuid_to_sql(person_id),)).fetchone()
+            previous = self._from_row(row) if row else None
+            if previous and changes:
+                connection.execute(UPSERT, self._to_row(replace(previous, **changes)))
+        if previous and changes:
+            self.bump_write_version()
+        return previous
+
+    def find_all(self) -> List[Person]:
+        return [self._from_row(row) for row in self.database.query(ALL)]
+
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Person]:
+        return map(self._from_row, self.database.stream(SELECT, (), batch_size))
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        return self.database.project("persons", Person, fields, DECODERS, batch_size)
+
+    def find_page(self, limit: int, cursor: Optional[str] = None) -> Page[Person]:
+        check_page_size(limit)
+        after = decode_cursor(cursor, date)
+        if after:
+            creation_date, person_id = after
+            rows = self.database.query(PAGE, (creation_date.isoformat(), uuid_to_sql(person_id), limit + 1))
+        else:
+            rows = self.database.query(FIRST_PAGE, (limit + 1,))
+        return page_of([self._from_row(row) for row in rows], limit, attrgetter("creation_date", "person_id"))
+
+    def find_by_country(self, country: Country) -> List[Person]:
+        return [self._from_row(row) for row in self.database.query(f"{SELECT} WHERE country = ?", (country.value,))]
+
+    def delete(self, person_id: UUID) -> bool:
+        deleted = self.database.execute("DELETE FROM persons WHERE person_id = ?", (uuid_to_sql(person_id),))
+        if deleted:
+            self.bump_write_version()
+        return deleted > 0
+
+    def delete_many(self, person_ids: Iterable[UUID]) -> int:
+        deleted = self.database.execute_many(
+            "DELETE FROM persons WHERE person_id = ?", [(uuid_to_sql(person_id),) for person_id in person_ids]
+        )
+        if deleted:
+            self.bump_write_version()
+        return deleted
+
+    @staticmethod
+    def _to_row(person: Person) -> tuple:
+        return (
+            uuid_to_sql(person.person_id),
+            person.first_name,
+            person.last_name,
+            person.date_of_birth.isoformat(),
+            person.email,
+            person.phone_number,
+            person.address,
+            person.country.value if person.country else None,
+            person.gender,
+            json.dumps(person.notification_preferences) if person.notification_preferences else None,
+            person.language_preference,
+            person.creation_date.isoformat(),
+            person.last_updated.isoformat()
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Person:
+        (person_id, first_name, last_name, date_of_birth, email, phone_number, address, country, gender,
+         notification_preferences, language_preference, creation_date, last_updated) = row
+        return Person(
+            person_id=uuid_from_sql(person_id),
+            first_name=first_name,
+            last_name=last_name,
+            date_of_birth=date.fromisoformat(date_of_birth),
+            email=email,
+            phone_number=phone_number,
+            address=address,
+            country=Country(country) if country else None,
+            gender=gender,
+            notification_preferences=json.loads(notification_preferences) if notification_preferences else {},
+            language_preference=language_preference,
+            creation_date=date.fromisoformat(creation_date),
+            last_updated=date.fromisoformat(last_updated)
+        )
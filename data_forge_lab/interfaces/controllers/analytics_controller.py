@@ -1,4 +1,5 @@
 import logging
+from datetime import date, datetime, timedelta
 from uuid import UUID
 from flask import Blueprint, request, jsonify
 from dependency_injector.wiring import inject, Provide
@@ -22,20 +23,47 @@ class AnalyticsController:
         self.analytics_blueprint.route('/analytics/time-heatmap', methods=['GET'])(self.get_time_heatmap)
         self.analytics_blueprint.route('/analytics/drop-off-rates', methods=['GET'])(self.get_drop_off_rates)
         self.analytics_blueprint.route('/analytics/first-week-success', methods=['GET'])(self.get_first_week_success)
+        self.analytics_blueprint.route('/analytics/activity-days', methods=['GET'])(self.get_activity_days)
         self.analytics_blueprint.route('/analytics/engagement', methods=['GET'])(self.get_engagement_metrics)
         self.analytics_blueprint.route('/analytics/geographic-trends', methods=['GET'])(self.get_geographic_trends)
+        self.analytics_blueprint.route('/analytics/dashboard', methods=['GET'])(self.get_dashboard)
+        self.analytics_blueprint.route('/analytics/materialized/rebuild', methods=['POST'])(self.rebuild_materialized)
+        self.analytics_blueprint.route('/analytics/materialized/consistency', methods=['GET'])(self.check_materialized)
+
+    @staticmethod
+    def _flag(name: str) -> bool:
+        return request.args.get(name, default='false').lower() in ('1', 'true', 'yes')
+
+    @classmethod
+    def _use_cache(cls) -> bool:
+        """Clients can bypass the analytics cache with `?no_cache=true` or a `Cache-Control: no-cache` header."""
+        if cls._flag('no_cache'):
+            return False
+        return 'no-cache' not in request.headers.get('Cache-Control', '')
+
+    @staticmethod
+    def _date_range():
+        """Read `start`/`end` (YYYY-MM-DD, inclusive) or `days` (the last N days, today included) from the query."""
+        days = request.args.get('days', type=int)
+        if days:
+            end = datetime.now().date()
+            return end - timedelta(days=days - 1), end
+        start, end = request.args.get('start'), request.args.get('end')
+        return (date.fromisoformat(start) if start else None), (date.fromisoformat(end) if end else None)
+
+    @staticmethod
+    def _completion_rates_list(result: dict) -> list:
+        # Transform dict of dicts to list of dicts for frontend compatibility
+        return [
+            {"habit_id": habit_id, **data}
+            for habit_id, data in result.items()
+        ]
 
     def get_completion_rates(self):
         try:
             person_id = request.args.get('person_id')
-            result = self.analytics_use_cases.get_completion_rates(UUID(person_id) if person_id else None)
-
-            # Transform dict of dicts to list of dicts for frontend compatibility
-            result_list = [
-                {"habit_id": habit_id, **data}
-                for habit_id, data in result.items()
-            ]
-            return jsonify(result_list)
+            result = self.analytics_use_cases.get_completion_rates(UUID(person_id) if person_id else None, use_cache=self._use_cache())
+            return jsonify(self._completion_rates_list(result))
         except Exception as e:
             logger.error(f"Error getting completion rates: {e}")
             return jsonify({"error": "Failed to get completion rates", "details": str(e)}), 500
@@ -43,7 +71,7 @@ class AnalyticsController:
     def get_consistency(self):
         try:
             person_id = request.args.get('person_id')
-            result = self.analytics_use_cases.get_consistency(UUID(person_id) if person_id else None)
+            result = self.analytics_use_cases.get_consistency(UUID(person_id) if person_id else None, use_cache=self._use_cache())
             print(f"Consistency result: {result}")
             return jsonify(result)
         except Exception as e:
@@ -53,7 +81,7 @@ class AnalyticsController:
     def get_distribution(self):
         try:
             person_id = request.args.get('person_id')
-            result = self.analytics_use_cases.get_distribution(UUID(person_id) if person_id else None)
+            result = self.analytics_use_cases.get_distribution(UUID(person_id) if person_id else None, use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting distribution: {e}")
@@ -62,7 +90,7 @@ class AnalyticsController:
     def get_category_distribution(self):
         try:
             person_id = request.args.get('person_id')
-            result = self.analytics_use_cases.get_category_distribution(UUID(person_id) if person_id else None)
+            result = self.analytics_use_cases.get_category_distribution(UUID(person_id) if person_id else None, use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting category distribution: {e}")
@@ -70,8 +98,16 @@ class AnalyticsController:
 
     def get_habit_popularity(self):
         try:
-            result = self.analytics_use_cases.get_habit_popularity()
+            result = self.analytics_use_cases.get_habit_popularity(
+                request.args.get('k', default=5, type=int),
+                request.args.get('category'),
+                request.args.get('country'),
+                self._flag('exact'),
+                use_cache=self._use_cache()
+            )
             return jsonify(result)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             logger.error(f"Error getting habit popularity: {e}")
             return jsonify({"error": "Failed to get habit popularity", "details": str(e)}), 500
@@ -79,7 +115,8 @@ class AnalyticsController:
     def get_time_heatmap(self):
         try:
             person_id = request.args.get('person_id')
-            result = self.analytics_use_cases.get_time_of_day_heatmap(UUID(person_id) if person_id else None)
+            start, end = self._date_range()
+            result = self.analytics_use_cases.get_time_of_day_heatmap(UUID(person_id) if person_id else None, start, end, use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting time heatmap: {e}")
@@ -88,7 +125,7 @@ class AnalyticsController:
     def get_drop_off_rates(self):
         try:
             days_threshold = request.args.get('days', default=7, type=int)
-            result = self.analytics_use_cases.get_drop_off_rates(days_threshold)
+            result = self.analytics_use_cases.get_drop_off_rates(days_threshold, use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting drop-off rates: {e}")
@@ -96,15 +133,26 @@ class AnalyticsController:
 
     def get_first_week_success(self):
         try:
-            result = self.analytics_use_cases.get_first_week_success()
+            result = self.analytics_use_cases.get_first_week_success(use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting first week success: {e}")
             return jsonify({"error": "Failed to get first week success", "details": str(e)}), 500
 
+    def get_activity_days(self):
+        try:
+            person_id = request.args.get('person_id')
+            result = self.analytics_use_cases.get_activity_days(UUID(person_id) if person_id else None, use_cache=self._use_cache())
+            return jsonify(result)
+        except Exception as e:
+            logger.error(f"Error getting activity days: {e}")
+            return jsonify({"error": "Failed to get activity days", "details": str(e)}), 500
+
     def get_engagement_metrics(self):
         try:
-            result = self.analytics_use_cases.get_engagement_metrics()
+            days = request.args.get('days', type=int)
+            approx = self._flag('approx')
+            result = self.analytics_use_cases.get_engagement_metrics(days, approx, use_cache=self._use_cache())
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting engagement metrics: {e}")
@@ -112,8 +160,50 @@ class AnalyticsController:
 
     def get_geographic_trends(self):
         try:
-            result = self.analytics_use_cases.get_geographic_trends()
+            start, end = self._date_range()
+            result = self.analytics_use_cases.get_geographic_trends(
+                request.args.get('category'),
+                start,
+                end,
+                self._flag('by_category'),
+                use_cache=self._use_cache()
+            )
             return jsonify(result)
         except Exception as e:
             logger.error(f"Error getting geographic trends: {e}")
             return jsonify({"error": "Failed to get geographic trends", "details": str(e)}), 500
+
+    def get_dashboard(self):
+        try:
+            sections = request.args.get('sections')
+            sections = [name.strip() for name in sections.split(',') if name.strip()] if sections else None
+            result = self.analytics_use_cases.get_dashboard(sections)
+
+            completion_rates = result["sections"].get("completion-rates")
+            if isinstance(completion_rates, dict) and "error" not in completion_rates:
+                result["sections"]["completion-rates"] = self._completion_rates_list(completion_rates)
+            return jsonify(result)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error getting dashboard: {e}")
+            return jsonify({"error": "Failed to get dashboard", "details": str(e)}), 500
+
+    def rebuild_materialized(self):
+        try:
+            if not self.analytics_use_cases.rebuild_materialized():
+                return jsonify({"error": "Materialized analytics are not enabled"}), 404
+            return jsonify({"rebuilt": True})
+        except Exception as e:
+            logger.error(f"Error rebuilding materialized analytics: {e}")
+            return jsonify({"error": "Failed to rebuild materialized analytics", "details": str(e)}), 500
+
+    def check_materialized(self):
+        try:
+            result = self.analytics_use_cases.check_materialized()
+            if result is None:
+                return jsonify({"error": "Materialized analytics are not enabled"}), 404
+            return jsonify(result)
+        except Exception as e:
+            logger.error(f"Error checking materialized analytics: {e}")
+            return jsonify({"error": "Failed to check materialized analytics", "details": str(e)}), 500
@@ -3,6 +3,7 @@ from uuid import UUID
 from flask import Blueprint, request, jsonify
 from application.use_cases.habit_use_cases import HabitUseCases
 from application.domain.services.habit_service import HabitService
+from interfaces.controllers.pagination import page_arguments, page_body
 
 logger = logging.getLogger('data_forge_lab')
 
@@ -40,7 +41,10 @@ class HabitController:
 
     def update_habit(self, habit_id):
         data = request.get_json()
-        habit = self.habit_use_cases.update_habit(habit_id, **data)
+        try:
+            habit = self.habit_use_cases.update_habit(habit_id, **data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         if not habit:
             return jsonify({"error": "Habit not found"}), 404
         return jsonify(habit.to_dict()), 200
@@ -52,6 +56,14 @@ class HabitController:
         return jsonify(habit.to_dict()), 200
 
     def list_habits(self, person_id):
+        """Every habit of the person as a JSON array, or one page of them with `limit` and `cursor` (see page_arguments)."""
+        try:
+            page_request = page_arguments()
+            if page_request:
+                return jsonify(page_body(self.habit_use_cases.list_habits_page(person_id, *page_request))), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         habits = self.habit_use_cases.list_habits(person_id)
         habits_dict = list(map(lambda habit: habit.to_dict(), habits))
         return jsonify(habits_dict), 200
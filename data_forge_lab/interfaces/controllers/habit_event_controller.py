@@ -3,6 +3,7 @@ from uuid import UUID
 from flask import Blueprint, request, jsonify
 from application.use_cases.habit_event_use_cases import HabitEventUseCases
 from application.domain.services.habit_event_service import HabitEventService
+from interfaces.controllers.pagination import page_arguments, page_body
 from interfaces.event_publisher import EventPublisher
 
 logger = logging.getLogger('data_forge_lab')
@@ -39,7 +40,10 @@ class HabitEventController:
 
     def update_habit_event(self, event_id):
         data = request.get_json()
-        event = self.habit_event_use_cases.update_habit_event(event_id, **data)
+        try:
+            event = self.habit_event_use_cases.update_habit_event(event_id, **data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         if not event:
             return jsonify({"error": "Habit event not found"}), 404
         return jsonify(event.to_dict()), 200
@@ -51,6 +55,14 @@ class HabitEventController:
         return '', 204
 
     def list_habit_events(self, habit_id):
+        """Every event of the habit as a JSON array, or one page of them with `limit` and `cursor` (see page_arguments)."""
+        try:
+            page_request = page_arguments()
+            if page_request:
+                return jsonify(page_body(self.habit_event_use_cases.list_habit_events_page(habit_id, *page_request))), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         events = self.habit_event_use_cases.list_habit_events(habit_id)
         events_dict = list(map(lambda event: event.to_dict(), events))
         return jsonify(events_dict), 200
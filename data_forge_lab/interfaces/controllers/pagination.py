@@ -0,0 +1,22 @@
+from typing import Optional, Tuple
+
+from flask import request
+
+from interfaces.repositories.pagination import DEFAULT_PAGE_SIZE, Page
+
+
+def page_arguments() -> Optional[Tuple[int, Optional[str]]]:
+    """The `limit` and `cursor` query parameters of a list request, or None when neither is given: the whole list is
+    then returned as a JSON array, as before pagination. A cursor without a limit reads pages of DEFAULT_PAGE_SIZE.
+
+    Raises ValueError when the limit is not a number.
+    """
+    limit, cursor = request.args.get('limit'), request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    return (int(limit) if limit is not None else DEFAULT_PAGE_SIZE), cursor
+
+
+def page_body(page: Page) -> dict:
+    """JSON body of a page: its items and the cursor to pass to get the next page, null on the last one."""
+    return {"items": [item.to_dict() for item in page.items], "next_cursor": page.next_cursor}
@@ -5,6 +5,8 @@ from flask import Blueprint, request, jsonify
 from application.use_cases.person_use_cases import PersonUseCases
 from application.domain.services.person_service import PersonService
 from application.domain.models.person import Country
+from interfaces.controllers.pagination import page_arguments, page_body
+from interfaces.repositories.batch import write_batch
 
 logger = logging.getLogger('data_forge_lab')
 
@@ -24,33 +26,46 @@ class PersonController:
         self.person_blueprint.route('/persons/countries', strict_slashes=False, methods=['GET'])(self.get_countries)
 
     def create_person(self):
-        created_persons = []
-        data = request.get_json()
+        """Create the persons of a JSON list in one batch.
 
-        for person_to_create in data:
-            try:
-                logger.info(f"create person: {person_to_create}")
-
-                date_of_birth = datetime.strptime(person_to_create['date_of_birth'], '%Y-%m-%d').date()
-
-                person = self.person_use_cases.create_person(
-                    first_name=person_to_create['first_name'],
-                    last_name=person_to_create['last_name'],
-                    date_of_birth=date_of_birth,
-                    email=person_to_create['email'],
-                    phone_number=person_to_create['phone_number'],
-                    address=person_to_create['address'],
-                    country=Country(person_to_create['country']),
-                    gender=person_to_create.get('gender'),
-                    notification_preferences=person_to_create.get('notification_preferences'),
-                    language_preference=person_to_create.get('language_preference', "English")
-                )
-                created_persons.append(person.to_dict())
-            except Exception as e:
-                logger.error(f"Error creating person: {e}")
-                return jsonify({"error": f"Failed to create person: {person_to_create}", "details": str(e)}), 500
-
-        return jsonify(created_persons), 201
+        With `?ordered=false` every valid person is created whatever the others; by default creation stops at the
+        first invalid one. Returns 201 with the created persons, or the created persons and the errors by position
+        in the list: 207 when some were created, 400 otherwise.
+        """
+        data = request.get_json()
+        ordered = request.args.get('ordered', default='true').lower() not in ('0', 'false', 'no')
+        logger.info(f"create {len(data)} persons (ordered: {ordered})")
+
+        result = write_batch(
+            data,
+            self._person_fields,
+            lambda persons: self.person_use_cases.create_persons(persons, ordered),
+            ordered
+        )
+        created_persons = [person.to_dict() for person in result.written]
+        if result.ok:
+            return jsonify(created_persons), 201
+
+        for error in result.errors:
+            logger.error(f"Error creating person {error.index}: {error.error}")
+        body = {"created": created_persons, "errors": [error.to_dict() for error in result.errors]}
+        return jsonify(body), 207 if created_persons else 400
+
+    @staticmethod
+    def _person_fields(person_to_create: dict) -> dict:
+        """Arguments of PersonService.create_person for one item of the JSON list."""
+        return dict(
+            first_name=person_to_create['first_name'],
+            last_name=person_to_create['last_name'],
+            date_of_birth=datetime.strptime(person_to_create['date_of_birth'], '%Y-%m-%d').date(),
+            email=person_to_create['email'],
+            phone_number=person_to_create['phone_number'],
+            address=person_to_create['address'],
+            country=Country(person_to_create['country']),
+            gender=person_to_create.get('gender'),
+            notification_preferences=person_to_create.get('notification_preferences'),
+            language_preference=person_to_create.get('language_preference', "English")
+        )
 
     def get_person(self, person_id):
         person = self.person_use_cases.get_person(person_id)
@@ -61,7 +76,10 @@ class PersonController:
 
     def update_person(self, person_id):
         data = request.get_json()
-        person = self.person_use_cases.update_person(person_id, **data)
+        try:
+            person = self.person_use_cases.update_person(person_id, **data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         if not person:
             return jsonify({"error": "Person not found"}), 404
 
@@ -74,6 +92,14 @@ class PersonController:
         return '', 204
 
     def list_persons(self):
+        """Every person as a JSON array, or one page of persons with `limit` and `cursor` (see page_arguments)."""
+        try:
+            page_request = page_arguments()
+            if page_request:
+                return jsonify(page_body(self.person_use_cases.list_persons_page(*page_request))), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         persons = self.person_use_cases.list_persons()
         persons_dict = list(map(lambda person: person.to_dict(), persons))
         return jsonify(persons_dict), 200
@@ -5,9 +5,10 @@ logger = logging.getLogger('data_forge_lab')
 
 
 class SystemController:
-    def __init__(self, person_repo, event_publisher):
+    def __init__(self, person_repo, event_publisher, analytics_cache=None):
         self.person_repo = person_repo
         self.event_publisher = event_publisher
+        self.analytics_cache = analytics_cache
         self.system_blueprint = Blueprint('system', __name__)
         self.system_blueprint.route('/system/status', strict_slashes=False, methods=['GET'])(self.get_status)
 
@@ -34,4 +35,7 @@ class SystemController:
         # Flask check: if this endpoint is hit, Flask is running
         status["flask"] = True
 
+        if self.analytics_cache:
+            status["analytics_cache"] = self.analytics_cache.stats()
+
         return jsonify(status), 200 
@@ -0,0 +1,40 @@
+from abc import ABC
+from typing import List, Optional
+from uuid import UUID
+from application.domain.models.person import Person
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+
+
+class HabitActivityListener(ABC):
+    """Notified by the services after persons, habits and habit events are written.
+
+    Every hook is a no-op by default so a listener only overrides what it needs. `previous` is a copy of the
+    entity as it was before the write, or None when the entity was just created.
+    """
+    # Listeners that maintain the habits' streaks themselves set it: the services then leave the streaks alone
+    updates_streaks = False
+
+    def on_person_saved(self, previous: Optional[Person], person: Person) -> None:
+        pass
+
+    def on_person_deleted(self, person: Person) -> None:
+        pass
+
+    def on_habit_saved(self, previous: Optional[Habit], habit: Habit) -> None:
+        pass
+
+    def on_habit_deleted(self, habit: Habit) -> None:
+        pass
+
+    def on_event_saved(self, previous: Optional[HabitEvent], event: HabitEvent) -> None:
+        pass
+
+    def on_event_deleted(self, event: HabitEvent) -> None:
+        pass
+
+    def on_habit_events_deleted(self, habit_id: UUID, events: List[HabitEvent]) -> None:
+        """The events deleted along with their habit, before `on_habit_deleted`. Defaults to `on_event_deleted` for
+        each of them."""
+        for event in events:
+            self.on_event_deleted(event)
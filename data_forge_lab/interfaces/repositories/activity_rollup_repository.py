@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Iterable, List, Optional
+from application.domain.models.rollup import ActivityRollup
+from uuid import UUID
+
+
+class ActivityRollupRepository(ABC):
+    @abstractmethod
+    def increment(self, day: date, person_id: Optional[UUID], hour: int, events: int = 1, completed: int = 0) -> None:
+        """Atomically add to the counters of one rollup, creating it if needed. Counts may be negative."""
+        pass
+
+    @abstractmethod
+    def find_range(self, start: Optional[date] = None, end: Optional[date] = None, person_id: Optional[UUID] = None) -> List[ActivityRollup]:
+        """Rollups of one person (or the global ones when person_id is None) between start and end, inclusive."""
+        pass
+
+    @abstractmethod
+    def find_person_rollups(self, start: Optional[date] = None, end: Optional[date] = None) -> List[ActivityRollup]:
+        """Per-person rollups of every person between start and end, inclusive."""
+        pass
+
+    @abstractmethod
+    def replace_all(self, rollups: Iterable[ActivityRollup]) -> None:
+        pass
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+# Errors raised by invalid items (missing fields, wrong types, unparsable values), reported per item by batches
+ITEM_ERRORS = (AttributeError, KeyError, TypeError, ValueError)
+
+
+@dataclass
+class BatchItemError:
+    """A batch item that was not written: its position in the batch and the reason."""
+    index: int
+    error: str
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "error": self.error}
+
+
+@dataclass
+class BatchWriteResult:
+    """Outcome of a batch write: the items written, in batch order, and the failed ones by position in the batch.
+
+    Ordered batches stop at the first failing item, the items after it are not attempted and only the first error is
+    reported. Unordered batches attempt every item and report every failure.
+    """
+    written: List[Any] = field(default_factory=list)
+    errors: List[BatchItemError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @classmethod
+    def partial(cls, items: Sequence, failures: Dict[int, str], ordered: bool) -> "BatchWriteResult":
+        """Result of writing `items` when the ones at the positions of `failures` failed."""
+        if ordered and failures:
+            first = min(failures)
+            return cls(list(items[:first]), [BatchItemError(first, failures[first])])
+        return cls(
+            [item for index, item in enumerate(items) if index not in failures],
+            [BatchItemError(index, failures[index]) for index in sorted(failures)]
+        )
+
+
+def write_batch(items: Iterable, prepare: Callable[[Any], Any], write: Callable[[list], BatchWriteResult],
+                ordered: bool = True) -> BatchWriteResult:
+    """Prepare every item, then write the prepared ones with a single call to `write`.
+
+    Items whose preparation raises one of ITEM_ERRORS are reported at their position in `items`, and so are the
+    errors `write` reports for the prepared ones. An ordered batch only writes the items before the first one that
+    cannot be prepared.
+    """
+    prepared, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            prepared.append(prepare(item))
+        except ITEM_ERRORS as e:
+            errors.append(BatchItemError(index, str(e)))
+            if ordered:
+                break
+        else:
+            positions.append(index)
+    result = write(prepared) if prepared else BatchWriteResult()
+    errors.extend(BatchItemError(positions[error.index], error.error) for error in result.errors)
+    errors.sort(key=lambda error: error.index)
+    return BatchWriteResult(result.written, errors[:1] if ordered else errors)
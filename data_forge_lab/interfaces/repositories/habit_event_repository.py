@@ -1,30 +1,78 @@
-from abc import ABC, abstractmethod
-from typing import List, Optional
+from abc import abstractmethod
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from application.domain.models.event import HabitEvent
 from uuid import UUID
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, project_entities
+from interfaces.repositories.versioned_repository import VersionedRepository
 
 
-class HabitEventRepository(ABC):
+class HabitEventRepository(VersionedRepository):
     @abstractmethod
     def save(self, event: HabitEvent) -> HabitEvent:
         pass
 
+    @abstractmethod
+    def save_many(self, events: Iterable[HabitEvent], ordered: bool = True) -> BatchWriteResult:
+        """Save the events in one batch, reporting the ones that could not be saved (see BatchWriteResult)."""
+        pass
+
     @abstractmethod
     def get_by_id(self, event_id: UUID) -> Optional[HabitEvent]:
         pass
 
+    def update_fields(self, event_id: UUID, changes: Dict[str, Any]) -> Optional[HabitEvent]:
+        """Set the given fields of a event and return the event as it was before, None when there is none. The updated
+        event is `replace(previous, **changes)`.
+
+        Backends that can patch a stored event write only the changed fields, atomically and in one round trip.
+        """
+        event = self.get_by_id(event_id)
+        if event:
+            self.save(replace(event, **changes))
+        return event
+
     @abstractmethod
     def find_all(self) -> List[HabitEvent]:
         pass
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[HabitEvent]:
+        """Every event, fetched and built `batch_size` at a time by the backends that can stream, not as one list."""
+        return iter(self.find_all())
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """The given fields of every event, streamed as rows (see `row_type`) without building the events."""
+        return project_entities(self.iter_all(batch_size), HabitEvent, fields)
+
     @abstractmethod
     def find_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
         pass
 
+    @abstractmethod
+    def find_page_by_habit_id(self, habit_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[HabitEvent]:
+        """The next `limit` events of a habit after `cursor` (from the first one without), by timestamp then id."""
+        pass
+
     @abstractmethod
     def delete(self, event_id: UUID) -> bool:
         pass
 
+    @abstractmethod
+    def delete_by_habit_id(self, habit_id: UUID) -> List[HabitEvent]:
+        """Delete every event of a habit in one batch. Returns the events deleted."""
+        pass
+
+    @abstractmethod
+    def delete_many(self, event_ids: Iterable[UUID]) -> int:
+        """Delete the events with the given ids in one batch. Returns the number of events deleted."""
+        pass
+
     @abstractmethod
     def find_by_person_id(self, person_id: UUID) -> List[HabitEvent]:
         pass
+
+    @abstractmethod
+    def find_by_status(self, status: str) -> List[HabitEvent]:
+        pass
@@ -1,26 +1,94 @@
-from abc import ABC, abstractmethod
-from typing import List, Optional
+from abc import abstractmethod
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 from application.domain.models.habit import Habit
 from uuid import UUID
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, project_entities
+from interfaces.repositories.versioned_repository import VersionedRepository
 
 
-class HabitRepository(ABC):
+class HabitRepository(VersionedRepository):
     @abstractmethod
     def save(self, habit: Habit) -> Habit:
         pass
 
+    @abstractmethod
+    def save_many(self, habits: Iterable[Habit], ordered: bool = True) -> BatchWriteResult:
+        """Save the habits in one batch, reporting the ones that could not be saved (see BatchWriteResult)."""
+        pass
+
     @abstractmethod
     def get_by_id(self, habit_id: UUID) -> Optional[Habit]:
         pass
 
+    def update_fields(self, habit_id: UUID, changes: Dict[str, Any]) -> Optional[Habit]:
+        """Set the given fields of a habit and return the habit as it was before, None when there is none. The updated
+        habit is `replace(previous, **changes)`.
+
+        Backends that can patch a stored habit write only the changed fields, atomically and in one round trip.
+        """
+        habit = self.get_by_id(habit_id)
+        if habit:
+            self.save(replace(habit, **changes))
+        return habit
+
+    @abstractmethod
+    def compare_and_set(self, habit_id: UUID, expected: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        """Set the given fields of a habit only if its `expected` fields still hold the expected values, atomically.
+        Returns whether the habit was updated."""
+        pass
+
+    def record_completion(self, habit_id: UUID, completed_at: datetime, updated_at: datetime) -> Optional[Habit]:
+        """Count a completion in the streak of a habit (see `Habit.record_completion`) and return the updated habit,
+        None when there is none.
+
+        Concurrent completions of a habit all count: the streak is compared and set, and computed again from the
+        stored habit when another completion changed it in between. Backends that can compute the streak on the
+        server do it in a single conditional update instead.
+        """
+        while True:
+            habit = self.get_by_id(habit_id)
+            if not habit:
+                return None
+            expected = {"streak": habit.streak, "last_completed": habit.last_completed}
+            habit.record_completion(completed_at)
+            habit.updated_at = updated_at
+            changes = {
+                "streak": habit.streak, "longest_streak": habit.longest_streak, "last_completed": habit.last_completed,
+                "updated_at": updated_at
+            }
+            if self.compare_and_set(habit_id, expected, changes):
+                return habit
+
     @abstractmethod
     def find_all(self) -> List[Habit]:
         pass
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Habit]:
+        """Every habit, fetched and built `batch_size` at a time by the backends that can stream, not as one list."""
+        return iter(self.find_all())
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """The given fields of every habit, streamed as rows (see `row_type`) without building the habits."""
+        return project_entities(self.iter_all(batch_size), Habit, fields)
+
     @abstractmethod
     def find_by_person_id(self, person_id: UUID) -> List[Habit]:
         pass
 
+    @abstractmethod
+    def find_page_by_person_id(self, person_id: UUID, limit: int, cursor: Optional[str] = None) -> Page[Habit]:
+        """The next `limit` habits of a person after `cursor` (from the first one without), by creation time then id."""
+        pass
+
     @abstractmethod
     def delete(self, habit_id: UUID) -> bool:
         pass
+
+    @abstractmethod
+    def delete_many(self, habit_ids: Iterable[UUID]) -> int:
+        """Delete the habits with the given ids in one batch. Returns the number of habits deleted."""
+        pass
@@ -0,0 +1,57 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar, Union
+from uuid import UUID
+
+T = TypeVar("T")
+
+# Page sizes accepted by the paginated finders
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+
+# Where a page starts: the sort value (a timestamp or a date) and the id of the last item of the previous page
+Position = Tuple[Union[date, datetime], UUID]
+
+
+@dataclass
+class Page(Generic[T]):
+    """One page of a paginated finder: its items, in order, and the cursor of the next page (None on the last one).
+
+    Pages are keyset paginated: the items are sorted by a sort value then by id, and a cursor is the position of the
+    last item of its page. The next page is read from that position on through an index, so every page costs the
+    same at any depth, and concurrent inserts or deletes neither shift nor repeat the items of later pages.
+    """
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def check_page_size(limit: int):
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid page size {limit}: must be between 1 and {MAX_PAGE_SIZE}")
+
+
+def encode_cursor(position: Position) -> str:
+    value, item_id = position
+    return base64.urlsafe_b64encode(json.dumps([value.isoformat(), str(item_id)]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], value_type: type = datetime) -> Optional[Position]:
+    """Position of a cursor handed out by `encode_cursor`, for sort values of `value_type` (None: the first page)."""
+    if not cursor:
+        return None
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return value_type.fromisoformat(value), UUID(item_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def page_of(items: List[T], limit: int, position: Callable[[T], Position]) -> Page[T]:
+    """Page of the items read for a page of `limit`: finders read `limit + 1` items, the extra one telling that
+    there is a next page without counting the remaining items."""
+    if len(items) <= limit:
+        return Page(items)
+    items = items[:limit]
+    return Page(items, encode_cursor(position(items[-1])))
@@ -1,22 +1,65 @@
-from abc import ABC, abstractmethod
-from typing import List, Optional
-from application.domain.models.person import Person
+from abc import abstractmethod
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from application.domain.models.person import Person, Country
 from uuid import UUID
+from interfaces.repositories.batch import BatchWriteResult
+from interfaces.repositories.pagination import Page
+from interfaces.repositories.streaming import DEFAULT_BATCH_SIZE, project_entities
+from interfaces.repositories.versioned_repository import VersionedRepository
 
 
-class PersonRepository(ABC):
+class PersonRepository(VersionedRepository):
     @abstractmethod
     def save(self, person: Person) -> Person:
         pass
 
+    @abstractmethod
+    def save_many(self, persons: Iterable[Person], ordered: bool = True) -> BatchWriteResult:
+        """Save the persons in one batch, reporting the ones that could not be saved (see BatchWriteResult)."""
+        pass
+
     @abstractmethod
     def get_by_id(self, person_id: UUID) -> Optional[Person]:
         pass
 
+    def update_fields(self, person_id: UUID, changes: Dict[str, Any]) -> Optional[Person]:
+        """Set the given fields of a person and return the person as it was before, None when there is none. The updated
+        person is `replace(previous, **changes)`.
+
+        Backends that can patch a stored person write only the changed fields, atomically and in one round trip.
+        """
+        person = self.get_by_id(person_id)
+        if person:
+            self.save(replace(person, **changes))
+        return person
+
     @abstractmethod
     def find_all(self) -> List[Person]:
         pass
 
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Person]:
+        """Every person, fetched and built `batch_size` at a time by the backends that can stream, not as one list."""
+        return iter(self.find_all())
+
+    def project(self, fields: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+        """The given fields of every person, streamed as rows (see `row_type`) without building the persons."""
+        return project_entities(self.iter_all(batch_size), Person, fields)
+
+    @abstractmethod
+    def find_page(self, limit: int, cursor: Optional[str] = None) -> Page[Person]:
+        """The next `limit` persons after `cursor` (from the first one without), by creation date then id."""
+        pass
+
+    @abstractmethod
+    def find_by_country(self, country: Country) -> List[Person]:
+        pass
+
     @abstractmethod
     def delete(self, person_id: UUID) -> bool:
         pass
+
+    @abstractmethod
+    def delete_many(self, person_ids: Iterable[UUID]) -> int:
+        """Delete the persons with the given ids in one batch. Returns the number of persons deleted."""
+        pass
@@ -0,0 +1,38 @@
+from collections import namedtuple
+from dataclasses import fields as dataclass_fields
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+# Entities fetched per round trip by the streaming reads
+DEFAULT_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def row_type(entity_type: type, fields: Tuple[str, ...]) -> type:
+    """Named tuple type of the projections of `entity_type` on `fields`, which must be fields of the entity.
+
+    Rows are plain tuples, a few dozen bytes each, whose values are also readable as attributes: code written for
+    the entity reads a row holding the fields it uses unchanged.
+    """
+    names = {field.name for field in dataclass_fields(entity_type)}
+    unknown = [name for name in fields if name not in names]
+    if not fields or unknown:
+        raise ValueError(f"Invalid projection of {entity_type.__name__}: {', '.join(unknown) or 'no field'}")
+    return namedtuple(f"{entity_type.__name__}Row", fields)
+
+
+def project_entities(entities: Iterable, entity_type: type, fields: Sequence[str]) -> Iterator[tuple]:
+    """Projection rows of entities that are already built."""
+    make = row_type(entity_type, tuple(fields))._make
+    return (make([getattr(entity, name) for name in fields]) for entity in entities)
+
+
+def batches(items: Iterable, size: int) -> Iterator[List]:
+    """Consecutive lists of `size` items (the last one may be shorter)."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,27 @@
+import threading
+from abc import ABC
+
+_write_version_lock = threading.Lock()
+
+
+class VersionedRepository(ABC):
+    """Repository exposing a write version: a monotonically increasing counter bumped on every save/delete.
+
+    Readers can tag derived data with the version and know it is stale as soon as the version moves. The
+    version is local to the process, writes made by other processes on a shared database do not bump it.
+    """
+    _write_version = 0
+
+    @property
+    def write_version(self) -> int:
+        return self._write_version
+
+    def snapshot(self) -> "VersionedRepository":
+        """Read-only view of the repository frozen at its current write version, for reads that must be consistent
+        across several queries. Repositories that cannot provide one return themselves."""
+        return self
+
+    def bump_write_version(self) -> int:
+        with _write_version_lock:
+            self._write_version += 1
+            return self._write_version
@@ -0,0 +1,24 @@
+"""Rebuild the activity rollups from the raw habit events stored in MongoDB.
+
+Run from the `data_forge_lab` directory once before enabling `ANALYTICS_ROLLUPS`, or whenever the rollups need
+to be recomputed:
+
+    python -m scripts.backfill_rollups
+"""
+from application.domain.analytics.rollups import ActivityRollups
+from infrastructure.config.mongo_config import get_mongo_collections
+from infrastructure.persistence.mongodb.activity_rollup import MongoActivityRollupRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+
+
+def backfill_rollups():
+    collections = get_mongo_collections()
+    habit_event_repo = MongoHabitEventRepository(collections["habit_event"])
+    rollups = ActivityRollups(MongoActivityRollupRepository(collections["activity_rollup"]))
+
+    written = rollups.backfill(habit_event_repo)
+    print(f"Backfill completed: {written} rollups written.")
+
+
+if __name__ == "__main__":
+    backfill_rollups()
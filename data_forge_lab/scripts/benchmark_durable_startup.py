@@ -0,0 +1,51 @@
+"""Measure how long the durable in-memory habit event repository takes to start, from a snapshot plus a log tail.
+
+The snapshot is written from a bulk-loaded repository, the tail through regular saves. Run from the
+`data_forge_lab` directory:
+
+    python -m scripts.benchmark_durable_startup [event_count] [tail_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.durable.repositories import DurableHabitEventRepository
+
+
+def random_events(count: int, habits: list):
+    for _ in range(count):
+        person_id, habit_id = random.choice(habits)
+        yield HabitEvent(person_id=person_id, habit_id=habit_id, status=random.choice(["completed", "missed"]))
+
+
+def benchmark_durable_startup(event_count: int = 1_000_000, tail_count: int = 10_000):
+    habits = [(uuid4(), uuid4()) for _ in range(max(1, event_count // 100))]
+    with tempfile.TemporaryDirectory() as directory:
+        repo = DurableHabitEventRepository(directory, fsync=False, snapshot_every=0)
+        repo._load(map(repo._encode, random_events(event_count, habits)))
+        started = time.perf_counter()
+        repo.checkpoint()
+        print(f"snapshot of {event_count} events written in {time.perf_counter() - started:.1f}s, "
+              f"{os.path.getsize(repo.snapshot_path) / event_count:.0f} bytes per event")
+
+        started = time.perf_counter()
+        for event in random_events(tail_count, habits):
+            repo.save(event)
+        print(f"{tail_count} logged saves in {time.perf_counter() - started:.1f}s")
+        repo.close()
+
+        started = time.perf_counter()
+        repo = DurableHabitEventRepository(directory, snapshot_every=0)
+        print(f"startup: {len(repo.storage)} events recovered in {time.perf_counter() - started:.1f}s")
+        repo.close()
+
+
+if __name__ == "__main__":
+    benchmark_durable_startup(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    )
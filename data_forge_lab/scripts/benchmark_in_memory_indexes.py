@@ -0,0 +1,51 @@
+"""Compare indexed in-memory repository lookups with the linear scans they replace.
+
+Run from the `data_forge_lab` directory:
+
+    python -m scripts.benchmark_in_memory_indexes [event_count]
+"""
+import random
+import sys
+import time
+from uuid import uuid4
+
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.in_memory import InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+def timed(function, arguments):
+    started = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - started) / len(arguments) * 1000
+
+
+def benchmark_in_memory_indexes(event_count: int = 1_000_000, lookups: int = 20):
+    habit_repo = InMemoryHabitRepository()
+    habit_event_repo = InMemoryHabitEventRepository()
+    persons = [uuid4() for _ in range(event_count // 1000)]
+    habits = [habit_repo.save(Habit(person_id=random.choice(persons), name="Habit", goal="Daily", category="Health"))
+              for _ in range(event_count // 100)]
+
+    started = time.perf_counter()
+    for _ in range(event_count):
+        habit = random.choice(habits)
+        habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, status=random.choice(["completed", "missed"])))
+    print(f"{event_count} events, {len(habits)} habits, {len(persons)} persons saved in {time.perf_counter() - started:.1f}s")
+
+    habit_ids = [habit.habit_id for habit in random.sample(habits, lookups)]
+    person_ids = random.sample(persons, lookups)
+    events, habits = habit_event_repo.find_all(), habit_repo.find_all()
+    cases = [
+        ("events by habit_id", habit_event_repo.find_by_habit_id, lambda habit_id: [e for e in events if e.habit_id == habit_id], habit_ids),
+        ("events by person_id", habit_event_repo.find_by_person_id, lambda person_id: [e for e in events if e.person_id == person_id], person_ids),
+        ("habits by person_id", habit_repo.find_by_person_id, lambda person_id: [h for h in habits if h.person_id == person_id], person_ids),
+    ]
+    for name, indexed, scan, arguments in cases:
+        scan_ms, indexed_ms = timed(scan, arguments), timed(indexed, arguments)
+        print(f"{name:<20} scan {scan_ms:9.3f} ms   indexed {indexed_ms:7.3f} ms   x{scan_ms / indexed_ms:,.0f}")
+
+
+if __name__ == "__main__":
+    benchmark_in_memory_indexes(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,85 @@
+"""Measure sustained event ingestion into the in-memory repository while full analytics scans run concurrently.
+
+Scans read a consistent view of the events either from an O(1) snapshot (`snapshot`, what the analytics do), or
+by holding the commit lock for the whole scan (`locked`, what a consistent scan costs without versions: writers wait
+for it). `idle` runs no scan. For each mode the script reports the events saved per second and the save latency
+percentiles: the snapshot mode trades a slower save for latencies that do not depend on the scans.
+
+Run from the `data_forge_lab` directory:
+
+    python -m scripts.benchmark_ingestion_with_scans [event_count] [seconds]
+"""
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from application.domain.analytics.engine import AnalyticsEngine
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import EVENT_FIELDS
+from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+
+
+def random_events(count: int, habits: list, start: datetime):
+    for _ in range(count):
+        person_id, habit_id = random.choice(habits)
+        yield HabitEvent(person_id=person_id, habit_id=habit_id, status=random.choice(["completed", "missed"]),
+                         timestamp=start + timedelta(minutes=random.randrange(525_600)))
+
+
+def percentile(latencies: list, fraction: float) -> float:
+    return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1e6
+
+
+def run(mode: str, event_count: int, seconds: float, habits: list) -> str:
+    repo = InMemoryHabitEventRepository()
+    repo.save_many(random_events(event_count, habits, datetime(2024, 1, 1)))
+    stop = threading.Event()
+    scans = []
+
+    def scan():
+        while not stop.is_set():
+            started = time.perf_counter()
+            if mode == "locked":
+                with repo._commit_lock:
+                    AnalyticsEngine(repo.project(EVENT_FIELDS))
+            else:
+                AnalyticsEngine(repo.snapshot().project(EVENT_FIELDS))
+            scans.append(time.perf_counter() - started)
+
+    scanner = threading.Thread(target=scan) if mode != "idle" else None
+    if scanner:
+        scanner.start()
+    latencies = []
+    events = random_events(10 ** 9, habits, datetime(2025, 1, 1))
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        event = next(events)
+        started = time.perf_counter()
+        repo.save(event)
+        latencies.append(time.perf_counter() - started)
+    stop.set()
+    if scanner:
+        scanner.join()
+
+    latencies.sort()
+    scan_ms = f"{sum(scans) / len(scans) * 1000:7.0f} ms" if scans else "      -"
+    return (f"{mode:<9} {len(latencies) / seconds:9,.0f} saves/s   p50 {percentile(latencies, 0.5):7.0f} us   "
+            f"p99 {percentile(latencies, 0.99):9,.0f} us   max {latencies[-1] * 1e6:11,.0f} us   "
+            f"{len(scans):3} scans of {scan_ms}")
+
+
+def benchmark_ingestion_with_scans(event_count: int = 100_000, seconds: float = 10):
+    habits = [(uuid4(), uuid4()) for _ in range(event_count // 100)]
+    print(f"{event_count} events preloaded, saving for {seconds:g}s per mode")
+    for mode in ("idle", "snapshot", "locked"):
+        print(run(mode, event_count, seconds, habits))
+
+
+if __name__ == "__main__":
+    benchmark_ingestion_with_scans(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    )
@@ -0,0 +1,29 @@
+"""Export the habit events of the configured repository backend (`REPO_TYPE`) to a CSV file.
+
+Events are streamed as projected rows, `batch_size` at a time, so the export runs in bounded memory whatever the
+number of events. Run from the `data_forge_lab` directory:
+
+    python -m scripts.export_habit_events path.csv [batch_size]
+"""
+import csv
+import sys
+
+from containers import RepositoryContainer
+
+FIELDS = ("event_id", "habit_id", "person_id", "timestamp", "status")
+
+
+def export_habit_events(path: str, batch_size: int = 1000):
+    habit_event_repo = RepositoryContainer().habit_event_repo()
+    exported = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for row in habit_event_repo.project(FIELDS, batch_size):
+            writer.writerow((row.event_id, row.habit_id, row.person_id, row.timestamp.isoformat(), row.status))
+            exported += 1
+    print(f"Export completed: {exported} events written to {path}.")
+
+
+if __name__ == "__main__":
+    export_habit_events(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
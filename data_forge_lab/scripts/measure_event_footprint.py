@@ -0,0 +1,33 @@
+"""Measure the memory held per habit event by the in-memory habit event repository, indexes included.
+
+Run from the `data_forge_lab` directory:
+
+    python -m scripts.measure_event_footprint [event_count]
+"""
+import gc
+import random
+import sys
+import tracemalloc
+from uuid import uuid4
+
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+
+
+def measure_event_footprint(event_count: int = 100_000):
+    habits = [(uuid4(), uuid4()) for _ in range(max(1, event_count // 100))]
+    repo = InMemoryHabitEventRepository()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(event_count):
+        person_id, habit_id = random.choice(habits)
+        repo.save(HabitEvent(person_id=person_id, habit_id=habit_id, status=random.choice(["completed", "missed"])))
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{event_count} events: {held / 2**20:.1f} MiB, {held / event_count:.0f} bytes per event")
+
+
+if __name__ == "__main__":
+    measure_event_footprint(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,68 @@
+"""Measure the peak memory of a scan of every habit event: `find_all`, `iter_all` and `project`.
+
+The events are bulk-loaded in an in-memory repository and in a temporary SQLite database, then each read is consumed
+by a loop that only counts the completed events, as the analytics do. The peak is the memory allocated on top of the
+loaded repository while the scan runs. Run from the `data_forge_lab` directory:
+
+    python -m scripts.measure_scan_memory [event_count] [batch_size]
+"""
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+from infrastructure.persistence.sqlite.database import SqliteDatabase
+from infrastructure.persistence.sqlite.habit_event import SqliteHabitEventRepository
+
+
+def random_events(count: int, habits: list):
+    now = datetime.now()
+    for _ in range(count):
+        person_id, habit_id = random.choice(habits)
+        yield HabitEvent(person_id=person_id, habit_id=habit_id, status=random.choice(["completed", "missed"]),
+                         timestamp=now - timedelta(minutes=random.randrange(500_000)))
+
+
+def measure(name: str, scan):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    completed = sum(1 for event in scan() if event.status == "completed")
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<28} peak {peak / 2**20:>8.1f} MiB  {elapsed:>6.1f}s  ({completed} completed)")
+
+
+def measure_scan_memory(event_count: int = 1_000_000, batch_size: int = 1000):
+    habits = [(uuid4(), uuid4()) for _ in range(max(1, event_count // 100))]
+    fields = ("habit_id", "person_id", "status", "timestamp")
+
+    repo = InMemoryHabitEventRepository()
+    repo._load(map(repo._encode, random_events(event_count, habits)))
+    print(f"{event_count} events, batches of {batch_size}")
+    measure("memory find_all", repo.find_all)
+    measure("memory iter_all", lambda: repo.iter_all(batch_size))
+    measure("memory project", lambda: repo.project(fields, batch_size))
+    del repo
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SqliteDatabase(os.path.join(directory, "scan.db"), synchronous="OFF")
+        repo = SqliteHabitEventRepository(database)
+        for start in range(0, event_count, 100_000):
+            repo.save_many(random_events(min(100_000, event_count - start), habits))
+        measure("sqlite find_all", repo.find_all)
+        measure("sqlite iter_all", lambda: repo.iter_all(batch_size))
+        measure("sqlite project", lambda: repo.project(fields, batch_size))
+        database.close()
+
+
+if __name__ == "__main__":
+    measure_scan_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,87 @@
+"""Convert the ids and timestamps stored in MongoDB from strings to native BSON types, in place.
+
+Ids stored as 36 character strings become binary UUIDs (subtype 4) and ISO timestamps become BSON datetimes
+(millisecond precision). Days and birth dates, which are not instants, stay ISO strings.
+
+Documents are converted in batches of `batch_size`, picked among those still holding a string in one of the
+converted fields: an interrupted migration resumes where it stopped when run again, and running it on a migrated
+database does nothing. The storage size of every collection is printed before and after; WiredTiger only returns
+the freed space to the OS after a `compact`.
+
+Stop the application first, it only reads the new types. Run from the `data_forge_lab` directory:
+
+    python -m scripts.migrate_mongo_bson_types [batch_size]
+"""
+import sys
+from datetime import datetime
+from typing import Dict, List
+from uuid import UUID
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from infrastructure.config.mongo_config import get_mongo_collections
+
+# Converted fields, by collection key of `get_mongo_collections`
+UUID_FIELDS = {
+    "person": ["person_id"],
+    "habit": ["habit_id", "person_id"],
+    "habit_event": ["event_id", "person_id", "habit_id"],
+    "activity_rollup": ["person_id"],
+}
+DATETIME_FIELDS = {
+    "habit": ["created_at", "updated_at", "last_completed"],
+    "habit_event": ["timestamp"],
+}
+
+
+def storage_stats(collection: Collection) -> Dict[str, int]:
+    stats = next(collection.aggregate([{"$collStats": {"storageStats": {}}}]), {}).get("storageStats", {})
+    return {key: stats.get(key, 0) for key in ("count", "size", "storageSize", "totalIndexSize")}
+
+
+def converted(document: dict, uuid_fields: List[str], datetime_fields: List[str]) -> dict:
+    changes = {}
+    for field in uuid_fields:
+        if isinstance(document.get(field), str):
+            changes[field] = UUID(document[field])
+    for field in datetime_fields:
+        if isinstance(document.get(field), str):
+            changes[field] = datetime.fromisoformat(document[field])
+    return changes
+
+
+def migrate_collection(collection: Collection, uuid_fields: List[str], datetime_fields: List[str], batch_size: int) -> int:
+    fields = uuid_fields + datetime_fields
+    remaining = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    migrated = 0
+    while True:
+        batch = list(collection.find(remaining, {field: 1 for field in fields}).limit(batch_size))
+        if not batch:
+            return migrated
+        requests = [
+            UpdateOne({"_id": document["_id"]}, {"$set": converted(document, uuid_fields, datetime_fields)})
+            for document in batch
+        ]
+        collection.bulk_write(requests, ordered=False)
+        migrated += len(requests)
+        print(f"{collection.name}: {migrated} documents converted")
+
+
+def migrate_mongo_bson_types(batch_size: int = 1000):
+    collections = get_mongo_collections()
+    before = {key: storage_stats(collections[key]) for key in UUID_FIELDS}
+
+    for key, uuid_fields in UUID_FIELDS.items():
+        migrated = migrate_collection(collections[key], uuid_fields, DATETIME_FIELDS.get(key, []), batch_size)
+        print(f"{collections[key].name}: done, {migrated} documents converted")
+
+    print(f"{'collection':<20} {'documents':>10} {'data before':>12} {'data after':>12} {'indexes before':>15} {'indexes after':>14}")
+    for key in UUID_FIELDS:
+        old, new = before[key], storage_stats(collections[key])
+        print(f"{collections[key].name:<20} {new['count']:>10} {old['size']:>12,} {new['size']:>12,} "
+              f"{old['totalIndexSize']:>15,} {new['totalIndexSize']:>14,}")
+
+
+if __name__ == "__main__":
+    migrate_mongo_bson_types(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -25,6 +25,8 @@ def migrate_persons_country():
         print(f"Updated person {person['_id']} with country {random_country.value}")
 
     print("Migration completed!")
+    # The writes bypass the services, so the running API's per-country analytics do not see them
+    print("Restart the API, or POST /api/analytics/materialized/rebuild, to count the persons under their new country.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+"""Recompute the current and longest streak and the last completion of every habit from its completed events.
+
+Streaks stored before `STREAK_TRACKING` was enabled, or by events logged out of order without it, are fixed in one
+sorted pass per habit; only the habits whose values change are saved, `batch_size` at a time. Run from the
+`data_forge_lab` directory, against the configured repository backend (`REPO_TYPE`), while habits are not being
+edited:
+
+    python -m scripts.recompute_streaks [batch_size]
+"""
+import sys
+
+from application.domain.analytics.streaks import recompute_streaks as recompute
+from containers import RepositoryContainer
+
+
+def recompute_streaks(batch_size: int = 1000):
+    container = RepositoryContainer()
+    fixed = recompute(container.habit_event_repo(), container.habit_repo(), batch_size)
+    print(f"Recompute completed: {fixed} habits fixed.")
+
+
+if __name__ == "__main__":
+    recompute_streaks(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
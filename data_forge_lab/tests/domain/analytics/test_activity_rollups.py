@@ -0,0 +1,112 @@
+import unittest
+from random import Random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from application.domain.analytics.rollups import ActivityRollups
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from application.domain.services.habit_event_service import HabitEventService
+from infrastructure.persistence.in_memory import (
+    InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository, InMemoryActivityRollupRepository
+)
+from interfaces.event_publisher import EventPublisher
+
+
+class NoOpEventPublisher(EventPublisher):
+    def publish(self, event):
+        pass
+
+
+class TestActivityRollups(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.rollup_repo = InMemoryActivityRollupRepository()
+        self.rollups = ActivityRollups(self.rollup_repo)
+
+        rng = Random(3)
+        self.now = datetime.now()
+        self.person_ids = [uuid4() for _ in range(6)]
+        self.habits = []
+        for i in range(8):
+            habit = Habit(person_id=rng.choice(self.person_ids), name=f"Habit {i}", goal="Daily", category="Health")
+            self.habit_repo.save(habit)
+            self.habits.append(habit)
+        for _ in range(300):
+            habit = rng.choice(self.habits)
+            event = HabitEvent(
+                person_id=habit.person_id,
+                habit_id=habit.habit_id,
+                timestamp=self.now - timedelta(minutes=rng.randint(0, 60 * 24 * 120)),
+                status=rng.choice(["completed", "missed"])
+            )
+            self.habit_event_repo.save(event)
+
+        self.rollups.backfill(self.habit_event_repo)
+        self.with_rollups = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo, rollups=self.rollups)
+        self.python = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+    def active_since(self, days):
+        today = self.now.date()
+        return {
+            event.person_id for event in self.habit_event_repo.find_all()
+            if today - timedelta(days=days) <= event.timestamp.date() <= today
+        }
+
+    def assertMatchesEvents(self):
+        today = self.now.date()
+        ranges = [(None, None), (today - timedelta(days=89), today), (today - timedelta(days=30), today - timedelta(days=10))]
+        for start, end in ranges:
+            self.assertEqual(self.with_rollups.get_time_of_day_heatmap(None, start, end), self.python.get_time_of_day_heatmap(None, start, end))
+            for person_id in self.person_ids:
+                self.assertEqual(
+                    self.with_rollups.get_time_of_day_heatmap(person_id, start, end),
+                    self.python.get_time_of_day_heatmap(person_id, start, end)
+                )
+
+        active_users = self.rollups.active_users(today, days=90)
+        self.assertEqual(active_users["daily"], len(self.active_since(0)))
+        self.assertEqual(active_users["weekly"], len(self.active_since(7)))
+        self.assertEqual(active_users["monthly"], len(self.active_since(30)))
+        self.assertEqual(active_users["last_90_days"], len(self.active_since(89)))
+
+    def test_backfilled_rollups_match_raw_events(self):
+        self.assertMatchesEvents()
+
+    def test_engagement_reports_custom_windows(self):
+        self.assertEqual(
+            self.with_rollups.get_engagement_metrics(days=90)["active_users"]["last_90_days"],
+            self.python.get_engagement_metrics(days=90)["active_users"]["last_90_days"]
+        )
+
+    def test_event_writes_update_rollups(self):
+        service = HabitEventService(self.habit_event_repo, NoOpEventPublisher(), self.habit_repo, listeners=[self.rollups])
+        habit = self.habits[0]
+
+        created = service.create_habit_event(habit.person_id, habit.habit_id, timestamp=self.now)
+        self.assertMatchesEvents()
+
+        service.update_habit_event(created.event_id, timestamp=self.now - timedelta(days=40, hours=3), status="missed")
+        self.assertMatchesEvents()
+
+        for event in self.habit_event_repo.find_by_habit_id(habit.habit_id):
+            service.delete_habit_event(event.event_id)
+        self.assertMatchesEvents()
+
+    def test_range_queries_read_only_the_days_in_range(self):
+        start, end = (self.now - timedelta(days=10)).date(), (self.now - timedelta(days=3)).date()
+        in_range = [rollup for rollups in self.rollup_repo.by_day.values() for rollup in rollups.values()
+                    if start <= rollup.day <= end]
+        self.assertEqual(self.rollup_repo.days, sorted(self.rollup_repo.by_day))
+
+        found = self.rollup_repo.find_range(start, end) + self.rollup_repo.find_person_rollups(start, end)
+        self.assertEqual(sorted(map(id, in_range)), sorted(map(id, found)))
+        person_id = self.person_ids[0]
+        self.assertTrue(all(rollup.person_id == person_id for rollup in self.rollup_repo.find_range(start, end, person_id)))
+
+
+if __name__ == "__main__":
+    unittest.main()
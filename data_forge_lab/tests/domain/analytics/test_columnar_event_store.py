@@ -0,0 +1,106 @@
+import unittest
+from random import Random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+
+from application.domain.analytics.columnar_store import ColumnarEventStore
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+class TestColumnarEventStore(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+
+        rng = Random(7)
+        now = datetime.now()
+        self.person_ids = [uuid4() for _ in range(5)]
+        self.habits = []
+        for i in range(10):
+            habit = Habit(person_id=rng.choice(self.person_ids), name=f"Habit {i}", goal="Daily", category="Health")
+            self.habit_repo.save(habit)
+            self.habits.append(habit)
+        for _ in range(300):
+            habit = rng.choice(self.habits[:-1])
+            event = HabitEvent(
+                person_id=habit.person_id,
+                habit_id=habit.habit_id,
+                timestamp=now - timedelta(minutes=rng.randint(0, 60 * 24 * 40)),
+                status=rng.choice(["completed", "missed", "pending"])
+            )
+            self.habit_event_repo.save(event)
+
+        self.store = ColumnarEventStore.from_repository(self.habit_event_repo)
+        self.columnar = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo, event_store=self.store)
+        self.python = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+    def assertMatchesPython(self):
+        self.assertEqual(self.columnar.get_completion_rates(), self.python.get_completion_rates())
+        self.assertEqual(self.columnar.get_time_of_day_heatmap(), self.python.get_time_of_day_heatmap())
+        self.assertEqual(self.columnar.get_engagement_metrics(), self.python.get_engagement_metrics())
+        for person_id in self.person_ids:
+            self.assertEqual(self.columnar.get_completion_rates(person_id), self.python.get_completion_rates(person_id))
+            self.assertEqual(self.columnar.get_time_of_day_heatmap(person_id), self.python.get_time_of_day_heatmap(person_id))
+
+    def test_vectorized_results_match_python_implementation(self):
+        self.assertMatchesPython()
+
+    def test_incremental_refresh(self):
+        habit = self.habits[0]
+        appended = HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, status="completed")
+        self.habit_event_repo.save(appended)
+        self.store.on_event_saved(None, appended)
+        self.assertMatchesPython()
+
+        updated = self.habit_event_repo.get_by_id(appended.event_id)
+        updated.status = "missed"
+        updated.timestamp = datetime.now() - timedelta(days=3, hours=5)
+        self.habit_event_repo.save(updated)
+        self.store.on_event_saved(None, updated)
+        self.assertMatchesPython()
+
+        for event in list(self.habit_event_repo.find_by_habit_id(habit.habit_id)):
+            self.habit_event_repo.delete(event.event_id)
+            self.store.on_event_deleted(event)
+        self.assertMatchesPython()
+
+        size = self.store.size
+        self.store.compact()
+        self.assertLess(self.store.size, size)
+        self.assertMatchesPython()
+
+    def test_deletes_compact_the_store(self):
+        store = ColumnarEventStore()
+        events = [HabitEvent(person_id=uuid4(), habit_id=uuid4(), timestamp=datetime(2024, 1, 1, hour % 24))
+                  for hour in range(1000)]
+        store.append(events)
+        for event in events[:300]:
+            store.remove(event.event_id)
+
+        # The 256th delete (COMPACT_MIN_ROWS) compacted the rows, the next 44 are still masked
+        self.assertEqual((store.size, store.dead), (744, 44))
+        self.assertEqual(sum(store.time_of_day_heatmap().values()), 700)
+        self.assertEqual(len(store.rows), 700)
+
+    def test_reads_copy_the_columns(self):
+        columns = self.store._columns()
+        for column in columns.values():
+            self.assertFalse(np.shares_memory(column, self.store.timestamps))
+            self.assertFalse(np.shares_memory(column, self.store.statuses))
+
+    def test_store_grows_past_its_capacity(self):
+        store = ColumnarEventStore(capacity=2)
+        events = [HabitEvent(person_id=uuid4(), habit_id=uuid4(), timestamp=datetime(2024, 1, 1, hour)) for hour in range(24)]
+        store.append(events)
+        self.assertEqual(store.size, 24)
+        self.assertTrue(all(count == 1 for count in store.time_of_day_heatmap().values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from random import Random
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from application.domain.analytics.day_bitmaps import CONTAINER_DAYS, DayBitmap, HabitDayBitmaps
+from application.domain.analytics.engine import AnalyticsEngine
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from application.domain.services.habit_event_service import HabitEventService
+from infrastructure.persistence.in_memory import (
+    InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+)
+from interfaces.event_publisher import EventPublisher
+
+
+class NoOpEventPublisher(EventPublisher):
+    def publish(self, event):
+        pass
+
+
+def brute_force_streaks(days: set) -> tuple:
+    """Current and longest run of consecutive days, by walking every day."""
+    longest = run = 0
+    for day in sorted(days):
+        run = run + 1 if day - 1 in days else 1
+        longest = max(longest, run)
+    return run, longest
+
+
+class TestDayBitmap(unittest.TestCase):
+    def test_operations_match_a_set_of_days(self):
+        rng = Random(5)
+        # Days on both sides of container boundaries
+        base = 739000 // CONTAINER_DAYS * CONTAINER_DAYS - 40
+        for _ in range(50):
+            days = {base + rng.randrange(3 * CONTAINER_DAYS) for _ in range(rng.randrange(1, 400))}
+            others = {base + rng.randrange(3 * CONTAINER_DAYS) for _ in range(rng.randrange(1, 400))}
+            bitmap, other = DayBitmap(days), DayBitmap(others)
+            for day in rng.sample(sorted(days), len(days) // 3):
+                bitmap.discard(day)
+                days.discard(day)
+
+            self.assertEqual(sorted(days), list(bitmap))
+            self.assertEqual((len(days), min(days), max(days)), (len(bitmap), bitmap.first(), bitmap.last()))
+            self.assertEqual(sorted(days & others), list(bitmap & other))
+            self.assertEqual(brute_force_streaks(days), bitmap.streaks())
+            start = base + rng.randrange(2 * CONTAINER_DAYS)
+            stop = start + rng.randrange(1, 2 * CONTAINER_DAYS)
+            self.assertEqual(sum(start <= day < stop for day in days), bitmap.count(start, stop))
+
+    def test_empty_bitmap(self):
+        bitmap = DayBitmap([10])
+        bitmap.discard(10)
+        self.assertEqual(({}, 0, None, (0, 0)), (bitmap.containers, len(bitmap), bitmap.first(), bitmap.streaks()))
+
+
+class TestHabitDayBitmaps(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.person_id = uuid4()
+        self.read = self.habit_repo.save(Habit(person_id=self.person_id, name="Read", goal="Daily", category="Health"))
+        self.run = self.habit_repo.save(Habit(person_id=self.person_id, name="Run", goal="Daily", category="Health"))
+        self.start = datetime(2024, 1, 1, 8)
+
+    def log(self, habit: Habit, day: int, status: str = "completed") -> HabitEvent:
+        return self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id,
+                                                     timestamp=self.start + timedelta(days=day), status=status))
+
+    def test_drop_off_and_first_week_match_the_engine(self):
+        # Events near midnight: 8 calendar days but 7 days and 2 hours apart, one of the two events completed
+        self.habit_event_repo.save(HabitEvent(person_id=self.person_id, habit_id=self.read.habit_id,
+                                              timestamp=datetime(2024, 1, 1, 23), status="completed"))
+        self.habit_event_repo.save(HabitEvent(person_id=self.person_id, habit_id=self.read.habit_id,
+                                              timestamp=datetime(2024, 1, 9, 1), status="pending"))
+        rng = Random(3)
+        for day in rng.sample(range(30), 12):
+            self.log(self.run, day, rng.choice(("completed", "missed")))
+        engine = AnalyticsEngine(self.habit_event_repo.find_all())
+        bitmaps = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo,
+                                   day_bitmaps=HabitDayBitmaps.from_repository(self.habit_event_repo))
+
+        for threshold in (7, 8, 20):
+            self.assertEqual(engine.drop_off_rates(self.habit_repo.find_all(), threshold),
+                             bitmaps.get_drop_off_rates(threshold))
+        self.assertEqual(engine.first_week_success(self.habit_repo.find_all()), bitmaps.get_first_week_success())
+        read = str(self.read.habit_id)
+        self.assertEqual(7, bitmaps.get_drop_off_rates()[read]["days_active"])
+        self.assertEqual(50.0, bitmaps.get_first_week_success()[read]["success_rate"])
+
+    def test_event_writes_keep_the_bitmaps_current(self):
+        bitmaps = HabitDayBitmaps()
+        service = HabitEventService(self.habit_event_repo, NoOpEventPublisher(), self.habit_repo, listeners=[bitmaps])
+        habit_id = self.read.habit_id
+        events = [service.create_habit_event(self.person_id, habit_id, timestamp=self.start + timedelta(days=day))
+                  for day in (0, 0, 1, 2, 4)]
+        service.update_habit_event(events[2].event_id, status="missed")
+        service.delete_habit_event(events[0].event_id)
+        service.delete_habit_event(events[4].event_id)
+
+        rebuilt = HabitDayBitmaps.from_repository(self.habit_event_repo)
+        for days in (bitmaps.habits[habit_id], rebuilt.habits[habit_id]):
+            self.assertEqual([self.start.toordinal() + day for day in (0, 1, 2)], list(days.active))
+            self.assertEqual([self.start.toordinal() + day for day in (0, 2)], list(days.completed))
+
+    def test_activity_days_of_a_person(self):
+        for day in (0, 1, 2, 5):
+            self.log(self.read, day)
+        for day in (1, 2, 3):
+            self.log(self.run, day)
+        self.log(self.run, 5, "missed")
+        service = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+        activity = service.get_activity_days(self.person_id)
+        self.assertEqual(["2024-01-02", "2024-01-03"], activity["all_habits_completed_days"])
+        self.assertEqual({
+            "habit_name": "Run", "active_days": 4, "completed_days": 3,
+            "current_streak": 3, "longest_streak": 3, "consistency": 60.0
+        }, activity["habits"][str(self.run.habit_id)])
+        read = activity["habits"][str(self.read.habit_id)]
+        self.assertEqual((1, 3), (read["current_streak"], read["longest_streak"]))
+
+        # Served from maintained bitmaps, the answer is the same
+        service.day_bitmaps = HabitDayBitmaps.from_repository(self.habit_event_repo)
+        self.assertEqual(activity, service.get_activity_days(self.person_id))
+        both = [self.read.habit_id, self.run.habit_id]
+        self.assertEqual(date(2024, 1, 2), service.day_bitmaps.days_all_completed(both)[0])
+        self.assertEqual([], service.day_bitmaps.days_all_completed([self.read.habit_id, uuid4()]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from random import Random
+from datetime import date
+
+from application.domain.analytics.top_k import SpaceSaving, HabitPopularityTracker
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.services.analytics_service import AnalyticsService
+from application.domain.services.habit_service import HabitService
+from application.domain.services.person_service import PersonService
+from application.use_cases.analytics_use_cases import AnalyticsUseCases
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_heavy_hitters_survive_a_full_summary(self):
+        summary = SpaceSaving(capacity=5)
+        rng = Random(1)
+        stream = ["frequent"] * 300 + ["common"] * 150 + [f"rare {i}" for i in range(400)]
+        rng.shuffle(stream)
+        for item in stream:
+            summary.increment(item)
+
+        top = summary.top(2)
+        self.assertEqual([item for item, _, _ in top], ["frequent", "common"])
+        for item, count, error in top:
+            self.assertGreaterEqual(count, stream.count(item))
+            self.assertLessEqual(count - error, stream.count(item))
+
+    def test_decrement_drops_empty_counters(self):
+        summary = SpaceSaving(capacity=3)
+        summary.increment("a")
+        summary.decrement("a")
+        summary.decrement("untracked")
+        self.assertEqual(summary.top(3), [])
+
+
+class TestHabitPopularityTracker(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+
+        self.rng = Random(9)
+        self.persons = []
+        for i in range(40):
+            person = Person(
+                first_name=f"First{i}", last_name=f"Last{i}", date_of_birth=date(1990, 1, 1),
+                email=f"person{i}@example.com", phone_number="000", address="Street",
+                country=self.rng.choice(list(Country) + [None])
+            )
+            self.person_repo.save(person)
+            self.persons.append(person)
+        for _ in range(150):
+            habit = self.random_habit()
+            self.habit_repo.save(habit)
+
+        self.tracker = HabitPopularityTracker.from_repositories(self.person_repo, self.habit_repo, capacity=50)
+        self.streaming = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo, popularity=self.tracker)
+        self.exact = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+    def random_habit(self):
+        # Names are skewed so that a few of them are clearly more popular
+        name = f"Habit {min(self.rng.randint(0, 20), self.rng.randint(0, 20))}"
+        category = self.rng.choice(["Health", "Productivity", "Social"])
+        return Habit(person_id=self.rng.choice(self.persons).person_id, name=name, goal="Daily", category=category)
+
+    def assertMatchesExact(self, **scope):
+        for k in (1, 5, 10):
+            result = self.streaming.get_habit_popularity(k, **scope)
+            expected = self.exact.get_habit_popularity(k, **scope)
+            # Names tied on user count may come back in a different order
+            self.assertEqual([row["user_count"] for row in result], [row["user_count"] for row in expected])
+            exact_counts = {row["habit_name"]: row["user_count"] for row in self.exact.get_habit_popularity(1000, **scope)}
+            for row in result:
+                self.assertEqual(row["user_count"], exact_counts[row["habit_name"]])
+
+    def assertAllScopesMatch(self):
+        self.assertMatchesExact()
+        for category in ("Health", "Productivity", "Social"):
+            self.assertMatchesExact(category=category)
+        for country in Country:
+            self.assertMatchesExact(country=country.value)
+
+    def test_rebuilt_summaries_match_exact_counts(self):
+        self.assertAllScopesMatch()
+
+    def test_habit_writes_update_summaries(self):
+        service = HabitService(self.habit_repo, self.habit_event_repo, listeners=[self.tracker])
+        created = []
+        for _ in range(60):
+            habit = self.random_habit()
+            try:
+                created.append(service.create_habit(habit.person_id, habit.name, habit.goal, habit.category))
+            except ValueError:
+                continue  # the person already has a habit with that name
+        self.assertAllScopesMatch()
+
+        for habit in created[:20]:
+            service.update_habit(habit.habit_id, category="Social")
+        self.assertAllScopesMatch()
+
+        for habit in self.rng.sample(self.habit_repo.find_all(), 80):
+            service.delete_habit(habit.habit_id)
+        self.assertAllScopesMatch()
+
+    def test_person_writes_move_country_counts(self):
+        service = PersonService(self.person_repo, listeners=[self.tracker])
+        for person in self.persons[:10]:
+            service.update_person(person.person_id, country=self.rng.choice(list(Country)).value)
+        for person in self.persons[10:15]:
+            service.delete_person(person.person_id)
+        self.assertAllScopesMatch()
+
+    def test_k_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            AnalyticsUseCases(self.streaming).get_habit_popularity(k=-1)
+
+    def test_exact_fallback(self):
+        for habit in self.habit_repo.find_all():
+            self.habit_repo.delete(habit.habit_id)
+        self.assertEqual(self.streaming.get_habit_popularity(exact=True), [])
+        self.assertNotEqual(self.streaming.get_habit_popularity(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime, timedelta
+from random import Random
+from uuid import UUID, uuid4
+
+from application.domain.analytics.hyperloglog import HyperLogLog, DailyActiveUserSketches
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def setUp(self):
+        rng = Random(11)
+        self.ids = [UUID(int=rng.getrandbits(128)) for _ in range(60000)]
+
+    def assertWithinError(self, sketch, expected):
+        # Three standard errors cover well over 99% of estimates
+        self.assertLessEqual(abs(sketch.count() - expected), 3 * sketch.standard_error * expected)
+
+    def test_estimates_are_within_the_error_bound(self):
+        for size in (1000, 10000, 60000):
+            sketch = HyperLogLog()
+            for value in self.ids[:size]:
+                sketch.add(value.bytes)
+            self.assertWithinError(sketch, size)
+
+    def test_small_cardinalities_are_nearly_exact(self):
+        sketch = HyperLogLog()
+        for value in self.ids[:50] * 3:
+            sketch.add(value.bytes)
+        self.assertEqual(sketch.count(), 50)
+
+    def test_merge_is_the_union(self):
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for value in self.ids[:30000]:
+            first.add(value.bytes)
+            union.add(value.bytes)
+        for value in self.ids[20000:50000]:
+            second.add(value.bytes)
+            union.add(value.bytes)
+        merged = first.merge(second)
+        self.assertEqual(merged.registers, union.registers)
+        self.assertWithinError(merged, 50000)
+
+    def test_precisions_cannot_be_mixed(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class TestDailyActiveUserSketches(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+
+        rng = Random(5)
+        self.now = datetime.now()
+        persons = [uuid4() for _ in range(3000)]
+        for _ in range(20000):
+            event = HabitEvent(
+                person_id=rng.choice(persons),
+                habit_id=uuid4(),
+                timestamp=self.now - timedelta(minutes=rng.randint(0, 60 * 24 * 100))
+            )
+            self.habit_event_repo.save(event)
+
+        self.sketches = DailyActiveUserSketches.from_repository(self.habit_event_repo)
+        self.analytics = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo, active_user_sketches=self.sketches)
+
+    def test_windows_are_estimated_within_the_error_bound(self):
+        today = self.now.date()
+        windows = {"daily": 0, "weekly": 7, "monthly": 30, "last_90_days": 89}
+        estimates = self.sketches.active_users(today, days=90)
+        for window, days in windows.items():
+            exact = len({
+                event.person_id for event in self.habit_event_repo.find_all()
+                if today - timedelta(days=days) <= event.timestamp.date() <= today
+            })
+            self.assertLessEqual(abs(estimates[window] - exact), 3 * self.sketches.standard_error * exact + 1)
+
+    def test_approximation_is_selected_per_request(self):
+        exact = self.analytics.get_engagement_metrics()
+        approx = self.analytics.get_engagement_metrics(approx=True)
+
+        self.assertNotIn("approximate", exact)
+        self.assertEqual(approx["approximate"]["standard_error"], self.sketches.standard_error)
+        self.assertEqual(set(approx["active_users"]), set(exact["active_users"]))
+
+    def test_new_events_are_added_to_the_sketches(self):
+        before = self.sketches.active_users()["daily"]
+        for _ in range(100):
+            self.sketches.on_event_saved(None, HabitEvent(person_id=uuid4(), habit_id=uuid4()))
+        self.assertGreater(self.sketches.active_users()["daily"], before + 90)
+
+
+if __name__ == "__main__":
+    unittest.main()
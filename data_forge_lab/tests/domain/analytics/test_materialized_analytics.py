@@ -0,0 +1,101 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from application.domain.analytics.materialized import MaterializedAnalytics
+from application.domain.models.person import Country
+from application.domain.services.analytics_service import AnalyticsService
+from application.domain.services.habit_event_service import HabitEventService
+from application.domain.services.habit_service import HabitService
+from application.domain.services.person_service import PersonService
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+class TestMaterializedAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.materialized = MaterializedAnalytics(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+        self.person_service = PersonService(self.person_repo, listeners=[self.materialized])
+        self.habit_service = HabitService(self.habit_repo, self.habit_event_repo, listeners=[self.materialized])
+        self.habit_event_service = HabitEventService(
+            self.habit_event_repo, MagicMock(), habit_repo=self.habit_repo, listeners=[self.materialized]
+        )
+        self.analytics = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo, materialized=self.materialized)
+        self.recompute = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+        self.alice = self.person_service.create_person("Alice", "A", date(1990, 1, 1), "a@example.com", "1", "Street", Country.FRANCE)
+        self.bob = self.person_service.create_person("Bob", "B", date(1990, 1, 1), "b@example.com", "2", "Street", Country.JAPAN)
+        self.exercise = self.habit_service.create_habit(self.alice.person_id, "Exercise", "Daily", "Health")
+        self.reading = self.habit_service.create_habit(self.alice.person_id, "Reading", "Daily", "Personal Development")
+        self.sleep = self.habit_service.create_habit(self.bob.person_id, "Sleep", "Daily", "Health")
+
+        self.habit_event_service.create_habit_event(self.alice.person_id, self.exercise.habit_id, timestamp=datetime(2024, 1, 1, 8))
+        self.habit_event_service.create_habit_event(self.alice.person_id, self.exercise.habit_id, timestamp=datetime(2024, 1, 2, 8))
+        self.habit_event_service.create_habit_event(self.alice.person_id, self.reading.habit_id, timestamp=datetime(2024, 1, 2, 21))
+        self.last_event = self.habit_event_service.create_habit_event(self.bob.person_id, self.sleep.habit_id, timestamp=datetime(2024, 1, 2, 22))
+
+    def assertMatchesRecompute(self):
+        for person_id in (None, self.alice.person_id, self.bob.person_id):
+            self.assertEqual(self.analytics.get_completion_rates(person_id), self.recompute.get_completion_rates(person_id))
+            self.assertEqual(self.analytics.get_time_of_day_heatmap(person_id), self.recompute.get_time_of_day_heatmap(person_id))
+            self.assertEqual(self.analytics.get_distribution(person_id), self.recompute.get_distribution(person_id))
+        self.assertEqual(self.analytics.get_geographic_trends(), self.recompute.get_geographic_trends())
+        self.assertTrue(self.materialized.check_consistency()["consistent"])
+
+    def test_counters_follow_creates(self):
+        self.assertEqual(self.analytics.get_time_of_day_heatmap()["08:00"], 2)
+        self.assertEqual(self.analytics.get_distribution(), {"Health": 2, "Personal Development": 1})
+        self.assertEqual(self.analytics.get_geographic_trends()["France"]["total_events"], 3)
+        self.assertMatchesRecompute()
+
+    def test_counters_follow_updates_and_deletes(self):
+        self.habit_event_service.update_habit_event(self.last_event.event_id, status="missed", timestamp=datetime(2024, 1, 3, 7))
+        self.assertEqual(self.analytics.get_completion_rates(self.bob.person_id)[str(self.sleep.habit_id)]["completion_rate"], 0)
+        self.assertMatchesRecompute()
+
+        self.habit_event_service.delete_habit_event(self.last_event.event_id)
+        self.assertEqual(self.analytics.get_geographic_trends()["Japan"]["active_users"], 0)
+        self.assertMatchesRecompute()
+
+        self.habit_service.update_habit(self.reading.habit_id, category="Productivity")
+        self.habit_service.delete_habit(self.exercise.habit_id)
+        self.assertEqual(self.analytics.get_distribution(), {"Health": 1, "Productivity": 1})
+        self.assertMatchesRecompute()
+
+    def test_country_totals_follow_person_changes(self):
+        # Moved through the API, which sends the country's value
+        self.person_service.update_person(self.bob.person_id, country="France")
+        self.assertEqual(self.analytics.get_geographic_trends()["Japan"]["total_habits"], 0)
+        self.assertEqual(self.analytics.get_geographic_trends()["France"]["active_users"], 2)
+        self.assertMatchesRecompute()
+
+        self.person_service.delete_person(self.alice.person_id)
+        self.assertEqual(self.analytics.get_geographic_trends()["France"]["total_events"], 1)
+        self.assertMatchesRecompute()
+
+        # Habits and events logged before their person is stored are counted once it is
+        carol_id = uuid4()
+        habit = self.habit_service.create_habit(carol_id, "Walk", "Daily", "Health")
+        self.habit_event_service.create_habit_event(carol_id, habit.habit_id, timestamp=datetime(2024, 1, 3, 9))
+        self.person_service.create_person("Carol", "C", date(1990, 1, 1), "c@example.com", "3", "Street", Country.JAPAN,
+                                          person_id=carol_id)
+        self.assertEqual(self.analytics.get_geographic_trends()["Japan"]["total_events"], 1)
+        self.assertMatchesRecompute()
+
+    def test_consistency_check_detects_drift_and_rebuild_repairs_it(self):
+        # A write that bypasses the services is invisible to the counters
+        self.habit_event_repo.delete(self.last_event.event_id)
+        report = self.materialized.check_consistency()
+        self.assertFalse(report["consistent"])
+        self.assertIn("time_of_day_heatmap", report["mismatches"])
+
+        self.materialized.rebuild()
+        self.assertMatchesRecompute()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from random import Random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from uuid import uuid4
+
+from application.domain.analytics.streaks import CompletionDays, StreakTracker, recompute_streaks
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.habit_event_service import HabitEventService
+from application.domain.services.habit_service import HabitService
+from infrastructure.persistence.in_memory import InMemoryHabitRepository, InMemoryHabitEventRepository
+from interfaces.event_publisher import EventPublisher
+
+
+class NoOpEventPublisher(EventPublisher):
+    def publish(self, event):
+        pass
+
+
+def brute_force_streaks(days: set) -> tuple:
+    """Current and longest run of consecutive days, by walking every day."""
+    longest = run = 0
+    for day in sorted(days):
+        run = run + 1 if day - 1 in days else 1
+        longest = max(longest, run)
+    return run, longest
+
+
+class TestStreakTracker(unittest.TestCase):
+    def setUp(self):
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.habit = self.habit_repo.save(Habit(person_id=uuid4(), name="Read", goal="Daily", category="Health"))
+        self.start = datetime(2024, 1, 1, 8)
+
+    def service(self, tracker: StreakTracker) -> HabitEventService:
+        return HabitEventService(self.habit_event_repo, NoOpEventPublisher(), self.habit_repo, listeners=[tracker])
+
+    def test_runs_match_a_full_recount_after_random_adds_and_removes(self):
+        rng = Random(7)
+        days, completions = CompletionDays(), []
+        for _ in range(2000):
+            if completions and rng.random() < 0.4:
+                days.remove(completions.pop(rng.randrange(len(completions))))
+            else:
+                completed_at = self.start + timedelta(days=rng.randrange(120), hours=rng.randrange(12))
+                days.add(completed_at)
+                completions.append(completed_at)
+
+            ordinals = {completed_at.toordinal() for completed_at in completions}
+            self.assertEqual((days.current, days.longest), brute_force_streaks(ordinals))
+            # Only the day of the last completion is exact once the latest completion of a day was removed
+            latest = max(completions, default=None)
+            self.assertEqual(days.last_completed and days.last_completed.date(), latest and latest.date())
+
+    def test_backfilled_and_deleted_events_fix_the_streaks(self):
+        service = self.service(StreakTracker(self.habit_repo))
+        habit_id = self.habit.habit_id
+        for day in (0, 1, 3, 4):
+            service.create_habit_event(self.habit.person_id, habit_id, timestamp=self.start + timedelta(days=day))
+        habit = self.habit_repo.get_by_id(habit_id)
+        self.assertEqual((2, 2), (habit.streak, habit.longest_streak))
+
+        # A backfilled completion fills the gap: both runs merge
+        gap = service.create_habit_event(self.habit.person_id, habit_id, timestamp=self.start + timedelta(days=2))
+        habit = self.habit_repo.get_by_id(habit_id)
+        self.assertEqual((5, 5), (habit.streak, habit.longest_streak))
+        self.assertEqual(self.start + timedelta(days=4), habit.last_completed)
+
+        # Deleting it splits them again, deleting the last day moves the last completion back
+        service.delete_habit_event(gap.event_id)
+        last = self.habit_event_repo.find_page_by_habit_id(habit_id, 10).items[-1]
+        service.delete_habit_event(last.event_id)
+        habit = self.habit_repo.get_by_id(habit_id)
+        self.assertEqual((1, 2), (habit.streak, habit.longest_streak))
+        self.assertEqual(self.start + timedelta(days=3), habit.last_completed)
+
+    def test_streaks_are_written_outside_of_the_tracker_lock(self):
+        tracker = StreakTracker(self.habit_repo)
+        update_fields, locked = self.habit_repo.update_fields, []
+
+        def checking_update_fields(habit_id, changes):
+            locked.append(tracker._lock.locked())
+            return update_fields(habit_id, changes)
+
+        with patch.object(self.habit_repo, "update_fields", checking_update_fields):
+            event = self.service(tracker).create_habit_event(self.habit.person_id, self.habit.habit_id,
+                                                             timestamp=self.start)
+            self.service(tracker).delete_habit_event(event.event_id)
+        self.assertEqual([False, False], locked)
+
+    def test_deleting_a_habit_does_not_write_its_streaks(self):
+        tracker = StreakTracker(self.habit_repo)
+        for day in range(30):
+            self.service(tracker).create_habit_event(self.habit.person_id, self.habit.habit_id,
+                                                     timestamp=self.start + timedelta(days=day))
+
+        with patch.object(self.habit_repo, "update_fields", wraps=self.habit_repo.update_fields) as update_fields:
+            HabitService(self.habit_repo, self.habit_event_repo, listeners=[tracker]).delete_habit(self.habit.habit_id)
+
+        self.assertEqual(0, update_fields.call_count)
+        self.assertEqual(self.habit_event_repo.find_all(), [])
+        self.assertEqual((0, 0), tracker.streaks(self.habit.habit_id))
+
+    def test_recompute_fixes_the_stored_streaks_from_the_history(self):
+        rng = Random(11)
+        timestamps = [self.start + timedelta(days=day, hours=rng.randrange(12)) for day in (0, 1, 2, 5, 6, 9)]
+        rng.shuffle(timestamps)
+        events = [HabitEvent(person_id=self.habit.person_id, habit_id=self.habit.habit_id, timestamp=timestamp,
+                             status="completed") for timestamp in timestamps]
+        self.habit_event_repo.save_many(events)
+        self.habit_event_repo.save(HabitEvent(person_id=self.habit.person_id, habit_id=self.habit.habit_id,
+                                              timestamp=self.start + timedelta(days=10), status="missed"))
+        idle = self.habit_repo.save(Habit(person_id=uuid4(), name="Idle", goal="Daily", category="Health", streak=4))
+
+        self.assertEqual(2, recompute_streaks(self.habit_event_repo, self.habit_repo, batch_size=1))
+        habit = self.habit_repo.get_by_id(self.habit.habit_id)
+        self.assertEqual((1, 3, max(timestamps)), (habit.streak, habit.longest_streak, habit.last_completed))
+        self.assertEqual(0, self.habit_repo.get_by_id(idle.habit_id).streak)
+        self.assertEqual(0, recompute_streaks(self.habit_event_repo, self.habit_repo))
+
+        tracker = StreakTracker.from_repositories(self.habit_event_repo, self.habit_repo)
+        self.assertEqual((1, 3), tracker.streaks(self.habit.habit_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,13 @@ import unittest
 from unittest.mock import MagicMock
 from uuid import uuid4
 from datetime import datetime, timedelta
+from application.domain.analytics.engine import AnalyticsEngine
+from application.domain.analytics.columnar_store import ColumnarEventStore
 from application.domain.services.analytics_service import AnalyticsService
 from application.domain.models.habit import Habit
 from application.domain.models.event import HabitEvent
-from application.domain.models.person import Person
+from application.domain.models.person import Person, Country
+from interfaces.repositories.streaming import project_entities
 
 
 class TestAnalyticsService(unittest.TestCase):
@@ -13,6 +16,13 @@ class TestAnalyticsService(unittest.TestCase):
         self.person_repo = MagicMock()
         self.habit_repo = MagicMock()
         self.habit_event_repo = MagicMock()
+        # Like VersionedRepository's default, the mocks cannot take snapshots
+        for repo, entity_type in ((self.person_repo, Person), (self.habit_repo, Habit), (self.habit_event_repo, HabitEvent)):
+            repo.snapshot.return_value = repo
+            # Like the repository defaults, the streaming reads go through find_all
+            repo.iter_all.side_effect = lambda batch_size=None, repo=repo: iter(repo.find_all())
+            repo.project.side_effect = lambda fields, batch_size=None, repo=repo, entity_type=entity_type: \
+                project_entities(repo.find_all(), entity_type, fields)
         self.analytics = AnalyticsService(
             person_repo=self.person_repo,
             habit_repo=self.habit_repo,
@@ -42,14 +52,14 @@ class TestAnalyticsService(unittest.TestCase):
 
     def test_get_completion_rates(self):
         self.habit_repo.find_by_person_id.return_value = [self.habit]
-        self.habit_event_repo.find_by_habit_id.return_value = [self.event1, self.event2]
+        self.habit_event_repo.find_by_person_id.return_value = [self.event1, self.event2]
         rates = self.analytics.get_completion_rates(self.person_id)
         self.assertIn(str(self.habit_id), rates)
         self.assertAlmostEqual(rates[str(self.habit_id)]["completion_rate"], 50.0)
 
     def test_get_consistency(self):
         self.habit_repo.find_by_person_id.return_value = [self.habit]
-        self.habit_event_repo.find_by_habit_id.return_value = [self.event1, self.event2]
+        self.habit_event_repo.find_by_person_id.return_value = [self.event1, self.event2]
         result = self.analytics.get_consistency(self.person_id)
         self.assertIn("consistency", result)
         self.assertAlmostEqual(result["consistency"], 50.0)
@@ -77,7 +87,7 @@ class TestAnalyticsService(unittest.TestCase):
 
     def test_get_drop_off_rates(self):
         self.habit_repo.find_all.return_value = [self.habit]
-        self.habit_event_repo.find_by_habit_id.return_value = [
+        self.habit_event_repo.find_all.return_value = [
             HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=datetime.now() - timedelta(days=2), status="completed"),
             HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=datetime.now(), status="completed")
         ]
@@ -87,7 +97,7 @@ class TestAnalyticsService(unittest.TestCase):
 
     def test_get_first_week_success(self):
         self.habit_repo.find_all.return_value = [self.habit]
-        self.habit_event_repo.find_by_habit_id.return_value = [
+        self.habit_event_repo.find_all.return_value = [
             HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=datetime.now(), status="completed"),
             HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=datetime.now(), status="missed")
         ]
@@ -106,15 +116,110 @@ class TestAnalyticsService(unittest.TestCase):
         self.assertIn("avg_habits_per_user", metrics)
 
     def test_get_geographic_trends(self):
-        person = MagicMock(person_id=self.person_id, country=MagicMock(value="USA"))
-        self.person_repo.find_all.return_value = [person]
+        person = MagicMock(person_id=self.person_id, country=Country.USA)
+        self.person_repo.find_by_country.side_effect = lambda country: [person] if country == Country.USA else []
         self.habit_repo.find_all.return_value = [self.habit]
-        self.habit_event_repo.find_by_person_id.return_value = [
+        self.habit_event_repo.find_all.return_value = [
             HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=datetime.now(), status="completed")
         ]
         trends = self.analytics.get_geographic_trends()
         self.assertIn("USA", trends)
         self.assertIn("total_habits", trends["USA"])
+        self.assertEqual(trends["USA"]["total_events"], 1)
+        self.assertEqual(trends["USA"]["active_users"], 1)
+        self.person_repo.find_all.assert_not_called()
+
+    def test_get_geographic_trends_breakdowns(self):
+        person = MagicMock(person_id=self.person_id, country=Country.USA)
+        self.person_repo.find_by_country.side_effect = lambda country: [person] if country == Country.USA else []
+        other_habit = Habit(person_id=self.person_id, name="Reading", goal="Daily", category="Personal Development")
+        self.habit_repo.find_all.return_value = [self.habit, other_habit]
+        self.habit_event_repo.find_all.return_value = [
+            self.event1,
+            self.event2,
+            HabitEvent(person_id=self.person_id, habit_id=other_habit.habit_id, timestamp=datetime.now() - timedelta(days=10))
+        ]
+
+        by_category = self.analytics.get_geographic_trends(by_category=True)["USA"]
+        self.assertEqual(by_category["total_habits"], 2)
+        self.assertEqual(by_category["categories"]["Health"], {"total_habits": 1, "total_events": 2, "active_users": 1})
+        self.assertEqual(by_category["categories"]["Personal Development"]["total_events"], 1)
+
+        health = self.analytics.get_geographic_trends(category="Health")["USA"]
+        self.assertEqual((health["total_habits"], health["total_events"]), (1, 2))
+
+        recent = self.analytics.get_geographic_trends(start=(datetime.now() - timedelta(days=2)).date())["USA"]
+        self.assertEqual((recent["total_habits"], recent["total_events"]), (2, 2))
+
+    def test_completion_rates_read_events_once(self):
+        other_habit = Habit(person_id=self.person_id, name="Reading", goal="Daily", category="Personal Development")
+        self.habit_repo.find_all.return_value = [self.habit, other_habit]
+        self.habit_event_repo.find_all.return_value = [
+            self.event1,
+            self.event2,
+            HabitEvent(person_id=self.person_id, habit_id=other_habit.habit_id, status="completed")
+        ]
+        rates = self.analytics.get_completion_rates()
+        self.assertAlmostEqual(rates[str(self.habit_id)]["completion_rate"], 50.0)
+        self.assertAlmostEqual(rates[str(other_habit.habit_id)]["completion_rate"], 100.0)
+        self.habit_event_repo.find_all.assert_called_once()
+        self.habit_event_repo.find_by_habit_id.assert_not_called()
+
+    def test_dashboard_loads_each_repository_once(self):
+        person = MagicMock(person_id=self.person_id, country=Country.USA)
+        self.person_repo.find_all.return_value = [person]
+        self.habit_repo.find_all.return_value = [self.habit]
+        self.habit_event_repo.find_all.return_value = [self.event1, self.event2]
+
+        dashboard = self.analytics.get_dashboard()
+
+        self.assertEqual(dashboard["sections"]["distribution"], {"Health": 1})
+        self.assertEqual(dashboard["sections"]["geographic-trends"]["USA"]["total_events"], 2)
+        self.assertAlmostEqual(dashboard["sections"]["completion-rates"][str(self.habit_id)]["completion_rate"], 50.0)
+        self.assertIn("load", dashboard["timings_ms"])
+        self.assertIn("engagement", dashboard["timings_ms"])
+        self.person_repo.find_all.assert_called_once()
+        self.habit_repo.find_all.assert_called_once()
+        self.habit_event_repo.find_all.assert_called_once()
+        self.person_repo.find_by_country.assert_not_called()
+
+    def test_engine_keeps_only_the_first_week_of_events(self):
+        start = datetime(2024, 1, 1)
+        # Newest first, so that the first week moves back as the events are read
+        events = [
+            HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=start + timedelta(hours=6 * i),
+                       status="completed" if i % 3 else "missed")
+            for i in reversed(range(200))
+        ]
+        expected = [event.status == "completed" for event in events if (event.timestamp - start).days <= 7]
+
+        engine = AnalyticsEngine(iter(events), now=start + timedelta(days=50))
+
+        self.assertLess(len(engine.habit_stats[self.habit_id].first_week), 2 * len(expected))
+        self.assertAlmostEqual(
+            engine.first_week_success([self.habit])[str(self.habit_id)]["success_rate"], sum(expected) / len(expected) * 100
+        )
+        self.assertEqual(engine.active_users(), {"daily": 1, "weekly": 1, "monthly": 1})
+
+    def test_engine_counts_active_users_from_every_event(self):
+        now = datetime(2024, 3, 1, 12)
+        # The latest event of the person is logged ahead: the one of the same day still makes them active today
+        events = [
+            HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=now - timedelta(hours=1)),
+            HabitEvent(person_id=self.person_id, habit_id=self.habit_id, timestamp=now + timedelta(days=2)),
+            HabitEvent(person_id=uuid4(), habit_id=self.habit_id, timestamp=now - timedelta(days=10)),
+        ]
+
+        engine = AnalyticsEngine(iter(events), now=now)
+        store = ColumnarEventStore()
+        store.append(events)
+
+        self.assertEqual(engine.active_users(), {"daily": 1, "weekly": 1, "monthly": 2})
+        self.assertEqual(engine.active_users(), store.active_users(now))
+
+    def test_dashboard_rejects_unknown_sections(self):
+        with self.assertRaises(ValueError):
+            self.analytics.get_dashboard(["distribution", "unknown"])
 
 
 if __name__ == "__main__":
@@ -1,9 +1,11 @@
 import unittest
+from unittest.mock import MagicMock
 from uuid import uuid4
 
 from application.domain.services.habit_service import HabitService
 from application.domain.models.habit import Habit
-from infrastructure.persistence.in_memory import InMemoryHabitRepository
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.in_memory import InMemoryHabitRepository, InMemoryHabitEventRepository
 
 
 class TestHabitService(unittest.TestCase):
@@ -45,4 +47,23 @@ class TestHabitService(unittest.TestCase):
         habit = self.service.create_habit(person_id, "Sleep", "Nightly", "Health")
         deleted = self.service.delete_habit(habit.habit_id)
         self.assertTrue(deleted)
-        self.assertIsNone(self.service.get_habit(habit.habit_id)) 
\ No newline at end of file
+        self.assertIsNone(self.service.get_habit(habit.habit_id)) 
+
+    def test_delete_habit_deletes_its_events_in_one_batch(self):
+        event_repo = InMemoryHabitEventRepository()
+        listener = MagicMock()
+        service = HabitService(habit_repo=self.repo, habit_event_repo=event_repo, listeners=[listener])
+        habit = service.create_habit(uuid4(), "Run", "Daily", "Health")
+        events = [HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id) for _ in range(3)]
+        other = HabitEvent(person_id=habit.person_id, habit_id=uuid4())
+        event_repo.save_many(events + [other])
+        version = event_repo.write_version
+
+        self.assertTrue(service.delete_habit(habit.habit_id))
+
+        self.assertEqual(event_repo.find_all(), [other])
+        self.assertEqual(event_repo.write_version, version + 1)
+        habit_id, deleted = listener.on_habit_events_deleted.call_args.args
+        self.assertEqual(habit_id, habit.habit_id)
+        self.assertCountEqual(deleted, events)
+        listener.on_habit_deleted.assert_called_once()
@@ -72,6 +72,46 @@ class TestPersonService(unittest.TestCase):
         self.assertEqual(result.first_name, "Jane")
         self.assertEqual(result.date_of_birth, date(1992, 2, 2))
 
+    def test_create_persons_in_one_batch(self):
+        fields = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "date_of_birth": date(1990, 1, 1),
+            "email": "john.doe@example.com",
+            "phone_number": "123-456-7890",
+            "address": "123 Main St",
+            "country": Country.USA
+        }
+        version = self.person_repo.write_version
+
+        result = self.person_service.create_persons([fields, {**fields, "first_name": "Jane"}])
+
+        self.assertTrue(result.ok)
+        self.assertEqual([person.first_name for person in result.written], ["John", "Jane"])
+        self.assertCountEqual(self.person_repo.find_all(), result.written)
+        self.assertEqual(self.person_repo.write_version, version + 1)
+
+    def test_create_persons_reports_invalid_items(self):
+        fields = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "date_of_birth": date(1990, 1, 1),
+            "email": "john.doe@example.com",
+            "phone_number": "123-456-7890",
+            "address": "123 Main St",
+            "country": Country.USA
+        }
+        missing_email = {key: value for key, value in fields.items() if key != "email"}
+        batch = [missing_email, fields, {**fields, "person_id": "not a uuid"}, {**fields, "first_name": "Jane"}]
+
+        ordered = self.person_service.create_persons(batch)
+        self.assertEqual((ordered.written, [error.index for error in ordered.errors]), ([], [0]))
+
+        unordered = self.person_service.create_persons(batch, ordered=False)
+        self.assertEqual([person.first_name for person in unordered.written], ["John", "Jane"])
+        self.assertEqual([error.index for error in unordered.errors], [0, 2])
+        self.assertEqual(len(self.person_repo.find_all()), 2)
+
     def test_get_person(self):
         # Arrange
         person_id = uuid4()
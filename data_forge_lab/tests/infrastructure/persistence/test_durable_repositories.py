@@ -0,0 +1,193 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+from uuid import uuid4
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.durable import wal
+from infrastructure.persistence.durable.repositories import (
+    DurablePersonRepository, DurableHabitRepository, DurableHabitEventRepository
+)
+
+
+class OpensAFile:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return open, (self.path, "w")
+
+
+class TestDurableRepositories(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        self.habit_id = uuid4()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reopen(self, repo, **options):
+        repo.close()
+        return DurableHabitEventRepository(self.path, **options)
+
+    def save_events(self, repo, count):
+        return [repo.save(HabitEvent(person_id=uuid4(), habit_id=self.habit_id)) for _ in range(count)]
+
+    def test_writes_survive_a_restart(self):
+        repo = DurableHabitEventRepository(self.path)
+        kept, deleted, updated = self.save_events(repo, 3)
+        repo.delete(deleted.event_id)
+        updated.complete()
+        repo.save(updated)
+
+        repo = self.reopen(repo)
+
+        self.assertEqual({event.event_id for event in repo.find_all()}, {kept.event_id, updated.event_id})
+        self.assertEqual(repo.get_by_id(updated.event_id).status, "completed")
+        self.assertEqual(repo.find_by_status("completed"), [updated])
+        self.assertEqual(len(repo.find_by_habit_id(self.habit_id)), 2)
+
+    def test_batches_survive_a_restart(self):
+        repo = DurableHabitEventRepository(self.path)
+        events = [HabitEvent(person_id=uuid4(), habit_id=self.habit_id) for _ in range(10)]
+        repo.save_many(events)
+        repo.delete_many([event.event_id for event in events[:3]])
+
+        repo = self.reopen(repo)
+
+        self.assertCountEqual(repo.find_by_habit_id(self.habit_id), events[3:])
+        self.assertCountEqual(repo.delete_by_habit_id(self.habit_id), events[3:])
+        self.assertEqual(self.reopen(repo).find_all(), [])
+
+    def test_checkpoint_replaces_the_log_covered_by_the_snapshot(self):
+        repo = DurableHabitEventRepository(self.path)
+        events = self.save_events(repo, 5)
+        self.assertEqual(repo.checkpoint(), 5)
+        repo.delete(events[0].event_id)
+        tail = self.save_events(repo, 2)
+
+        self.assertEqual(repo.log.segments(), [repo.log.segment])
+        repo = self.reopen(repo)
+
+        self.assertEqual({event.event_id for event in repo.find_all()}, {event.event_id for event in events[1:] + tail})
+
+    def test_snapshots_are_written_periodically(self):
+        repo = DurableHabitEventRepository(self.path, snapshot_every=10)
+        events = self.save_events(repo, 25)
+
+        deadline = time.monotonic() + 5
+        while repo._snapshot_segment < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists(repo.snapshot_path))
+
+        repo = self.reopen(repo, snapshot_every=10)
+        self.assertEqual(len(repo.find_all()), len(events))
+
+    def test_torn_tail_is_dropped(self):
+        repo = DurableHabitEventRepository(self.path)
+        events = self.save_events(repo, 3)
+        repo.close()
+        segment = repo.log._path(repo.log.segment)
+        with open(segment, "r+b") as file:
+            file.truncate(os.path.getsize(segment) - 5)
+
+        with self.assertLogs("data_forge_lab", level="WARNING"):
+            repo = DurableHabitEventRepository(self.path)
+
+        self.assertEqual({event.event_id for event in repo.find_all()}, {event.event_id for event in events[:2]})
+        repo.save(events[2])
+        repo = self.reopen(repo)
+        self.assertEqual(len(repo.find_all()), 3)
+
+    def test_records_of_every_kind_survive_a_restart(self):
+        persons = DurablePersonRepository(self.path)
+        person = persons.save(Person(first_name="Ada", last_name="Lovelace", date_of_birth=date(1990, 1, 1),
+                                     email="ada@example.com", phone_number="0", address="", country=Country.UK))
+        persons.checkpoint()
+        habits = DurableHabitRepository(self.path)
+        habit = habits.save(Habit(person_id=person.person_id, name="Read", goal="Daily", category="Health",
+                                  created_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+
+        persons.close()
+        habits.close()
+
+        self.assertEqual(DurablePersonRepository(self.path).get_by_id(person.person_id), person)
+        self.assertEqual(DurableHabitRepository(self.path).get_by_id(habit.habit_id), habit)
+
+    def test_data_cannot_reference_other_globals(self):
+        marker = os.path.join(self.path, "marker")
+        repo = DurableHabitEventRepository(self.path)
+        self.save_events(repo, 1)
+        repo.log.append(pickle.dumps((1, OpensAFile(marker))))
+        repo.log.sync(repo.log._appended)
+
+        with self.assertRaises(pickle.UnpicklingError):
+            self.reopen(repo)
+        self.assertFalse(os.path.exists(marker))
+
+        repo.log.remove_through(repo.log.segment)
+        with open(os.path.join(self.path, "habit_events.snapshot"), "wb") as file:
+            file.write(b"DFLSNAP2" + pickle.dumps((1, [(1, OpensAFile(marker))])))
+        with self.assertRaises(pickle.UnpicklingError):
+            DurableHabitEventRepository(self.path)
+        self.assertFalse(os.path.exists(marker))
+
+    def test_writes_the_log_did_not_take_are_taken_back(self):
+        repo = DurableHabitEventRepository(self.path)
+        kept = self.save_events(repo, 1)[0]
+        version = repo.write_version
+
+        for failing in ("append", "sync"):
+            with self.subTest(failing=failing):
+                event = HabitEvent(person_id=uuid4(), habit_id=self.habit_id)
+                with patch.object(repo.log, failing, side_effect=OSError(28, "No space left on device")):
+                    with self.assertRaises(OSError):
+                        repo.save(event)
+                self.assertIsNone(repo.get_by_id(event.event_id))
+                self.assertEqual(repo.find_by_habit_id(self.habit_id), [kept])
+                self.assertGreater(repo.write_version, version)
+                # The log may hold part of the record: nothing more is appended after it
+                with self.assertRaises(RuntimeError):
+                    repo.save(HabitEvent(person_id=uuid4(), habit_id=self.habit_id))
+                repo = self.reopen(repo)
+                if failing == "append":
+                    self.assertEqual(repo.find_all(), [kept])
+                else:
+                    # The record reached the file, a failed fsync does not tell whether it is durable
+                    self.assertIn(kept, repo.find_all())
+
+    def test_concurrent_writers_share_fsyncs(self):
+        repo = DurableHabitRepository(self.path)
+        fsyncs = []
+
+        def counted_fsync(fd):
+            fsyncs.append(fd)
+            time.sleep(0.002)
+
+        def write():
+            for _ in range(50):
+                repo.save(Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health"))
+
+        with patch.object(wal.os, "fsync", counted_fsync):
+            threads = [threading.Thread(target=write) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(repo.find_all()), 400)
+        self.assertLess(len(fsyncs), 400)
+        repo.close()
+        self.assertEqual(len(DurableHabitRepository(self.path).find_all()), 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
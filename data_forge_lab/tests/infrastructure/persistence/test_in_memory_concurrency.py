@@ -0,0 +1,108 @@
+import random
+import sys
+import threading
+import unittest
+from uuid import uuid4
+
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+
+
+class TestInMemoryConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.analytics = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+        self.person_ids = [uuid4() for _ in range(20)]
+        self.habits = [
+            self.habit_repo.save(Habit(person_id=random.choice(self.person_ids), name=f"Habit {i}", goal="Daily", category="Health"))
+            for i in range(50)
+        ]
+
+        # Switch threads as often as possible to surface races
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def run_concurrently(self, *workers):
+        errors = []
+
+        def guarded(worker):
+            try:
+                worker()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=guarded, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def writer(self, seed):
+        def write():
+            rng = random.Random(seed)
+            saved = []
+            for _ in range(1500):
+                action = rng.random()
+                if action < 0.6 or not saved:
+                    habit = rng.choice(self.habits)
+                    saved.append(self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id)))
+                elif action < 0.8:
+                    event = rng.choice(saved)
+                    event.habit_id = rng.choice(self.habits).habit_id
+                    event.complete()
+                    self.habit_event_repo.save(event)
+                else:
+                    self.habit_event_repo.delete(saved.pop(rng.randrange(len(saved))).event_id)
+                if action < 0.05:
+                    habit = rng.choice(self.habits)
+                    habit.person_id = rng.choice(self.person_ids)
+                    self.habit_repo.save(habit)
+        return write
+
+    def reader(self):
+        for _ in range(30):
+            self.analytics.get_completion_rates()
+            self.analytics.get_time_of_day_heatmap()
+            self.analytics.get_engagement_metrics()
+            for person_id in self.person_ids[:5]:
+                self.analytics.get_completion_rates(person_id)
+                self.habit_event_repo.find_by_person_id(person_id)
+            self.habit_event_repo.find_by_status("completed")
+
+    def snapshot_reader(self):
+        # Queries on one point-in-time view agree with each other while the writers go on
+        for _ in range(30):
+            analytics = self.analytics.point_in_time()
+            events = analytics.habit_event_repo.find_all()
+            by_status = sum(len(analytics.habit_event_repo.find_by_status(status)) for status in ("pending", "completed"))
+            self.assertEqual(by_status, len(events))
+
+    def assertIndexesMatchStorage(self, repo):
+        for index in repo.indexes:
+            expected = {}
+            for entity_id, entity in repo.storage.items():
+                expected.setdefault(index.key(entity), set()).add(entity_id)
+            # Sorted indexes key their buckets by position, which carries the id
+            self.assertEqual(
+                {value: {getattr(key, "entity_id", key) for key in keys} for value, keys in repo.buckets(index).items()},
+                expected
+            )
+
+    def test_concurrent_writers_and_analytics_readers(self):
+        errors = self.run_concurrently(*(self.writer(seed) for seed in range(4)), self.reader, self.reader, self.snapshot_reader)
+
+        self.assertEqual(errors, [])
+        self.assertIndexesMatchStorage(self.habit_event_repo)
+        self.assertIndexesMatchStorage(self.habit_repo)
+
+
+if __name__ == "__main__":
+    unittest.main()
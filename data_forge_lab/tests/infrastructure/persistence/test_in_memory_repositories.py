@@ -0,0 +1,321 @@
+import unittest
+from datetime import date, datetime, timedelta
+from random import Random
+from unittest.mock import patch
+from uuid import uuid4
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.habit_service import HabitService
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+from infrastructure.persistence.records import HabitRecord
+
+
+class TestInMemoryIndexes(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.person_id, self.other_person_id = uuid4(), uuid4()
+        self.habit_id, self.other_habit_id = uuid4(), uuid4()
+
+    def test_event_lookups_use_the_indexes(self):
+        events = [
+            HabitEvent(person_id=self.person_id, habit_id=self.habit_id, status="completed"),
+            HabitEvent(person_id=self.person_id, habit_id=self.other_habit_id, status="missed"),
+            HabitEvent(person_id=self.other_person_id, habit_id=self.habit_id, status="completed"),
+        ]
+        for event in events:
+            self.habit_event_repo.save(event)
+
+        self.assertCountEqual(self.habit_event_repo.find_by_habit_id(self.habit_id), [events[0], events[2]])
+        self.assertCountEqual(self.habit_event_repo.find_by_person_id(self.person_id), events[:2])
+        self.assertCountEqual(self.habit_event_repo.find_by_status("completed"), [events[0], events[2]])
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(uuid4()), [])
+
+    def test_indexes_follow_in_place_key_changes(self):
+        event = self.habit_event_repo.save(HabitEvent(person_id=self.person_id, habit_id=self.habit_id))
+
+        # The services mutate the stored entity before saving it again
+        stored = self.habit_event_repo.get_by_id(event.event_id)
+        stored.habit_id = self.other_habit_id
+        stored.complete()
+        self.habit_event_repo.save(stored)
+
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(self.habit_id), [])
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(self.other_habit_id), [stored])
+        self.assertEqual(self.habit_event_repo.find_by_status("pending"), [])
+        self.assertEqual(self.habit_event_repo.find_by_status("completed"), [stored])
+
+    def test_delete_removes_index_entries(self):
+        event = self.habit_event_repo.save(HabitEvent(person_id=self.person_id, habit_id=self.habit_id))
+        habit = self.habit_repo.save(Habit(person_id=self.person_id, name="Exercise", goal="Daily", category="Health"))
+
+        self.assertTrue(self.habit_event_repo.delete(event.event_id))
+        self.assertTrue(self.habit_repo.delete(habit.habit_id))
+
+        self.assertEqual(self.habit_event_repo.find_by_person_id(self.person_id), [])
+        self.assertEqual(self.habit_event_repo.find_by_status("pending"), [])
+        self.assertEqual(self.habit_repo.find_by_person_id(self.person_id), [])
+        self.assertEqual(len(self.habit_event_repo.buckets(self.habit_event_repo.by_person)), 0)
+
+    def test_habit_and_person_indexes(self):
+        habit = self.habit_repo.save(Habit(person_id=self.person_id, name="Exercise", goal="Daily", category="Health"))
+        habit.person_id = self.other_person_id
+        self.habit_repo.save(habit)
+        self.assertEqual(self.habit_repo.find_by_person_id(self.person_id), [])
+        self.assertEqual(self.habit_repo.find_by_person_id(self.other_person_id), [habit])
+
+        person = self.person_repo.save(Person(
+            first_name="Ada", last_name="Lovelace", date_of_birth=date(1990, 1, 1), email="ada@example.com",
+            phone_number="000", address="Street", country=Country.UK
+        ))
+        person.update_details(country=Country.FRANCE)
+        self.person_repo.save(person)
+        self.assertEqual(self.person_repo.find_by_country(Country.UK), [])
+        self.assertEqual(self.person_repo.find_by_country(Country.FRANCE), [person])
+
+    def test_field_updates_return_the_previous_entity(self):
+        event = self.habit_event_repo.save(HabitEvent(person_id=self.person_id, habit_id=uuid4(), status="pending"))
+
+        previous = self.habit_event_repo.update_fields(event.event_id, {"status": "completed"})
+        self.assertEqual(previous.status, "pending")
+        self.assertEqual(self.habit_event_repo.get_by_id(event.event_id).status, "completed")
+        self.assertEqual(self.habit_event_repo.find_by_status("pending"), [])
+        self.assertIsNone(self.habit_event_repo.update_fields(uuid4(), {"status": "missed"}))
+
+    def test_compare_and_set_retries_completions_on_concurrent_writes(self):
+        habit = self.habit_repo.save(Habit(person_id=self.person_id, name="Read", goal="Daily", category="Health"))
+        self.assertFalse(self.habit_repo.compare_and_set(habit.habit_id, {"streak": 3}, {"streak": 4}))
+
+        # Another completion of the same day lands between the read of the habit and its compare-and-set
+        get_by_id, reads = self.habit_repo.get_by_id, []
+
+        def racing_get_by_id(habit_id):
+            read = get_by_id(habit_id)
+            if not reads:
+                reads.append(read)
+                self.habit_repo.record_completion(habit_id, datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 12))
+            return read
+
+        self.habit_repo.get_by_id = racing_get_by_id
+        updated = self.habit_repo.record_completion(habit.habit_id, datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 8))
+
+        self.assertEqual((updated.streak, updated.last_completed), (1, datetime(2024, 1, 1, 12)))
+        self.assertEqual(self.habit_repo.get_by_id(habit.habit_id), updated)
+
+    def test_field_updates_keep_concurrent_completions(self):
+        habit = self.habit_repo.save(Habit(person_id=self.person_id, name="Read", goal="Daily", category="Health"))
+        completed_at = datetime(2024, 1, 1, 8)
+
+        # A completion lands between the read of the habit and the write of its new goal
+        materialize, reads = HabitRecord.materialize, []
+
+        def racing_materialize(record):
+            reads.append(record)
+            if len(reads) == 1:
+                self.habit_repo.record_completion(habit.habit_id, completed_at, completed_at)
+            return materialize(record)
+
+        with patch.object(HabitRecord, "materialize", racing_materialize):
+            HabitService(self.habit_repo).update_habit(habit.habit_id, goal="Weekly")
+
+        stored = self.habit_repo.get_by_id(habit.habit_id)
+        self.assertEqual((stored.goal, stored.streak, stored.last_completed), ("Weekly", 1, completed_at))
+
+
+class TestInMemoryBatches(unittest.TestCase):
+    def setUp(self):
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.habit_id = uuid4()
+
+    def new_events(self, count):
+        return [HabitEvent(person_id=uuid4(), habit_id=self.habit_id) for _ in range(count)]
+
+    def test_save_many_publishes_one_version(self):
+        events = self.new_events(50)
+        version = self.habit_event_repo.write_version
+
+        result = self.habit_event_repo.save_many(events)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.written, events)
+        self.assertEqual(self.habit_event_repo.write_version, version + 1)
+        self.assertCountEqual(self.habit_event_repo.find_by_habit_id(self.habit_id), events)
+
+    def test_ordered_batches_stop_at_the_first_invalid_item(self):
+        first, second, third = self.new_events(3)
+
+        result = self.habit_event_repo.save_many([first, None, second, "not an event", third])
+
+        self.assertEqual(result.written, [first])
+        self.assertEqual([error.index for error in result.errors], [1])
+        self.assertEqual(self.habit_event_repo.find_all(), [first])
+
+    def test_unordered_batches_write_every_valid_item(self):
+        first, second, third = self.new_events(3)
+
+        result = self.habit_event_repo.save_many([first, None, second, "not an event", third], ordered=False)
+
+        self.assertEqual(result.written, [first, second, third])
+        self.assertEqual([error.index for error in result.errors], [1, 3])
+        self.assertCountEqual(self.habit_event_repo.find_all(), [first, second, third])
+
+    def test_delete_many_and_delete_by_habit_id(self):
+        events = self.new_events(4)
+        other = HabitEvent(person_id=uuid4(), habit_id=uuid4())
+        self.habit_event_repo.save_many(events + [other])
+        version = self.habit_event_repo.write_version
+
+        self.assertEqual(self.habit_event_repo.delete_many([events[0].event_id, uuid4()]), 1)
+        self.assertCountEqual(self.habit_event_repo.delete_by_habit_id(self.habit_id), events[1:])
+
+        self.assertEqual(self.habit_event_repo.write_version, version + 2)
+        self.assertEqual(self.habit_event_repo.find_all(), [other])
+        self.assertEqual(self.habit_event_repo.find_by_status("pending"), [other])
+        self.assertEqual(self.habit_event_repo.delete_by_habit_id(self.habit_id), [])
+
+
+class TestInMemoryStreaming(unittest.TestCase):
+    def setUp(self):
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+
+    def test_iter_all_streams_every_entity(self):
+        events = [HabitEvent(person_id=uuid4(), habit_id=uuid4()) for _ in range(20)]
+        self.habit_event_repo.save_many(events)
+
+        stream = self.habit_event_repo.iter_all(batch_size=3)
+
+        self.assertNotIsInstance(stream, list)
+        self.assertCountEqual(list(stream), events)
+
+    def test_projections_decode_the_stored_values(self):
+        person = self.person_repo.save(Person(
+            first_name="Ada", last_name="Lovelace", date_of_birth=date(1815, 12, 10), email="ada@example.com",
+            phone_number="+44", address="London", country=Country.UK, notification_preferences={"email": True}
+        ))
+        event = self.habit_event_repo.save(HabitEvent(person_id=person.person_id, habit_id=uuid4(), status="completed"))
+
+        [person_row] = self.person_repo.project(("person_id", "date_of_birth", "country", "notification_preferences"))
+        [event_row] = self.habit_event_repo.project(("habit_id", "status", "timestamp"))
+
+        self.assertEqual(person_row, (person.person_id, person.date_of_birth, Country.UK, {"email": True}))
+        self.assertEqual((event_row.habit_id, event_row.status, event_row.timestamp), (event.habit_id, "completed", event.timestamp))
+
+    def test_projections_reject_unknown_fields(self):
+        for fields in ((), ("status", "duration")):
+            with self.subTest(fields=fields):
+                with self.assertRaises(ValueError):
+                    self.habit_event_repo.project(fields)
+
+
+class TestInMemoryPages(unittest.TestCase):
+    def setUp(self):
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.habit_id = uuid4()
+        rng, start = Random(7), datetime(2024, 1, 1)
+        # Few distinct timestamps, so that pages break between events sharing one
+        self.events = [
+            HabitEvent(person_id=uuid4(), habit_id=self.habit_id, timestamp=start + timedelta(hours=rng.randrange(20)))
+            for _ in range(100)
+        ]
+        self.habit_event_repo.save_many(self.events + [HabitEvent(person_id=uuid4(), habit_id=uuid4())])
+
+    def read_pages(self, repo, limit):
+        events, cursor = [], None
+        while True:
+            page = repo.find_page_by_habit_id(self.habit_id, limit, cursor)
+            self.assertLessEqual(len(page.items), limit)
+            events += page.items
+            cursor = page.next_cursor
+            if cursor is None:
+                return events
+
+    def expected(self):
+        return sorted(self.events, key=lambda event: (event.timestamp, event.event_id))
+
+    def test_pages_follow_timestamp_then_id_order(self):
+        for limit in (1, 7, 100, 1000):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.read_pages(self.habit_event_repo, limit), self.expected())
+
+    def test_pages_follow_updates_deletes_and_bulk_loads(self):
+        moved, deleted = self.events[0], self.events.pop(1)
+        moved.timestamp -= timedelta(days=1)
+        self.habit_event_repo.save(moved)
+        self.habit_event_repo.delete(deleted.event_id)
+        self.assertEqual(self.read_pages(self.habit_event_repo, 9), self.expected())
+
+        loaded = InMemoryHabitEventRepository()
+        loaded._load(map(loaded._encode, self.habit_event_repo.find_all()))
+        self.assertEqual(self.read_pages(loaded, 9), self.expected())
+
+    def test_habit_and_person_pages(self):
+        person_id, start = uuid4(), datetime(2024, 1, 1)
+        habits = [Habit(person_id=person_id, name=f"Habit {i}", goal="Daily", category="Health",
+                        created_at=start + timedelta(days=i % 2)) for i in range(5)]
+        habit_repo = InMemoryHabitRepository()
+        habit_repo.save_many(habits)
+
+        first = habit_repo.find_page_by_person_id(person_id, 3)
+        second = habit_repo.find_page_by_person_id(person_id, 3, first.next_cursor)
+
+        self.assertEqual(first.items + second.items, sorted(habits, key=lambda habit: (habit.created_at, habit.habit_id)))
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(InMemoryPersonRepository().find_page(10).items, [])
+
+    def test_unpaginated_lists_follow_the_page_order(self):
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(self.habit_id), self.expected())
+
+        person_id, start = uuid4(), date(2024, 1, 1)
+        persons = [Person(first_name="Ada", last_name=str(i), date_of_birth=date(1990, 1, 1), email=f"{i}@example.com",
+                          phone_number="0", address="", creation_date=start + timedelta(days=i % 7)) for i in range(20)]
+        habits = [Habit(person_id=person_id, name=f"Habit {i}", goal="Daily", category="Health",
+                        created_at=datetime(2024, 1, 1) + timedelta(days=i % 3)) for i in range(10)]
+        person_repo, habit_repo = InMemoryPersonRepository(), InMemoryHabitRepository()
+        person_repo.save_many(persons)
+        habit_repo.save_many(habits)
+
+        self.assertEqual(person_repo.find_all(), person_repo.find_page(100).items)
+        self.assertEqual(habit_repo.find_by_person_id(person_id), habit_repo.find_page_by_person_id(person_id, 100).items)
+
+
+class TestInMemorySnapshots(unittest.TestCase):
+    def setUp(self):
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.habit_id = uuid4()
+        self.event = self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=self.habit_id))
+
+    def test_snapshot_is_isolated_from_later_writes(self):
+        snapshot = self.habit_event_repo.snapshot()
+
+        updated = self.habit_event_repo.get_by_id(self.event.event_id)
+        updated.complete()
+        self.habit_event_repo.save(updated)
+        self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=self.habit_id))
+
+        self.assertEqual(len(self.habit_event_repo.find_by_habit_id(self.habit_id)), 2)
+        self.assertEqual(snapshot.find_by_habit_id(self.habit_id), [self.event])
+        self.assertEqual(snapshot.get_by_id(self.event.event_id).status, "pending")
+        self.assertEqual(snapshot.find_by_status("completed"), [])
+        self.assertEqual(snapshot.write_version + 2, self.habit_event_repo.write_version)
+
+    def test_in_place_changes_do_not_leak_into_storage(self):
+        snapshot = self.habit_event_repo.snapshot()
+        self.event.complete()
+        self.habit_event_repo.get_by_id(self.event.event_id).complete()
+
+        self.assertEqual(self.habit_event_repo.find_all()[0].status, "pending")
+        self.assertEqual(snapshot.find_all()[0].status, "pending")
+
+    def test_snapshots_are_read_only(self):
+        snapshot = self.habit_event_repo.snapshot()
+        with self.assertRaises(RuntimeError):
+            snapshot.delete(self.event.event_id)
+        self.assertIsNotNone(self.habit_event_repo.get_by_id(self.event.event_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
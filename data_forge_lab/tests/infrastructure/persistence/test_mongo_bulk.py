@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+
+
+def write_error(index: int) -> dict:
+    return {"index": index, "code": 11000, "errmsg": f"E11000 duplicate key error at {index}"}
+
+
+class TestMongoBulkWrites(unittest.TestCase):
+    def setUp(self):
+        self.collection = MagicMock()
+        self.repo = MongoHabitEventRepository(self.collection)
+        self.events = [HabitEvent(person_id=uuid4(), habit_id=uuid4()) for _ in range(4)]
+
+    def test_save_many_sends_one_bulk_write(self):
+        result = self.repo.save_many(self.events, ordered=False)
+
+        self.assertTrue(result.ok)
+        self.collection.bulk_write.assert_called_once()
+        requests = self.collection.bulk_write.call_args.args[0]
+        self.assertEqual(len(requests), 4)
+        self.assertIsInstance(requests[0], UpdateOne)
+        self.assertEqual(self.collection.bulk_write.call_args.kwargs, {"ordered": False})
+
+    def test_server_errors_are_reported_at_their_position_in_the_batch(self):
+        self.collection.bulk_write.side_effect = BulkWriteError({"writeErrors": [write_error(1)]})
+
+        ordered = self.repo.save_many(self.events[:3])
+        self.assertEqual(ordered.written, [self.events[0]])
+        self.assertEqual([error.index for error in ordered.errors], [1])
+
+        # None is rejected before the bulk write, which only holds the three events: the server's index 1 is item 2
+        batch = [self.events[0], None, self.events[1], self.events[2]]
+        unordered = self.repo.save_many(batch, ordered=False)
+        self.assertEqual(unordered.written, [self.events[0], self.events[2]])
+        self.assertEqual([error.index for error in unordered.errors], [1, 2])
+        self.assertIn("E11000", unordered.errors[1].error)
+
+    def test_delete_by_habit_id_deletes_the_events_found(self):
+        self.collection.find.return_value = [self.repo._to_dict(event) for event in self.events]
+
+        self.assertEqual(self.repo.delete_by_habit_id(uuid4()), self.events)
+        self.collection.delete_many.assert_called_once_with(
+            {"event_id": {"$in": [event.event_id for event in self.events]}}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+from uuid import UUID, uuid4
+
+import bson
+from bson.codec_options import CodecOptions
+
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from infrastructure.config.mongo_config import CLIENT_OPTIONS
+from infrastructure.persistence.mongodb.habit import MongoHabitRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+
+CODEC_OPTIONS = CodecOptions(uuid_representation=bson.binary.UuidRepresentation.STANDARD)
+
+
+def through_bson(document: dict) -> dict:
+    return bson.decode(bson.encode(document, codec_options=CODEC_OPTIONS), codec_options=CODEC_OPTIONS)
+
+
+class TestMongoDocuments(unittest.TestCase):
+    def test_ids_and_timestamps_use_native_bson_types(self):
+        repo = MongoHabitEventRepository(MagicMock())
+        event = HabitEvent(person_id=uuid4(), habit_id=uuid4(), timestamp=datetime(2024, 5, 1, 7, 30, 15, 123456))
+
+        document = repo._to_dict(event)
+        encoded = bson.encode(document, codec_options=CODEC_OPTIONS)
+
+        self.assertEqual(bson.decode(encoded)["event_id"].subtype, bson.binary.UUID_SUBTYPE)
+        self.assertLess(len(encoded), len(bson.encode(event.to_dict())))
+        # BSON datetimes keep milliseconds
+        restored = repo._from_dict(through_bson(document))
+        self.assertEqual(restored.timestamp, datetime(2024, 5, 1, 7, 30, 15, 123000))
+        self.assertEqual((restored.event_id, restored.person_id, restored.habit_id), (event.event_id, event.person_id, event.habit_id))
+
+    def test_habits_round_trip(self):
+        repo = MongoHabitRepository(MagicMock())
+        habit = Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health", created_at=datetime(2024, 1, 2, 3, 4, 5))
+
+        self.assertEqual(repo._from_dict(through_bson(repo._to_dict(habit))), habit)
+
+    def test_lookups_filter_on_binary_uuids(self):
+        repo = MongoHabitEventRepository(MagicMock())
+        habit_id = uuid4()
+        repo.find_by_habit_id(habit_id)
+
+        repo.collection.find.assert_called_once_with({"habit_id": habit_id})
+        self.assertEqual(CLIENT_OPTIONS["uuidRepresentation"], "standard")
+        self.assertIsInstance(repo.index_queries[0]["event_id"], UUID)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pymongo.errors import OperationFailure
+
+from infrastructure.persistence.mongodb.habit import MongoHabitRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.indexes import MongoIndexManager, QueryPlanError, plan_stages
+
+
+def explained(stage: str) -> dict:
+    return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": stage}}}}
+
+
+class TestMongoIndexManager(unittest.TestCase):
+    def setUp(self):
+        self.habit_repo = MongoHabitRepository(MagicMock())
+        self.habit_repo.collection.name = "habits"
+        self.habit_repo.collection.create_indexes.side_effect = lambda indexes: [index.document["name"] for index in indexes]
+        self.habit_event_repo = MongoHabitEventRepository(MagicMock())
+        self.habit_event_repo.collection.name = "habit_events"
+        self.habit_event_repo.collection.create_indexes.side_effect = lambda indexes: [index.document["name"] for index in indexes]
+        self.manager = MongoIndexManager([self.habit_repo, self.habit_event_repo, object()])
+
+    def test_declared_indexes(self):
+        self.assertEqual(self.manager.ensure_indexes(), {
+            "habits": ["habit_id_1", "person_id_1_name_1", "person_id_1_created_at_1_habit_id_1"],
+            "habit_events": ["event_id_1", "habit_id_1_timestamp_1_event_id_1", "person_id_1_timestamp_1", "status_1"],
+        })
+        self.assertTrue(self.habit_repo.indexes[0].document["unique"])
+
+    def test_conflicting_indexes_do_not_block_the_others(self):
+        self.habit_repo.collection.create_indexes.side_effect = [
+            OperationFailure("IndexOptionsConflict"), ["person_id_1_name_1"], ["person_id_1_created_at_1_habit_id_1"]
+        ]
+
+        self.assertEqual(self.manager.ensure_indexes()["habits"], ["person_id_1_name_1", "person_id_1_created_at_1_habit_id_1"])
+
+    def test_collection_scans_fail_the_query_plan_check(self):
+        self.habit_repo.collection.find.return_value.explain.return_value = explained("IXSCAN")
+        self.habit_event_repo.collection.find.return_value.explain.return_value = explained("IXSCAN")
+        self.manager.check_query_plans()
+
+        self.habit_event_repo.collection.find.return_value.explain.return_value = explained("COLLSCAN")
+        self.assertEqual(len(self.manager.collection_scans()), len(self.habit_event_repo.index_queries))
+        with self.assertRaises(QueryPlanError):
+            self.manager.check_query_plans()
+
+    def test_plan_stages_walks_every_plan_shape(self):
+        plan = {"queryPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+        self.assertEqual(list(plan_stages(plan)), ["OR", "IXSCAN", "COLLSCAN"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from pymongo import ASCENDING
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.person import Person
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.person import MongoPersonRepository
+from interfaces.repositories.pagination import decode_cursor
+
+
+class TestMongoPages(unittest.TestCase):
+    def setUp(self):
+        self.repo = MongoHabitEventRepository(MagicMock())
+        self.habit_id = uuid4()
+        start = datetime(2024, 1, 1)
+        self.events = [
+            HabitEvent(person_id=uuid4(), habit_id=self.habit_id, timestamp=start + timedelta(hours=i)) for i in range(3)
+        ]
+        documents = [self.repo._to_dict(event) for event in self.events]
+        self.repo.collection.find.return_value.sort.return_value.limit.return_value = documents
+
+    def test_first_page_reads_one_more_document_than_the_limit(self):
+        page = self.repo.find_page_by_habit_id(self.habit_id, 2)
+
+        self.assertEqual(page.items, self.events[:2])
+        self.assertEqual(decode_cursor(page.next_cursor), (self.events[1].timestamp, self.events[1].event_id))
+        self.repo.collection.find.assert_called_once_with({"habit_id": self.habit_id})
+        self.repo.collection.find.return_value.sort.assert_called_once_with([("timestamp", ASCENDING), ("event_id", ASCENDING)])
+        self.repo.collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+    def test_next_pages_seek_after_the_cursor(self):
+        cursor = self.repo.find_page_by_habit_id(self.habit_id, 2).next_cursor
+        timestamp, event_id = self.events[1].timestamp, self.events[1].event_id
+
+        self.repo.find_page_by_habit_id(self.habit_id, 2, cursor)
+
+        self.assertEqual(self.repo.collection.find.call_args.args[0], {
+            "habit_id": self.habit_id,
+            "timestamp": {"$gte": timestamp},
+            "$or": [{"timestamp": {"$gt": timestamp}}, {"event_id": {"$gt": event_id}}],
+        })
+
+    def test_person_pages_seek_on_iso_dates(self):
+        repo = MongoPersonRepository(MagicMock())
+        person = Person(first_name="Ada", last_name="Lovelace", date_of_birth=date(1815, 12, 10), email="ada@example.com",
+                        phone_number="+44", address="London", creation_date=date(2024, 3, 1))
+        repo.collection.find.return_value.sort.return_value.limit.return_value = [repo._to_dict(person)] * 2
+
+        page = repo.find_page(1)
+        repo.find_page(1, page.next_cursor)
+
+        query = repo.collection.find.call_args.args[0]
+        self.assertEqual(query["creation_date"], {"$gte": "2024-03-01"})
+        self.assertEqual(query["$or"][1], {"person_id": {"$gt": person.person_id}})
+
+    def test_invalid_pages_are_rejected(self):
+        for limit, cursor in ((0, None), (1001, None), (10, "not a cursor")):
+            with self.subTest(limit=limit, cursor=cursor):
+                with self.assertRaises(ValueError):
+                    self.repo.find_page_by_habit_id(self.habit_id, limit, cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from pymongo import ReturnDocument
+
+from application.domain.models.event import HabitEvent
+from application.domain.models.habit import Habit
+from application.domain.models.person import Person, Country
+from application.domain.services.habit_event_service import HabitEventService
+from infrastructure.persistence.mongodb.habit import MongoHabitRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.person import MongoPersonRepository
+
+
+class TestMongoUpdates(unittest.TestCase):
+    def setUp(self):
+        self.person = Person(
+            first_name="Ada", last_name="Lovelace", date_of_birth=date(1990, 1, 1), email="ada@example.com",
+            phone_number="000", address="Street", country=Country.UK
+        )
+        self.event = HabitEvent(person_id=uuid4(), habit_id=uuid4(), timestamp=datetime(2024, 5, 1, 7), notes="A")
+
+    def test_person_save_is_a_single_upsert(self):
+        collection = MagicMock()
+        MongoPersonRepository(collection).save(self.person)
+
+        collection.replace_one.assert_called_once()
+        self.assertEqual(collection.replace_one.call_args.args[0], {"person_id": self.person.person_id})
+        self.assertEqual(collection.replace_one.call_args.kwargs, {"upsert": True})
+        collection.find_one.assert_not_called()
+        collection.insert_one.assert_not_called()
+
+    def test_updates_set_only_the_encoded_changes(self):
+        collection = MagicMock()
+        repo = MongoPersonRepository(collection)
+        collection.find_one_and_update.return_value = repo._to_dict(self.person)
+
+        changes = {"country": Country.FRANCE, "last_updated": date(2024, 5, 2)}
+        previous = repo.update_fields(self.person.person_id, changes)
+
+        self.assertEqual(previous, self.person)
+        collection.find_one_and_update.assert_called_once_with(
+            {"person_id": self.person.person_id},
+            {"$set": {"country": "France", "last_updated": "2024-05-02"}},
+            return_document=ReturnDocument.BEFORE
+        )
+        self.assertEqual(repo.write_version, 1)
+
+    def test_updating_a_missing_entity_writes_nothing(self):
+        collection = MagicMock()
+        collection.find_one_and_update.return_value = None
+        repo = MongoHabitEventRepository(collection)
+
+        self.assertIsNone(repo.update_fields(uuid4(), {"notes": "B"}))
+        self.assertEqual(repo.write_version, 0)
+
+    def test_completions_update_the_streak_on_the_server(self):
+        collection = MagicMock()
+        repo = MongoHabitRepository(collection)
+        habit = Habit(person_id=uuid4(), name="Read", goal="Daily", category="Health", streak=2)
+        collection.find_one_and_update.return_value = repo._to_dict(habit)
+        service = HabitEventService(MongoHabitEventRepository(MagicMock()), MagicMock(), habit_repo=repo)
+
+        service.create_habit_event(habit.person_id, habit.habit_id, timestamp=datetime(2024, 5, 1, 7))
+
+        # A single pipeline update, the habit is neither read first nor written back whole
+        collection.find_one_and_update.assert_called_once()
+        query, pipeline = collection.find_one_and_update.call_args.args
+        self.assertEqual(query, {"habit_id": habit.habit_id})
+        self.assertEqual(set(pipeline[0]["$set"]), {"streak", "last_completed", "updated_at"})
+        self.assertEqual(collection.find_one_and_update.call_args.kwargs, {"return_document": ReturnDocument.AFTER})
+        collection.find_one.assert_not_called()
+        collection.update_one.assert_not_called()
+
+    def test_service_updates_in_one_round_trip(self):
+        collection = MagicMock()
+        repo = MongoHabitEventRepository(collection)
+        collection.find_one_and_update.return_value = repo._to_dict(self.event)
+        listener = MagicMock()
+        service = HabitEventService(repo, MagicMock(), listeners=[listener])
+
+        updated = service.update_habit_event(self.event.event_id, notes="B", unknown=1)
+
+        self.assertEqual(updated.notes, "B")
+        self.assertEqual(collection.find_one_and_update.call_args.args[1], {"$set": {"notes": "B"}})
+        collection.find_one.assert_not_called()
+        collection.update_one.assert_not_called()
+        listener.on_event_saved.assert_called_once_with(self.event, updated)
+
+
+if __name__ == "__main__":
+    unittest.main()
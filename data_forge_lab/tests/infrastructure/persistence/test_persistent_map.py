@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from infrastructure.persistence.persistent_map import EMPTY, PersistentMap
+
+
+class CollidingKey:
+    """Key whose hash collides with every other key of the same bucket."""
+
+    def __init__(self, name, bucket):
+        self.name = name
+        self.bucket = bucket
+
+    def __hash__(self):
+        return self.bucket
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+
+class TestPersistentMap(unittest.TestCase):
+    def test_matches_a_dict_under_random_operations(self):
+        rng = random.Random(7)
+        versions = [(EMPTY, {})]
+        current, expected = EMPTY, {}
+        for step in range(5000):
+            key = rng.randrange(2000)
+            if rng.random() < 0.7:
+                current, expected = current.set(key, step), {**expected, key: step}
+            else:
+                current = current.delete(key)
+                expected = {k: v for k, v in expected.items() if k != key}
+            if step % 500 == 0:
+                versions.append((current, expected))
+        versions.append((current, expected))
+
+        # Every past version is left untouched by the writes that followed it
+        for version, contents in versions:
+            self.assertEqual(len(version), len(contents))
+            self.assertEqual(dict(version.items()), contents)
+            self.assertTrue(all(version[key] == value for key, value in contents.items()))
+
+    def test_hash_collisions(self):
+        first, second, third = CollidingKey("a", 1), CollidingKey("b", 1), CollidingKey("c", 1 + (1 << 40))
+        colliding = EMPTY.set(first, 1).set(second, 2).set(third, 3).set(second, 20)
+
+        self.assertEqual(len(colliding), 3)
+        self.assertEqual((colliding[first], colliding[second], colliding[third]), (1, 20, 3))
+        self.assertNotIn(CollidingKey("d", 1), colliding)
+
+        remaining = colliding.delete(first).delete(CollidingKey("d", 1))
+        self.assertEqual(dict(remaining.items()), {second: 20, third: 3})
+        self.assertEqual(len(colliding), 3)
+
+    def test_bulk_built_map_matches_incremental_sets(self):
+        items = [(key, key * 2) for key in range(3000)] + [(CollidingKey(name, 5), name) for name in "abc"]
+        bulk = PersistentMap.from_items(items)
+        incremental = EMPTY
+        for key, value in items:
+            incremental = incremental.set(key, value)
+
+        self.assertEqual(len(bulk), len(items))
+        self.assertEqual(dict(bulk.items()), dict(incremental.items()))
+        self.assertEqual(bulk.set(1, "one").delete(2)[1], "one")
+        self.assertIs(PersistentMap.from_items([]), EMPTY)
+
+    def test_adopt_shares_the_source_entry(self):
+        source = EMPTY.set("a", [1]).set(CollidingKey("b", 5), 2).set(CollidingKey("c", 5), 3)
+        adopted = EMPTY.set("z", 0).adopt(source, "a").adopt(source, CollidingKey("c", 5))
+
+        self.assertEqual(dict(adopted.items()), {"z": 0, "a": [1], CollidingKey("c", 5): 3})
+        self.assertIs(adopted["a"], source["a"])
+        with self.assertRaises(KeyError):
+            adopted.adopt(source, "missing")
+
+    def test_missing_keys(self):
+        self.assertIsNone(EMPTY.get("missing"))
+        self.assertIs(EMPTY.delete("missing"), EMPTY)
+        with self.assertRaises(KeyError):
+            EMPTY.set("present", 1)["missing"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+from infrastructure.persistence.records import Interner, PersonRecord, HabitRecord, HabitEventRecord, to_epoch, from_epoch
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.intern = Interner()
+
+    def test_records_round_trip_to_equal_domain_objects(self):
+        person = Person(
+            first_name="Ada", last_name="Lovelace", date_of_birth=date(1815, 12, 10), email="ada@example.com",
+            phone_number="+44", address="London", country=Country.UK, gender="female",
+            notification_preferences={"email": True}
+        )
+        habit = Habit(person_id=person.person_id, name="Exercise", goal="Daily", category="Health", streak=3,
+                      last_completed=datetime(2024, 5, 1, 7, 30, 15, 123456))
+        event = HabitEvent(person_id=person.person_id, habit_id=habit.habit_id, notes="Morning run", status="completed")
+
+        self.assertEqual(PersonRecord.from_entity(person, self.intern).materialize(), person)
+        self.assertEqual(HabitRecord.from_entity(habit, self.intern).materialize(), habit)
+        self.assertEqual(HabitEventRecord.from_entity(event, self.intern).materialize(), event)
+
+    def test_repeated_ids_and_strings_are_stored_once(self):
+        person_id, habit_id = uuid4(), uuid4()
+        first, second = (
+            HabitEventRecord.from_entity(HabitEvent(person_id=person_id, habit_id=habit_id, status=status), self.intern)
+            for status in ("completed", "".join(["comp", "leted"]))
+        )
+
+        self.assertIs(first.person_id, second.person_id)
+        self.assertIs(first.habit_id, second.habit_id)
+        self.assertIs(first.status, second.status)
+
+    def test_epoch_timestamps(self):
+        naive = datetime(2024, 2, 29, 23, 59, 59, 999999)
+        aware = datetime(2024, 2, 29, 12, tzinfo=timezone.utc)
+
+        self.assertIsInstance(to_epoch(naive), int)
+        self.assertEqual(from_epoch(to_epoch(naive)), naive)
+        self.assertIs(to_epoch(aware), aware)
+        self.assertIsNone(from_epoch(to_epoch(None)))
+
+    def test_repository_reads_materialize_fresh_objects(self):
+        repo = InMemoryHabitEventRepository()
+        event = repo.save(HabitEvent(person_id=uuid4(), habit_id=uuid4()))
+
+        stored = repo.storage[event.event_id.int]
+        self.assertIsInstance(stored, HabitEventRecord)
+        self.assertEqual(repo.get_by_id(event.event_id), event)
+        self.assertIsNot(repo.get_by_id(event.event_id), repo.get_by_id(event.event_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
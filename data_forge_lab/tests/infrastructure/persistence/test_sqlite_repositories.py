@@ -0,0 +1,306 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from random import Random
+from unittest.mock import patch
+from uuid import uuid4
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from application.domain.services.habit_service import HabitService
+from infrastructure.persistence.sqlite.database import SqliteDatabase
+from infrastructure.persistence.sqlite.person import SqlitePersonRepository
+from infrastructure.persistence.sqlite.habit import SqliteHabitRepository, BY_PERSON as HABITS_BY_PERSON
+from infrastructure.persistence.sqlite.habit_event import (
+    SqliteHabitEventRepository, PAGE_BY_HABIT, FIRST_PAGE_BY_HABIT, BY_HABIT as EVENTS_BY_HABIT
+)
+from infrastructure.persistence.sqlite.analytics import SqliteAnalyticsService
+
+
+class SqliteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.db")
+        self.database = SqliteDatabase(self.path)
+        self.person_repo = SqlitePersonRepository(self.database)
+        self.habit_repo = SqliteHabitRepository(self.database)
+        self.habit_event_repo = SqliteHabitEventRepository(self.database)
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+
+class TestSqliteRepositories(SqliteTestCase):
+    def test_entities_round_trip(self):
+        person = self.person_repo.save(Person(
+            first_name="Ada", last_name="Lovelace", date_of_birth=date(1815, 12, 10), email="ada@example.com",
+            phone_number="+44", address="London", country=Country.UK, notification_preferences={"email": True}
+        ))
+        habit = self.habit_repo.save(Habit(person_id=person.person_id, name="Exercise", goal="Daily", category="Health",
+                                           last_completed=datetime(2024, 5, 1, 7, 30, 15, 123456)))
+        event = self.habit_event_repo.save(HabitEvent(person_id=person.person_id, habit_id=habit.habit_id, notes="Run"))
+
+        self.assertEqual(self.person_repo.get_by_id(person.person_id), person)
+        self.assertEqual(self.habit_repo.get_by_id(habit.habit_id), habit)
+        self.assertEqual(self.habit_event_repo.get_by_id(event.event_id), event)
+        self.assertEqual(self.person_repo.find_by_country(Country.UK), [person])
+        self.assertEqual(self.habit_repo.find_by_person_id(person.person_id), [habit])
+        self.assertIsNone(self.habit_repo.get_by_id(uuid4()))
+
+    def test_save_updates_and_delete_removes(self):
+        event = self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=uuid4()))
+        event.complete()
+        self.habit_event_repo.save(event)
+
+        self.assertEqual(self.habit_event_repo.find_by_status("completed"), [event])
+        self.assertEqual(self.habit_event_repo.find_by_status("pending"), [])
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(event.habit_id), [event])
+        self.assertTrue(self.habit_event_repo.delete(event.event_id))
+        self.assertFalse(self.habit_event_repo.delete(event.event_id))
+        self.assertEqual(self.habit_event_repo.find_all(), [])
+
+    def test_completions_compare_and_set_the_streak(self):
+        habit = self.habit_repo.save(Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health"))
+        for day in (1, 2, 2, 3):
+            completed_at = datetime(2024, 1, day, 7, 30, 0, 123456)
+            updated = self.habit_repo.record_completion(habit.habit_id, completed_at, completed_at)
+
+        self.assertEqual(updated, self.habit_repo.get_by_id(habit.habit_id))
+        self.assertEqual((updated.streak, updated.last_completed), (3, datetime(2024, 1, 3, 7, 30, 0, 123456)))
+        # Stale expected values, such as a streak another completion already moved, do not match
+        self.assertFalse(self.habit_repo.compare_and_set(habit.habit_id, {"streak": 2}, {"streak": 5}))
+        current = {"streak": 3, "last_completed": updated.last_completed}
+        self.assertTrue(self.habit_repo.compare_and_set(habit.habit_id, current, {"goal": "Weekly"}))
+        self.assertIsNone(self.habit_repo.record_completion(uuid4(), datetime(2024, 1, 4), datetime(2024, 1, 4)))
+        with self.assertRaises(ValueError):
+            self.habit_repo.compare_and_set(habit.habit_id, {}, {"streak; DROP TABLE habits": 1})
+
+    def test_field_updates_keep_concurrent_completions(self):
+        habit = self.habit_repo.save(Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health"))
+        completed_at = datetime(2024, 1, 1, 8)
+
+        # A completion from another thread starts between the read of the habit and the write of its new goal
+        from_row, completions = SqliteHabitRepository._from_row, []
+
+        def racing_from_row(row):
+            if not completions:
+                completion = threading.Thread(
+                    target=self.habit_repo.record_completion, args=(habit.habit_id, completed_at, completed_at)
+                )
+                completions.append(completion)
+                completion.start()
+                completion.join(0.2)
+            return from_row(row)
+
+        with patch.object(SqliteHabitRepository, "_from_row", staticmethod(racing_from_row)):
+            HabitService(self.habit_repo).update_habit(habit.habit_id, goal="Weekly")
+        completions[0].join()
+
+        stored = self.habit_repo.get_by_id(habit.habit_id)
+        self.assertEqual((stored.goal, stored.streak, stored.last_completed), ("Weekly", 1, completed_at))
+        self.assertEqual(self.person_repo.update_fields(uuid4(), {"email": "a@example.com"}), None)
+        with self.assertRaises(ValueError):
+            self.habit_repo.update_fields(habit.habit_id, {"streak; DROP TABLE habits": 1})
+
+    def test_aware_timestamps_are_stored_in_utc(self):
+        aware = datetime(2024, 3, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+        event = self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=uuid4(), timestamp=aware))
+
+        self.assertEqual(self.habit_event_repo.get_by_id(event.event_id).timestamp, datetime(2024, 3, 1, 10))
+
+    def test_save_many_is_one_transaction(self):
+        habit_id = uuid4()
+        events = [HabitEvent(person_id=uuid4(), habit_id=habit_id) for _ in range(100)]
+        version = self.habit_event_repo.write_version
+
+        self.assertTrue(self.habit_event_repo.save_many(events).ok)
+        self.assertEqual(len(self.habit_event_repo.find_by_habit_id(habit_id)), 100)
+        self.assertEqual(self.habit_event_repo.write_version, version + 1)
+
+    def test_batches_report_failing_items(self):
+        first, second = HabitEvent(person_id=uuid4(), habit_id=uuid4()), HabitEvent(person_id=uuid4(), habit_id=uuid4())
+        invalid = HabitEvent(person_id=uuid4(), habit_id=uuid4(), status=None)
+
+        ordered = self.habit_event_repo.save_many([first, invalid, second])
+        self.assertEqual((ordered.written, [error.index for error in ordered.errors]), ([first], [1]))
+        self.assertEqual(self.habit_event_repo.find_all(), [first])
+
+        unordered = self.habit_event_repo.save_many([None, invalid, second], ordered=False)
+        self.assertEqual((unordered.written, [error.index for error in unordered.errors]), ([second], [0, 1]))
+        self.assertCountEqual(self.habit_event_repo.find_all(), [first, second])
+
+    def test_delete_many_and_delete_by_habit_id(self):
+        habit_id = uuid4()
+        events = [HabitEvent(person_id=uuid4(), habit_id=habit_id) for _ in range(5)]
+        self.habit_event_repo.save_many(events)
+
+        self.assertEqual(self.habit_event_repo.delete_many([events[0].event_id, uuid4()]), 1)
+        self.assertCountEqual(self.habit_event_repo.delete_by_habit_id(habit_id), events[1:])
+        self.assertEqual(self.habit_event_repo.find_all(), [])
+
+    def test_streaming_reads_fetch_in_batches(self):
+        habit = self.habit_repo.save(Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health"))
+        events = [HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, status="completed") for _ in range(10)]
+        self.habit_event_repo.save_many(events)
+
+        self.assertCountEqual(list(self.habit_event_repo.iter_all(batch_size=3)), events)
+        self.assertEqual(list(self.habit_repo.iter_all(batch_size=3)), [habit])
+        rows = list(self.habit_event_repo.project(("event_id", "habit_id", "timestamp"), batch_size=3))
+        self.assertCountEqual(rows, [(event.event_id, event.habit_id, event.timestamp) for event in events])
+        with self.assertRaises(ValueError):
+            self.habit_event_repo.project(("event_id", "duration"))
+
+    def test_pages_seek_after_the_cursor(self):
+        habit_id, start = uuid4(), datetime(2024, 1, 1)
+        events = [HabitEvent(person_id=uuid4(), habit_id=habit_id, timestamp=start + timedelta(hours=i % 4)) for i in range(11)]
+        self.habit_event_repo.save_many(events)
+
+        listed, cursor = [], None
+        while True:
+            page = self.habit_event_repo.find_page_by_habit_id(habit_id, 3, cursor)
+            listed += page.items
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(listed, sorted(events, key=lambda event: (event.timestamp, event.event_id)))
+        # Pages are index ranges read in order, without sorting
+        for sql, parameters in ((PAGE_BY_HABIT, (b"", 0, b"", 4)), (FIRST_PAGE_BY_HABIT, (b"", 4))):
+            plan = " ".join(row[-1] for row in self.database.query(f"EXPLAIN QUERY PLAN {sql}", parameters))
+            self.assertIn("USING INDEX habit_events_habit_timestamp", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_unpaginated_lists_follow_the_page_order(self):
+        person_id, habit_id, start = uuid4(), uuid4(), datetime(2024, 1, 1)
+        events = [HabitEvent(person_id=person_id, habit_id=habit_id, timestamp=start + timedelta(hours=i % 4))
+                  for i in range(11)]
+        habits = [Habit(person_id=person_id, name=f"Habit {i}", goal="Daily", category="Health",
+                        created_at=start + timedelta(days=i % 3)) for i in range(7)]
+        persons = [Person(first_name="Ada", last_name=str(i), date_of_birth=date(1990, 1, 1), email=f"{i}@example.com",
+                          phone_number="0", address="", creation_date=date(2024, 1, 1 + i % 3)) for i in range(7)]
+        self.habit_event_repo.save_many(events)
+        self.habit_repo.save_many(habits)
+        self.person_repo.save_many(persons)
+
+        events_in_order = self.habit_event_repo.find_page_by_habit_id(habit_id, 100).items
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(habit_id), events_in_order)
+        self.assertEqual(self.habit_event_repo.find_by_person_id(person_id), events_in_order)
+        self.assertEqual(self.habit_event_repo.find_all(), events_in_order)
+        habits_in_order = self.habit_repo.find_page_by_person_id(person_id, 100).items
+        self.assertEqual(self.habit_repo.find_by_person_id(person_id), habits_in_order)
+        self.assertEqual(self.habit_repo.find_all(), habits_in_order)
+        self.assertEqual(self.person_repo.find_all(), self.person_repo.find_page(100).items)
+        # The lists of a habit's events and of a person's habits are index ranges read in order, like the pages
+        indexes = ((EVENTS_BY_HABIT, "habit_events_habit_timestamp"), (HABITS_BY_PERSON, "habits_person_created"))
+        for sql, index in indexes:
+            plan = " ".join(row[-1] for row in self.database.query(f"EXPLAIN QUERY PLAN {sql}", (b"",)))
+            self.assertIn(f"USING INDEX {index}", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_columns_added_since_are_added_to_existing_tables(self):
+        path = os.path.join(self.directory.name, "old.db")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE habits (habit_id BLOB PRIMARY KEY, person_id BLOB NOT NULL, name TEXT NOT NULL, goal TEXT, "
+            "category TEXT, created_at INTEGER NOT NULL, updated_at INTEGER, streak INTEGER NOT NULL DEFAULT 0, "
+            "last_completed INTEGER)"
+        )
+        connection.close()
+
+        habit_repo = SqliteHabitRepository(SqliteDatabase(path))
+        habit = habit_repo.save(Habit(person_id=uuid4(), name="Run", goal="Daily", category="Health", longest_streak=4))
+        self.assertEqual(habit_repo.get_by_id(habit.habit_id).longest_streak, 4)
+        habit_repo.database.close()
+
+    def test_data_survives_reopening_the_database(self):
+        event = self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=uuid4()))
+        self.database.close()
+
+        database = SqliteDatabase(self.path)
+        self.assertEqual(SqliteHabitEventRepository(database).get_by_id(event.event_id), event)
+        self.assertEqual(database.query_one("PRAGMA journal_mode")[0], "wal")
+        database.close()
+
+    def test_lookups_use_the_indexes(self):
+        for column in ("habit_id", "person_id"):
+            plan = self.database.query(f"EXPLAIN QUERY PLAN SELECT * FROM habit_events WHERE {column} = ?", (b"",))
+            self.assertIn("USING INDEX", " ".join(row[-1] for row in plan))
+
+
+class TestSqliteAnalytics(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = Random(42)
+        now = datetime.now()
+        persons = self.person_repo.save_many(
+            Person(first_name=f"First{i}", last_name=f"Last{i}", date_of_birth=date(1990, 1, 1),
+                   email=f"person{i}@example.com", phone_number="000", address="Street",
+                   country=rng.choice(list(Country) + [None]))
+            for i in range(12)
+        ).written
+        habits = self.habit_repo.save_many(
+            Habit(person_id=rng.choice(persons).person_id, name=f"Habit {i % 9}", goal="Daily",
+                  category=rng.choice(["Health", "Productivity", "Social"]))
+            for i in range(30)
+        ).written
+        # The last habits never get any event
+        events = []
+        for _ in range(400):
+            habit = rng.choice(habits[:-3])
+            events.append(HabitEvent(
+                person_id=habit.person_id,
+                habit_id=habit.habit_id,
+                timestamp=now - timedelta(microseconds=rng.randint(0, 45 * 24 * 3600 * 10 ** 6)),
+                status=rng.choice(["completed", "completed", "missed"])
+            ))
+        self.habit_event_repo.save_many(events)
+        self.persons = persons
+        self.python_analytics = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+        self.sqlite_analytics = SqliteAnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+
+    def test_queries_match_python_implementation(self):
+        cases = [
+            ("get_completion_rates", ()),
+            ("get_distribution", ()),
+            ("get_habit_popularity", ()),
+            ("get_habit_popularity", (3, "Health")),
+            ("get_habit_popularity", (5, None, "France")),
+            ("get_time_of_day_heatmap", ()),
+            ("get_time_of_day_heatmap", (None, date.today() - timedelta(days=10), date.today())),
+            ("get_drop_off_rates", (7,)),
+            ("get_drop_off_rates", (30,)),
+            ("get_first_week_success", ()),
+            ("get_engagement_metrics", ()),
+            ("get_engagement_metrics", (14,)),
+            ("get_geographic_trends", ()),
+            ("get_geographic_trends", ("Health",)),
+            ("get_geographic_trends", (None, date.today() - timedelta(days=10), date.today())),
+        ]
+        for method, args in cases:
+            with self.subTest(method=method, args=args):
+                self.assertEqual(getattr(self.sqlite_analytics, method)(*args), getattr(self.python_analytics, method)(*args))
+
+    def test_person_scoped_queries_match_python_implementation(self):
+        for person in self.persons:
+            for method in ("get_completion_rates", "get_time_of_day_heatmap", "get_distribution"):
+                with self.subTest(method=method, person=person.first_name):
+                    self.assertEqual(
+                        getattr(self.sqlite_analytics, method)(person.person_id),
+                        getattr(self.python_analytics, method)(person.person_id)
+                    )
+
+    def test_dashboard_runs_the_queries_concurrently(self):
+        dashboard = self.sqlite_analytics.get_dashboard()
+
+        self.assertFalse([name for name, result in dashboard["sections"].items() if "error" in result])
+        self.assertEqual(dashboard["sections"]["distribution"], self.python_analytics.get_distribution())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import pytest
+from random import Random
+from datetime import date, datetime, timedelta
+
+from application.domain.models.person import Person, Country
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.services.analytics_service import AnalyticsService
+from infrastructure.persistence.mongodb.person import MongoPersonRepository
+from infrastructure.persistence.mongodb.habit import MongoHabitRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.analytics import MongoAnalyticsService
+
+from tests.utils.mongo_test_config import get_test_collection
+
+
+@pytest.fixture(scope="module")
+def repositories():
+    collections = [
+        get_test_collection("test_analytics_persons"),
+        get_test_collection("test_analytics_habits"),
+        get_test_collection("test_analytics_habit_events"),
+    ]
+    for collection in collections:
+        collection.delete_many({})
+
+    person_repo = MongoPersonRepository(collections[0])
+    habit_repo = MongoHabitRepository(collections[1])
+    habit_event_repo = MongoHabitEventRepository(collections[2])
+
+    rng = Random(42)
+    now = datetime.now().replace(microsecond=0)
+    persons = []
+    for i in range(12):
+        person = Person(
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            date_of_birth=date(1990, 1, 1),
+            email=f"person{i}@example.com",
+            phone_number="000",
+            address="Street",
+            country=rng.choice(list(Country) + [None])
+        )
+        persons.append(person_repo.save(person))
+
+    habits = []
+    for i in range(30):
+        habit = Habit(
+            person_id=rng.choice(persons).person_id,
+            name=f"Habit {i % 9}",
+            goal="Daily",
+            category=rng.choice(["Health", "Productivity", "Social"])
+        )
+        habits.append(habit_repo.save(habit))
+
+    # The last habits never get any event
+    for _ in range(400):
+        habit = rng.choice(habits[:-3])
+        habit_event_repo.save(HabitEvent(
+            person_id=habit.person_id,
+            habit_id=habit.habit_id,
+            timestamp=now - timedelta(minutes=rng.randint(0, 60 * 24 * 45)),
+            status=rng.choice(["completed", "completed", "missed"])
+        ))
+
+    yield person_repo, habit_repo, habit_event_repo
+
+    for collection in collections:
+        collection.delete_many({})
+
+
+@pytest.fixture
+def python_analytics(repositories):
+    return AnalyticsService(*repositories)
+
+
+@pytest.fixture
+def mongo_analytics(repositories):
+    return MongoAnalyticsService(*repositories)
+
+
+@pytest.mark.parametrize("method, args", [
+    ("get_completion_rates", ()),
+    ("get_distribution", ()),
+    ("get_time_of_day_heatmap", ()),
+    ("get_drop_off_rates", (7,)),
+    ("get_drop_off_rates", (30,)),
+    ("get_first_week_success", ()),
+    ("get_engagement_metrics", ()),
+    ("get_geographic_trends", ()),
+    ("get_geographic_trends", ("Health",)),
+    ("get_geographic_trends", (None, date.today() - timedelta(days=10), date.today())),
+])
+def test_mongo_pipelines_match_python_implementation(python_analytics, mongo_analytics, method, args):
+    assert getattr(mongo_analytics, method)(*args) == getattr(python_analytics, method)(*args)
+
+
+def test_consistency_matches_python_implementation(python_analytics, mongo_analytics):
+    # Averages are summed in a different order, so allow for floating point noise
+    assert mongo_analytics.get_consistency() == pytest.approx(python_analytics.get_consistency())
+
+
+def test_person_scoped_pipelines_match_python_implementation(python_analytics, mongo_analytics, repositories):
+    person_repo, _, _ = repositories
+    for person in person_repo.find_all():
+        assert mongo_analytics.get_completion_rates(person.person_id) == python_analytics.get_completion_rates(person.person_id)
+        assert mongo_analytics.get_time_of_day_heatmap(person.person_id) == python_analytics.get_time_of_day_heatmap(person.person_id)
+        assert mongo_analytics.get_distribution(person.person_id) == python_analytics.get_distribution(person.person_id)
+
+
+def test_habit_popularity_matches_python_implementation(python_analytics, mongo_analytics):
+    expected = python_analytics.get_habit_popularity()
+    result = mongo_analytics.get_habit_popularity()
+    # Names tied on user count may legitimately come back in a different order
+    assert sorted(h["user_count"] for h in result) == sorted(h["user_count"] for h in expected)
+    assert {h["habit_name"] for h in result if h["user_count"] > expected[-1]["user_count"]} == \
+        {h["habit_name"] for h in expected if h["user_count"] > expected[-1]["user_count"]}
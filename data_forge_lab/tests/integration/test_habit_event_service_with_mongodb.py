@@ -1,6 +1,6 @@
 import pytest
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from application.domain.services.habit_event_service import HabitEventService
 from application.domain.models.event import HabitEvent
@@ -75,6 +75,26 @@ def test_list_habit_events(habit_event_service):
     assert all(isinstance(e, HabitEvent) for e in events)
 
 
+def test_list_habit_events_by_page(habit_event_service):
+    person_id = uuid4()
+    habit_id = uuid4()
+    start = datetime(2024, 1, 1)
+    created = [
+        habit_event_service.create_habit_event(person_id, habit_id, timestamp=start + timedelta(hours=i % 3))
+        for i in range(7)
+    ]
+
+    listed, cursor = [], None
+    while True:
+        page = habit_event_service.list_habit_events_page(habit_id, 3, cursor)
+        listed += [event.event_id for event in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert listed == [event.event_id for event in sorted(created, key=lambda event: (event.timestamp, event.event_id))]
+
+
 def test_get_nonexistent_event(habit_event_service):
     fake_event_id = uuid4()
     event = habit_event_service.get_habit_event(fake_event_id)
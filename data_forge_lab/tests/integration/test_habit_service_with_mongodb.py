@@ -135,3 +135,17 @@ def test_delete_habit_cascades_events(habit_service, event_collection):
     # Events should also be deleted
     events_after = event_repo.find_by_habit_id(habit.habit_id)
     assert len(events_after) == 0
+
+
+def test_bulk_writes(event_collection):
+    event_repo = MongoHabitEventRepository(event_collection)
+    habit_id = uuid4()
+    events = [HabitEvent(person_id=uuid4(), habit_id=habit_id) for _ in range(20)]
+
+    result = event_repo.save_many(events, ordered=False)
+    assert result.ok and result.written == events
+    assert len(event_repo.find_by_habit_id(habit_id)) == 20
+
+    assert event_repo.delete_many([events[0].event_id, uuid4()]) == 1
+    assert {event.event_id for event in event_repo.delete_by_habit_id(habit_id)} == {event.event_id for event in events[1:]}
+    assert event_repo.find_by_habit_id(habit_id) == []
@@ -0,0 +1,33 @@
+from infrastructure.persistence.mongodb.person import MongoPersonRepository
+from infrastructure.persistence.mongodb.habit import MongoHabitRepository
+from infrastructure.persistence.mongodb.habit_event import MongoHabitEventRepository
+from infrastructure.persistence.mongodb.indexes import MongoIndexManager
+
+from tests.utils.mongo_test_config import get_test_collection
+
+
+def test_repository_queries_use_the_declared_indexes():
+    collections = [
+        get_test_collection("test_indexes_persons"),
+        get_test_collection("test_indexes_habits"),
+        get_test_collection("test_indexes_habit_events"),
+    ]
+    for collection in collections:
+        collection.drop()
+    manager = MongoIndexManager([
+        MongoPersonRepository(collections[0]),
+        MongoHabitRepository(collections[1]),
+        MongoHabitEventRepository(collections[2]),
+    ])
+    for collection in collections:
+        collection.insert_one({"placeholder": True})
+
+    assert manager.collection_scans()
+    first = manager.ensure_indexes()
+    # Idempotent: a second run finds every index in place
+    assert manager.ensure_indexes() == first
+    assert manager.collection_scans() == []
+    manager.check_query_plans()
+
+    for collection in collections:
+        collection.drop()
@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+from flask import Flask
+
+from application.domain.models.habit import Habit
+from application.domain.models.event import HabitEvent
+from application.domain.analytics.hyperloglog import DailyActiveUserSketches
+from application.domain.services.analytics_service import AnalyticsService
+from application.use_cases.analytics_use_cases import AnalyticsUseCases
+from infrastructure.cache.analytics_cache import AnalyticsCache
+from infrastructure.persistence.in_memory import InMemoryPersonRepository, InMemoryHabitRepository, InMemoryHabitEventRepository
+from interfaces.controllers.analytics_controller import AnalyticsController
+from interfaces.controllers.system_controller import SystemController
+
+
+class TestAnalyticsController(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+
+        self.person_repo = InMemoryPersonRepository()
+        self.habit_repo = InMemoryHabitRepository()
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        self.cache = AnalyticsCache([self.person_repo, self.habit_repo, self.habit_event_repo], max_entries=2, ttl_seconds=60)
+
+        analytics_service = AnalyticsService(self.person_repo, self.habit_repo, self.habit_event_repo)
+        self.analytics_controller = AnalyticsController(AnalyticsUseCases(analytics_service, cache=self.cache))
+        self.system_controller = SystemController(self.person_repo, None, analytics_cache=self.cache)
+
+        self.app.register_blueprint(self.analytics_controller.analytics_blueprint, url_prefix='/api')
+        self.app.register_blueprint(self.system_controller.system_blueprint, url_prefix='/api')
+        self.client = self.app.test_client()
+
+        self.habit_repo.save(Habit(person_id=uuid4(), name="Exercise", goal="Daily", category="Health"))
+
+    def test_repeated_requests_are_served_from_cache(self):
+        with patch.object(AnalyticsService, 'get_distribution', wraps=self.analytics_controller.analytics_use_cases.analytics_service.get_distribution) as compute:
+            first = self.client.get('/api/analytics/distribution')
+            second = self.client.get('/api/analytics/distribution')
+
+        self.assertEqual(first.json, {"Health": 1})
+        self.assertEqual(second.json, first.json)
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_writes_invalidate_cached_results(self):
+        self.assertEqual(self.client.get('/api/analytics/distribution').json, {"Health": 1})
+
+        self.habit_repo.save(Habit(person_id=uuid4(), name="Budget", goal="Monthly", category="Financial"))
+
+        self.assertEqual(self.client.get('/api/analytics/distribution').json, {"Health": 1, "Financial": 1})
+        self.assertEqual(self.cache.invalidations, 1)
+
+    def test_bypass_flag_skips_the_cache(self):
+        self.client.get('/api/analytics/distribution')
+        self.client.get('/api/analytics/distribution?no_cache=true')
+        self.client.get('/api/analytics/distribution', headers={'Cache-Control': 'no-cache'})
+
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_cache_is_bounded(self):
+        self.client.get('/api/analytics/distribution')
+        self.client.get('/api/analytics/habit-popularity')
+        self.client.get('/api/analytics/time-heatmap')
+
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_cache_stats_are_exposed_on_system_status(self):
+        self.client.get('/api/analytics/distribution')
+        self.client.get('/api/analytics/distribution')
+
+        response = self.client.get('/api/system/status')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["analytics_cache"]["hits"], 1)
+        self.assertEqual(response.json["analytics_cache"]["misses"], 1)
+
+    def test_results_are_tagged_with_the_snapshot_they_read(self):
+        get_distribution = AnalyticsService.get_distribution
+
+        def distribution_with_concurrent_write(analytics, person_id=None):
+            self.habit_repo.save(Habit(person_id=uuid4(), name="Budget", goal="Monthly", category="Financial"))
+            return get_distribution(analytics, person_id)
+
+        with patch.object(AnalyticsService, 'get_distribution', distribution_with_concurrent_write):
+            first = self.client.get('/api/analytics/distribution')
+
+        # The write landed after the snapshot was taken: the result and its cache entry belong to the older version
+        self.assertEqual(first.json, {"Health": 1})
+        self.assertEqual(self.client.get('/api/analytics/distribution').json, {"Health": 1, "Financial": 1})
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_time_heatmap_accepts_a_date_range(self):
+        habit = self.habit_repo.find_all()[0]
+        old = datetime.now() - timedelta(days=100)
+        self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, timestamp=old))
+        self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id))
+
+        self.assertEqual(sum(self.client.get('/api/analytics/time-heatmap').json.values()), 2)
+        self.assertEqual(sum(self.client.get('/api/analytics/time-heatmap?days=90').json.values()), 1)
+        day = old.date().isoformat()
+        self.assertEqual(sum(self.client.get(f'/api/analytics/time-heatmap?start={day}&end={day}').json.values()), 1)
+
+        engagement = self.client.get('/api/analytics/engagement?days=90').json
+        self.assertEqual(engagement["active_users"]["last_90_days"], 1)
+
+    def test_activity_days_of_a_person(self):
+        habit = self.habit_repo.find_all()[0]
+        for days_ago in (2, 1):
+            timestamp = datetime.now() - timedelta(days=days_ago)
+            self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, timestamp=timestamp,
+                                                  status="completed"))
+
+        activity = self.client.get(f'/api/analytics/activity-days?person_id={habit.person_id}').json
+        self.assertEqual(activity["habits"][str(habit.habit_id)]["current_streak"], 2)
+        self.assertEqual(len(activity["all_habits_completed_days"]), 2)
+
+    def test_engagement_approximation_is_selected_per_request(self):
+        sketches = DailyActiveUserSketches()
+        self.analytics_controller.analytics_use_cases.analytics_service.active_user_sketches = sketches
+        habit = self.habit_repo.find_all()[0]
+        event = self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id))
+        sketches.on_event_saved(None, event)
+
+        exact = self.client.get('/api/analytics/engagement').json
+        approx = self.client.get('/api/analytics/engagement?approx=true').json
+
+        self.assertNotIn("approximate", exact)
+        self.assertEqual(approx["active_users"]["daily"], 1)
+        self.assertIn("standard_error", approx["approximate"])
+
+    def test_dashboard_sections_match_individual_routes(self):
+        habit = self.habit_repo.find_all()[0]
+        self.habit_event_repo.save(HabitEvent(person_id=habit.person_id, habit_id=habit.habit_id, status="completed"))
+
+        response = self.client.get('/api/analytics/dashboard?sections=completion-rates,time-heatmap,distribution')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json["sections"]), {"completion-rates", "time-heatmap", "distribution"})
+        self.assertEqual(set(response.json["timings_ms"]), {"load", "completion-rates", "time-heatmap", "distribution"})
+        for section in response.json["sections"]:
+            self.assertEqual(response.json["sections"][section], self.client.get(f'/api/analytics/{section}').json)
+
+    def test_dashboard_rejects_unknown_sections(self):
+        response = self.client.get('/api/analytics/dashboard?sections=distribution,unknown')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
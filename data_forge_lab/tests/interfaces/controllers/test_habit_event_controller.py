@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+from uuid import uuid4
+from flask import Flask
+
+from application.domain.models.event import HabitEvent
+from application.domain.services.habit_event_service import HabitEventService
+from application.use_cases.habit_event_use_cases import HabitEventUseCases
+from infrastructure.persistence.in_memory import InMemoryHabitEventRepository
+from interfaces.controllers.habit_event_controller import HabitEventController
+from interfaces.event_publisher import EventPublisher
+
+
+class NoOpEventPublisher(EventPublisher):
+    def publish(self, event):
+        pass
+
+
+class TestHabitEventController(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.habit_event_repo = InMemoryHabitEventRepository()
+        service = HabitEventService(self.habit_event_repo, NoOpEventPublisher())
+        self.habit_event_controller = HabitEventController(HabitEventUseCases(service))
+        self.app.register_blueprint(self.habit_event_controller.habit_event_blueprint, url_prefix='/api')
+        self.client = self.app.test_client()
+
+        self.event = self.habit_event_repo.save(HabitEvent(person_id=uuid4(), habit_id=uuid4()))
+        self.url = f'/api/habit_events/{self.event.event_id}'
+
+    def test_update_parses_typed_fields(self):
+        habit_id = uuid4()
+
+        response = self.client.put(self.url, json={
+            "timestamp": "2024-01-01T10:00:00", "habit_id": str(habit_id), "status": "completed"
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["timestamp"], "2024-01-01T10:00:00")
+        stored = self.habit_event_repo.get_by_id(self.event.event_id)
+        self.assertEqual((stored.timestamp, stored.habit_id), (datetime(2024, 1, 1, 10), habit_id))
+        self.assertEqual(self.habit_event_repo.find_by_habit_id(habit_id), [stored])
+
+    def test_update_rejects_invalid_fields(self):
+        for body in ({"timestamp": "yesterday"}, {"timestamp": 1704103200}, {"person_id": "42"}, {"status": None},
+                     {"notes": ["a", "list"]}):
+            with self.subTest(body=body):
+                response = self.client.put(self.url, json=body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json)
+        self.assertEqual(self.habit_event_repo.get_by_id(self.event.event_id), self.event)
+
+    def test_update_of_a_missing_event(self):
+        response = self.client.put(f'/api/habit_events/{uuid4()}', json={"timestamp": "2024-01-01T10:00:00"})
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 from flask import Flask
 from interfaces.controllers.person_controller import PersonController, init_person_controller
 from infrastructure.persistence.in_memory import InMemoryPersonRepository
+from interfaces.repositories.batch import BatchWriteResult
 from application.domain.models.person import Country, Person
 from datetime import date
 from uuid import UUID
@@ -26,8 +27,8 @@ class TestPersonController(unittest.TestCase):
         # Set up the test client
         self.client = self.app.test_client()
 
-    @patch('application.use_cases.person_use_cases.PersonUseCases.create_person')
-    def test_create_person(self, mock_create_person):
+    @patch('application.use_cases.person_use_cases.PersonUseCases.create_persons')
+    def test_create_person(self, mock_create_persons):
         # Create a mock Person object
         mock_person = Person(
             person_id=UUID("123e4567-e89b-12d3-a456-426614174000"),
@@ -39,7 +40,7 @@ class TestPersonController(unittest.TestCase):
             address="123 Main St",
             country=Country.USA
         )
-        mock_create_person.return_value = mock_person
+        mock_create_persons.return_value = BatchWriteResult([mock_person])
 
         # Send a POST request to create a person
         response = self.client.post('/api/persons', json=[{
@@ -56,6 +57,32 @@ class TestPersonController(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertIn("John", response.json[0]["first_name"])
 
+    def test_create_persons_reports_invalid_items(self):
+        valid = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "date_of_birth": "1990-01-01",
+            "email": "john.doe@example.com",
+            "phone_number": "123-456-7890",
+            "address": "123 Main St",
+            "country": Country.USA.value
+        }
+        persons = [valid, {**valid, "date_of_birth": "01/01/1990"}, {**valid, "first_name": "Jane"}]
+
+        # Ordered by default: creation stops at the first invalid person
+        response = self.client.post('/api/persons', json=persons)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([person["first_name"] for person in response.json["created"]], ["John"])
+        self.assertEqual([error["index"] for error in response.json["errors"]], [1])
+
+        response = self.client.post('/api/persons?ordered=false', json=persons)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([person["first_name"] for person in response.json["created"]], ["John", "Jane"])
+        self.assertEqual(len(self.person_repo.find_all()), 3)
+
+        response = self.client.post('/api/persons', json=[{**valid, "country": "Atlantis"}])
+        self.assertEqual(response.status_code, 400)
+
     @patch('application.use_cases.person_use_cases.PersonUseCases.get_person')
     def test_get_person(self, mock_get_person):
         # Create a mock Person object
@@ -100,6 +127,25 @@ class TestPersonController(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("Jane", response.json["first_name"])
 
+    def test_update_person_parses_typed_fields(self):
+        person = self.person_repo.save(Person(
+            first_name="John", last_name="Doe", date_of_birth=date(1990, 1, 1), email="john.doe@example.com",
+            phone_number="123-456-7890", address="123 Main St", country=Country.USA
+        ))
+        url = f'/api/persons/{person.person_id}'
+
+        response = self.client.put(url, json={"date_of_birth": "1991-02-03", "country": "France"})
+
+        self.assertEqual(response.status_code, 200)
+        stored = self.person_repo.get_by_id(person.person_id)
+        self.assertEqual((stored.date_of_birth, stored.country), (date(1991, 2, 3), Country.FRANCE))
+        for body in ({"date_of_birth": "03/02/1991"}, {"country": "Atlantis"}, {"first_name": None}):
+            with self.subTest(body=body):
+                response = self.client.put(url, json=body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json)
+        self.assertEqual(self.person_repo.get_by_id(person.person_id), stored)
+
     @patch('application.use_cases.person_use_cases.PersonUseCases.delete_person')
     def test_delete_person(self, mock_delete_person):
         # Mock the delete_person method
@@ -133,6 +179,31 @@ class TestPersonController(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json), 1)
 
+    def test_list_persons_by_page(self):
+        persons = [
+            Person(first_name=f"Person {i}", last_name="Doe", date_of_birth=date(1990, 1, 1), email="doe@example.com",
+                   phone_number="123-456-7890", address="123 Main St", country=Country.USA, creation_date=date(2024, 1, i % 3 + 1))
+            for i in range(5)
+        ]
+        self.person_repo.save_many(persons)
+
+        listed, cursor = [], None
+        while True:
+            response = self.client.get('/api/persons', query_string={"limit": 2, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json["items"]), 2)
+            listed += [person["person_id"] for person in response.json["items"]]
+            cursor = response.json["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = sorted(persons, key=lambda person: (person.creation_date, person.person_id))
+        self.assertEqual(listed, [str(person.person_id) for person in expected])
+
+        for query_string in ({"limit": 0}, {"limit": "ten"}, {"cursor": "not a cursor"}):
+            with self.subTest(query_string=query_string):
+                self.assertEqual(self.client.get('/api/persons', query_string=query_string).status_code, 400)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,8 @@ from dotenv import load_dotenv
 import os
 from pymongo import MongoClient
 
+from infrastructure.config.mongo_config import CLIENT_OPTIONS
+
 load_dotenv(dotenv_path="../.env.test")
 
 
@@ -9,7 +11,7 @@ def get_test_collection(collection_name: str):
     print("MONGO_TEST_URI:", os.getenv("MONGO_TEST_URI"))
     print("MONGO_TEST_DB:", os.getenv("MONGO_TEST_DB"))
 
-    client = MongoClient(os.getenv("MONGO_TEST_URI"))
+    client = MongoClient(os.getenv("MONGO_TEST_URI"), **CLIENT_OPTIONS)
     db_name = os.getenv("MONGO_TEST_DB")
     print("Loaded DB:", os.getenv("MONGO_TEST_DB"))
 